@@ -3,17 +3,24 @@ Controlador para digitalización de documentos
 Maneja el flujo: Upload → MinIO → BD → OCR/HTR → Resultados
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import text
+import hashlib
+import httpx
+import json
 import logging
 import asyncio
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from app.services.digitalizacion_service import DigitalizacionService
+from app.services.progreso_service import progreso_service
+from app.services.http_client import cliente_servicios, TIMEOUT_RECONOCER_TUPLA
+from app.services.admision_service import admision_service, ServicioSaturado
+from app.services.lectura_stream import tamano_archivo
 from app.dto.digitalizacion_dto import (
     UploadDocumentRequest, UploadDocumentResponse, 
     ProcessingStatusResponse, DocumentListResponse
@@ -31,12 +38,13 @@ digitalizacion_service = DigitalizacionService()
 
 @router.post("/upload", response_model=UploadDocumentResponse)
 async def upload_document(
+    response: Response,
     archivo: UploadFile = File(..., description="Archivo JPG, PNG o PDF"),
     libro_id: int = Form(..., description="ID del libro"),
     tipo_sacramento: int = Form(..., description="Tipo de sacramento (1=bautizo, 2=confirmacion, etc.)"),
     institucion_id: int = Form(1, description="ID de la institución/parroquia"),
     procesar_automaticamente: bool = Form(True, description="Procesar con OCR/HTR automáticamente"),
-    modelo_procesamiento: str = Form('ocr', description="Modelo de procesamiento: 'ocr' (texto impreso) o 'htr' (texto manuscrito)"),
+    modelo_procesamiento: str = Form('ocr', description="Modelo de procesamiento: 'ocr' (texto impreso), 'htr' (texto manuscrito) o 'auto' (clasificador de páginas)"),
     db: Session = Depends(get_db)
 ):
     """
@@ -44,20 +52,25 @@ async def upload_document(
     
     Flujo:
     1. Valida el archivo
-    2. Sube a MinIO
-    3. Guarda metadata en BD (documento_digitalizado)
-    4. Si procesar_automaticamente=True, llama al OCR o HTR service
-    5. Guarda resultados en BD (ocr_resultado)
+    2. Reserva lugar en OCR/HTR (control de admisión)
+    3. Sube a MinIO
+    4. Guarda metadata en BD (documento_digitalizado)
+    5. Si procesar_automaticamente=True, llama al OCR o HTR service
+    6. Guarda resultados en BD (ocr_resultado)
+    
+    Con procesamiento automático responde 200 si el documento se procesa de
+    inmediato, 202 si quedó en la cola del servicio (con posicion_cola y
+    eta_segundos) y 429 con Retry-After si el servicio y su cola están llenos.
     """
     
     try:
         logger.info(f"Iniciando upload de documento: {archivo.filename} (modelo: {modelo_procesamiento})")
         
         # Validar modelo_procesamiento
-        if modelo_procesamiento not in ['ocr', 'htr']:
+        if modelo_procesamiento not in ['ocr', 'htr', 'auto']:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="modelo_procesamiento debe ser 'ocr' o 'htr'"
+                detail="modelo_procesamiento debe ser 'ocr', 'htr' o 'auto'"
             )
         
         # Validar tipo de archivo
@@ -70,27 +83,27 @@ async def upload_document(
                 detail="Tipo de archivo no soportado. Solo JPG, PNG y PDF."
             )
         
-        # Validar tamaño (máx 50MB)
+        # Validar tamaño (máx 50MB) sin leer el archivo: se sube a MinIO por partes
         MAX_SIZE = 50 * 1024 * 1024  # 50MB
-        archivo_bytes = await archivo.read()
+        tamano = tamano_archivo(archivo.file)
         
-        if len(archivo_bytes) > MAX_SIZE:
+        if tamano > MAX_SIZE:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Archivo demasiado grande. Máximo 50MB."
             )
         
-        if len(archivo_bytes) == 0:
+        if tamano == 0:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Archivo vacío."
             )
         
-        logger.info(f"Archivo validado: {len(archivo_bytes)} bytes")
+        logger.info(f"Archivo validado: {tamano} bytes")
         
         # Procesar documento usando el servicio
         resultado = await digitalizacion_service.procesar_documento(
-            archivo_bytes=archivo_bytes,
+            archivo=archivo.file,
             archivo_nombre=archivo.filename,
             content_type=archivo.content_type,
             libro_id=libro_id,
@@ -102,11 +115,20 @@ async def upload_document(
         )
         
         logger.info(f"Documento procesado exitosamente. ID: {resultado.documento_id}")
+        if resultado.admision == 'en_cola':
+            response.status_code = status.HTTP_202_ACCEPTED
         
         return resultado
         
     except HTTPException:
         raise
+    except ServicioSaturado as e:
+        logger.warning(f"🚦 Upload de {archivo.filename} rechazado: {e.motivo}")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=e.motivo,
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         logger.error(f"Error procesando documento: {str(e)}")
         raise HTTPException(
@@ -116,7 +138,7 @@ async def upload_document(
         
         # Procesar documento usando el servicio
         resultado = await digitalizacion_service.procesar_documento(
-            archivo_bytes=archivo_bytes,
+            archivo=archivo.file,
             archivo_nombre=archivo.filename,
             content_type=archivo.content_type,
             libro_id=libro_id,
@@ -139,170 +161,210 @@ async def upload_document(
             detail=f"Error interno: {str(e)}"
         )
 
-@router.get("/progreso/{documento_id}")
-async def get_progreso_procesamiento(
-    documento_id: int,
+@router.get("/capacidad")
+async def get_capacidad():
+    """
+    Capacidad de OCR/HTR vista por el control de admisión: documentos en curso o
+    en cola, tamaño de la cola, duración media y si el worker avisó saturación
+    """
+    return admision_service.estado()
+
+@router.post("/lote", status_code=status.HTTP_202_ACCEPTED)
+async def upload_lote(
+    archivos: List[UploadFile] = File(..., description="Páginas JPG, PNG o PDF y/o archivos ZIP con páginas"),
+    libro_id: int = Form(..., description="ID del libro"),
+    tipo_sacramento: int = Form(..., description="Tipo de sacramento (1=bautizo, 2=confirmacion, etc.)"),
+    institucion_id: int = Form(1, description="ID de la institución/parroquia"),
+    procesar_automaticamente: bool = Form(True, description="Procesar con OCR/HTR automáticamente"),
+    modelo_procesamiento: str = Form('ocr', description="Modelo de procesamiento: 'ocr', 'htr' o 'auto' (clasificador, por página)"),
     db: Session = Depends(get_db)
 ):
     """
-    Obtiene el progreso de procesamiento leyendo los logs de Docker
-    del contenedor OCR o HTR según corresponda
+    Carga de un libro completo: varias páginas y/o ZIPs de páginas en un pedido
+    
+    Las páginas se suben a MinIO en paralelo (acotado), se guardan en la BD en un
+    solo INSERT con un lote_id común y se envían a OCR/HTR en segundo plano a
+    medida que haya lugar. Responde 202 con el lote_id, los documentos creados
+    (y los que ya existían para el libro, `duplicado`) y las páginas omitidas con
+    su motivo. El avance del lote se consulta en GET /lote/{lote_id}.
     """
+    if modelo_procesamiento not in ['ocr', 'htr', 'auto']:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="modelo_procesamiento debe ser 'ocr', 'htr' o 'auto'"
+        )
+    
+    logger.info(f"📚 Carga por lote: {len(archivos)} archivo(s) para el libro {libro_id} (modelo: {modelo_procesamiento})")
     try:
-        from sqlalchemy import text
-        import subprocess
-        import re
-        
-        # Obtener modelo_procesamiento del documento
-        query = text("""
-            SELECT modelo_procesamiento 
-            FROM documento_digitalizado 
-            WHERE id_documento = :doc_id
-        """)
-        result = db.execute(query, {"doc_id": documento_id}).fetchone()
-        
-        if not result:
+        resultado = await digitalizacion_service.procesar_lote(
+            archivos=[(archivo.filename or '', archivo.content_type, archivo.file) for archivo in archivos],
+            libro_id=libro_id,
+            tipo_sacramento=tipo_sacramento,
+            procesar_ocr=procesar_automaticamente,
+            modelo_procesamiento=modelo_procesamiento,
+            db=db
+        )
+    except Exception as e:
+        logger.error(f"Error procesando lote: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error interno: {str(e)}"
+        )
+    
+    if not resultado['documentos']:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"mensaje": "El lote no tiene páginas válidas", "omitidos": resultado['omitidos']}
+        )
+    return resultado
+
+@router.get("/lote/{lote_id}")
+async def get_progreso_lote_carga(lote_id: str, db: Session = Depends(get_db)):
+    """
+    Progreso agregado de un lote de carga: cantidad de documentos completados,
+    con error, en OCR/HTR y pendientes, progreso promedio y el de cada documento
+    """
+    try:
+        resumen = progreso_service.snapshot_lote(db, lote_id)
+    except Exception as e:
+        logger.error(f"Error obteniendo progreso del lote {lote_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error obteniendo progreso: {str(e)}"
+        )
+    if resumen is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Lote {lote_id} no encontrado"
+        )
+    return resumen
+
+# Máximo de documentos por consulta de progreso en lote
+MAX_PROGRESO_LOTE = 200
+
+@router.get("/progreso")
+async def get_progreso_lote(
+    request: Request,
+    ids: Optional[str] = None,
+    en_curso: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Progreso de varios documentos en una sola consulta, para tableros y
+    digitalización por lotes.
+
+    - `ids=1,2,3`: progreso de esos documentos (máximo MAX_PROGRESO_LOTE)
+    - `en_curso=true`: los documentos que se están procesando o esperan en cola
+      ahora (se suman a `ids` si vienen ambos). Si son más de los que entran en
+      la respuesta se devuelven los que llevan más tiempo sin actualizarse y
+      `truncado: true` con el total en `en_curso_total` (p.ej. mientras se
+      despacha un lote grande)
+
+    Responde con `ETag`; si el cliente envía `If-None-Match` y nada cambió
+    devuelve `304` sin cuerpo.
+    """
+    documentos_ids = []
+    if ids:
+        try:
+            documentos_ids = list(dict.fromkeys(int(i) for i in ids.split(",") if i.strip()))
+        except ValueError:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Documento {documento_id} no encontrado"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="ids debe ser una lista de enteros separados por coma"
             )
-        
-        modelo = result[0] or 'ocr'
-        
-        # Determinar nombre del contenedor según modelo
-        if modelo == 'htr':
-            container_name = "sacra360_htr_service"
-            modelo_upper = "HTR"
-        else:
-            container_name = "sacra360_ocr_service"
-            modelo_upper = "OCR"
-        
+        if len(documentos_ids) > MAX_PROGRESO_LOTE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Máximo {MAX_PROGRESO_LOTE} documentos por consulta"
+            )
+    elif not en_curso:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Indicar ids=... o en_curso=true"
+        )
+
+    extra = {}
+    if en_curso:
+        pedidos = set(documentos_ids)
+        activos = [d for d in progreso_service.almacen.en_curso() if d not in pedidos]
+        lugar = MAX_PROGRESO_LOTE - len(documentos_ids)
+        documentos_ids += activos[:lugar]
+        extra = {"truncado": len(activos) > lugar, "en_curso_total": len(activos)}
+
+    try:
+        progresos = progreso_service.snapshot_varios(db, documentos_ids) if documentos_ids else {}
+    except Exception as e:
+        logger.error(f"Error obteniendo progreso en lote: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error obteniendo progreso: {str(e)}"
+        )
+
+    cuerpo = json.dumps(
+        {"documentos": {str(d): progresos[d] for d in documentos_ids if d in progresos}, **extra},
+        sort_keys=True, default=str
+    )
+    etag = '"' + hashlib.sha1(cuerpo.encode()).hexdigest()[:20] + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cuerpo, media_type="application/json", headers=headers)
+
+@router.get("/progreso/stream")
+async def stream_progreso_varios(ids: str):
+    """
+    Progreso en vivo de varios documentos en un solo stream SSE (`ids=1,2,3`),
+    para no abrir una conexión por documento (los navegadores admiten ~6 por
+    origen en HTTP/1.1). Cada evento es `event: progreso` con el JSON de
+    GET /progreso/{documento_id} más `documento_id`; el stream termina cuando
+    todos los documentos se completaron o fallaron.
+    """
+    try:
+        documentos_ids = list(dict.fromkeys(int(i) for i in ids.split(",") if i.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids debe ser una lista de enteros separados por coma"
+        )
+    if not documentos_ids or len(documentos_ids) > MAX_PROGRESO_LOTE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Indicar entre 1 y {MAX_PROGRESO_LOTE} documentos"
+        )
+
+    def leer_snapshots(pendientes):
+        # Sesión propia: el stream dura más que la dependencia get_db del request
+        db = SessionLocal()
         try:
-            # Leer logs del contenedor (últimas 200 líneas)
-            cmd = ["docker", "logs", container_name, "--tail", "200"]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
-            logs = result.stdout + result.stderr
-            
-            # Parsear logs para extraer progreso
-            estado = "procesando"
-            progreso = 0
-            mensaje = f"Procesando con {modelo_upper}..."
-            
-            # Buscar documento_id en logs
-            doc_pattern = rf"documento.*{documento_id}|ID=?{documento_id}|doc_id.*{documento_id}"
-            if not re.search(doc_pattern, logs, re.IGNORECASE):
-                return {
-                    "estado": "pendiente",
-                    "progreso": 0,
-                    "mensaje": f"Esperando inicio de procesamiento {modelo_upper}...",
-                    "etapa": "pendiente"
-                }
-            
-            # Para HTR: buscar filas procesadas
-            if modelo == 'htr':
-                # Buscar "✅ COMPLETADO: X filas válidas extraídas"
-                completado_match = re.search(r'✅ COMPLETADO:\s*(\d+)\s*filas válidas', logs)
-                if completado_match:
-                    return {
-                        "estado": "completado",
-                        "progreso": 100,
-                        "mensaje": f"HTR completado: {completado_match.group(1)} filas extraídas",
-                        "etapa": "completado"
-                    }
-                
-                # Contar TODAS las filas procesadas (válidas + saltadas por ruido)
-                filas_validas = len(re.findall(r'✅ VÁLIDA', logs))
-                filas_saltadas = len(re.findall(r'⏭️.*SALTADA|Fila.*SALTADA', logs))
-                total_procesadas = filas_validas + filas_saltadas
-                
-                # Buscar total estimado de filas detectadas
-                filas_detectadas_match = re.search(r'📍 Filas detectadas:\s*(\d+)', logs)
-                total_filas = int(filas_detectadas_match.group(1)) if filas_detectadas_match else 10
-                
-                if total_procesadas > 0:
-                    # Progreso basado en filas procesadas (válidas + ruido)
-                    progreso = min(int((total_procesadas / total_filas) * 85), 85)  # Max 85% durante procesamiento
-                    mensaje = f"HTR: {total_procesadas}/{total_filas} filas procesadas ({filas_validas} válidas)"
-                    estado = "procesando_htr"
-                elif "Detectando estructura" in logs:
-                    progreso = 10
-                    mensaje = "HTR: Detectando estructura de tabla..."
-                    estado = "procesando_htr"
-                elif "Convirtiendo PDF" in logs:
-                    progreso = 5
-                    mensaje = "HTR: Convirtiendo PDF a imagen..."
-                    estado = "procesando_htr"
-                else:
-                    progreso = 2
-                    mensaje = "HTR: Iniciando procesamiento..."
-                    estado = "procesando_htr"
-                    
-            # Para OCR: buscar progreso de EasyOCR
-            else:
-                # Buscar completado - DEBE ser mensaje final específico
-                if re.search(r'✅ PROCESAMIENTO COMPLETADO EXITOSAMENTE|✅ OCR completado:', logs):
-                    return {
-                        "estado": "completado",
-                        "progreso": 100,
-                        "mensaje": "OCR completado exitosamente",
-                        "etapa": "completado"
-                    }
-                
-                # Buscar progreso de lectura de celdas en logs de EasyOCR
-                # Patrón: "📊 Procesadas X/Y celdas" - ÚNICO indicador válido para evitar saltos
-                # Usar findall para encontrar TODAS las coincidencias y tomar la ÚLTIMA
-                ocr_cells_matches = re.findall(r'📊 Procesadas (\d+)/(\d+) celdas', logs)
-                
-                if ocr_cells_matches:
-                    # Tomar la ÚLTIMA coincidencia (progreso más reciente)
-                    procesadas, total = ocr_cells_matches[-1]
-                    procesadas = int(procesadas)
-                    total = int(total)
-                    # Progreso 0-95% basado en celdas procesadas
-                    progreso = min(int((procesadas / total) * 95), 95)
-                    mensaje = f"OCR: Leyendo {procesadas}/{total} celdas..."
-                    estado = "procesando_ocr"
-                else:
-                    # Antes de empezar a leer celdas, mantener en 0%
-                    progreso = 0
-                    mensaje = "OCR: Preparando documento..."
-                    estado = "procesando_ocr"
-            
-            # Buscar errores
-            if re.search(r'ERROR|Exception|Traceback|Failed', logs, re.IGNORECASE):
-                error_match = re.search(r'(ERROR|Exception):\s*(.+)', logs)
-                error_msg = error_match.group(2) if error_match else "Error en procesamiento"
-                return {
-                    "estado": "error",
-                    "progreso": 0,
-                    "mensaje": f"Error: {error_msg[:100]}",
-                    "etapa": "error"
-                }
-            
-            return {
-                "estado": estado,
-                "progreso": progreso,
-                "mensaje": mensaje,
-                "etapa": modelo
-            }
-            
-        except subprocess.TimeoutExpired:
-            logger.error(f"Timeout leyendo logs de {container_name}")
-            return {
-                "estado": "error",
-                "progreso": 0,
-                "mensaje": "Timeout consultando logs del contenedor"
-            }
-        except Exception as e:
-            logger.error(f"Error leyendo logs de Docker: {e}")
-            return {
-                "estado": "procesando",
-                "progreso": 10,
-                "mensaje": f"Procesando con {modelo_upper}... (sin acceso a logs)"
-            }
-        
-    except HTTPException:
-        raise
+            return progreso_service.snapshot_varios(db, pendientes)
+        finally:
+            db.close()
+
+    async def sse():
+        async for item in progreso_service.eventos_varios(documentos_ids, leer_snapshots):
+            if item is None:
+                yield ": latido\n\n"
+                continue
+            documento_id, evento = item
+            yield f"event: progreso\ndata: {json.dumps(dict(evento, documento_id=documento_id), default=str)}\n\n"
+
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/progreso/{documento_id}")
+async def get_progreso_procesamiento(
+    documento_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Snapshot del progreso de procesamiento OCR/HTR del documento (lectura de BD).
+    Para seguirlo en vivo usar /progreso/{documento_id}/stream
+    """
+    try:
+        progreso = progreso_service.snapshot(db, documento_id)
     except Exception as e:
         logger.error(f"Error obteniendo progreso: {str(e)}")
         raise HTTPException(
@@ -310,6 +372,41 @@ async def get_progreso_procesamiento(
             detail=f"Error obteniendo progreso: {str(e)}"
         )
 
+    if progreso is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Documento {documento_id} no encontrado"
+        )
+    return progreso
+
+@router.get("/progreso/{documento_id}/stream")
+async def stream_progreso_procesamiento(documento_id: int):
+    """
+    Progreso en vivo por Server-Sent Events: envía el snapshot actual y luego
+    cada evento que publican OCR/HTR, hasta que el documento se completa o falla.
+    Cada evento es `event: progreso` con el mismo JSON que GET /progreso/{documento_id}.
+    """
+    def leer_snapshot():
+        # Sesión propia: el stream dura más que la dependencia get_db del request
+        db = SessionLocal()
+        try:
+            return progreso_service.snapshot(db, documento_id)
+        finally:
+            db.close()
+
+    async def sse():
+        async for evento in progreso_service.eventos(documento_id, leer_snapshot):
+            if evento is None:
+                yield ": latido\n\n"
+                continue
+            yield f"event: progreso\ndata: {json.dumps(evento, default=str)}\n\n"
+
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/status/{documento_id}", response_model=ProcessingStatusResponse)
 async def get_processing_status(
     documento_id: int,
@@ -383,12 +480,15 @@ async def get_documentos_pendientes(db: Session = Depends(get_db)):
                 COUNT(o.id_ocr) as total_tuplas,
                 SUM(CASE WHEN o.estado_validacion = 'pendiente' THEN 1 ELSE 0 END) as tuplas_pendientes,
                 SUM(CASE WHEN o.estado_validacion = 'validado' THEN 1 ELSE 0 END) as tuplas_validadas,
-                o.fuente_modelo
+                o.fuente_modelo,
+                d.checkpoint_procesamiento IS NOT NULL as en_proceso
             FROM documento_digitalizado d
             INNER JOIN ocr_resultado o ON d.id_documento = o.documento_id
             WHERE o.estado_validacion = 'pendiente'
+            AND o.listo = true
             GROUP BY d.id_documento, d.nombre_archivo, d.libros_id, d.tipo_sacramento, 
-                     d.imagen_url, d.fecha_procesamiento, d.modelo_procesamiento, d.modelo_fuente, o.fuente_modelo
+                     d.imagen_url, d.fecha_procesamiento, d.modelo_procesamiento, d.modelo_fuente, o.fuente_modelo,
+                     d.checkpoint_procesamiento
             ORDER BY d.fecha_procesamiento DESC
         """)
         
@@ -411,6 +511,7 @@ async def get_documentos_pendientes(db: Session = Depends(get_db)):
                 "tuplas_pendientes": row[9],
                 "tuplas_validadas": row[10],
                 "fuente_modelo": row[11] or 'Desconocido',  # de ocr_resultado
+                "en_proceso": bool(row[12]),  # el OCR/HTR sigue publicando tuplas
                 "progreso": int((row[10] / row[8] * 100)) if row[8] > 0 else 0
             })
         
@@ -453,8 +554,10 @@ async def update_modelo_procesamiento(
     db: Session = Depends(get_db)
 ):
     """
-    Cambia el modelo de procesamiento de un documento existente y lo reprocesa
+    Cambia el modelo de procesamiento de un documento existente y lo reprocesa.
+    Responde 429 con Retry-After (sin tocar el documento) si el servicio está saturado.
     """
+    admision = None
     try:
         # Validar modelo
         if modelo_procesamiento not in ['ocr', 'htr']:
@@ -482,13 +585,29 @@ async def update_modelo_procesamiento(
                 "modelo_procesamiento": modelo_procesamiento
             }
         
-        # Actualizar modelo y resetear estado
+        # Reservar lugar en el servicio nuevo antes de borrar los resultados anteriores
+        try:
+            admision = admision_service.reservar(modelo_procesamiento)
+        except ServicioSaturado as e:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=e.motivo,
+                headers={"Retry-After": str(e.retry_after)}
+            )
+        
+        # Actualizar modelo y resetear estado. Si el modelo lo eligió el clasificador,
+        # se registra la corrección para medir sus errores de enrutamiento
         update_query = text("""
             UPDATE documento_digitalizado 
             SET modelo_procesamiento = :modelo,
+                clasificacion_pagina = CASE
+                    WHEN clasificacion_pagina IS NULL THEN NULL
+                    ELSE clasificacion_pagina || jsonb_build_object('corregido_a', CAST(:modelo AS text))
+                END,
                 estado_procesamiento = 'pendiente',
                 progreso_ocr = 0,
-                modelo_fuente = ''
+                modelo_fuente = '',
+                checkpoint_procesamiento = NULL
             WHERE id_documento = :doc_id
         """)
         
@@ -514,43 +633,75 @@ async def update_modelo_procesamiento(
         doc_info = db.execute(doc_query, {"doc_id": documento_id}).fetchone()
         
         # Disparar procesamiento asíncrono
-        import threading
-        import requests
-        
-        def _reprocesar():
-            try:
-                servicio_nombre = "HTR" if modelo_procesamiento == 'htr' else "OCR"
-                service_url = digitalizacion_service.htr_service_url if modelo_procesamiento == 'htr' else digitalizacion_service.ocr_service_url
-                endpoint = f"{service_url}/api/v1/{modelo_procesamiento}/procesar-desde-bd/{documento_id}"
-                
-                logger.info(f"🔄 Reprocesando documento {documento_id} con {servicio_nombre}: {endpoint}")
-                response = requests.post(endpoint, timeout=600)
-                
-                if response.status_code == 200:
-                    logger.info(f"✅ Reprocesamiento {servicio_nombre} completado para documento {documento_id}")
-                else:
-                    logger.error(f"❌ Reprocesamiento {servicio_nombre} falló HTTP {response.status_code}")
-                    
-            except Exception as e:
-                logger.error(f"❌ Error reprocesando documento {documento_id}: {e}")
-        
-        thread = threading.Thread(target=_reprocesar, daemon=True)
-        thread.start()
+        logger.info(f"🔄 Reprocesando documento {documento_id} con {modelo_procesamiento.upper()}")
+        digitalizacion_service.iniciar_procesamiento(documento_id, modelo_procesamiento)
+        decision, admision = admision, None  # la tarea libera el lugar al terminar
         
         return {
             "mensaje": f"Modelo cambiado de '{modelo_actual}' a '{modelo_procesamiento}'. Reprocesando en background...",
             "documento_id": documento_id,
             "modelo_anterior": modelo_actual,
             "modelo_nuevo": modelo_procesamiento,
-            "estado": "procesando"
+            "estado": "procesando",
+            **decision
         }
         
     except HTTPException:
         raise
     except Exception as e:
+        if admision is not None:
+            admision_service.liberar(modelo_procesamiento)
         logger.error(f"Error actualizando modelo de procesamiento: {str(e)}")
         db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error: {str(e)}"
-        )
\ No newline at end of file
+        )
+@router.post("/reconocer-tupla/{documento_id}/{tupla_numero}")
+async def reconocer_tupla(
+    documento_id: int,
+    tupla_numero: int,
+    columna: Optional[int] = None,
+    dpi: Optional[int] = None,
+    motor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Vuelve a reconocer una tupla (o solo una columna) con el servicio que procesó
+    el documento, usando las cajas de celda guardadas. Opcionalmente a mayor DPI
+    o con otro motor; solo se actualiza esa fila de ocr_resultado.
+    """
+    result = db.execute(
+        text("SELECT modelo_procesamiento FROM documento_digitalizado WHERE id_documento = :doc_id"),
+        {"doc_id": documento_id}
+    ).fetchone()
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Documento {documento_id} no encontrado"
+        )
+
+    modelo = result[0] if result[0] in ('ocr', 'htr') else 'ocr'
+    service_url = digitalizacion_service.htr_service_url if modelo == 'htr' else digitalizacion_service.ocr_service_url
+    params = {k: v for k, v in {"columna": columna, "dpi": dpi, "motor": motor}.items() if v is not None}
+
+    try:
+        response = await cliente_servicios.post(
+            f"{modelo}-tupla",
+            f"{service_url}/api/v1/{modelo}/reconocer-tupla/{documento_id}/{tupla_numero}",
+            params=params,
+            timeout=TIMEOUT_RECONOCER_TUPLA
+        )
+    except httpx.HTTPError as e:
+        logger.error(f"❌ Error llamando a {modelo.upper()} para re-reconocer tupla {tupla_numero}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Servicio {modelo.upper()} no disponible: {str(e)}"
+        )
+
+    # Propagar la respuesta (y el código de error) del servicio tal cual
+    try:
+        contenido = response.json()
+    except ValueError:
+        contenido = {"detail": response.text}
+    return JSONResponse(status_code=response.status_code, content=contenido)
@@ -0,0 +1,80 @@
+"""
+Receptor de eventos de OCR-service y HTR-service
+
+Los eventos llegan desde el outbox de cada servicio (ver services/outbox.py en
+OCR/HTR) con entrega al menos una vez: el mismo id_evento puede llegar más de
+una vez, así que se anota en evento_recibido y las repeticiones se ignoran.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+import logging
+from typing import Any, Callable, Dict
+
+from app.database import get_db
+from app.dto.digitalizacion_dto import EventoServicioRequest
+from app.services.progreso_service import progreso_service, ESTADOS_COMPLETADOS
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/v1/eventos", tags=["Eventos"])
+
+
+def _documento_procesado(db: Session, evento: EventoServicioRequest):
+    """OCR/HTR terminó: el progreso compartido pasa a completado y se avisa a los streams"""
+    modelo = evento.payload.get('modelo', evento.origen)
+    if evento.payload.get('estado_procesamiento') in ESTADOS_COMPLETADOS:
+        estado = {"estado": "completado", "progreso": 100, "etapa": "completado",
+                  "mensaje": f"{modelo.upper()} completado: {evento.payload.get('total_tuplas', 0)} tuplas",
+                  "modelo": modelo}
+    else:
+        estado = {"estado": "error", "progreso": 100, "etapa": "error",
+                  "mensaje": evento.payload.get('mensaje') or "Error en procesamiento", "modelo": modelo}
+    progreso_service.reportar(evento.documento_id, estado)
+
+
+# tipo de evento -> manejador; los tipos sin manejador se registran y se ignoran
+MANEJADORES: Dict[str, Callable[[Session, EventoServicioRequest], Any]] = {
+    "documento.procesado": _documento_procesado,
+}
+
+
+@router.post("")
+async def recibir_evento(evento: EventoServicioRequest, db: Session = Depends(get_db)):
+    """
+    Aplica un evento del outbox. Responde 2xx también para eventos repetidos o sin
+    manejador (el emisor los da por entregados); ante un error responde 500 y el
+    emisor reintenta más tarde.
+    """
+    try:
+        nuevo = db.execute(text("""
+            INSERT INTO evento_recibido (id_evento, tipo, documento_id, origen)
+            VALUES (CAST(:id_evento AS uuid), :tipo, :documento_id, :origen)
+            ON CONFLICT (id_evento) DO NOTHING
+            RETURNING id_evento
+        """), {
+            "id_evento": evento.id_evento,
+            "tipo": evento.tipo,
+            "documento_id": evento.documento_id,
+            "origen": evento.origen
+        }).fetchone()
+
+        if nuevo is None:
+            db.rollback()
+            return {"aplicado": False, "motivo": "duplicado"}
+
+        manejador = MANEJADORES.get(evento.tipo)
+        if manejador is None:
+            logger.warning(f"⚠️ Evento sin manejador: {evento.tipo} ({evento.id_evento})")
+        else:
+            manejador(db, evento)
+        db.commit()
+
+        logger.info(f"📨 Evento {evento.tipo} del documento {evento.documento_id} ({evento.origen}) aplicado")
+        return {"aplicado": manejador is not None}
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"❌ Error aplicando evento {evento.id_evento}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
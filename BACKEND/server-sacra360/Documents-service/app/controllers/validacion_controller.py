@@ -18,6 +18,22 @@ from app.dto.validacion_dto import (
 router = APIRouter()
 validacion_service = ValidacionService()
 
+
+def _procesamiento_en_curso(documento_id: int, db: Session) -> bool:
+    """
+    True si el OCR/HTR del documento no terminó (tiene checkpoint y aún puede publicar
+    tuplas). Un documento con falla definitiva (error, rechazo por calidad) no está en
+    curso aunque le haya quedado un checkpoint de antes.
+    """
+    query = text("""
+        SELECT checkpoint_procesamiento IS NOT NULL
+               AND estado_procesamiento NOT IN ('error', 'rechazado_calidad')
+        FROM documento_digitalizado
+        WHERE id_documento = :doc_id
+    """)
+    return bool(db.execute(query, {"doc_id": documento_id}).scalar())
+
+
 @router.get(
     "/tuplas-pendientes/{documento_id}",
     summary="Obtener tuplas pendientes de validación",
@@ -30,6 +46,9 @@ async def obtener_tuplas_pendientes(
     """
     Obtiene las tuplas OCR pendientes de validación para un documento en formato JSON.
     
+    Los pipelines OCR/HTR publican cada tupla apenas la reconocen, así que la
+    lista puede crecer mientras `procesamiento_en_curso` sea true.
+    
     Args:
         documento_id: ID del documento digitalizado
         
@@ -50,6 +69,7 @@ async def obtener_tuplas_pendientes(
             FROM ocr_resultado
             WHERE documento_id = :doc_id
             AND estado_validacion = 'pendiente'
+            AND listo = true
             ORDER BY tupla_numero
         """)
         
@@ -90,17 +110,20 @@ async def obtener_tuplas_pendientes(
                 ],
                 "confianza": float(row[3]),
                 "estado_validacion": row[4],
-                "total_tuplas_documento": None  # Se llenará después
+                "total_tuplas_documento": None,  # Se llenará después
+                "procesamiento_en_curso": False
             })
         
-        # Calcular total de tuplas del documento
+        # Calcular total de tuplas del documento (hasta ahora, si sigue procesándose)
         if tuplas:
             query_total = text("""
-                SELECT COUNT(*) FROM ocr_resultado WHERE documento_id = :doc_id
+                SELECT COUNT(*) FROM ocr_resultado WHERE documento_id = :doc_id AND listo = true
             """)
             total = db.execute(query_total, {"doc_id": documento_id}).scalar()
+            en_curso = _procesamiento_en_curso(documento_id, db)
             for tupla in tuplas:
                 tupla["total_tuplas_documento"] = total
+                tupla["procesamiento_en_curso"] = en_curso
         
         return tuplas
     except ValueError as e:
@@ -218,6 +241,7 @@ async def validar_tupla(
                 SUM(CASE WHEN estado_validacion IN ('validado', 'rechazado') THEN 1 ELSE 0 END) as procesadas
             FROM ocr_resultado
             WHERE documento_id = :doc_id
+            AND listo = true
         """)
         
         stats = db.execute(query_total, {"doc_id": validacion_data.documento_id}).fetchone()
@@ -227,7 +251,9 @@ async def validar_tupla(
         tuplas_procesadas = stats[3]
         
         # Si todas las tuplas están procesadas, actualizar estado del documento
-        completado = (total_tuplas == tuplas_procesadas)
+        # (salvo que el OCR/HTR siga publicando tuplas de la página)
+        en_curso = _procesamiento_en_curso(validacion_data.documento_id, db)
+        completado = (total_tuplas == tuplas_procesadas) and not en_curso
         
         if completado:
             update_doc = text("""
@@ -245,6 +271,7 @@ async def validar_tupla(
             FROM ocr_resultado
             WHERE documento_id = :doc_id
             AND estado_validacion = 'pendiente'
+            AND listo = true
             ORDER BY tupla_numero
             LIMIT 1
         """)
@@ -259,7 +286,8 @@ async def validar_tupla(
             "total_tuplas": total_tuplas,
             "tuplas_validadas": tuplas_validadas,
             "tuplas_rechazadas": tuplas_rechazadas,
-            "tuplas_pendientes": total_tuplas - tuplas_procesadas
+            "tuplas_pendientes": total_tuplas - tuplas_procesadas,
+            "procesamiento_en_curso": en_curso
         }
         
     except ValueError as e:
@@ -36,6 +36,20 @@ class UploadDocumentResponse(BaseModel):
     total_tuplas: Optional[int] = None
     calidad_general: Optional[float] = None
     tiempo_ocr: Optional[float] = None
+    
+    # Modelo usado y, con modelo_procesamiento='auto', la decisión del clasificador
+    modelo_procesamiento: Optional[str] = None
+    clasificacion_pagina: Optional[Dict[str, Any]] = None
+    
+    # Control de admisión: 'procesando' (de inmediato) o 'en_cola' (HTTP 202) con la
+    # posición en la cola del servicio y la espera estimada
+    admision: Optional[str] = None
+    posicion_cola: Optional[int] = None
+    eta_segundos: Optional[int] = None
+    
+    # True si el mismo archivo ya estaba subido para el libro y sacramento: se
+    # devuelve el documento existente sin volver a subirlo ni procesarlo
+    duplicado: bool = False
 
 class ProcessingStatusResponse(BaseModel):
     """Estado de procesamiento de un documento"""
@@ -82,4 +96,12 @@ class OcrResultadoResponse(BaseModel):
     calidad_general: float
     tiempo_procesamiento: float
     tuplas: List[Dict[str, Any]]
-    mensaje: str
\ No newline at end of file
+    mensaje: str
+class EventoServicioRequest(BaseModel):
+    """Evento entregado por el outbox de OCR-service / HTR-service"""
+    id_evento: str = Field(..., description="UUID del evento (clave de deduplicación)")
+    tipo: str = Field(..., description="Tipo de evento, p.ej. documento.procesado")
+    documento_id: Optional[int] = None
+    origen: str = Field(..., description="Servicio que generó el evento ('ocr' o 'htr')")
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    creado_en: Optional[datetime] = None
@@ -23,6 +23,7 @@ from app.controllers.sacramento_controller import router as sacramento_router
 from app.controllers.reportes_controller import router as reportes_router
 from app.controllers.bautizo_controller import router as bautizo_router
 from app.controllers.matrimonio_controller import router as matrimonio_router
+from app.controllers.eventos_controller import router as eventos_router
 
 # Importar configuración de base de datos y modelos
 from app.database import engine, Base
@@ -62,6 +63,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # ETag: progreso en lote (el frontend lo reenvía en If-None-Match);
+    # Retry-After: uploads rechazados con 429 por el control de admisión
+    expose_headers=["ETag", "Retry-After"],
 )
 
 @app.get("/")
@@ -107,6 +111,13 @@ app.include_router(validacion_router, prefix="/api/v1/validacion", tags=["valida
 app.include_router(reportes_router, prefix="/api/v1")
 app.include_router(bautizo_router, prefix="/api/v1")
 app.include_router(matrimonio_router, prefix="/api/v1")
+app.include_router(eventos_router)  # Eventos del outbox de OCR/HTR
+
+@app.on_event("shutdown")
+async def cerrar_cliente_servicios():
+    """Cierra el pool de conexiones hacia OCR/HTR"""
+    from app.services.http_client import cliente_servicios
+    await cliente_servicios.cerrar()
 
 # Manejador de errores global
 @app.exception_handler(Exception)
@@ -3,6 +3,7 @@ Modelo SQLAlchemy para documento_digitalizado
 """
 
 from sqlalchemy import Column, Integer, String, Text, Numeric, DateTime, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -28,6 +29,20 @@ class DocumentoDigitalizado(Base):
     estado_procesamiento = Column(String(50), nullable=False, default="pendiente")
     fecha_validacion = Column(DateTime, nullable=True)
     
+    # Decisión del clasificador impreso/manuscrito (solo con modelo_procesamiento='auto')
+    clasificacion_pagina = Column(JSONB, nullable=True)
+    
+    # Métricas del control de calidad de imagen (OCR/HTR, antes de reconocer)
+    calidad_imagen = Column(JSONB, nullable=True)
+    
+    # SHA-256 del archivo: clave del objeto en MinIO y de la deduplicación de uploads
+    # (índice idx_documento_sha256, ver Migration_Sha256_Documentos.sql)
+    sha256 = Column(String(64), nullable=True)
+    
+    # Lote de carga (POST /lote) al que pertenece el documento
+    # (índice idx_documento_lote, ver Migration_Lote_Documentos.sql)
+    lote_id = Column(String(32), nullable=True)
+    
     # Relaciones simples (comentadas para evitar referencias circulares por ahora)
     # resultados_ocr = relationship("OCRResultado", back_populates="documento")
     # validaciones = relationship("ValidacionTupla", back_populates="documento")
@@ -32,6 +32,7 @@ class OCRResultado(Base):
     estado_validacion = Column(String(20), nullable=False, default="pendiente", name="estado_validacion")
     sacramento_id = Column(Integer, ForeignKey("sacramentos.id_sacramento"), nullable=True, name="sacramento_id")
     fecha_validacion = Column(DateTime, nullable=True, name="fecha_validacion")
+    listo = Column(Boolean, nullable=False, default=True, server_default="true", name="listo")  # false mientras el OCR/HTR sigue en curso
     
     # Relaciones simples (comentadas para evitar referencias circulares por ahora)
     # documento = relationship("DocumentoDigitalizado", back_populates="resultados_ocr")
@@ -117,5 +118,6 @@ class OCRResultado(Base):
             "validado": self.validado,
             "estado_validacion": self.estado_validacion,
             "sacramento_id": self.sacramento_id,
-            "fecha_validacion": self.fecha_validacion.isoformat() if self.fecha_validacion else None
+            "fecha_validacion": self.fecha_validacion.isoformat() if self.fecha_validacion else None,
+            "listo": self.listo
         }
\ No newline at end of file
@@ -0,0 +1,173 @@
+"""
+Control de admisión de documentos hacia OCR-service y HTR-service
+
+Cada upload con procesamiento automático reserva un lugar en el servicio que
+lo va a procesar antes de subir nada a MinIO:
+
+- Hay capacidad libre (menos documentos en curso que la concurrencia del
+  servicio): se procesa de inmediato.
+- El servicio está lleno pero la cola tiene lugar: se acepta en cola (HTTP 202)
+  con la posición y una estimación de espera según la duración media reciente.
+- La cola también está llena: se rechaza con HTTP 429 y `Retry-After`, sin
+  guardar el archivo, para que el cliente reintente más tarde en lugar de
+  apilar cientos de llamadas que terminan en timeout.
+
+La capacidad de cada servicio es su concurrencia en el cliente HTTP compartido
+(OCR_CONCURRENCIA / HTR_CONCURRENCIA, ver http_client.py). Si un worker responde
+503 (lleno o sin memoria, ver services/admission.py en OCR/HTR) el servicio se
+marca saturado durante su `Retry-After` y los documentos nuevos van a la cola.
+
+Los lotes (POST /lote) no pasan por la cola: esperan con `esperar_lugar` a que
+haya capacidad y envían de a un documento por lugar libre.
+
+Las cuentas son por proceso de Documents-service.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ServicioSaturado(Exception):
+    """El servicio de procesamiento y su cola están llenos"""
+
+    def __init__(self, servicio: str, retry_after: int, motivo: str):
+        super().__init__(motivo)
+        self.servicio = servicio
+        self.retry_after = retry_after
+        self.motivo = motivo
+
+
+class AdmisionService:
+    """Capacidad, cola y tiempo estimado por servicio de procesamiento"""
+
+    def __init__(self, capacidad: Dict[str, int], max_cola: Dict[str, int],
+                 duracion_inicial: Dict[str, float], retry_after_minimo: int = 5):
+        """
+        Args:
+            capacidad: Documentos que cada servicio procesa a la vez, p.ej. {'ocr': 2, 'htr': 1}
+            max_cola: Documentos en espera admitidos por servicio además de los en curso
+            duracion_inicial: Segundos por documento estimados hasta medir los reales
+            retry_after_minimo: Piso del Retry-After sugerido al rechazar
+        """
+        self.capacidad = dict(capacidad)
+        self.max_cola = dict(max_cola)
+        self.duracion = dict(duracion_inicial)
+        self.retry_after_minimo = retry_after_minimo
+        self.pendientes: Dict[str, int] = {servicio: 0 for servicio in self.capacidad}
+        self._saturado_hasta: Dict[str, float] = {}
+        # Se activa cada vez que se libera un lugar (despierta a los lotes en espera)
+        self._liberado: Dict[str, asyncio.Event] = {}
+
+    def _saturado(self, servicio: str) -> float:
+        """Segundos que faltan para volver a probar un servicio que respondió 503 (0 = no saturado)"""
+        return max(0.0, self._saturado_hasta.get(servicio, 0.0) - time.monotonic())
+
+    def evaluar(self, servicio: str) -> Dict[str, Any]:
+        """
+        Qué pasaría con un documento más para `servicio`, sin reservar lugar.
+
+        Returns:
+            {'admision': 'procesando'} o {'admision': 'en_cola', 'posicion_cola', 'eta_segundos'}
+
+        Raises:
+            ServicioSaturado: si la cola está llena
+        """
+        capacidad = max(1, self.capacidad.get(servicio, 1))
+        pendientes = self.pendientes.get(servicio, 0)
+        saturado = self._saturado(servicio)
+
+        if pendientes < capacidad and not saturado:
+            return {'admision': 'procesando'}
+
+        # Lleno (o el worker avisó que no acepta más): el documento espera su turno
+        en_cola = max(0, pendientes - capacidad) if not saturado else pendientes
+        duracion = self.duracion.get(servicio, 60.0)
+        if en_cola < self.max_cola.get(servicio, 0):
+            posicion = en_cola + 1
+            eta = max(saturado, math.ceil(posicion / capacidad) * duracion)
+            return {'admision': 'en_cola', 'posicion_cola': posicion, 'eta_segundos': round(eta)}
+
+        # Se libera un lugar de la cola cuando termina un documento en curso
+        retry_after = max(self.retry_after_minimo, math.ceil(saturado), math.ceil(duracion / capacidad))
+        raise ServicioSaturado(
+            servicio, retry_after,
+            f"{servicio.upper()} saturado: {pendientes} documentos en curso o en cola; reintentar en {retry_after}s"
+        )
+
+    def reservar(self, servicio: str) -> Dict[str, Any]:
+        """Como `evaluar`, y además ocupa el lugar (liberarlo con `liberar`)"""
+        decision = self.evaluar(servicio)
+        self.pendientes[servicio] = self.pendientes.get(servicio, 0) + 1
+        return decision
+
+    def liberar(self, servicio: str, duracion: Optional[float] = None):
+        """
+        Libera el lugar de un documento que terminó (o que no llegó a enviarse).
+
+        Args:
+            duracion: Segundos que tardó el procesamiento, si terminó bien; actualiza
+                la duración media (promedio móvil) con la que se estima la espera
+        """
+        self.pendientes[servicio] = max(0, self.pendientes.get(servicio, 0) - 1)
+        if servicio in self._liberado:
+            self._liberado[servicio].set()
+        if duracion is not None:
+            anterior = self.duracion.get(servicio, duracion)
+            self.duracion[servicio] = round(0.8 * anterior + 0.2 * duracion, 1)
+
+    async def esperar_lugar(self, servicio: str):
+        """Espera a que el servicio tenga capacidad libre y ocupa el lugar (liberarlo con `liberar`)"""
+        evento = self._liberado.setdefault(servicio, asyncio.Event())
+        capacidad = max(1, self.capacidad.get(servicio, 1))
+        while True:
+            saturado = self._saturado(servicio)
+            if self.pendientes.get(servicio, 0) < capacidad and not saturado:
+                self.pendientes[servicio] = self.pendientes.get(servicio, 0) + 1
+                return
+            evento.clear()
+            try:
+                # Sin liberaciones (p.ej. saturado por un 503) se vuelve a mirar igual
+                await asyncio.wait_for(evento.wait(), timeout=max(1.0, saturado))
+            except asyncio.TimeoutError:
+                pass
+
+    def saturar(self, servicio: str, retry_after: float):
+        """El worker rechazó un documento (503): no enviarle nuevos durante `retry_after` segundos"""
+        self._saturado_hasta[servicio] = time.monotonic() + retry_after
+        logger.warning(f"🚦 {servicio.upper()} saturado; documentos nuevos a la cola por {retry_after:.0f}s")
+
+    def estado(self) -> Dict[str, Any]:
+        """Capacidad, ocupación y espera estimada de cada servicio"""
+        return {
+            servicio: {
+                "capacidad": self.capacidad[servicio],
+                "pendientes": self.pendientes.get(servicio, 0),
+                "max_cola": self.max_cola.get(servicio, 0),
+                "duracion_media_s": self.duracion.get(servicio),
+                "saturado_s": round(self._saturado(servicio)),
+            }
+            for servicio in self.capacidad
+        }
+
+
+# Instancia del servicio
+admision_service = AdmisionService(
+    capacidad={
+        'ocr': int(os.getenv('OCR_CONCURRENCIA', '2')),
+        'htr': int(os.getenv('HTR_CONCURRENCIA', '1')),
+    },
+    max_cola={
+        'ocr': int(os.getenv('OCR_MAX_COLA', '20')),
+        'htr': int(os.getenv('HTR_MAX_COLA', '10')),
+    },
+    duracion_inicial={
+        'ocr': float(os.getenv('OCR_DURACION_ESTIMADA', '420')),
+        'htr': float(os.getenv('HTR_DURACION_ESTIMADA', '540')),
+    }
+)
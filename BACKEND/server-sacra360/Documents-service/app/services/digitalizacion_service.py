@@ -4,26 +4,34 @@ Maneja el flujo completo: MinIO → BD → OCR → Resultados
 """
 
 import os
-import uuid
 import time
-import requests
+import uuid
+import zipfile
+import asyncio
 import json
 import logging
-import threading
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import BinaryIO, Optional, Dict, Any, List, Tuple
+from sqlalchemy import text, insert
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
+import httpx
 from minio import Minio
 from minio.error import S3Error
-from io import BytesIO
 
 from app.dto.digitalizacion_dto import (
     UploadDocumentResponse, ProcessingStatusResponse, 
     DocumentListResponse, DocumentoInfo, EstadoProcesamiento,
     OcrResultadoResponse
 )
+from app.services.clasificador_pagina import ClasificadorPagina
+from app.services.progreso_service import progreso_service, ESTADOS_COMPLETADOS, ESTADOS_ERROR
+from app.services.http_client import cliente_servicios, TIMEOUT_PROCESAMIENTO
+from app.services.admision_service import admision_service
+from app.services.lectura_stream import (
+    LectorConHash, hash_archivo, copiar_a_temporal, tipo_documento, es_zip, entradas_zip
+)
 
 logger = logging.getLogger(__name__)
 
@@ -37,11 +45,34 @@ class DigitalizacionService:
         self.minio_secret_key = os.getenv('MINIO_SECRET_KEY', 'minioadmin123')
         self.minio_bucket = os.getenv('MINIO_BUCKET', 'sacra360-documents')
         self.minio_secure = os.getenv('MINIO_SECURE', 'false').lower() == 'true'
+        # Tamaño de cada parte del upload multipart (mínimo de S3/MinIO: 5 MB)
+        self.minio_part_size = max(5 * 1024 * 1024, int(os.getenv('MINIO_PART_SIZE', str(5 * 1024 * 1024))))
+        
+        # Carga de libros por lote (POST /lote): páginas por lote, subidas simultáneas a MinIO
+        # y tamaño máximo de cada página (también de las que vienen dentro de un ZIP)
+        self.lote_max_archivos = int(os.getenv('LOTE_MAX_ARCHIVOS', '500'))
+        self.lote_concurrencia_subida = max(1, int(os.getenv('LOTE_CONCURRENCIA_SUBIDA', '4')))
+        self.lote_max_bytes_pagina = 50 * 1024 * 1024
         
         # URLs de servicios de procesamiento
         self.ocr_service_url = os.getenv('OCR_SERVICE_URL', 'http://localhost:8003')
         self.htr_service_url = os.getenv('HTR_SERVICE_URL', 'http://localhost:8004')
         
+        # Reintentos ante timeout o caída del servicio (en el cliente HTTP): el OCR/HTR reanuda
+        # desde su checkpoint (el timeout de lectura es PROCESAMIENTO_TIMEOUT, ver http_client.py)
+        self.procesamiento_reintentos = int(os.getenv('PROCESAMIENTO_REINTENTOS', '3'))
+        self.procesamiento_espera_reintento = int(os.getenv('PROCESAMIENTO_ESPERA_REINTENTO', '30'))
+        # Reenvíos cuando el worker responde 503 (lleno o sin memoria), tras su Retry-After
+        self.procesamiento_reintentos_saturado = int(os.getenv('PROCESAMIENTO_REINTENTOS_SATURADO', '3'))
+        
+        # Tareas de procesamiento en background (ver iniciar_procesamiento)
+        self._tareas = set()
+        
+        # Clasificador impreso/manuscrito para modelo_procesamiento='auto'
+        self.clasificador = ClasificadorPagina(
+            modelo_defecto=os.getenv('CLASIFICADOR_MODELO_DEFECTO', 'ocr')
+        )
+        
         # Inicializar cliente MinIO
         self._init_minio_client()
     
@@ -68,7 +99,7 @@ class DigitalizacionService:
     
     async def procesar_documento(
         self,
-        archivo_bytes: bytes,
+        archivo: BinaryIO,
         archivo_nombre: str,
         content_type: str,
         libro_id: int,
@@ -81,19 +112,55 @@ class DigitalizacionService:
         """
         Procesa un documento completo: MinIO → BD → OCR/HTR
         
+        El archivo se guarda en MinIO bajo su SHA-256. Si el mismo contenido ya se
+        subió para el mismo libro y sacramento (y no falló) se devuelve ese documento
+        sin subir ni procesar nada; si no, se crea un documento nuevo que reutiliza
+        el objeto ya guardado, si lo hay.
+        
         Args:
-            modelo_procesamiento: 'ocr' para texto impreso, 'htr' para texto manuscrito
+            archivo: Archivo subido (UploadFile.file); se lee por partes, nunca entero
+            modelo_procesamiento: 'ocr' para texto impreso, 'htr' para texto manuscrito,
+                'auto' para decidirlo con el clasificador de páginas
         """
         inicio_tiempo = time.time()
+        admision = None
+        despachado = False
         
         try:
-            # 1. Subir archivo a MinIO
-            logger.info("Subiendo archivo a MinIO...")
-            minio_info = await self._subir_a_minio(
-                archivo_bytes=archivo_bytes,
-                archivo_nombre=archivo_nombre,
-                content_type=content_type
-            )
+            # 0. Hash del contenido (lectura por bloques del temporal local) y duplicados
+            sha256 = await asyncio.to_thread(hash_archivo, archivo)
+            duplicado = self._buscar_duplicado(db, sha256, libro_id, tipo_sacramento)
+            if duplicado is not None:
+                logger.info(f"♻️ {archivo_nombre} ya subido como documento {duplicado.id_documento} (sha256 {sha256[:12]})")
+                return self._respuesta_duplicado(duplicado, time.time() - inicio_tiempo)
+            existente = self._buscar_por_sha256(db, sha256)
+            
+            # 0b. Decidir OCR/HTR si el cliente lo deja en automático
+            clasificacion = None
+            if modelo_procesamiento == 'auto':
+                # El clasificador decodifica la página: es el único paso que la carga entera
+                archivo.seek(0)
+                clasificacion = self.clasificar_pagina(archivo.read(), content_type)
+                archivo.seek(0)
+                modelo_procesamiento = clasificacion['modelo']
+            
+            # Reservar lugar en OCR/HTR antes de guardar nada: si el servicio y su cola
+            # están llenos se lanza ServicioSaturado (429) sin subir el archivo
+            if procesar_ocr:
+                admision = admision_service.reservar(modelo_procesamiento)
+            
+            # 1. Subir archivo a MinIO (salvo que el mismo contenido ya esté guardado)
+            if existente is not None:
+                logger.info(f"♻️ Reutilizando el archivo del documento {existente.id_documento}")
+                minio_info = {'url': existente.imagen_url, 'sha256': sha256}
+            else:
+                logger.info("Subiendo archivo a MinIO...")
+                minio_info = await self._subir_a_minio(
+                    archivo=archivo,
+                    sha256=sha256,
+                    archivo_nombre=archivo_nombre,
+                    content_type=content_type
+                )
             
             # 2. Guardar metadata en BD
             logger.info("Guardando metadata en BD...")
@@ -103,6 +170,8 @@ class DigitalizacionService:
                 tipo_sacramento=tipo_sacramento,
                 nombre_archivo=archivo_nombre,
                 modelo_procesamiento=modelo_procesamiento,
+                clasificacion_pagina=clasificacion,
+                sha256=sha256,
                 db=db
             )
             
@@ -111,10 +180,8 @@ class DigitalizacionService:
             if procesar_ocr:
                 servicio_nombre = "HTR" if modelo_procesamiento == 'htr' else "OCR"
                 logger.info(f"Procesando con {servicio_nombre}...")
+                despachado = True
                 ocr_resultado = await self._procesar_ocr(
-                    archivo_bytes=archivo_bytes,
-                    archivo_nombre=archivo_nombre,
-                    content_type=content_type,
                     documento_id=documento_id,
                     libro_id=libro_id,
                     tipo_sacramento=tipo_sacramento,
@@ -132,7 +199,10 @@ class DigitalizacionService:
                 archivo_url=minio_info['url'],
                 estado=EstadoProcesamiento.PROCESANDO if procesar_ocr else EstadoProcesamiento.SUBIDO,
                 tiempo_upload=tiempo_total,
-                ocr_procesado=False  # Siempre False porque el OCR/HTR se procesa en background
+                ocr_procesado=False,  # Siempre False porque el OCR/HTR se procesa en background
+                modelo_procesamiento=modelo_procesamiento,
+                clasificacion_pagina=clasificacion,
+                **(admision or {})
             )
             
             # No agregamos info del OCR/HTR porque aún está procesando
@@ -141,39 +211,367 @@ class DigitalizacionService:
             return response
             
         except Exception as e:
+            if admision is not None and not despachado:
+                admision_service.liberar(modelo_procesamiento)
             logger.error(f"Error procesando documento: {e}")
             raise
     
+    async def procesar_lote(
+        self,
+        archivos: List[Tuple[str, Optional[str], BinaryIO]],
+        libro_id: int,
+        tipo_sacramento: int,
+        procesar_ocr: bool = True,
+        modelo_procesamiento: str = 'ocr',
+        db: Session = None
+    ) -> Dict[str, Any]:
+        """
+        Carga un libro completo (o parte) en un solo pedido.
+        
+        Cada archivo es una página (JPG, PNG, PDF) o un ZIP de páginas; las entradas
+        del ZIP se extraen de a una a un temporal, en orden de nombre. Hasta
+        `lote_concurrencia_subida` páginas se hashean, clasifican y suben a MinIO a
+        la vez. Los documentos nuevos se insertan en la BD en un solo INSERT con el
+        mismo lote_id y su procesamiento se despacha en segundo plano a medida que
+        OCR/HTR tienen lugar (admision_service.esperar_lugar), sin pasar por la cola
+        ni rechazar con 429.
+        
+        Las páginas ya subidas para el mismo libro y sacramento no se repiten: se
+        informan como duplicadas con el documento existente. Las que no se pueden
+        cargar (tipo no soportado, demasiado grandes, repetidas dentro del lote) van
+        a `omitidos` con el motivo, sin cortar el resto del lote.
+        
+        Args:
+            archivos: (nombre, content_type, archivo) de cada archivo subido
+        
+        Returns:
+            {'lote_id', 'total', 'documentos': [...], 'omitidos': [...], 'tiempo_s'}
+        """
+        inicio_tiempo = time.time()
+        lote_id = uuid.uuid4().hex
+        semaforo = asyncio.Semaphore(self.lote_concurrencia_subida)
+        tareas: List[asyncio.Task] = []
+        omitidos: List[Dict[str, str]] = []
+        vistos: Dict[str, str] = {}  # sha256 -> nombre de la primera página con ese contenido
+        
+        async def preparar(nombre: str, content_type: str, temporal: BinaryIO) -> Optional[Dict[str, Any]]:
+            try:
+                return await self._preparar_pagina_lote(
+                    nombre, content_type, temporal, libro_id, tipo_sacramento,
+                    modelo_procesamiento, vistos, omitidos, db
+                )
+            except Exception as e:
+                logger.error(f"❌ Lote {lote_id}: no se pudo cargar {nombre}: {e}")
+                omitidos.append({'nombre_archivo': nombre, 'motivo': str(e)})
+                return None
+            finally:
+                temporal.close()
+                semaforo.release()
+        
+        paginas = 0
+        for nombre, content_type, origen in self._paginas_lote(archivos, omitidos):
+            if paginas >= self.lote_max_archivos:
+                omitidos.append({'nombre_archivo': nombre, 'motivo': f"supera el máximo de {self.lote_max_archivos} páginas por lote"})
+                continue
+            # El semáforo acota también los temporales abiertos: se libera al terminar la página
+            await semaforo.acquire()
+            try:
+                temporal = await asyncio.to_thread(copiar_a_temporal, origen, self.lote_max_bytes_pagina)
+            except Exception as e:
+                semaforo.release()
+                omitidos.append({'nombre_archivo': nombre, 'motivo': str(e)})
+                continue
+            paginas += 1
+            tareas.append(asyncio.create_task(preparar(nombre, content_type, temporal)))
+        
+        preparadas = [p for p in await asyncio.gather(*tareas) if p is not None]
+        duplicadas = [p for p in preparadas if p.get('duplicado')]
+        nuevas = [p for p in preparadas if not p.get('duplicado')]
+        
+        # Un solo INSERT para todas las páginas nuevas del lote
+        ids: List[int] = []
+        if nuevas:
+            from app.models.documento_model import DocumentoDigitalizadoModel
+            ahora = datetime.now()
+            try:
+                ids = db.execute(
+                    insert(DocumentoDigitalizadoModel).returning(
+                        DocumentoDigitalizadoModel.id_documento, sort_by_parameter_order=True
+                    ),
+                    [
+                        {
+                            'libros_id': libro_id,
+                            'tipo_sacramento': tipo_sacramento,
+                            'imagen_url': p['archivo_url'],
+                            'nombre_archivo': p['nombre_archivo'],
+                            'ocr_texto': "",
+                            'modelo_fuente': "",
+                            'modelo_procesamiento': p['modelo_procesamiento'],
+                            'confianza': 0.0,
+                            'fecha_procesamiento': ahora,
+                            'fecha_subida': ahora,
+                            'estado_procesamiento': 'pendiente',
+                            'clasificacion_pagina': p['clasificacion'],
+                            'sha256': p['sha256'],
+                            'lote_id': lote_id,
+                        }
+                        for p in nuevas
+                    ]
+                ).scalars().all()
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"❌ Lote {lote_id}: error guardando documentos en BD: {e}")
+                raise
+            for pagina, documento_id in zip(nuevas, ids):
+                pagina['documento_id'] = documento_id
+        
+        if procesar_ocr and nuevas:
+            self._despachar_lote(lote_id, nuevas)
+        
+        tiempo_total = time.time() - inicio_tiempo
+        logger.info(f"📚 Lote {lote_id}: {len(nuevas)} documentos nuevos, {len(duplicadas)} duplicados, "
+                    f"{len(omitidos)} omitidos en {tiempo_total:.1f}s")
+        
+        documentos = sorted(nuevas + duplicadas, key=lambda p: p['nombre_archivo'])
+        return {
+            'lote_id': lote_id,
+            'libro_id': libro_id,
+            'tipo_sacramento': tipo_sacramento,
+            'total': len(nuevas),
+            'documentos': [
+                {k: p.get(k) for k in ('documento_id', 'nombre_archivo', 'modelo_procesamiento', 'archivo_url', 'duplicado')}
+                for p in documentos
+            ],
+            'omitidos': omitidos,
+            'tiempo_s': round(tiempo_total, 2),
+        }
+    
+    def _paginas_lote(self, archivos: List[Tuple[str, Optional[str], BinaryIO]], omitidos: List[Dict[str, str]]):
+        """(nombre, content_type, stream) de cada página del lote, expandiendo los ZIP"""
+        for nombre, content_type, archivo in archivos:
+            if es_zip(nombre, content_type):
+                try:
+                    for entrada, tamano, stream in entradas_zip(archivo):
+                        tipo = tipo_documento(entrada)
+                        if tipo is None:
+                            omitidos.append({'nombre_archivo': entrada, 'motivo': "tipo de archivo no soportado"})
+                        elif tamano > self.lote_max_bytes_pagina:
+                            omitidos.append({'nombre_archivo': entrada, 'motivo': f"supera el máximo de {self.lote_max_bytes_pagina // (1024 * 1024)} MB"})
+                        else:
+                            yield entrada, tipo, stream
+                except zipfile.BadZipFile:
+                    omitidos.append({'nombre_archivo': nombre, 'motivo': "ZIP inválido o dañado"})
+                continue
+            
+            tipo = tipo_documento(nombre)
+            if tipo is None:
+                omitidos.append({'nombre_archivo': nombre, 'motivo': "tipo de archivo no soportado"})
+                continue
+            archivo.seek(0)
+            yield nombre, tipo, archivo
+    
+    async def _preparar_pagina_lote(
+        self,
+        nombre: str,
+        content_type: str,
+        archivo: BinaryIO,
+        libro_id: int,
+        tipo_sacramento: int,
+        modelo_procesamiento: str,
+        vistos: Dict[str, str],
+        omitidos: List[Dict[str, str]],
+        db: Session
+    ) -> Optional[Dict[str, Any]]:
+        """Hash, deduplicación, clasificación y subida a MinIO de una página del lote"""
+        sha256 = await asyncio.to_thread(hash_archivo, archivo)
+        if sha256 in vistos:
+            omitidos.append({'nombre_archivo': nombre, 'motivo': f"mismo contenido que {vistos[sha256]} en este lote"})
+            return None
+        vistos[sha256] = nombre
+        
+        duplicado = self._buscar_duplicado(db, sha256, libro_id, tipo_sacramento)
+        if duplicado is not None:
+            logger.info(f"♻️ {nombre} ya subido como documento {duplicado.id_documento} (sha256 {sha256[:12]})")
+            return {
+                'documento_id': duplicado.id_documento,
+                'nombre_archivo': nombre,
+                'modelo_procesamiento': duplicado.modelo_procesamiento,
+                'archivo_url': duplicado.imagen_url,
+                'duplicado': True,
+            }
+        existente = self._buscar_por_sha256(db, sha256)
+        
+        clasificacion = None
+        if modelo_procesamiento == 'auto':
+            datos = await asyncio.to_thread(archivo.read)
+            archivo.seek(0)
+            clasificacion = await asyncio.to_thread(self.clasificar_pagina, datos, content_type)
+            modelo_procesamiento = clasificacion['modelo']
+        
+        if existente is not None:
+            url = existente.imagen_url
+        else:
+            url = (await self._subir_a_minio(archivo, sha256, nombre, content_type))['url']
+        
+        return {
+            'nombre_archivo': nombre,
+            'modelo_procesamiento': modelo_procesamiento,
+            'clasificacion': clasificacion,
+            'sha256': sha256,
+            'archivo_url': url,
+            'duplicado': False,
+        }
+    
+    def _despachar_lote(self, lote_id: str, paginas: List[Dict[str, Any]]):
+        """
+        Envía los documentos del lote a OCR/HTR en segundo plano, uno por cada lugar
+        libre del servicio (un despachador por servicio, en orden de página).
+        """
+        por_modelo: Dict[str, List[int]] = {}
+        for pagina in sorted(paginas, key=lambda p: p['nombre_archivo']):
+            modelo = 'htr' if pagina['modelo_procesamiento'] == 'htr' else 'ocr'
+            por_modelo.setdefault(modelo, []).append(pagina['documento_id'])
+            progreso_service.reportar(pagina['documento_id'], {
+                'estado': 'en_cola',
+                'progreso': 0,
+                'mensaje': f'En cola del lote, esperando lugar en {modelo.upper()}...',
+                'etapa': 'pendiente',
+                'modelo': modelo
+            })
+        
+        async def _despachar(modelo: str, documentos_ids: List[int]):
+            for documento_id in documentos_ids:
+                await admision_service.esperar_lugar(modelo)
+                self.iniciar_procesamiento(documento_id, modelo)
+            logger.info(f"📚 Lote {lote_id}: {len(documentos_ids)} documentos enviados a {modelo.upper()}")
+        
+        for modelo, documentos_ids in por_modelo.items():
+            tarea = asyncio.create_task(_despachar(modelo, documentos_ids))
+            self._tareas.add(tarea)
+            tarea.add_done_callback(self._tareas.discard)
+    
+    def clasificar_pagina(self, archivo_bytes: bytes, content_type: str) -> Dict[str, Any]:
+        """
+        Clasifica la página como impresa (OCR) o manuscrita (HTR).
+        Si la imagen no se puede analizar se usa el modelo por defecto con confianza 0.
+        """
+        try:
+            return self.clasificador.clasificar(archivo_bytes, es_pdf=content_type == 'application/pdf')
+        except Exception as e:
+            logger.warning(f"No se pudo clasificar la página, se usa '{self.clasificador.modelo_defecto}': {e}")
+            return {
+                'modelo': self.clasificador.modelo_defecto,
+                'confianza': 0.0,
+                'error': str(e)
+            }
+    
+    def _buscar_duplicado(self, db: Session, sha256: str, libro_id: int, tipo_sacramento: int):
+        """
+        Documento más reciente con el mismo contenido en el mismo libro y sacramento,
+        o None. Los que fallaron (error, rechazado por calidad) no cuentan: volver a
+        subir el archivo es la forma de reintentarlo.
+        """
+        return db.execute(text("""
+            SELECT id_documento, libros_id, tipo_sacramento, imagen_url, modelo_procesamiento,
+                   estado_procesamiento, fecha_subida
+            FROM documento_digitalizado
+            WHERE sha256 = :sha256
+              AND libros_id = :libro_id
+              AND tipo_sacramento = :tipo_sacramento
+              AND COALESCE(estado_procesamiento, '') NOT IN ('error', 'rechazado_calidad')
+            ORDER BY id_documento DESC
+            LIMIT 1
+        """), {"sha256": sha256, "libro_id": libro_id, "tipo_sacramento": tipo_sacramento}).fetchone()
+    
+    def _buscar_por_sha256(self, db: Session, sha256: str):
+        """Documento más reciente con el mismo contenido en cualquier libro (para reutilizar su objeto en MinIO), o None"""
+        return db.execute(text("""
+            SELECT id_documento, libros_id, tipo_sacramento, imagen_url, modelo_procesamiento,
+                   estado_procesamiento, fecha_subida
+            FROM documento_digitalizado
+            WHERE sha256 = :sha256
+            ORDER BY id_documento DESC
+            LIMIT 1
+        """), {"sha256": sha256}).fetchone()
+    
+    def _respuesta_duplicado(self, existente, tiempo: float) -> UploadDocumentResponse:
+        """Respuesta del upload cuando el documento ya existe (mismo archivo, libro y sacramento)"""
+        if existente.estado_procesamiento in ESTADOS_COMPLETADOS:
+            estado = EstadoProcesamiento.COMPLETADO
+        elif existente.estado_procesamiento in ESTADOS_ERROR:
+            estado = EstadoProcesamiento.ERROR
+        else:
+            estado = EstadoProcesamiento.PROCESANDO
+        return UploadDocumentResponse(
+            success=True,
+            documento_id=existente.id_documento,
+            mensaje=f"El archivo ya estaba subido como documento {existente.id_documento}; no se vuelve a procesar",
+            archivo_url=existente.imagen_url,
+            estado=estado,
+            tiempo_upload=tiempo,
+            ocr_procesado=estado == EstadoProcesamiento.COMPLETADO,
+            modelo_procesamiento=existente.modelo_procesamiento,
+            duplicado=True
+        )
+    
     async def _subir_a_minio(
         self, 
-        archivo_bytes: bytes, 
+        archivo: BinaryIO, 
+        sha256: str,
         archivo_nombre: str, 
         content_type: str
     ) -> Dict[str, Any]:
-        """Sube archivo a MinIO y retorna información"""
+        """
+        Guarda el archivo en MinIO bajo su hash (documents/sha256/{ab}/{sha256}.ext).
+        Si el objeto ya existe no se vuelve a subir. Si no, se sube por partes
+        (multipart, `minio_part_size` bytes por parte): la memoria por upload queda
+        acotada a una parte sin importar el tamaño del archivo.
+        """
         try:
-            # Generar nombre único
-            extension = os.path.splitext(archivo_nombre)[1]
-            unique_name = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}{extension}"
-            object_name = f"documents/{unique_name}"
-            
-            # Subir archivo
-            file_stream = BytesIO(archivo_bytes)
-            self.minio_client.put_object(
+            extension = os.path.splitext(archivo_nombre)[1].lower()
+            object_name = f"documents/sha256/{sha256[:2]}/{sha256}{extension}"
+            archivo_url = f"http://{self.minio_endpoint}/{self.minio_bucket}/{object_name}"
+            
+            # Mismo contenido ya guardado (p.ej. de un documento borrado): no se sube
+            try:
+                info = await asyncio.to_thread(self.minio_client.stat_object, self.minio_bucket, object_name)
+                logger.info(f"♻️ Objeto {object_name} ya existe en MinIO")
+                return {
+                    'object_name': object_name,
+                    'url': archivo_url,
+                    'size': info.size,
+                    'sha256': sha256,
+                    'content_type': content_type
+                }
+            except S3Error as e:
+                if e.code not in ('NoSuchKey', 'NoSuchObject'):
+                    raise
+            
+            # Subir archivo (cliente MinIO bloqueante: en un hilo para no frenar el event loop)
+            archivo.seek(0)
+            lector = LectorConHash(archivo)
+            await asyncio.to_thread(
+                self.minio_client.put_object,
                 bucket_name=self.minio_bucket,
                 object_name=object_name,
-                data=file_stream,
-                length=len(archivo_bytes),
+                data=lector,
+                length=-1,
+                part_size=self.minio_part_size,
                 content_type=content_type
             )
             
-            # URL del archivo
-            archivo_url = f"http://{self.minio_endpoint}/{self.minio_bucket}/{object_name}"
+            # La clave es el hash: si lo subido no coincide, el objeto no debe quedar
+            if lector.sha256 != sha256:
+                await asyncio.to_thread(self.minio_client.remove_object, self.minio_bucket, object_name)
+                raise Exception("El archivo cambió durante el upload (SHA-256 distinto)")
+            logger.info(f"Archivo subido a MinIO: {object_name} ({lector.tamano} bytes)")
             
             return {
                 'object_name': object_name,
                 'url': archivo_url,
-                'size': len(archivo_bytes),
+                'size': lector.tamano,
+                'sha256': lector.sha256,
                 'content_type': content_type
             }
             
@@ -188,7 +586,9 @@ class DigitalizacionService:
         tipo_sacramento: int, 
         db: Session,
         nombre_archivo: Optional[str] = None,
-        modelo_procesamiento: str = 'ocr'
+        modelo_procesamiento: str = 'ocr',
+        clasificacion_pagina: Optional[Dict[str, Any]] = None,
+        sha256: Optional[str] = None
     ) -> int:
         """Guarda documento en base de datos y retorna ID"""
         try:
@@ -205,7 +605,9 @@ class DigitalizacionService:
                 confianza=0.0,  # Se llenará después del OCR/HTR
                 fecha_procesamiento=datetime.now(),
                 estado_procesamiento='pendiente',
-                modelo_procesamiento=modelo_procesamiento  # 'ocr' o 'htr'
+                modelo_procesamiento=modelo_procesamiento,  # 'ocr' o 'htr'
+                clasificacion_pagina=clasificacion_pagina,  # Solo si se eligió 'auto'
+                sha256=sha256
             )
             
             db.add(documento)
@@ -221,47 +623,16 @@ class DigitalizacionService:
     
     async def _procesar_ocr(
         self,
-        archivo_bytes: bytes,
-        archivo_nombre: str,
-        content_type: str,
         documento_id: int,
         libro_id: int,
         tipo_sacramento: int,
         modelo_procesamiento: str = 'ocr'
     ) -> Optional[Dict[str, Any]]:
-        """Inicia el procesamiento OCR/HTR de forma COMPLETAMENTE asíncrona usando threading"""
-        
-        def _llamar_servicio_procesamiento():
-            """Función que se ejecuta en un thread separado para llamar al servicio de procesamiento"""
-            try:
-                # Seleccionar URL según el modelo
-                if modelo_procesamiento == 'htr':
-                    service_url = f"{self.htr_service_url}/api/v1/htr/procesar-desde-bd/{documento_id}"
-                    servicio_nombre = "HTR"
-                else:
-                    service_url = f"{self.ocr_service_url}/api/v1/ocr/procesar-desde-bd/{documento_id}"
-                    servicio_nombre = "OCR"
-                
-                logger.info(f"🔄 [Thread] Llamando {servicio_nombre} service: {service_url}")
-                
-                # Llamada bloqueante pero en thread separado
-                response = requests.post(url=service_url, timeout=600)  # 10 minutos de timeout
-                
-                if response.status_code == 200:
-                    logger.info(f"✅ [Thread] {servicio_nombre} completado para documento {documento_id}")
-                else:
-                    logger.error(f"❌ [Thread] {servicio_nombre} falló HTTP {response.status_code}")
-                    
-            except Exception as e:
-                logger.error(f"❌ [Thread] Error en {servicio_nombre}: {e}")
-        
+        """Inicia el procesamiento OCR/HTR en background (tarea asyncio) y retorna de inmediato"""
+        servicio_nombre = "HTR" if modelo_procesamiento == 'htr' else "OCR"
         try:
-            # Iniciar el procesamiento en un thread separado (fire-and-forget)
-            thread = threading.Thread(target=_llamar_servicio_procesamiento, daemon=True)
-            thread.start()
-            
-            servicio_nombre = "HTR" if modelo_procesamiento == 'htr' else "OCR"
-            logger.info(f"✅ {servicio_nombre} iniciado en background (thread separado) para documento {documento_id}")
+            self.iniciar_procesamiento(documento_id, modelo_procesamiento)
+            logger.info(f"✅ {servicio_nombre} iniciado en background para documento {documento_id}")
             
             # Retornar inmediatamente sin esperar
             return {
@@ -271,9 +642,146 @@ class DigitalizacionService:
             }
                 
         except Exception as e:
-            logger.error(f"❌ Error iniciando thread {servicio_nombre}: {e}")
+            admision_service.liberar(modelo_procesamiento)
+            logger.error(f"❌ Error iniciando {servicio_nombre} en background: {e}")
             return None
     
+    def iniciar_procesamiento(self, documento_id: int, modelo_procesamiento: str) -> asyncio.Task:
+        """
+        Dispara (fire-and-forget) el POST procesar-desde-bd al servicio OCR/HTR como
+        tarea del event loop: no ocupa un hilo por documento y usa el pool de
+        conexiones compartido (ver http_client.py).
+
+        El llamador ya reservó el lugar con admision_service.reservar(); se libera
+        al terminar la tarea.
+        """
+        modelo = 'htr' if modelo_procesamiento == 'htr' else 'ocr'
+        service_url = self.htr_service_url if modelo == 'htr' else self.ocr_service_url
+        endpoint = f"{service_url}/api/v1/{modelo}/procesar-desde-bd/{documento_id}"
+        logger.info(f"🔄 Llamando {modelo.upper()} service: {endpoint}")
+        
+        async def _procesar():
+            inicio = time.monotonic()
+            completado = False
+            try:
+                completado = await self.llamar_servicio_procesamiento(endpoint, modelo.upper(), documento_id)
+            finally:
+                admision_service.liberar(modelo, time.monotonic() - inicio if completado else None)
+        
+        tarea = asyncio.create_task(_procesar())
+        # Mantener la referencia hasta que termine (asyncio solo guarda referencias débiles)
+        self._tareas.add(tarea)
+        tarea.add_done_callback(self._tareas.discard)
+        return tarea
+    
+    def _marcar_error(self, documento_id: int, mensaje: str):
+        """
+        El documento no se pudo enviar a OCR/HTR y no se reintenta más: estado
+        'error' y sin checkpoint, para que no quede figurando en curso en la validación.
+        """
+        from app.database import SessionLocal
+        db = SessionLocal()
+        try:
+            db.execute(text("""
+                UPDATE documento_digitalizado
+                SET estado_procesamiento = 'error',
+                    mensaje_progreso = :mensaje,
+                    checkpoint_procesamiento = NULL
+                WHERE id_documento = :doc_id
+            """), {"doc_id": documento_id, "mensaje": mensaje})
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"⚠️ No se pudo marcar el documento {documento_id} con error: {e}")
+        finally:
+            db.close()
+    
+    async def llamar_servicio_procesamiento(self, service_url: str, servicio_nombre: str, documento_id: int) -> bool:
+        """
+        POST al servicio OCR/HTR con reintentos.
+
+        Cada error se reintenta en una sola capa:
+        - Timeout o error de conexión (contenedor reiniciándose): los reintenta el
+          cliente HTTP, hasta `procesamiento_reintentos` veces con espera exponencial
+          con jitter; el servicio retoma el documento desde su último checkpoint.
+        - HTTP 503 (worker lleno o sin memoria): se espera su Retry-After y se vuelve
+          a enviar, hasta `procesamiento_reintentos_saturado` veces (mientras tanto
+          los documentos nuevos van a la cola, ver admision_service.py).
+        HTTP 409 significa que el documento sigue procesándose y 422 que la página no
+        pasó el control de calidad (hay que reescanearla); ninguno de los dos se reintenta.
+        """
+        modelo = servicio_nombre.lower()
+        progreso_service.reportar(documento_id, {
+            'estado': 'en_cola',
+            'progreso': 0,
+            'mensaje': f'Enviado a {servicio_nombre}, esperando inicio...',
+            'etapa': 'pendiente',
+            'modelo': modelo
+        })
+        envios = 0
+        while True:
+            envios += 1
+            try:
+                response = await cliente_servicios.post(
+                    modelo, service_url,
+                    timeout=TIMEOUT_PROCESAMIENTO,
+                    reintentos=self.procesamiento_reintentos,
+                    espera_base=self.procesamiento_espera_reintento
+                )
+            except httpx.TransportError as e:
+                mensaje = f'{servicio_nombre} no respondió tras {self.procesamiento_reintentos + 1} intentos'
+                logger.error(f"❌ {mensaje} (documento {documento_id}): {e!r}")
+                progreso_service.reportar(documento_id, {
+                    'estado': 'error',
+                    'progreso': 100,
+                    'mensaje': mensaje,
+                    'etapa': 'error',
+                    'modelo': modelo
+                })
+                await asyncio.to_thread(self._marcar_error, documento_id, mensaje)
+                return False
+            
+            if response.status_code != 503:
+                break
+            try:
+                espera = int(response.headers.get('Retry-After', ''))
+            except ValueError:
+                espera = self.procesamiento_espera_reintento
+            admision_service.saturar(modelo, espera)
+            if envios > self.procesamiento_reintentos_saturado:
+                logger.error(f"❌ {servicio_nombre} siguió saturado tras {envios} envíos (documento {documento_id})")
+                progreso_service.reportar(documento_id, {
+                    'estado': 'error',
+                    'progreso': 100,
+                    'mensaje': f'{servicio_nombre} saturado, reintentar más tarde',
+                    'etapa': 'error',
+                    'modelo': modelo
+                })
+                await asyncio.to_thread(self._marcar_error, documento_id, f'{servicio_nombre} saturado, reintentar más tarde')
+                return False
+            logger.warning(f"🚦 {servicio_nombre} saturado para el documento {documento_id}; "
+                           f"reenvío {envios}/{self.procesamiento_reintentos_saturado} en {espera}s")
+            progreso_service.reportar(documento_id, {
+                'estado': 'en_cola',
+                'progreso': 0,
+                'mensaje': f'{servicio_nombre} ocupado, reintento en {espera}s...',
+                'etapa': 'pendiente',
+                'modelo': modelo
+            })
+            await asyncio.sleep(espera)
+        
+        if response.status_code == 200:
+            logger.info(f"✅ {servicio_nombre} completado para documento {documento_id}")
+            return True
+        if response.status_code == 409:
+            logger.info(f"⏳ {servicio_nombre} ya está procesando el documento {documento_id}")
+            return False
+        if response.status_code == 422:
+            logger.warning(f"📷 {servicio_nombre} rechazó el documento {documento_id} por calidad de imagen")
+            return False
+        logger.error(f"❌ {servicio_nombre} falló HTTP {response.status_code}")
+        return False
+    
     async def _crear_registros_validacion(
         self,
         documento_id: int,
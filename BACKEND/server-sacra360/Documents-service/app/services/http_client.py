@@ -0,0 +1,115 @@
+"""
+Cliente HTTP compartido para las llamadas a OCR-service y HTR-service
+
+Un solo `httpx.AsyncClient` por proceso (pool de conexiones con keep-alive) en
+lugar de un `requests.post` suelto por documento en un hilo propio:
+
+- Timeouts por ruta: conectar siempre es rápido; la lectura depende de lo que
+  haga el endpoint (procesar un documento completo vs. una tupla).
+- Concurrencia acotada por servicio destino: un semáforo por servicio limita las
+  llamadas simultáneas (p.ej. no mandar 50 documentos a la vez al HTR con GPU);
+  el resto espera su turno sin ocupar conexiones. Las llamadas cortas
+  (re-reconocer una tupla) usan su propio semáforo ('ocr-tupla', 'htr-tupla').
+- Reintentos ante timeout o error de conexión con espera exponencial y jitter,
+  para que varios documentos que fallaron juntos no reintenten todos a la vez.
+
+Se cierra en el shutdown de la aplicación (ver main.py).
+"""
+
+import asyncio
+import logging
+import os
+import random
+from typing import Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Timeouts por ruta (segundos)
+TIMEOUT_CONEXION = float(os.getenv('HTTP_TIMEOUT_CONEXION', '5'))
+TIMEOUT_PROCESAMIENTO = httpx.Timeout(float(os.getenv('PROCESAMIENTO_TIMEOUT', '600')), connect=TIMEOUT_CONEXION)
+TIMEOUT_RECONOCER_TUPLA = httpx.Timeout(120.0, connect=TIMEOUT_CONEXION)
+TIMEOUT_DEFECTO = httpx.Timeout(30.0, connect=TIMEOUT_CONEXION)
+
+
+class ClienteServicios:
+    """Cliente HTTP asíncrono compartido con límite de concurrencia por servicio"""
+
+    def __init__(self, max_conexiones: int = 100, max_keepalive: int = 20, keepalive_expiry: float = 30.0,
+                 concurrencia: Optional[Dict[str, int]] = None, concurrencia_defecto: int = 8):
+        """
+        Args:
+            max_conexiones: Conexiones abiertas como máximo en el pool
+            max_keepalive: Conexiones ociosas que se mantienen abiertas para reutilizar
+            keepalive_expiry: Segundos que vive una conexión ociosa
+            concurrencia: Llamadas simultáneas por servicio, p.ej. {'ocr': 4, 'htr': 2}
+            concurrencia_defecto: Límite de los servicios que no están en `concurrencia`
+        """
+        self.limites = httpx.Limits(
+            max_connections=max_conexiones,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.concurrencia = dict(concurrencia or {})
+        self.concurrencia_defecto = concurrencia_defecto
+        self._cliente: Optional[httpx.AsyncClient] = None
+        self._semaforos: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def cliente(self) -> httpx.AsyncClient:
+        """AsyncClient del proceso (se crea en el primer uso)"""
+        if self._cliente is None or self._cliente.is_closed:
+            self._cliente = httpx.AsyncClient(limits=self.limites, timeout=TIMEOUT_DEFECTO)
+        return self._cliente
+
+    def _semaforo(self, servicio: str) -> asyncio.Semaphore:
+        if servicio not in self._semaforos:
+            self._semaforos[servicio] = asyncio.Semaphore(self.concurrencia.get(servicio, self.concurrencia_defecto))
+        return self._semaforos[servicio]
+
+    async def post(self, servicio: str, url: str, *, timeout: httpx.Timeout = TIMEOUT_DEFECTO,
+                   reintentos: int = 0, espera_base: float = 1.0, espera_maxima: float = 300.0,
+                   **kwargs) -> httpx.Response:
+        """
+        POST a `url` del servicio `servicio` ('ocr', 'htr', ...).
+
+        Reintenta `reintentos` veces ante timeout o error de conexión, esperando un
+        tiempo al azar entre 0 y espera_base * 2^intento (tope espera_maxima). Las
+        respuestas HTTP (incluidos 4xx/5xx) se devuelven tal cual, sin reintentar.
+
+        Raises:
+            httpx.TimeoutException, httpx.TransportError: si se agotan los reintentos
+        """
+        for intento in range(reintentos + 1):
+            try:
+                async with self._semaforo(servicio):
+                    return await self.cliente.post(url, timeout=timeout, **kwargs)
+            except httpx.TransportError as e:
+                if intento == reintentos:
+                    raise
+                espera = random.uniform(0, min(espera_maxima, espera_base * (2 ** intento)))
+                logger.warning(f"⚠️ {servicio.upper()} sin respuesta ({e!r}); reintento {intento + 1}/{reintentos} "
+                               f"en {espera:.0f}s")
+                await asyncio.sleep(espera)
+
+    async def cerrar(self):
+        """Cierra las conexiones del pool (shutdown de la aplicación)"""
+        if self._cliente is not None and not self._cliente.is_closed:
+            await self._cliente.aclose()
+            logger.info("🔌 Cliente HTTP de servicios cerrado")
+
+
+# Instancia compartida por controladores y servicios
+cliente_servicios = ClienteServicios(
+    max_conexiones=int(os.getenv('HTTP_MAX_CONEXIONES', '100')),
+    max_keepalive=int(os.getenv('HTTP_MAX_KEEPALIVE', '20')),
+    concurrencia={
+        'ocr': int(os.getenv('OCR_CONCURRENCIA', '2')),
+        'htr': int(os.getenv('HTR_CONCURRENCIA', '1')),
+        # Re-reconocer una tupla tarda ~1 s: límite propio para no esperar detrás
+        # de un documento completo (hasta PROCESAMIENTO_TIMEOUT) en el mismo semáforo
+        'ocr-tupla': int(os.getenv('TUPLA_CONCURRENCIA', '4')),
+        'htr-tupla': int(os.getenv('TUPLA_CONCURRENCIA', '4')),
+    }
+)
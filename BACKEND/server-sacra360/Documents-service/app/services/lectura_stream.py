@@ -0,0 +1,107 @@
+"""
+Lectura por partes de archivos subidos
+
+El upload no se lee entero en memoria: el archivo que recibe FastAPI (UploadFile,
+en memoria hasta 1 MB y luego en un temporal en disco) se pasa a MinIO por partes
+de `part_size` bytes y el SHA-256 y el tamaño se calculan mientras se lee.
+El hash previo al upload (deduplicación) también se calcula por bloques, y las
+entradas de un ZIP (carga de libros por lote) se extraen de a una a un temporal.
+"""
+
+import hashlib
+import os
+import tempfile
+import zipfile
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+# Tipos de archivo que se aceptan como página de un libro
+TIPOS_DOCUMENTO = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.pdf': 'application/pdf',
+}
+
+
+def tamano_archivo(archivo: BinaryIO) -> int:
+    """Tamaño del archivo en bytes, sin leerlo (deja la posición al inicio)"""
+    archivo.seek(0, 2)
+    tamano = archivo.tell()
+    archivo.seek(0)
+    return tamano
+
+
+class LectorConHash:
+    """Envuelve un archivo y calcula SHA-256 y bytes leídos a medida que se lee"""
+
+    def __init__(self, archivo: BinaryIO):
+        self.archivo = archivo
+        self.tamano = 0
+        self._hash = hashlib.sha256()
+
+    def read(self, n: int = -1) -> bytes:
+        datos = self.archivo.read(n)
+        self._hash.update(datos)
+        self.tamano += len(datos)
+        return datos
+
+    @property
+    def sha256(self) -> str:
+        """SHA-256 (hex) de lo leído hasta ahora; completo una vez leído todo el archivo"""
+        return self._hash.hexdigest()
+
+
+def hash_archivo(archivo: BinaryIO, bloque: int = 1024 * 1024) -> str:
+    """SHA-256 (hex) del archivo leído en bloques (deja la posición al inicio)"""
+    archivo.seek(0)
+    lector = LectorConHash(archivo)
+    while lector.read(bloque):
+        pass
+    archivo.seek(0)
+    return lector.sha256
+
+
+def copiar_a_temporal(origen: BinaryIO, max_bytes: int, bloque: int = 1024 * 1024) -> tempfile.SpooledTemporaryFile:
+    """
+    Copia `origen` por bloques a un temporal (en memoria hasta 1 MB, luego en disco).
+
+    Raises:
+        ValueError: si `origen` tiene más de `max_bytes` (no se confía en el tamaño declarado)
+    """
+    temporal = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    copiados = 0
+    while True:
+        datos = origen.read(bloque)
+        if not datos:
+            break
+        copiados += len(datos)
+        if copiados > max_bytes:
+            temporal.close()
+            raise ValueError(f"supera el máximo de {max_bytes // (1024 * 1024)} MB")
+        temporal.write(datos)
+    temporal.seek(0)
+    return temporal
+
+
+def tipo_documento(nombre: str) -> Optional[str]:
+    """Content-type de la página según la extensión, o None si no es un tipo aceptado"""
+    return TIPOS_DOCUMENTO.get(os.path.splitext(nombre)[1].lower())
+
+
+def es_zip(nombre: str, content_type: Optional[str]) -> bool:
+    return nombre.lower().endswith('.zip') or content_type in ('application/zip', 'application/x-zip-compressed')
+
+
+def entradas_zip(archivo: BinaryIO) -> Iterator[Tuple[str, int, BinaryIO]]:
+    """
+    Entradas del ZIP como (nombre, tamaño declarado, stream), en orden de nombre
+    (las páginas de un libro suelen venir numeradas). Omite carpetas y archivos
+    ocultos o de sistema (__MACOSX, .DS_Store). Cada stream se lee de a partes.
+    """
+    with zipfile.ZipFile(archivo) as zf:
+        for info in sorted(zf.infolist(), key=lambda i: i.filename):
+            nombre = os.path.basename(info.filename)
+            if info.is_dir() or not nombre or nombre.startswith('.') or info.filename.startswith('__MACOSX/'):
+                continue
+            with zf.open(info) as stream:
+                yield nombre, info.file_size, stream
@@ -0,0 +1,258 @@
+"""
+Progreso de procesamiento OCR/HTR de los documentos
+
+- Snapshot: una lectura del almacén de progreso compartido (Redis con TTL, ver
+  progress_store.py) que OCR/HTR actualizan mientras procesan; si el documento
+  no tiene progreso reciente se deriva de documento_digitalizado.
+- Stream: OCR-service y HTR-service publican cada cambio de progreso en Redis
+  (canal `sacra360:progreso:{documento_id}`); acá se reenvían al cliente como
+  Server-Sent Events. Si Redis no está disponible el stream sigue funcionando
+  releyendo el snapshot periódicamente.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.services.progress_events import PublicadorProgreso, canal_progreso
+from app.services.progress_store import AlmacenProgreso, ESTADOS_FINALES
+
+logger = logging.getLogger(__name__)
+
+# estado_procesamiento en BD → estado que ve el cliente
+ESTADOS_COMPLETADOS = {'ocr_completado', 'validado', 'validado_completado'}
+ESTADOS_ERROR = {'error', 'rechazado_calidad'}
+
+
+class ProgresoService:
+    """Snapshot y stream del progreso de procesamiento de documentos"""
+
+    def __init__(self, redis_url: Optional[str], ttl: float = 3600.0, intervalo_respaldo: float = 10.0,
+                 duracion_maxima: float = 1800.0):
+        """
+        Args:
+            redis_url: URL de Redis (vacío = progreso en memoria y snapshot periódico)
+            ttl: Segundos que se conserva el progreso de un documento en el almacén
+            intervalo_respaldo: Segundos sin eventos tras los que se relee el snapshot
+                (cubre eventos perdidos y mantiene viva la conexión)
+            duracion_maxima: Duración máxima de un stream; el cliente reconecta solo
+        """
+        self.redis_url = redis_url
+        self.almacen = AlmacenProgreso(redis_url, ttl=ttl)
+        self.publicador = PublicadorProgreso(redis_url, servicio='documents')
+        self.intervalo_respaldo = intervalo_respaldo
+        self.duracion_maxima = duracion_maxima
+        self._cliente = None
+
+    # --- Snapshot ---
+
+    def reportar(self, documento_id: int, estado: Dict[str, Any]):
+        """Guarda el progreso en el almacén compartido y lo publica (p.ej. en cola, error de envío)"""
+        self.almacen.guardar(documento_id, estado)
+        self.publicador.publicar(documento_id, estado)
+
+    def snapshot(self, db: Session, documento_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Progreso actual del documento (None si no existe). Si el almacén compartido
+        tiene progreso reciente se devuelve sin tocar la BD.
+        """
+        progreso = self.almacen.obtener(documento_id)
+        if progreso is not None:
+            return progreso
+
+        fila = db.execute(text("""
+            SELECT id_documento, modelo_procesamiento, estado_procesamiento, progreso_ocr, mensaje_progreso
+            FROM documento_digitalizado
+            WHERE id_documento = :doc_id
+        """), {"doc_id": documento_id}).fetchone()
+        return self._desde_bd(fila) if fila else None
+
+    def snapshot_varios(self, db: Session, documentos_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Progreso de varios documentos: una lectura del almacén para todos y una sola
+        consulta a la BD para los que no tienen progreso reciente. Omite los inexistentes.
+        """
+        progresos = self.almacen.obtener_varios(documentos_ids)
+        faltantes = [d for d in documentos_ids if d not in progresos]
+        if faltantes:
+            filas = db.execute(text("""
+                SELECT id_documento, modelo_procesamiento, estado_procesamiento, progreso_ocr, mensaje_progreso
+                FROM documento_digitalizado
+                WHERE id_documento = ANY(:ids)
+            """), {"ids": faltantes}).fetchall()
+            for fila in filas:
+                progresos[fila[0]] = self._desde_bd(fila)
+        return progresos
+
+    def snapshot_lote(self, db: Session, lote_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Progreso agregado de los documentos creados por un lote (None si no hay).
+        Los duplicados del lote no cuentan: pertenecen al lote que los subió primero.
+        """
+        filas = db.execute(text("""
+            SELECT id_documento, nombre_archivo
+            FROM documento_digitalizado
+            WHERE lote_id = :lote_id
+            ORDER BY nombre_archivo, id_documento
+        """), {"lote_id": lote_id}).fetchall()
+        if not filas:
+            return None
+
+        progresos = self.snapshot_varios(db, [fila[0] for fila in filas])
+        estados = [progresos.get(fila[0], {}).get('estado') for fila in filas]
+        completados = sum(1 for e in estados if e == 'completado')
+        errores = sum(1 for e in estados if e == 'error')
+        # En OCR/HTR: cualquier estado intermedio (descargando, procesando_ocr, guardando...)
+        en_proceso = sum(1 for e in estados if e not in (None, 'pendiente', 'en_cola', 'completado', 'error'))
+        return {
+            "lote_id": lote_id,
+            "total": len(filas),
+            "completados": completados,
+            "errores": errores,
+            "en_proceso": en_proceso,
+            "pendientes": len(filas) - completados - errores - en_proceso,
+            "progreso": round(sum(progresos.get(fila[0], {}).get('progreso', 0) for fila in filas) / len(filas)),
+            "finalizado": completados + errores == len(filas),
+            "documentos": [
+                dict(progresos.get(fila[0], {}), documento_id=fila[0], nombre_archivo=fila[1])
+                for fila in filas
+            ],
+        }
+
+    @staticmethod
+    def _desde_bd(fila) -> Dict[str, Any]:
+        """Progreso derivado de (id, modelo, estado, progreso_ocr, mensaje_progreso) en BD"""
+        modelo = fila[1] if fila[1] in ('ocr', 'htr') else 'ocr'
+        estado_bd, progreso, mensaje = fila[2], fila[3] or 0, fila[4] or ''
+
+        if estado_bd in ESTADOS_COMPLETADOS:
+            return {"estado": "completado", "progreso": 100,
+                    "mensaje": f"{modelo.upper()} completado", "etapa": "completado", "modelo": modelo}
+        if estado_bd in ESTADOS_ERROR:
+            return {"estado": "error", "progreso": 100,
+                    "mensaje": mensaje or "Error en procesamiento", "etapa": "error", "modelo": modelo}
+        if progreso > 0:
+            return {"estado": f"procesando_{modelo}", "progreso": progreso,
+                    "mensaje": f"{modelo.upper()}: {mensaje}" if mensaje else f"Procesando con {modelo.upper()}...",
+                    "etapa": modelo, "modelo": modelo}
+        return {"estado": "pendiente", "progreso": 0,
+                "mensaje": f"Esperando inicio de procesamiento {modelo.upper()}...",
+                "etapa": "pendiente", "modelo": modelo}
+
+    # --- Stream ---
+
+    async def _suscribir(self, documentos_ids: List[int]):
+        """PubSub suscrito a los canales de los documentos, o None si Redis no está disponible"""
+        if not self.redis_url:
+            return None
+        try:
+            if self._cliente is None:
+                import redis.asyncio as redis_asyncio
+                self._cliente = redis_asyncio.from_url(self.redis_url, socket_connect_timeout=1)
+            pubsub = self._cliente.pubsub()
+            await pubsub.subscribe(*[canal_progreso(d) for d in documentos_ids])
+            return pubsub
+        except Exception as e:
+            logger.warning(f"⚠️ Redis no disponible para el stream de progreso ({e}); usando snapshot periódico")
+            return None
+
+    async def eventos(self, documento_id: int,
+                      leer_snapshot: Callable[[], Optional[Dict[str, Any]]]) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """
+        Eventos de progreso de un documento (ver `eventos_varios`): el snapshot
+        actual y luego cada cambio hasta un estado final; None es un latido.
+
+        Args:
+            leer_snapshot: Función sin argumentos que lee el snapshot (se llama en un hilo)
+        """
+        def leer(_ids):
+            progreso = leer_snapshot()
+            return {documento_id: progreso} if progreso is not None else {}
+
+        async for item in self.eventos_varios([documento_id], leer):
+            yield item[1] if item is not None else None
+
+    async def eventos_varios(self, documentos_ids: List[int],
+                             leer_snapshots: Callable[[List[int]], Dict[int, Dict[str, Any]]]
+                             ) -> AsyncIterator[Optional[Tuple[int, Dict[str, Any]]]]:
+        """
+        Eventos de progreso de varios documentos en un solo stream: primero el
+        snapshot actual de cada uno y luego cada cambio publicado por OCR/HTR como
+        (documento_id, evento). Un documento deja de seguirse al llegar a un estado
+        final (o si no existe) y el stream termina cuando no queda ninguno. Produce
+        None cuando no hubo cambios en `intervalo_respaldo` segundos (latido).
+
+        Args:
+            leer_snapshots: Función que recibe ids y devuelve {id: snapshot} (se llama en un hilo)
+        """
+        ultimos = await asyncio.to_thread(leer_snapshots, list(documentos_ids))
+        pendientes = set()
+        for documento_id in documentos_ids:
+            if documento_id in ultimos:
+                yield documento_id, ultimos[documento_id]
+                if ultimos[documento_id]['estado'] not in ESTADOS_FINALES:
+                    pendientes.add(documento_id)
+        if not pendientes:
+            return
+
+        pubsub = await self._suscribir(sorted(pendientes))
+        fin = time.monotonic() + self.duracion_maxima
+        try:
+            while pendientes and time.monotonic() < fin:
+                cambios = []
+                if pubsub is not None:
+                    try:
+                        mensaje = await pubsub.get_message(ignore_subscribe_messages=True,
+                                                           timeout=self.intervalo_respaldo)
+                    except Exception as e:
+                        logger.warning(f"⚠️ Se perdió la suscripción de progreso ({e}); usando snapshot periódico")
+                        pubsub = None
+                        continue
+                    if mensaje and mensaje.get('type') == 'message':
+                        evento = json.loads(mensaje['data'])
+                        canal = mensaje['channel']
+                        canal = canal.decode() if isinstance(canal, bytes) else canal
+                        documento_id = int(canal.rsplit(':', 1)[-1])
+                        if documento_id in pendientes:
+                            cambios.append((documento_id, evento))
+                else:
+                    await asyncio.sleep(self.intervalo_respaldo)
+
+                if not cambios and (pubsub is None or mensaje is None):
+                    # Sin eventos: el snapshot cubre lo que se haya perdido (o Redis caído)
+                    actuales = await asyncio.to_thread(leer_snapshots, sorted(pendientes))
+                    cambios = [(d, e) for d, e in actuales.items() if e != ultimos.get(d)]
+                    if not cambios:
+                        yield None
+                        continue
+
+                for documento_id, evento in cambios:
+                    ultimos[documento_id] = evento
+                    yield documento_id, evento
+                    if evento.get('estado') in ESTADOS_FINALES:
+                        pendientes.discard(documento_id)
+                        if pubsub is not None:
+                            try:
+                                await pubsub.unsubscribe(canal_progreso(documento_id))
+                            except Exception:
+                                pass
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.unsubscribe()
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+
+# Instancia del servicio
+progreso_service = ProgresoService(
+    os.getenv('REDIS_URL', ''),
+    ttl=float(os.getenv('PROGRESS_TTL_SECONDS', '3600'))
+)
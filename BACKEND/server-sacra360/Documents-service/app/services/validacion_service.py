@@ -69,7 +69,7 @@ class ValidacionService:
                 text("""
                     SELECT COALESCE(MAX(tupla_numero), 0) 
                     FROM ocr_resultado 
-                    WHERE documento_id = :doc_id
+                    WHERE documento_id = :doc_id AND listo = true
                 """),
                 {"doc_id": documento_id}
             ).scalar() or 0
@@ -85,7 +85,7 @@ class ValidacionService:
                     text("""
                         SELECT id_ocr, datos_ocr, confianza, validado, sacramento_id
                         FROM ocr_resultado 
-                        WHERE documento_id = :doc_id AND tupla_numero = :tupla_num
+                        WHERE documento_id = :doc_id AND tupla_numero = :tupla_num AND listo = true
                         LIMIT 1
                     """),
                     {"doc_id": documento_id, "tupla_num": tupla_numero}
@@ -612,6 +612,7 @@ class ValidacionService:
                 JOIN documento_digitalizado d ON o.documento_id = d.id_documento
                 WHERE o.documento_id = :doc_id
                 AND o.estado_validacion = 'pendiente'
+                AND o.listo = true
                 ORDER BY o.tupla_numero
             """)
             
@@ -698,6 +699,7 @@ class ValidacionService:
                 WHERE o.documento_id = :doc_id 
                 AND o.tupla_numero = :tupla_num
                 AND o.estado_validacion = 'pendiente'
+                AND o.listo = true
             """)
             
             tupla = db.execute(tupla_query, {
@@ -885,6 +887,7 @@ class ValidacionService:
                 FROM ocr_resultado
                 WHERE documento_id = :doc_id
                 AND estado_validacion = 'pendiente'
+                AND listo = true
                 ORDER BY tupla_numero
                 LIMIT 1
             """)
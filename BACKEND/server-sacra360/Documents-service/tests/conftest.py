@@ -0,0 +1,9 @@
+"""
+Configuración de pytest para Documents Service
+"""
+
+import sys
+import os
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
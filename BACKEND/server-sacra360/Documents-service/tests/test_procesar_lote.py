@@ -0,0 +1,244 @@
+"""
+Tests de la carga de libros por lote (POST /lote) y la deduplicación por contenido
+"""
+
+import hashlib
+import io
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.services.digitalizacion_service import DigitalizacionService
+
+LIBRO_ID = 7
+TIPO_SACRAMENTO = 1
+
+
+class _ResultadoInsert:
+    def __init__(self, ids):
+        self._ids = ids
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self._ids
+
+
+class _SesionFalsa:
+    """Sesión que solo registra el INSERT masivo del lote"""
+
+    def __init__(self):
+        self.filas = []
+        self.commits = 0
+
+    def execute(self, _sentencia, filas):
+        self.filas.extend(filas)
+        return _ResultadoInsert(list(range(100, 100 + len(filas))))
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def servicio():
+    """DigitalizacionService sin MinIO ni BD: la subida y la búsqueda por hash quedan registradas"""
+    s = DigitalizacionService.__new__(DigitalizacionService)
+    s.lote_max_archivos = 500
+    s.lote_concurrencia_subida = 2
+    s.lote_max_bytes_pagina = 50 * 1024 * 1024
+    s._tareas = set()
+    s.subidos = []
+    s.existentes = []
+
+    async def subir(archivo, sha256, nombre, content_type):
+        s.subidos.append(nombre)
+        return {'url': f"minio://documents/sha256/{sha256}"}
+
+    s._subir_a_minio = subir
+    s._buscar_duplicado = lambda db, sha256, libro_id, tipo: next((
+        d for d in reversed(s.existentes)
+        if (d.sha256, d.libros_id, d.tipo_sacramento) == (sha256, libro_id, tipo)
+        and d.estado_procesamiento not in ('error', 'rechazado_calidad')
+    ), None)
+    s._buscar_por_sha256 = lambda db, sha256: next((d for d in reversed(s.existentes) if d.sha256 == sha256), None)
+    return s
+
+
+def _documento(id_documento, contenido, libros_id, estado='ocr_completado', modelo='ocr'):
+    return SimpleNamespace(id_documento=id_documento, sha256=hashlib.sha256(contenido).hexdigest(),
+                           libros_id=libros_id, tipo_sacramento=TIPO_SACRAMENTO, imagen_url=f"minio://{id_documento}",
+                           modelo_procesamiento=modelo, estado_procesamiento=estado)
+
+
+def _archivo(nombre, contenido, content_type=None):
+    return (nombre, content_type, io.BytesIO(contenido))
+
+
+def _zip(entradas):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        for nombre, contenido in entradas:
+            zf.writestr(nombre, contenido)
+    buffer.seek(0)
+    return buffer.getvalue()
+
+
+async def _procesar(servicio, archivos, db=None):
+    return await servicio.procesar_lote(
+        archivos, libro_id=LIBRO_ID, tipo_sacramento=TIPO_SACRAMENTO,
+        procesar_ocr=False, db=db or _SesionFalsa()
+    )
+
+
+def _motivos(resultado):
+    return {o['nombre_archivo']: o['motivo'] for o in resultado['omitidos']}
+
+
+@pytest.mark.asyncio
+async def test_pagina_repetida_en_el_lote_se_omite(servicio):
+    db = _SesionFalsa()
+    resultado = await _procesar(servicio, [
+        _archivo("p001.jpg", b"pagina-1"),
+        _archivo("p002.jpg", b"pagina-2"),
+        _archivo("p003.jpg", b"pagina-1"),
+    ], db)
+
+    assert resultado['total'] == 2
+    assert [d['nombre_archivo'] for d in resultado['documentos']] == ["p001.jpg", "p002.jpg"]
+    assert _motivos(resultado) == {"p003.jpg": "mismo contenido que p001.jpg en este lote"}
+    assert sorted(servicio.subidos) == ["p001.jpg", "p002.jpg"]
+    # Un solo INSERT con el lote_id para las páginas nuevas
+    assert len(db.filas) == 2 and db.commits == 1
+    assert {f['lote_id'] for f in db.filas} == {resultado['lote_id']}
+
+
+@pytest.mark.asyncio
+async def test_duplicado_de_otro_lote_segun_el_libro(servicio):
+    servicio.existentes = [
+        _documento(1, b"ya-en-este-libro", LIBRO_ID),
+        _documento(2, b"ya-en-otro-libro", 99, modelo='htr'),
+        # Copia más nueva en otro libro: no tapa la del libro propio
+        _documento(3, b"ya-en-este-libro", 99),
+    ]
+    db = _SesionFalsa()
+    resultado = await _procesar(servicio, [
+        _archivo("a.jpg", b"ya-en-este-libro"),
+        _archivo("b.jpg", b"ya-en-otro-libro"),
+    ], db)
+
+    documentos = {d['nombre_archivo']: d for d in resultado['documentos']}
+    # Mismo libro y sacramento: se informa el documento existente
+    assert documentos["a.jpg"]['duplicado'] is True and documentos["a.jpg"]['documento_id'] == 1
+    # Otro libro: es un documento nuevo, pero reutiliza el objeto ya subido a MinIO
+    assert documentos["b.jpg"]['duplicado'] is False and documentos["b.jpg"]['documento_id'] == 100
+    assert documentos["b.jpg"]['archivo_url'] == "minio://2"
+    assert servicio.subidos == []
+    assert resultado['total'] == 1 and [f['libros_id'] for f in db.filas] == [LIBRO_ID]
+
+
+@pytest.mark.asyncio
+async def test_duplicado_con_error_se_vuelve_a_procesar(servicio):
+    servicio.existentes = [_documento(1, b"fallo", LIBRO_ID, estado='error')]
+    db = _SesionFalsa()
+    resultado = await _procesar(servicio, [_archivo("a.jpg", b"fallo")], db)
+
+    documento = resultado['documentos'][0]
+    assert documento['duplicado'] is False and documento['documento_id'] == 100
+    # El objeto en MinIO sigue sirviendo
+    assert documento['archivo_url'] == "minio://1" and servicio.subidos == []
+
+
+def test_busquedas_por_sha256_en_sql():
+    """Las dos consultas reales, sobre SQLite"""
+    engine = create_engine("sqlite://")
+    with Session(engine) as db:
+        db.execute(text("""
+            CREATE TABLE documento_digitalizado (
+                id_documento INTEGER PRIMARY KEY, libros_id INTEGER, tipo_sacramento INTEGER, imagen_url TEXT,
+                modelo_procesamiento TEXT, estado_procesamiento TEXT, fecha_subida TEXT, sha256 TEXT
+            )
+        """))
+        for id_documento, libros_id, estado in ((1, LIBRO_ID, 'ocr_completado'), (2, LIBRO_ID, 'error'),
+                                                (3, 99, 'ocr_completado'), (4, LIBRO_ID, 'rechazado_calidad')):
+            db.execute(text("""
+                INSERT INTO documento_digitalizado
+                VALUES (:id, :libro, :tipo, :url, 'ocr', :estado, NULL, 'h')
+            """), {"id": id_documento, "libro": libros_id, "tipo": TIPO_SACRAMENTO,
+                   "url": f"minio://{id_documento}", "estado": estado})
+        s = DigitalizacionService.__new__(DigitalizacionService)
+
+        assert s._buscar_duplicado(db, 'h', LIBRO_ID, TIPO_SACRAMENTO).id_documento == 1
+        assert s._buscar_duplicado(db, 'h', LIBRO_ID, TIPO_SACRAMENTO + 1) is None
+        assert s._buscar_duplicado(db, 'otro', LIBRO_ID, TIPO_SACRAMENTO) is None
+        assert s._buscar_por_sha256(db, 'h').id_documento == 4
+
+
+@pytest.mark.asyncio
+async def test_zip_omite_entradas_no_soportadas_grandes_y_de_sistema(servicio):
+    servicio.lote_max_bytes_pagina = 10
+    contenido = _zip([
+        ("libro/p002.png", b"pagina-2"),
+        ("libro/p001.jpg", b"pagina-1"),
+        ("libro/notas.txt", b"texto"),
+        ("libro/p003.jpg", b"x" * 20),
+        ("__MACOSX/libro/._p001.jpg", b"metadatos"),
+        ("libro/.DS_Store", b"sistema"),
+    ])
+    resultado = await _procesar(servicio, [_archivo("libro.zip", contenido, 'application/zip')])
+
+    # Entradas en orden de nombre, sin la carpeta del ZIP
+    assert [d['nombre_archivo'] for d in resultado['documentos']] == ["p001.jpg", "p002.png"]
+    motivos = _motivos(resultado)
+    assert motivos.keys() == {"notas.txt", "p003.jpg"}
+    assert motivos["notas.txt"] == "tipo de archivo no soportado"
+    assert motivos["p003.jpg"].startswith("supera el máximo de")
+
+
+@pytest.mark.asyncio
+async def test_pagina_suelta_que_supera_el_maximo_se_omite(servicio):
+    servicio.lote_max_bytes_pagina = 10
+    resultado = await _procesar(servicio, [
+        _archivo("chica.jpg", b"pagina"),
+        _archivo("grande.jpg", b"x" * 20),
+        _archivo("planilla.xlsx", b"datos"),
+    ])
+
+    assert [d['nombre_archivo'] for d in resultado['documentos']] == ["chica.jpg"]
+    motivos = _motivos(resultado)
+    assert motivos["grande.jpg"].startswith("supera el máximo de")
+    assert motivos["planilla.xlsx"] == "tipo de archivo no soportado"
+
+
+@pytest.mark.asyncio
+async def test_tope_de_paginas_por_lote(servicio):
+    servicio.lote_max_archivos = 2
+    resultado = await _procesar(servicio, [
+        _archivo("p001.jpg", b"pagina-1"),
+        _archivo("p002.jpg", b"pagina-2"),
+        _archivo("p003.jpg", b"pagina-3"),
+        _archivo("p004.jpg", b"pagina-4"),
+    ])
+
+    assert resultado['total'] == 2
+    assert _motivos(resultado) == {
+        "p003.jpg": "supera el máximo de 2 páginas por lote",
+        "p004.jpg": "supera el máximo de 2 páginas por lote",
+    }
+
+
+@pytest.mark.asyncio
+async def test_zip_invalido_no_corta_el_lote(servicio):
+    resultado = await _procesar(servicio, [
+        _archivo("roto.zip", b"esto no es un zip"),
+        _archivo("p001.jpg", b"pagina-1"),
+    ])
+
+    assert [d['nombre_archivo'] for d in resultado['documentos']] == ["p001.jpg"]
+    assert _motivos(resultado) == {"roto.zip": "ZIP inválido o dañado"}
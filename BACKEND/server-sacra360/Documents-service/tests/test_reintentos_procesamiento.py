@@ -0,0 +1,130 @@
+"""
+Tests de los reintentos hacia OCR/HTR: errores de red en el cliente HTTP, 503 en el llamador
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import digitalizacion_service as modulo
+from app.services import http_client
+from app.services.http_client import ClienteServicios
+
+
+@pytest.fixture
+def esperas(monkeypatch):
+    """Registra los asyncio.sleep en lugar de esperar"""
+    registradas = []
+
+    async def dormir(segundos):
+        registradas.append(segundos)
+
+    # Mismo módulo asyncio en http_client y digitalizacion_service
+    monkeypatch.setattr(http_client.asyncio, 'sleep', dormir)
+    return registradas
+
+
+def _cliente(respuestas):
+    """ClienteServicios cuyo transporte responde (o falla) según `respuestas`, en orden"""
+    pedidos = []
+
+    def responder(request):
+        pedidos.append(request)
+        respuesta = respuestas[min(len(pedidos), len(respuestas)) - 1]
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        return respuesta
+
+    cliente = ClienteServicios()
+    cliente._cliente = httpx.AsyncClient(transport=httpx.MockTransport(responder))
+    return cliente, pedidos
+
+
+@pytest.mark.asyncio
+async def test_cliente_reintenta_errores_de_red_con_jitter(monkeypatch, esperas):
+    topes = []
+
+    def uniforme(minimo, maximo):
+        topes.append((minimo, maximo))
+        return maximo / 2
+
+    monkeypatch.setattr(http_client.random, 'uniform', uniforme)
+    cliente, pedidos = _cliente([httpx.ConnectError("caído"), httpx.ReadTimeout("lento"), httpx.Response(200)])
+
+    respuesta = await cliente.post('ocr', 'http://ocr/procesar', reintentos=3, espera_base=10, espera_maxima=15)
+    assert respuesta.status_code == 200 and len(pedidos) == 3
+    # Espera al azar entre 0 y base * 2^intento, con tope en espera_maxima
+    assert topes == [(0, 10), (0, 15)]
+    assert esperas == [5, 7.5]
+
+
+@pytest.mark.asyncio
+async def test_cliente_no_reintenta_respuestas_http(esperas):
+    cliente, pedidos = _cliente([httpx.Response(503), httpx.Response(200)])
+    respuesta = await cliente.post('ocr', 'http://ocr/procesar', reintentos=3)
+    assert respuesta.status_code == 503 and len(pedidos) == 1 and esperas == []
+
+
+@pytest.mark.asyncio
+async def test_cliente_agota_los_reintentos(esperas):
+    cliente, pedidos = _cliente([httpx.ConnectError("caído")])
+    with pytest.raises(httpx.ConnectError):
+        await cliente.post('ocr', 'http://ocr/procesar', reintentos=2)
+    assert len(pedidos) == 3 and len(esperas) == 2
+
+
+@pytest.mark.asyncio
+async def test_tupla_no_espera_al_documento_en_curso(esperas):
+    cliente, pedidos = _cliente([httpx.Response(200)])
+    cliente.concurrencia = {'htr': 1, 'htr-tupla': 1}
+    # Un documento completo ocupa el único lugar de 'htr'
+    async with cliente._semaforo('htr'):
+        respuesta = await asyncio.wait_for(
+            cliente.post('htr-tupla', 'http://htr/reconocer-tupla/1/1'), timeout=1
+        )
+    assert respuesta.status_code == 200 and len(pedidos) == 1
+
+
+@pytest.fixture
+def servicio(monkeypatch):
+    s = modulo.DigitalizacionService.__new__(modulo.DigitalizacionService)
+    s.procesamiento_reintentos = 2
+    s.procesamiento_espera_reintento = 30
+    s.procesamiento_reintentos_saturado = 2
+    s.errores = []
+    s._marcar_error = lambda documento_id, mensaje: s.errores.append((documento_id, mensaje))
+    monkeypatch.setattr(modulo.progreso_service, 'reportar', lambda documento_id, estado: None)
+    monkeypatch.setattr(modulo.admision_service, 'saturar', lambda modelo, espera: None)
+    return s
+
+
+@pytest.mark.asyncio
+async def test_503_se_reenvia_tras_retry_after(monkeypatch, servicio, esperas):
+    saturado = httpx.Response(503, headers={'Retry-After': '7'})
+    cliente, pedidos = _cliente([saturado, saturado, httpx.Response(200)])
+    monkeypatch.setattr(modulo, 'cliente_servicios', cliente)
+
+    assert await servicio.llamar_servicio_procesamiento('http://ocr/procesar', 'OCR', 1) is True
+    assert len(pedidos) == 3 and esperas == [7, 7]
+
+
+@pytest.mark.asyncio
+async def test_503_persistente_marca_error(monkeypatch, servicio, esperas):
+    cliente, pedidos = _cliente([httpx.Response(503, headers={'Retry-After': '7'})])
+    monkeypatch.setattr(modulo, 'cliente_servicios', cliente)
+
+    assert await servicio.llamar_servicio_procesamiento('http://ocr/procesar', 'OCR', 1) is False
+    assert len(pedidos) == 3
+    assert servicio.errores == [(1, 'OCR saturado, reintentar más tarde')]
+
+
+@pytest.mark.asyncio
+async def test_error_de_red_se_reintenta_en_una_sola_capa(monkeypatch, servicio, esperas):
+    cliente, pedidos = _cliente([httpx.ConnectError("caído")])
+    monkeypatch.setattr(modulo, 'cliente_servicios', cliente)
+
+    assert await servicio.llamar_servicio_procesamiento('http://ocr/procesar', 'OCR', 1) is False
+    # procesamiento_reintentos + 1 POST en total, no (reintentos + 1)^2
+    assert len(pedidos) == 3
+    assert servicio.errores == [(1, 'OCR no respondió tras 3 intentos')]
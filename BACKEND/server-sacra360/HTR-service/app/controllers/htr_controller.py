@@ -7,17 +7,52 @@ Similar a ocr_controller.py pero usando el modelo HTR_Sacra360
 from fastapi import HTTPException, Depends
 from sqlalchemy.orm import Session
 from sqlalchemy import text
+import json
 import logging
-from typing import Dict, Any
+import time
+import uuid
+from typing import Dict, Any, Optional
 from datetime import datetime
 
 from services.htr_processor import HTRProcessor
+from services.quality_gate import CalidadInsuficiente
+from services.debug_artifacts import debug_store
+from services.progress_events import PublicadorProgreso
+from services.progress_store import AlmacenProgreso
+from services.outbox import EVENTO_DOCUMENTO_PROCESADO, registrar_evento
+from services.admission import ControlAdmision
 from database import get_db
 
+try:
+    from ..utils.config import settings
+except ImportError:
+    from utils.config import settings
+
 logger = logging.getLogger(__name__)
 
-# Tracker de progreso en memoria (compartido entre requests)
-progress_tracker = {}
+# Progreso por documento, compartido entre workers y servicios (Redis con TTL)
+almacen_progreso = AlmacenProgreso(settings.redis_url, ttl=settings.progress_ttl_seconds)
+
+# Eventos de progreso para Documents-service (SSE), vía Redis pub/sub
+publicador_progreso = PublicadorProgreso(settings.redis_url, servicio='htr')
+
+
+def reportar_progreso(documento_id: int, estado: Dict[str, Any]):
+    """Guarda el progreso en el almacén compartido y lo publica para los clientes suscritos"""
+    almacen_progreso.guardar(documento_id, dict(estado, modelo='htr'))
+    publicador_progreso.publicar(documento_id, estado)
+
+
+# Documentos procesándose en este proceso e identificador del proceso (para checkpoints)
+trabajos_activos = set()
+INSTANCIA = uuid.uuid4().hex
+
+# Rechaza trabajos nuevos con el proceso lleno o sin memoria (503 + Retry-After)
+control_admision = ControlAdmision(
+    max_trabajos=settings.max_trabajos_simultaneos,
+    max_rss_mb=settings.max_rss_mb,
+    retry_after=settings.admision_retry_after
+)
 
 
 class HTRController:
@@ -27,28 +62,38 @@ class HTRController:
         self.db = db
         self.htr_processor = htr_processor
     
-    async def procesar_desde_bd(self, documento_id: int) -> Dict[str, Any]:
+    async def procesar_desde_bd(self, documento_id: int, debug: bool = False) -> Dict[str, Any]:
         """
         Procesa un documento desde la BD usando HTR
         
         Args:
             documento_id: ID del documento en documento_digitalizado
+            debug: Guardar artefactos de debug (grilla, celdas, decisiones por fila)
             
         Returns:
             Dict con estado del procesamiento
         """
+        if documento_id in trabajos_activos:
+            raise HTTPException(status_code=409, detail=f"El documento {documento_id} ya se está procesando")
+        motivo = control_admision.motivo_rechazo(len(trabajos_activos))
+        if motivo:
+            logger.warning(f"🚦 Documento {documento_id} rechazado: {motivo}")
+            raise HTTPException(status_code=503, detail=motivo,
+                                headers={"Retry-After": str(control_admision.retry_after)})
+        trabajos_activos.add(documento_id)
+        sesion_debug = debug_store.sesion(documento_id, forzar=debug)
         try:
             logger.info("=" * 70)
             logger.info(f"📄 Procesando documento con HTR: ID={documento_id}")
             logger.info("=" * 70)
             
             # Inicializar progreso
-            progress_tracker[documento_id] = {
+            reportar_progreso(documento_id, {
                 'estado': 'iniciando',
                 'progreso': 5,
                 'mensaje': 'Iniciando procesamiento HTR...',
                 'etapa': 'init'
-            }
+            })
             
             # 1. Obtener documento de BD
             query = text("""
@@ -64,33 +109,27 @@ class HTRController:
             
             doc_id, imagen_url, nombre_archivo, libro_id, tipo_sacramento = resultado
             logger.info(f"📄 Documento encontrado: {nombre_archivo}")
+
+            # Reanudar desde el último checkpoint (reinicio del contenedor o reintento por timeout)
+            checkpoint = self._cargar_checkpoint(documento_id, imagen_url)
+            tuplas_previas = checkpoint['estado']['tupla'] - 1 if checkpoint else 0
+            self._descartar_tuplas_no_listas(documento_id, desde_tupla=tuplas_previas + 1)
+            if checkpoint:
+                logger.info(f"⏯️ Checkpoint encontrado: {tuplas_previas} tuplas ya guardadas")
             
             # Actualizar progreso
-            progress_tracker[documento_id] = {
+            reportar_progreso(documento_id, {
                 'estado': 'descargando',
                 'progreso': 10,
                 'mensaje': 'Descargando archivo...',
                 'etapa': 'download'
-            }
+            })
             
             # 2. Descargar archivo desde MinIO
             from services.minio_service import MinIOService
             minio_service = MinIOService()
             
-            # Extraer path de MinIO desde URL
-            # URL puede ser: http://minio:9000/sacra360-documents/documents/file.pdf
-            # Necesitamos solo la parte: documents/file.pdf
-            if '/sacra360-documents/' in imagen_url:
-                minio_path = imagen_url.split('/sacra360-documents/')[-1]
-            elif '/sacra360-htr/' in imagen_url:
-                minio_path = imagen_url.split('/sacra360-htr/')[-1]
-            else:
-                # Fallback: usar la parte después del bucket
-                parts = imagen_url.split('/')
-                if len(parts) > 4:
-                    minio_path = '/'.join(parts[4:])
-                else:
-                    minio_path = parts[-1]
+            minio_path = self._ruta_minio(imagen_url)
             
             logger.info(f"☁️  Descargando desde MinIO: {imagen_url}")
             logger.info(f"📁 Path en bucket: {minio_path}")
@@ -99,12 +138,12 @@ class HTRController:
             logger.info(f"✅ Archivo descargado: {len(contenido)} bytes")
             
             # Actualizar progreso
-            progress_tracker[documento_id] = {
+            reportar_progreso(documento_id, {
                 'estado': 'procesando_htr',
                 'progreso': 15,
                 'mensaje': 'Procesando con HTR...',
                 'etapa': 'htr'
-            }
+            })
             
             # 3. Determinar si es PDF
             es_pdf = nombre_archivo.lower().endswith('.pdf')
@@ -118,13 +157,13 @@ class HTRController:
                 progreso_htr = 20 + int((celda_actual / total_celdas) * 60)
                 mensaje = f'Procesadas {celda_actual}/{total_celdas} celdas (HTR)'
                 
-                # Actualizar en memoria
-                progress_tracker[documento_id] = {
+                # Actualizar en el almacén compartido y publicar
+                reportar_progreso(documento_id, {
                     'estado': 'procesando_htr',
                     'progreso': progreso_htr,
                     'mensaje': mensaje,
                     'etapa': 'htr'
-                }
+                })
                 
                 # Actualizar en BD para persistencia
                 try:
@@ -143,9 +182,30 @@ class HTRController:
                 except Exception as e:
                     logger.warning(f"⚠️ No se pudo guardar progreso en BD: {e}")
             
+            def guardar_fila(tupla, estado):
+                """Publica la tupla para validación y guarda el checkpoint en una transacción"""
+                try:
+                    if tupla is not None:
+                        self._insertar_tupla(documento_id, tupla, listo=settings.stream_partial_results)
+                    self._guardar_checkpoint(documento_id, imagen_url, estado)
+                    self.db.commit()
+                except Exception:
+                    self.db.rollback()
+                    raise
+            
+            def guardar_calidad(reporte):
+                """Guarda las métricas de calidad de la página junto al documento"""
+                self._guardar_calidad(documento_id, reporte)
+                self.db.commit()
+            
             resultado_htr_data = self.htr_processor.process_pdf(
                 pdf_bytes=contenido,
-                progress_callback=actualizar_progreso_htr
+                progress_callback=actualizar_progreso_htr,
+                debug=sesion_debug,
+                libro_id=libro_id,
+                reanudar=checkpoint['estado'] if checkpoint else None,
+                row_callback=guardar_fila,
+                calidad_callback=guardar_calidad
             )
             
             # Adaptar respuesta al formato esperado
@@ -157,12 +217,12 @@ class HTRController:
             }
             
             if resultado_htr['estado'] != 'success':
-                progress_tracker[documento_id] = {
+                reportar_progreso(documento_id, {
                     'estado': 'error',
                     'progreso': 100,
                     'mensaje': f"Error en HTR: {resultado_htr.get('mensaje', 'Error desconocido')}",
                     'etapa': 'error'
-                }
+                })
                 logger.error(f"❌ Error en HTR: {resultado_htr.get('mensaje')}")
                 return {
                     'estado': 'error',
@@ -173,37 +233,22 @@ class HTRController:
             logger.info(f"✅ HTR completado: {resultado_htr['total_tuplas']} tuplas extraídas")
             
             # Actualizar progreso
-            progress_tracker[documento_id] = {
+            reportar_progreso(documento_id, {
                 'estado': 'guardando',
                 'progreso': 85,
                 'mensaje': 'Guardando resultados en BD...',
                 'etapa': 'save'
-            }
+            })
             
-            # 5. Guardar resultados en ocr_resultado (reutilizamos la tabla)
-            total_tuplas = 0
-            for tupla_data in resultado_htr['datos']:
-                import json
-                insert_query = text("""
-                    INSERT INTO ocr_resultado (
-                        documento_id, tupla_numero, datos_ocr, confianza,
-                        fuente_modelo, validado, estado_validacion
-                    ) VALUES (
-                        :doc_id, :tupla_num, CAST(:datos_json AS jsonb), :conf,
-                        :modelo, false, 'pendiente'
-                    )
-                """)
-                
-                self.db.execute(insert_query, {
-                    'doc_id': documento_id,
-                    'tupla_num': tupla_data['tupla_numero'],
-                    'datos_json': json.dumps(tupla_data['datos_ocr']),
-                    'conf': 0.85,  # Confianza estimada del HTR
-                    'modelo': 'HTR_Sacra360'
-                })
-                total_tuplas += 1
+            # 5. Las tuplas ya se guardaron fila por fila: marcar como listas las que no se publicaron
+            total_tuplas = tuplas_previas + len(resultado_htr['datos'])
+            self.db.execute(text("""
+                UPDATE ocr_resultado
+                SET listo = true
+                WHERE documento_id = :doc_id AND listo = false
+            """), {"doc_id": documento_id})
             
-            # 6. Actualizar estado del documento
+            # 6. Actualizar estado del documento y descartar el checkpoint
             update_doc = text("""
                 UPDATE documento_digitalizado
                 SET estado_procesamiento = 'ocr_completado',
@@ -211,20 +256,30 @@ class HTRController:
                     modelo_fuente = 'HTR_Sacra360',
                     modelo_procesamiento = 'htr',
                     progreso_ocr = 100,
-                    mensaje_progreso = 'HTR completado'
+                    mensaje_progreso = 'HTR completado',
+                    checkpoint_procesamiento = NULL
                 WHERE id_documento = :doc_id
             """)
             
             self.db.execute(update_doc, {"doc_id": documento_id})
+            
+            # 7. Evento para Documents-service en la misma transacción (outbox)
+            registrar_evento(self.db, EVENTO_DOCUMENTO_PROCESADO, documento_id, {
+                'modelo': 'htr',
+                'estado_procesamiento': 'ocr_completado',
+                'total_tuplas': total_tuplas,
+                'libro_id': libro_id,
+                'tipo_sacramento': tipo_sacramento
+            }, origen='htr')
             self.db.commit()
             
             # Actualizar progreso final
-            progress_tracker[documento_id] = {
+            reportar_progreso(documento_id, {
                 'estado': 'completado',
                 'progreso': 100,
                 'mensaje': f'HTR completado: {total_tuplas} tuplas extraídas',
                 'etapa': 'completed'
-            }
+            })
             
             logger.info(f"✅ Resultados guardados: {total_tuplas} tuplas")
             logger.info("=" * 70)
@@ -236,20 +291,219 @@ class HTRController:
                 'documento_id': documento_id
             }
             
+        except HTTPException:
+            raise
+        except CalidadInsuficiente as e:
+            # Página rechazada antes del HTR: no se reintenta, hay que reescanear
+            logger.warning(f"📷 Documento {documento_id} rechazado por calidad: {', '.join(e.reporte['motivos'])}")
+            mensaje = f"Reescanear: {', '.join(e.reporte['motivos'])}"
+            self.db.execute(text("""
+                UPDATE documento_digitalizado
+                SET estado_procesamiento = 'rechazado_calidad',
+                    mensaje_progreso = :mensaje,
+                    checkpoint_procesamiento = NULL
+                WHERE id_documento = :doc_id
+            """), {"doc_id": documento_id, "mensaje": mensaje})
+            self.db.commit()
+            
+            reportar_progreso(documento_id, {
+                'estado': 'error',
+                'progreso': 100,
+                'mensaje': mensaje,
+                'etapa': 'error'
+            })
+            
+            raise HTTPException(
+                status_code=422,
+                detail={'mensaje': 'Calidad de imagen insuficiente', 'calidad': e.reporte}
+            )
         except Exception as e:
             logger.error(f"❌ Error procesando documento {documento_id}: {e}", exc_info=True)
             
-            progress_tracker[documento_id] = {
+            # Documents-service no reenvía un 500: la falla es definitiva y el documento
+            # no debe seguir figurando en curso (checkpoint) para poder validarse
+            self._marcar_error(documento_id, f'Error: {str(e)}')
+            
+            reportar_progreso(documento_id, {
                 'estado': 'error',
                 'progreso': 100,
                 'mensaje': f'Error: {str(e)}',
                 'etapa': 'error'
-            }
+            })
             
             raise HTTPException(
                 status_code=500,
                 detail=f"Error al procesar documento: {str(e)}"
             )
+        
+        finally:
+            trabajos_activos.discard(documento_id)
+            if sesion_debug is not None:
+                sesion_debug.cerrar()
+
+    @staticmethod
+    def _ruta_minio(imagen_url: str) -> str:
+        """
+        Extraer path de MinIO desde URL
+        URL puede ser: http://minio:9000/sacra360-documents/documents/file.pdf
+        Necesitamos solo la parte: documents/file.pdf
+        """
+        if '/sacra360-documents/' in imagen_url:
+            return imagen_url.split('/sacra360-documents/')[-1]
+        if '/sacra360-htr/' in imagen_url:
+            return imagen_url.split('/sacra360-htr/')[-1]
+        # Fallback: usar la parte después del bucket
+        parts = imagen_url.split('/')
+        return '/'.join(parts[4:]) if len(parts) > 4 else parts[-1]
+
+    def reconocer_tupla(self, documento_id: int, tupla_numero: int, columna: Optional[int] = None,
+                        dpi: Optional[int] = None, motor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Vuelve a leer una tupla (o una de sus celdas) con las cajas guardadas en
+        bbox_celdas y actualiza solo esa fila de ocr_resultado, sin reprocesar la página.
+        """
+        fila = self.db.execute(text("""
+            SELECT r.id_ocr, r.datos_ocr, r.bbox_celdas, r.validado, d.imagen_url
+            FROM ocr_resultado r
+            JOIN documento_digitalizado d ON d.id_documento = r.documento_id
+            WHERE r.documento_id = :doc_id AND r.tupla_numero = :tupla_num
+        """), {"doc_id": documento_id, "tupla_num": tupla_numero}).fetchone()
+        if not fila:
+            raise HTTPException(status_code=404, detail=f"Tupla {tupla_numero} del documento {documento_id} no encontrada")
+        id_ocr, datos_ocr, bbox, validado, imagen_url = fila
+        if validado:
+            raise HTTPException(status_code=409, detail=f"La tupla {tupla_numero} ya fue validada")
+        if not bbox:
+            raise HTTPException(
+                status_code=422,
+                detail="La tupla no tiene regiones guardadas (procesada antes de bbox_celdas); reprocese el documento"
+            )
+        datos_ocr = json.loads(datos_ocr) if isinstance(datos_ocr, str) else dict(datos_ocr)
+        bbox = json.loads(bbox) if isinstance(bbox, str) else bbox
+
+        from services.minio_service import MinIOService
+        inicio = time.time()
+        contenido = MinIOService().download_file(self._ruta_minio(imagen_url))
+        try:
+            textos = self.htr_processor.reconocer_region(contenido, bbox, columna=columna, dpi=dpi, motor=motor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        anteriores = {f"col_{j}": datos_ocr.get(f"col_{j}") for j in textos}
+        datos_ocr.update({f"col_{j}": texto for j, texto in textos.items()})
+        self.db.execute(text("""
+            UPDATE ocr_resultado SET datos_ocr = CAST(:datos AS jsonb) WHERE id_ocr = :id_ocr
+        """), {"id_ocr": id_ocr, "datos": json.dumps(datos_ocr)})
+        self.db.commit()
+
+        segundos = round(time.time() - inicio, 2)
+        logger.info(f"🔁 Tupla {tupla_numero} del documento {documento_id} re-leída en {segundos}s")
+        return {
+            'documento_id': documento_id,
+            'tupla_numero': tupla_numero,
+            'datos_ocr': datos_ocr,
+            'anteriores': anteriores,
+            'motor': motor,
+            'dpi': dpi,
+            'tiempo_s': segundos
+        }
+
+    def _cargar_checkpoint(self, documento_id: int, imagen_url: str) -> Optional[Dict[str, Any]]:
+        """
+        Checkpoint HTR del documento, si corresponde al mismo archivo.
+
+        Si el checkpoint pertenece a otro proceso y se actualizó hace poco, ese
+        trabajo probablemente sigue vivo (otro worker) y se rechaza con 409.
+        """
+        fila = self.db.execute(text("""
+            SELECT checkpoint_procesamiento FROM documento_digitalizado WHERE id_documento = :doc_id
+        """), {"doc_id": documento_id}).fetchone()
+        checkpoint = fila[0] if fila else None
+        if isinstance(checkpoint, str):
+            checkpoint = json.loads(checkpoint)
+        if not checkpoint or checkpoint.get('modelo') != 'htr' or checkpoint.get('archivo') != imagen_url:
+            return None
+
+        antiguedad = time.time() - checkpoint.get('actualizado', 0)
+        if checkpoint.get('instancia') != INSTANCIA and antiguedad < settings.checkpoint_heartbeat_timeout:
+            raise HTTPException(
+                status_code=409,
+                detail=f"El documento {documento_id} se está procesando en otro worker (checkpoint hace {antiguedad:.0f}s)"
+            )
+        return checkpoint
+
+    def _marcar_error(self, documento_id: int, mensaje: str):
+        """Falla sin reanudación: estado 'error' y sin checkpoint"""
+        try:
+            self.db.rollback()
+            self.db.execute(text("""
+                UPDATE documento_digitalizado
+                SET estado_procesamiento = 'error',
+                    mensaje_progreso = :mensaje,
+                    checkpoint_procesamiento = NULL
+                WHERE id_documento = :doc_id
+            """), {"doc_id": documento_id, "mensaje": mensaje[:500]})
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.warning(f"⚠️ No se pudo marcar el documento {documento_id} con error: {e}")
+
+    def _guardar_checkpoint(self, documento_id: int, imagen_url: str, estado: Dict[str, Any]):
+        checkpoint = {
+            'modelo': 'htr',
+            'archivo': imagen_url,
+            'instancia': INSTANCIA,
+            'actualizado': time.time(),
+            'estado': estado,
+        }
+        self.db.execute(text("""
+            UPDATE documento_digitalizado
+            SET checkpoint_procesamiento = CAST(:checkpoint AS jsonb)
+            WHERE id_documento = :doc_id
+        """), {"doc_id": documento_id, "checkpoint": json.dumps(checkpoint)})
+
+    def _guardar_calidad(self, documento_id: int, reporte: Dict[str, Any]):
+        self.db.execute(text("""
+            UPDATE documento_digitalizado
+            SET calidad_imagen = CAST(:calidad AS jsonb)
+            WHERE id_documento = :doc_id
+        """), {"doc_id": documento_id, "calidad": json.dumps(reporte)})
+
+    def _descartar_tuplas_no_listas(self, documento_id: int, desde_tupla: int):
+        """
+        Borra tuplas no publicadas de un trabajo interrumpido que no están cubiertas
+        por el checkpoint. Las publicadas (listo = true) pueden estar ya validadas.
+        """
+        self.db.execute(text("""
+            DELETE FROM ocr_resultado
+            WHERE documento_id = :doc_id AND listo = false AND tupla_numero >= :desde
+        """), {"doc_id": documento_id, "desde": desde_tupla})
+        self.db.commit()
+
+    def _insertar_tupla(self, documento_id: int, tupla_data: Dict[str, Any], listo: bool):
+        """
+        Inserta la tupla si todavía no existe: al reprocesar sin checkpoint utilizable
+        las tuplas ya publicadas (quizás ya validadas) no se duplican ni se tocan.
+        """
+        self.db.execute(text("""
+            INSERT INTO ocr_resultado (
+                documento_id, tupla_numero, datos_ocr, confianza,
+                fuente_modelo, validado, estado_validacion, listo, bbox_celdas
+            )
+            SELECT :doc_id, :tupla_num, CAST(:datos_json AS jsonb), :conf,
+                   :modelo, false, 'pendiente', :listo, CAST(:bbox AS jsonb)
+            WHERE NOT EXISTS (
+                SELECT 1 FROM ocr_resultado WHERE documento_id = :doc_id AND tupla_numero = :tupla_num
+            )
+        """), {
+            'doc_id': documento_id,
+            'tupla_num': tupla_data['tupla_numero'],
+            'datos_json': json.dumps(tupla_data['datos_ocr']),
+            'conf': 0.85,  # Confianza estimada del HTR
+            'modelo': 'HTR_Sacra360',
+            'listo': listo,
+            'bbox': json.dumps(tupla_data['bbox_celdas']) if tupla_data.get('bbox_celdas') else None
+        })
     
     def obtener_progreso(self, documento_id: int) -> Dict[str, Any]:
         """
@@ -261,7 +515,12 @@ class HTRController:
         Returns:
             Dict con información de progreso
         """
-        # Primero verificar en BD (fuente de verdad)
+        # Almacén compartido: una lectura, sin consultar la BD
+        progreso = almacen_progreso.obtener(documento_id)
+        if progreso is not None:
+            return progreso
+        
+        # Sin progreso reciente (venció el TTL o se procesó en otra época): estado en BD
         query = text("""
             SELECT estado_procesamiento, progreso_ocr, mensaje_progreso
             FROM documento_digitalizado
@@ -281,22 +540,6 @@ class HTRController:
         
         logger.info(f"📊 Consultando progreso HTR doc {documento_id}: estado_bd={estado_bd}, progreso={progreso_bd}")
         
-        # Si está en procesamiento y tiene progreso, devolverlo
-        if estado_bd == 'procesando' and progreso_bd > 0:
-            respuesta = {
-                'estado': 'procesando_htr',
-                'progreso': progreso_bd,
-                'mensaje': mensaje_bd or f'Procesando HTR: {progreso_bd}%',
-                'etapa': 'htr'
-            }
-            logger.info(f"✅ Devolviendo progreso desde BD: {respuesta}")
-            return respuesta
-        
-        # Si hay info en memoria, usarla
-        if documento_id in progress_tracker:
-            logger.info(f"✅ Devolviendo progreso desde memoria")
-            return progress_tracker[documento_id]
-        
         # Mapear estado de BD a respuesta
         if estado_bd == 'ocr_completado':
             return {
@@ -30,6 +30,10 @@ class OcrResultado(Base):
     estado_validacion = Column(String(20), nullable=False, default='pendiente')
     sacramento_id = Column(Integer, nullable=True)
     fecha_validacion = Column(DateTime, nullable=True)
+    # false mientras el trabajo sigue en curso (Migration_Checkpoint_Procesamiento.sql)
+    listo = Column(Boolean, nullable=False, default=True)
+    # Caja de cada celda en la página, para re-reconocer la tupla (Migration_Bbox_Celdas.sql)
+    bbox_celdas = Column(JSONB, nullable=True)
     
     def __repr__(self):
         return f"<OcrResultado(id_ocr={self.id_ocr}, tupla={self.tupla_numero}, documento={self.documento_id}, fuente={self.fuente_modelo})>"
@@ -55,6 +59,8 @@ class DocumentoDigitalizado(Base):
     modelo_procesamiento = Column(String(20), nullable=False, default='htr')  # 'ocr' o 'htr'
     progreso_ocr = Column(Integer, nullable=True, default=0)  # Aplica para OCR y HTR
     mensaje_progreso = Column(String(255), nullable=True)
+    checkpoint_procesamiento = Column(JSONB, nullable=True)  # Migration_Checkpoint_Procesamiento.sql
+    calidad_imagen = Column(JSONB, nullable=True)  # Migration_Calidad_Imagen.sql
     
     # Relación con resultados de procesamiento
     ocr_resultados = relationship("OcrResultado", backref="documento")
@@ -0,0 +1,32 @@
+"""
+Configuración de gunicorn para HTR Service - modo pre-fork
+
+Uso: gunicorn -c gunicorn.conf.py main:app
+
+Con preload_app el master importa main.py (que carga los modelos EasyOCR y
+los índices de corrección) antes de hacer fork de los workers. Arrancar N
+workers cuesta aproximadamente una sola carga de modelos y los pesos se
+comparten entre procesos en modo copy-on-write.
+"""
+
+import os
+
+# main.py solo carga los modelos al importarse si HTR_PRELOAD=true
+os.environ.setdefault("HTR_PRELOAD", "true")
+
+bind = f"0.0.0.0:{os.getenv('SERVICE_PORT', '8004')}"
+workers = int(os.getenv("HTR_WORKERS", "1"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+# El procesamiento HTR de una página bloquea el worker varios minutos;
+# el timeout debe superar al de los clientes (600 s en Documents-service)
+timeout = int(os.getenv("HTR_WORKER_TIMEOUT", "900"))
+graceful_timeout = 30
+loglevel = os.getenv("LOG_LEVEL", "INFO").lower()
+
+
+def post_fork(server, worker):
+    """Ajustes por worker después del fork (hilos de torch)"""
+    from utils.prefork import configurar_worker
+    configurar_worker()
@@ -10,13 +10,22 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import uvicorn
 from typing import Optional, List
 import logging
+import os
 from datetime import datetime
 
 # Importar configuración centralizada
 try:
     from .utils.config import settings
+    from .utils.prefork import uso_memoria
+    from .services.recognition_engines import estadisticas_motores
+    from .services.minio_service import cache_objetos
+    from .services.onnx_recognizer import backend_activo, BACKEND_ONNX_INT8
 except ImportError:
     from utils.config import settings
+    from utils.prefork import uso_memoria
+    from services.recognition_engines import estadisticas_motores
+    from services.minio_service import cache_objetos
+    from services.onnx_recognizer import backend_activo, BACKEND_ONNX_INT8
 
 # Configuración de logging
 logging.basicConfig(
@@ -61,21 +70,76 @@ security = HTTPBearer()
 # Variable global para HTR Processor (se inicializa una sola vez)
 htr_processor_instance = None
 
+def cargar_htr_processor():
+    """Carga el HTR Processor (modelos EasyOCR + índices de corrección) si aún no existe"""
+    global htr_processor_instance
+    if htr_processor_instance is None:
+        logger.info("📦 Inicializando HTR Processor (esto puede tomar varios minutos)...")
+        from services.htr_processor import HTRProcessor
+        htr_processor_instance = HTRProcessor()
+        logger.info("✅ HTR Processor inicializado correctamente")
+    return htr_processor_instance
+
+# Modo pre-fork (gunicorn --preload): el master carga los modelos al importar la app
+# y los workers los heredan por fork en lugar de cargar cada uno su propia copia
+if settings.htr_preload:
+    try:
+        from .utils.prefork import congelar_heap
+    except ImportError:
+        from utils.prefork import congelar_heap
+    logger.info("🚀 Modo pre-fork: cargando modelos en el proceso master...")
+    cargar_htr_processor()
+    congelar_heap()
+
 @app.on_event("startup")
 async def startup_event():
     """Inicializar recursos al arrancar el servicio"""
-    global htr_processor_instance
     logger.info("🚀 Iniciando HTR Service...")
-    logger.info("📦 Inicializando HTR Processor (esto puede tomar varios minutos)...")
+    
+    if htr_processor_instance is not None:
+        logger.info("✅ HTR Processor heredado del proceso master (preload)")
+        return
     
     try:
-        from services.htr_processor import HTRProcessor
-        htr_processor_instance = HTRProcessor()
-        logger.info("✅ HTR Processor inicializado correctamente")
+        cargar_htr_processor()
     except Exception as e:
         logger.error(f"❌ Error al inicializar HTR Processor: {str(e)}")
         raise
 
+# Relay del outbox de eventos (uno por worker: las filas se reparten con SKIP LOCKED)
+relay_outbox = None
+
+@app.on_event("startup")
+async def iniciar_relay_outbox():
+    """Entrega en segundo plano los eventos documento.procesado pendientes"""
+    global relay_outbox
+    if not settings.outbox_relay_enabled:
+        return
+    try:
+        from .database import SessionLocal
+        from .services.outbox import RelayOutbox, entregar_http, entregar_redis
+    except ImportError:
+        from database import SessionLocal
+        from services.outbox import RelayOutbox, entregar_http, entregar_redis
+    if settings.outbox_destino_url:
+        entregar = entregar_http(settings.outbox_destino_url)
+    elif settings.redis_url:
+        entregar = entregar_redis(settings.redis_url)
+    else:
+        logger.warning("⚠️ Outbox sin destino (OUTBOX_DESTINO_URL y REDIS_URL vacíos): relay desactivado")
+        return
+    relay_outbox = RelayOutbox(
+        SessionLocal, entregar,
+        intervalo=settings.outbox_relay_interval,
+        max_intentos=settings.outbox_max_intentos
+    )
+    relay_outbox.iniciar()
+
+@app.on_event("shutdown")
+async def detener_relay_outbox():
+    if relay_outbox is not None:
+        relay_outbox.detener()
+
 def get_htr_processor():
     """Dependency para obtener instancia del HTR Processor"""
     if htr_processor_instance is None:
@@ -85,8 +149,10 @@ def get_htr_processor():
 # Importar routers
 try:
     from routers import htr_router
+    from controllers.htr_controller import control_admision, trabajos_activos
 except ImportError:
     from .routers import htr_router
+    from .controllers.htr_controller import control_admision, trabajos_activos
 
 # Registrar routers
 app.include_router(htr_router.router)
@@ -132,8 +198,33 @@ async def service_status():
                 "htr_model_path": settings.htr_model_path,
                 "confidence_threshold": settings.htr_confidence_threshold,
                 "max_file_size_mb": settings.max_file_size // (1024 * 1024),
-                "supported_file_types": settings.allowed_file_types
+                "supported_file_types": settings.allowed_file_types,
+                "preload": settings.htr_preload,
+                "recognizer_backend": settings.htr_recognizer_backend,
+                # Con onnx_int8 puede quedar torch_int8 si la exportación falló (None = reader sin cargar)
+                "recognizer_backend_activo": (
+                    backend_activo() if settings.htr_recognizer_backend == BACKEND_ONNX_INT8
+                    else settings.htr_recognizer_backend
+                )
+            },
+            "proceso": {
+                "pid": os.getpid(),
+                "memoria": uso_memoria()
+            },
+            "admision": control_admision.estado(len(trabajos_activos)),
+            "cache_minio": cache_objetos.estado(),
+            "motores": {
+                "seleccion": {
+                    tipo: htr_processor_instance.ocr_engine.motores.seleccionar(tipo).nombre
+                    for tipo in ('text', 'date')
+                } if htr_processor_instance is not None else {},
+                "estadisticas": estadisticas_motores.resumen()
             },
+            "plantillas_grilla": (
+                htr_processor_instance.grid_detector.plantillas.resumen()
+                if htr_processor_instance is not None and htr_processor_instance.grid_detector.plantillas is not None
+                else None
+            ),
             "capabilities": [
                 "HTR de registros manuscritos",
                 "Extracción de tuplas estructuradas",
@@ -3,11 +3,14 @@ HTR Router - Endpoints HTTP para el servicio HTR
 """
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import logging
+import os
 
 from controllers.htr_controller import HTRController
+from services.debug_artifacts import debug_store
 from database import get_db
 
 logger = logging.getLogger(__name__)
@@ -24,6 +27,7 @@ def get_htr_processor_dependency():
 @router.post("/procesar-desde-bd/{documento_id}")
 async def procesar_documento_desde_bd(
     documento_id: int,
+    debug: bool = False,
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
     """
@@ -31,13 +35,14 @@ async def procesar_documento_desde_bd(
     
     Args:
         documento_id: ID del documento en documento_digitalizado
+        debug: Guardar artefactos de debug (ver GET /debug/{documento_id})
         
     Returns:
         Estado del procesamiento
     """
     htr_processor = get_htr_processor_dependency()
     controller = HTRController(db, htr_processor)
-    return await controller.procesar_desde_bd(documento_id)
+    return await controller.procesar_desde_bd(documento_id, debug=debug)
 
 
 @router.get("/progreso/{documento_id}")
@@ -59,6 +64,52 @@ async def obtener_progreso(
     return controller.obtener_progreso(documento_id)
 
 
+@router.post("/reconocer-tupla/{documento_id}/{tupla_numero}")
+async def reconocer_tupla(
+    documento_id: int,
+    tupla_numero: int,
+    columna: Optional[int] = None,
+    dpi: Optional[int] = None,
+    motor: Optional[str] = None,
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """
+    Vuelve a leer una tupla (o una celda) con sus cajas guardadas, sin reprocesar el documento
+    
+    Args:
+        documento_id: ID del documento
+        tupla_numero: Tupla a re-leer
+        columna: Índice de columna (0-9); sin él, toda la tupla
+        dpi: Rasterizar el PDF a más resolución que la original (ej. 300)
+        motor: Motor de reconocimiento (easyocr, easyocr_digitos, tesseract, mlp_digitos)
+        
+    Returns:
+        Tupla actualizada y valores anteriores
+    """
+    htr_processor = get_htr_processor_dependency()
+    controller = HTRController(db, htr_processor)
+    return controller.reconocer_tupla(documento_id, tupla_numero, columna=columna, dpi=dpi, motor=motor)
+
+
+@router.get("/debug/{documento_id}")
+async def listar_artefactos_debug(documento_id: int) -> Dict[str, Any]:
+    """Lista los artefactos de debug guardados para un documento"""
+    archivos = debug_store.listar(documento_id)
+    if not archivos:
+        raise HTTPException(status_code=404, detail="Sin artefactos de debug para este documento")
+    return {"documento_id": documento_id, "archivos": archivos}
+
+
+@router.get("/debug/{documento_id}/{archivo:path}")
+async def obtener_artefacto_debug(documento_id: int, archivo: str):
+    """Descarga un artefacto de debug (grid.jpg, filas.json, celdas/...)"""
+    base = os.path.realpath(debug_store.carpeta(documento_id))
+    ruta = os.path.realpath(os.path.join(base, archivo))
+    if not ruta.startswith(base + os.sep) or not os.path.isfile(ruta):
+        raise HTTPException(status_code=404, detail="Artefacto no encontrado")
+    return FileResponse(ruta)
+
+
 @router.get("/health")
 async def health_check():
     """Health check del servicio HTR"""
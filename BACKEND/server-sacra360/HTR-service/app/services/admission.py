@@ -0,0 +1,61 @@
+"""
+Control de admisión de trabajos en el worker
+
+Antes de aceptar un documento el worker verifica que tenga lugar: si ya tiene
+`max_trabajos` documentos en curso o su memoria residente (RSS) supera
+`max_rss_mb`, rechaza el trabajo con 503 y `Retry-After` en lugar de aceptarlo y
+quedarse sin memoria o atender todo más lento. Documents-service interpreta el
+503 como "servicio saturado": deja de mandarle trabajo y reintenta pasado ese
+tiempo (ver admision_service.py en Documents-service).
+
+Los límites son por proceso (cada worker cuenta sus propios trabajos y su RSS).
+"""
+
+import os
+from typing import Any, Dict, Optional
+
+_PAGINA_KB = os.sysconf('SC_PAGE_SIZE') / 1024 if hasattr(os, 'sysconf') else 4.0
+
+
+def rss_mb() -> Optional[float]:
+    """Memoria residente del proceso en MB (None si no se puede leer, p.ej. fuera de Linux)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return round(int(f.read().split()[1]) * _PAGINA_KB / 1024, 1)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ControlAdmision:
+    """Decide si el worker acepta un trabajo nuevo"""
+
+    def __init__(self, max_trabajos: int = 1, max_rss_mb: float = 0, retry_after: int = 30):
+        """
+        Args:
+            max_trabajos: Documentos simultáneos por proceso (0 = sin límite)
+            max_rss_mb: RSS a partir de la cual no se aceptan trabajos (0 = sin límite)
+            retry_after: Segundos sugeridos al cliente para reintentar
+        """
+        self.max_trabajos = max_trabajos
+        self.max_rss_mb = max_rss_mb
+        self.retry_after = retry_after
+
+    def motivo_rechazo(self, activos: int) -> Optional[str]:
+        """None si se acepta un trabajo más con `activos` en curso; si no, el motivo"""
+        if self.max_trabajos and activos >= self.max_trabajos:
+            return f"Worker ocupado: {activos}/{self.max_trabajos} documentos en curso"
+        if self.max_rss_mb:
+            rss = rss_mb()
+            if rss is not None and rss >= self.max_rss_mb:
+                return f"Worker sin memoria disponible: RSS {rss:.0f} MB (límite {self.max_rss_mb:.0f} MB)"
+        return None
+
+    def estado(self, activos: int) -> Dict[str, Any]:
+        """Capacidad actual del worker (para /status)"""
+        return {
+            "activos": activos,
+            "max_trabajos": self.max_trabajos,
+            "rss_mb": rss_mb(),
+            "max_rss_mb": self.max_rss_mb,
+            "acepta": self.motivo_rechazo(activos) is None,
+        }
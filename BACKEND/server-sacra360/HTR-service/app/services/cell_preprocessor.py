@@ -0,0 +1,102 @@
+"""
+Preprocesamiento de celdas para el OCR manuscrito
+
+Grises → CLAHE → escalado 2.5x (cúbico) → Otsu → dilatación 2x2 → borde blanco.
+Con altura_objetivo el factor deja de ser fijo: se calcula por celda (o por fila)
+para que los glifos queden a esa altura (ver glyph_scale.py).
+Los objetos de OpenCV (CLAHE y el kernel de dilatación) se crean una sola vez
+y se reutilizan entre celdas.
+"""
+
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .glyph_scale import escala_adaptativa, interpolacion
+
+
+class CellPreprocessor:
+    """Preprocesa celdas individuales o filas completas de la tabla"""
+
+    def __init__(self, scale_factor: float = 2.5, clip_limit: float = 3.0, tiles: int = 8, border: int = 5,
+                 altura_objetivo: Optional[float] = None, escala_minima: float = 0.5, escala_maxima: float = 4.0):
+        self.scale_factor = scale_factor
+        self.altura_objetivo = altura_objetivo
+        self.escala_minima = escala_minima
+        self.escala_maxima = escala_maxima
+        self.clip_limit = clip_limit
+        self.tiles = tiles
+        self.border = border
+        self._clahe = {}
+        self._kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
+
+    def _get_clahe(self, tiles: int):
+        if tiles not in self._clahe:
+            self._clahe[tiles] = cv2.createCLAHE(clipLimit=self.clip_limit, tileGridSize=(tiles, tiles))
+        return self._clahe[tiles]
+
+    @staticmethod
+    def _to_gray(img: np.ndarray) -> np.ndarray:
+        return img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+    def escala(self, gray: np.ndarray) -> float:
+        """Factor de escala para la celda/fila: fijo o según la altura de sus glifos"""
+        return escala_adaptativa(gray, self.altura_objetivo, self.scale_factor,
+                                 self.escala_minima, self.escala_maxima)
+
+    def _binarize(self, gray: np.ndarray) -> np.ndarray:
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        binary = cv2.dilate(binary, self._kernel, iterations=1)
+        b = self.border
+        return cv2.copyMakeBorder(binary, b, b, b, b, cv2.BORDER_CONSTANT, value=255)
+
+    def preprocess_cell(self, cell_img: np.ndarray) -> Optional[np.ndarray]:
+        if cell_img.shape[0] < 8 or cell_img.shape[1] < 8:
+            return None
+        gray = self._to_gray(cell_img)
+        s = self.escala(gray)
+        gray = self._get_clahe(self.tiles).apply(gray)
+        gray = cv2.resize(gray, None, fx=s, fy=s, interpolation=interpolacion(s))
+        return self._binarize(gray)
+
+    def preprocess_row(self, row_img: np.ndarray, x_bounds: List[Tuple[int, int]]) -> List[Optional[np.ndarray]]:
+        """
+        Preprocesa una fila completa de una sola vez y recorta las celdas.
+
+        La conversión a grises y el escalado se aplican una vez a la franja de la
+        fila. CLAHE se aplica por celda sobre vistas de la franja (con el mismo
+        objeto cacheado) porque sus tiles dependen del tamaño de la celda; Otsu,
+        dilatación y borde también son por celda. El resultado coincide con
+        preprocess_cell salvo en los píxeles vecinos a los bordes de cada celda,
+        donde la interpolación cúbica ve la fila en lugar del borde replicado.
+
+        Args:
+            row_img: Franja horizontal de la fila
+            x_bounds: (x1, x2) de cada celda, relativos a la franja
+
+        Returns:
+            Celda preprocesada (o None si es muy chica) por cada elemento de x_bounds
+        """
+        if row_img.shape[0] < 8 or not x_bounds:
+            return [None] * len(x_bounds)
+
+        gray = self._to_gray(row_img).copy()
+        # Una sola escala para toda la fila (la escritura tiene el mismo tamaño en la fila)
+        s = self.escala(gray)
+        clahe = self._get_clahe(self.tiles)
+        for x1, x2 in x_bounds:
+            if x2 - x1 >= 8:
+                gray[:, x1:x2] = clahe.apply(np.ascontiguousarray(gray[:, x1:x2]))
+        gray = cv2.resize(gray, None, fx=s, fy=s, interpolation=interpolacion(s))
+
+        cells = []
+        for x1, x2 in x_bounds:
+            if x2 - x1 < 8:
+                cells.append(None)
+                continue
+            # Mismo ancho que daría cv2.resize sobre la celda sola
+            a = int(round(x1 * s))
+            b = min(a + int(round((x2 - x1) * s)), gray.shape[1])
+            cells.append(self._binarize(gray[:, a:b]))
+        return cells
@@ -0,0 +1,72 @@
+"""
+Regiones de celdas guardadas por tupla (ocr_resultado.bbox_celdas)
+
+Cada tupla guarda dónde estaba cada una de sus celdas para poder volver a
+reconocer solo esa región (una tupla o una celda) sin reprocesar la página:
+
+    {
+        "pagina": {"ancho": 8038, "alto": 3965, "dpi": 200, "angulo": -0.85},
+        "celdas": [[x, y, w, h], ..., null]
+    }
+
+Las cajas están en píxeles de la página tal como se procesó (ya enderezada
+`angulo` grados y, en HTR, llevada a ancho x alto). Para recortar sobre otra
+rasterización (otro DPI) se repite la rotación y se escalan las cajas por la
+relación de tamaños. Una celda sin origen en la página (relleno del validador
+de patrón) es null.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .deskew import rotar
+
+
+def describir_pagina(img: np.ndarray, dpi: Optional[float], angulo: float) -> Dict[str, Any]:
+    """Datos de la página procesada necesarios para ubicar las cajas más tarde"""
+    return {
+        "ancho": int(img.shape[1]),
+        "alto": int(img.shape[0]),
+        "dpi": dpi,
+        "angulo": round(float(angulo), 3),
+    }
+
+
+def bbox_tupla(pagina: Dict[str, Any], cajas: Sequence[Optional[Sequence[int]]]) -> Dict[str, Any]:
+    """Valor de bbox_celdas para una tupla"""
+    return {
+        "pagina": pagina,
+        "celdas": [[int(v) for v in caja] if caja is not None else None for caja in cajas],
+    }
+
+
+def preparar_pagina(img: np.ndarray, pagina: Dict[str, Any]) -> np.ndarray:
+    """Repite sobre una nueva rasterización el enderezado que se aplicó al procesar"""
+    fondo = float(np.median(img[::8, ::8]))
+    return rotar(img, pagina.get("angulo") or 0.0, fondo=fondo)
+
+
+def recortar(img: np.ndarray, pagina: Dict[str, Any], caja: Sequence[int]) -> np.ndarray:
+    """
+    Recorta una caja (en coordenadas de la página procesada) de `img`, que es la
+    misma página ya preparada con preparar_pagina pero quizás a otro tamaño.
+    """
+    fx = img.shape[1] / float(pagina["ancho"])
+    fy = img.shape[0] / float(pagina["alto"])
+    x, y, w, h = caja
+    x1 = max(int(round(x * fx)), 0)
+    y1 = max(int(round(y * fy)), 0)
+    x2 = min(int(round((x + w) * fx)), img.shape[1])
+    y2 = min(int(round((y + h) * fy)), img.shape[0])
+    return img[y1:y2, x1:x2]
+
+
+def columnas_a_reconocer(bbox: Dict[str, Any], columna: Optional[int]) -> List[int]:
+    """Índices de columna a reconocer: una sola o todas las que tienen caja"""
+    celdas = bbox.get("celdas") or []
+    if columna is not None:
+        if not 0 <= columna < len(celdas) or celdas[columna] is None:
+            raise ValueError(f"La columna {columna} no tiene región guardada")
+        return [columna]
+    return [j for j, caja in enumerate(celdas) if caja is not None]
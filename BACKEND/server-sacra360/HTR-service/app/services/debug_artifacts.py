@@ -0,0 +1,179 @@
+"""
+Almacén de artefactos de debug del HTR (grilla, celdas y decisiones por fila)
+
+Los artefactos son opcionales: se generan solo si el request lo pide
+(`?debug=true`) o para una fracción de documentos (HTR_DEBUG_SAMPLE_RATE).
+El procesamiento solo encola referencias a la imagen; un hilo en segundo
+plano reduce la resolución, dibuja y escribe en disco, fuera del camino
+crítico. Cada documento tiene su carpeta `<HTR_DEBUG_DIR>/<documento_id>/` y
+el total se limita a HTR_DEBUG_MAX_MB borrando los documentos más antiguos.
+"""
+
+import json
+import logging
+import os
+import queue
+import random
+import shutil
+import threading
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+try:
+    from ..utils.config import settings
+except ImportError:
+    from utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DebugSession:
+    """Artefactos de un documento. Todas las llamadas solo encolan trabajo"""
+
+    def __init__(self, store: "DebugArtifactStore", documento_id):
+        self.store = store
+        self.documento_id = documento_id
+        self.filas: List[Dict[str, Any]] = []
+
+    def grid(self, img: np.ndarray, xs: List[int], ys: List[int]):
+        """Overlay de la grilla detectada sobre la página"""
+        self.store._encolar(self.store._escribir_grid, self.documento_id, img, list(xs), list(ys))
+
+    def celda(self, fila: int, columna: int, img: Optional[np.ndarray]):
+        """Recorte de celda (tal como lo ve el reconocedor)"""
+        if img is not None:
+            self.store._encolar(self.store._escribir_celda, self.documento_id, fila, columna, img)
+
+    def fila(self, **decision):
+        """Decisión tomada para una fila (saltada, vacía, válida...)"""
+        self.filas.append(decision)
+
+    def cerrar(self):
+        self.store._encolar(self.store._escribir_filas, self.documento_id, list(self.filas))
+
+
+class DebugArtifactStore:
+    """Escritor en segundo plano de artefactos de debug con tamaño total acotado"""
+
+    def __init__(self, directorio: str, max_bytes: int, escala: float = 0.25,
+                 sample_rate: float = 0.0, max_pendientes: int = 512):
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.escala = escala
+        self.sample_rate = sample_rate
+        self._cola: "queue.Queue" = queue.Queue(maxsize=max_pendientes)
+        self._hilo: Optional[threading.Thread] = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.descartados = 0
+
+    def sesion(self, documento_id, forzar: bool = False) -> Optional[DebugSession]:
+        """Sesión de debug si el request la pide o cae en la muestra; None en otro caso"""
+        if not (forzar or (self.sample_rate > 0 and random.random() < self.sample_rate)):
+            return None
+        logger.info(f"   🐞 Artefactos de debug activos para documento {documento_id}")
+        return DebugSession(self, documento_id)
+
+    def carpeta(self, documento_id) -> str:
+        return os.path.join(self.directorio, str(documento_id))
+
+    def listar(self, documento_id) -> List[str]:
+        base = self.carpeta(documento_id)
+        if not os.path.isdir(base):
+            return []
+        return sorted(
+            os.path.relpath(os.path.join(raiz, f), base)
+            for raiz, _, archivos in os.walk(base) for f in archivos
+        )
+
+    def esperar(self):
+        """Bloquea hasta que se escriban los artefactos pendientes (tests/scripts)"""
+        self._cola.join()
+
+    # --- Hilo escritor ---
+
+    def _asegurar_hilo(self):
+        # Tras un fork (gunicorn --preload) el hilo del master no existe en el worker
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._hilo = threading.Thread(target=self._trabajar, name="htr-debug-writer", daemon=True)
+                self._hilo.start()
+
+    def _encolar(self, funcion, *args):
+        self._asegurar_hilo()
+        try:
+            self._cola.put_nowait((funcion, args))
+        except queue.Full:
+            self.descartados += 1
+
+    def _trabajar(self):
+        while True:
+            funcion, args = self._cola.get()
+            try:
+                funcion(*args)
+            except Exception as e:
+                logger.warning(f"⚠️ Error escribiendo artefacto de debug: {e}")
+            finally:
+                self._cola.task_done()
+
+    def _reducir(self, img: np.ndarray) -> np.ndarray:
+        if self.escala >= 1.0:
+            return img
+        return cv2.resize(img, None, fx=self.escala, fy=self.escala, interpolation=cv2.INTER_AREA)
+
+    def _escribir_grid(self, documento_id, img, xs, ys):
+        # Se reduce primero y se dibuja sobre la copia chica (nunca sobre la página original)
+        s = self.escala if self.escala < 1.0 else 1.0
+        overlay = self._reducir(img)
+        overlay = cv2.cvtColor(overlay, cv2.COLOR_GRAY2BGR) if overlay.ndim == 2 else overlay.copy()
+        h, w = overlay.shape[:2]
+        for y in ys:
+            cv2.line(overlay, (0, int(y * s)), (w, int(y * s)), (0, 255, 0), 1)
+        for x in xs:
+            cv2.line(overlay, (int(x * s), 0), (int(x * s), h), (0, 0, 255), 1)
+        os.makedirs(self.carpeta(documento_id), exist_ok=True)
+        cv2.imwrite(os.path.join(self.carpeta(documento_id), "grid.jpg"), overlay, [cv2.IMWRITE_JPEG_QUALITY, 80])
+
+    def _escribir_celda(self, documento_id, fila, columna, img):
+        carpeta = os.path.join(self.carpeta(documento_id), "celdas")
+        os.makedirs(carpeta, exist_ok=True)
+        cv2.imwrite(os.path.join(carpeta, f"f{fila:03d}_c{columna}.png"), self._reducir(img))
+
+    def _escribir_filas(self, documento_id, filas):
+        os.makedirs(self.carpeta(documento_id), exist_ok=True)
+        with open(os.path.join(self.carpeta(documento_id), "filas.json"), "w", encoding="utf-8") as f:
+            json.dump(filas, f, ensure_ascii=False, indent=1, default=str)
+        self._aplicar_limite()
+
+    def _aplicar_limite(self):
+        """Borra los documentos más antiguos hasta quedar bajo max_bytes"""
+        if not os.path.isdir(self.directorio):
+            return
+        documentos = []
+        for nombre in os.listdir(self.directorio):
+            ruta = os.path.join(self.directorio, nombre)
+            if os.path.isdir(ruta):
+                tamano = sum(
+                    os.path.getsize(os.path.join(raiz, f)) for raiz, _, archivos in os.walk(ruta) for f in archivos
+                )
+                documentos.append((os.path.getmtime(ruta), ruta, tamano))
+
+        total = sum(t for _, _, t in documentos)
+        for _, ruta, tamano in sorted(documentos):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(ruta, ignore_errors=True)
+            total -= tamano
+            logger.info(f"   🧹 Artefactos de debug eliminados: {ruta}")
+
+
+# Instancia global del proceso
+debug_store = DebugArtifactStore(
+    directorio=settings.htr_debug_dir,
+    max_bytes=settings.htr_debug_max_mb * 1024 * 1024,
+    escala=settings.htr_debug_scale,
+    sample_rate=settings.htr_debug_sample_rate,
+)
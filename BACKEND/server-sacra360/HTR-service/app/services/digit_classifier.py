@@ -0,0 +1,311 @@
+"""
+Clasificador compacto de dígitos para las columnas de fecha del HTR
+
+Las seis columnas de fecha (día/mes/año) solo contienen 1 a 4 dígitos
+manuscritos. En lugar de pasar por EasyOCR completo, la celda binarizada se
+segmenta en glifos (componentes conexas + corte de dígitos pegados) y cada glifo
+se clasifica con un MLP en numpy de una capa oculta (784 → 128 → 10).
+
+El modelo se entrena con `train_digit_classifier.py` a partir de las tuplas
+validadas en `ocr_resultado` (o con dígitos sintéticos para arrancar) y se
+guarda como .npz. Se registra como motor `mlp_digitos` en el registro de
+motores; si la confianza es baja la celda se lee con EasyOCR.
+"""
+
+import logging
+import os
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .recognition_engines import MotorReconocimiento, ReconocimientoIncierto
+
+logger = logging.getLogger(__name__)
+
+MOTOR_MLP_DIGITOS = "mlp_digitos"
+
+LADO = 28          # Tamaño del glifo normalizado (estilo MNIST)
+LADO_INTERNO = 20  # El trazo ocupa 20x20 centrado en 28x28
+
+FUENTES_SINTETICAS = [
+    cv2.FONT_HERSHEY_SCRIPT_SIMPLEX,
+    cv2.FONT_HERSHEY_SCRIPT_COMPLEX,
+    cv2.FONT_HERSHEY_SIMPLEX,
+    cv2.FONT_HERSHEY_DUPLEX,
+    cv2.FONT_HERSHEY_COMPLEX,
+]
+
+
+def _binarizar_tinta(imagen: np.ndarray) -> np.ndarray:
+    """Máscara uint8 (1 = tinta) a partir de una celda binaria o en grises"""
+    if imagen.ndim == 3:
+        imagen = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
+    _, tinta = cv2.threshold(imagen, 0, 1, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    return tinta
+
+
+def _cortar_pegados(tinta: np.ndarray, caja: Tuple[int, int, int, int], partes: int) -> List[Tuple[int, int, int, int]]:
+    """Divide una caja con dígitos pegados en los mínimos de la proyección vertical"""
+    x, y, w, h = caja
+    proyeccion = tinta[y:y + h, x:x + w].sum(axis=0)
+    cortes = [0]
+    for k in range(1, partes):
+        centro = int(k * w / partes)
+        margen = max(1, w // (3 * partes))
+        ventana = proyeccion[max(centro - margen, 1):min(centro + margen, w - 1)]
+        cortes.append(max(centro - margen, 1) + int(np.argmin(ventana)) if len(ventana) else centro)
+    cortes.append(w)
+    return [(x + a, y, b - a, h) for a, b in zip(cortes[:-1], cortes[1:]) if b - a > 1]
+
+
+def segmentar_digitos(imagen: np.ndarray, max_digitos: int = 4) -> List[np.ndarray]:
+    """
+    Separa una celda de fecha en glifos individuales ordenados de izquierda a derecha.
+
+    Args:
+        imagen: Celda preprocesada (fondo blanco, tinta negra) o en escala de grises
+
+    Returns:
+        Lista de recortes binarios (1 = tinta), uno por dígito
+    """
+    tinta = _binarizar_tinta(imagen)
+    alto, ancho = tinta.shape
+    n, _, stats, _ = cv2.connectedComponentsWithStats(tinta, connectivity=8)
+
+    cajas = []
+    for i in range(1, n):
+        x, y, w, h, area = stats[i]
+        # Restos de líneas de la grilla: muy largos y delgados
+        if (w > 0.8 * ancho and h < 0.15 * alto) or (h > 0.9 * alto and w < 0.05 * ancho):
+            continue
+        if area < max(12, 0.001 * alto * ancho):
+            continue
+        cajas.append([x, y, w, h, area])
+
+    if not cajas:
+        return []
+
+    # Descartar ruido pequeño respecto al trazo más alto
+    alto_max = max(c[3] for c in cajas)
+    cajas = [c for c in cajas if c[3] >= 0.3 * alto_max]
+
+    # Unir trazos rotos del mismo dígito (se solapan en x)
+    cajas.sort(key=lambda c: c[0])
+    unidas = []
+    for c in cajas:
+        if unidas:
+            u = unidas[-1]
+            solape = min(u[0] + u[2], c[0] + c[2]) - max(u[0], c[0])
+            if solape > 0.5 * min(u[2], c[2]):
+                x1, y1 = min(u[0], c[0]), min(u[1], c[1])
+                x2, y2 = max(u[0] + u[2], c[0] + c[2]), max(u[1] + u[3], c[1] + c[3])
+                unidas[-1] = [x1, y1, x2 - x1, y2 - y1, u[4] + c[4]]
+                continue
+        unidas.append(c)
+
+    # Separar dígitos pegados (caja mucho más ancha que alta)
+    finales = []
+    for x, y, w, h, area in unidas:
+        if w > 1.2 * h:
+            partes = int(np.clip(round(w / (0.7 * h)), 2, max_digitos))
+            finales.extend((*caja, area / partes) for caja in _cortar_pegados(tinta, (x, y, w, h), partes))
+        else:
+            finales.append((x, y, w, h, area))
+
+    if len(finales) > max_digitos:
+        finales = sorted(finales, key=lambda c: c[4], reverse=True)[:max_digitos]
+    finales.sort(key=lambda c: c[0])
+
+    return [tinta[y:y + h, x:x + w] for x, y, w, h, _ in finales]
+
+
+def normalizar_glifo(recorte: np.ndarray) -> np.ndarray:
+    """Escala el glifo a 20x20 conservando proporción y lo centra por masa en 28x28"""
+    ys, xs = np.nonzero(recorte)
+    lienzo = np.zeros((LADO, LADO), dtype=np.float32)
+    if len(xs) == 0:
+        return lienzo
+    recorte = recorte[ys.min():ys.max() + 1, xs.min():xs.max() + 1].astype(np.float32)
+
+    h, w = recorte.shape
+    escala = LADO_INTERNO / max(h, w)
+    nh, nw = max(1, int(round(h * escala))), max(1, int(round(w * escala)))
+    glifo = cv2.resize(recorte, (nw, nh), interpolation=cv2.INTER_AREA)
+
+    y0, x0 = (LADO - nh) // 2, (LADO - nw) // 2
+    lienzo[y0:y0 + nh, x0:x0 + nw] = glifo
+
+    masa = lienzo.sum()
+    if masa > 0:
+        cy = (lienzo.sum(axis=1) * np.arange(LADO)).sum() / masa
+        cx = (lienzo.sum(axis=0) * np.arange(LADO)).sum() / masa
+        m = np.float32([[1, 0, LADO / 2 - cx], [0, 1, LADO / 2 - cy]])
+        lienzo = cv2.warpAffine(lienzo, m, (LADO, LADO))
+    return np.clip(lienzo, 0.0, 1.0)
+
+
+class ClasificadorDigitos:
+    """MLP de una capa oculta (ReLU + softmax) implementado en numpy"""
+
+    def __init__(self, ocultas: int = 128, semilla: int = 0):
+        rng = np.random.default_rng(semilla)
+        entradas = LADO * LADO
+        self.W1 = (rng.standard_normal((entradas, ocultas)) * np.sqrt(2.0 / entradas)).astype(np.float32)
+        self.b1 = np.zeros(ocultas, dtype=np.float32)
+        self.W2 = (rng.standard_normal((ocultas, 10)) * np.sqrt(2.0 / ocultas)).astype(np.float32)
+        self.b2 = np.zeros(10, dtype=np.float32)
+
+    def probabilidades(self, X: np.ndarray) -> np.ndarray:
+        """X: [n, 784] → probabilidades [n, 10]"""
+        oculta = np.maximum(X @ self.W1 + self.b1, 0)
+        logits = oculta @ self.W2 + self.b2
+        logits -= logits.max(axis=1, keepdims=True)
+        e = np.exp(logits)
+        return e / e.sum(axis=1, keepdims=True)
+
+    def predecir(self, glifos: List[np.ndarray]) -> Tuple[str, float]:
+        """Clasifica glifos ya segmentados; devuelve (dígitos, confianza mínima)"""
+        if not glifos:
+            return "", 0.0
+        X = np.stack([normalizar_glifo(g).ravel() for g in glifos])
+        p = self.probabilidades(X)
+        return "".join(str(d) for d in p.argmax(axis=1)), float(p.max(axis=1).min())
+
+    def entrenar(self, X: np.ndarray, y: np.ndarray, epocas: int = 15, lr: float = 0.05,
+                 lote: int = 64, l2: float = 1e-4, semilla: int = 0) -> List[float]:
+        """SGD con momentum sobre entropía cruzada. Devuelve la pérdida por época"""
+        rng = np.random.default_rng(semilla)
+        X = X.astype(np.float32)
+        velocidades = [np.zeros_like(p) for p in (self.W1, self.b1, self.W2, self.b2)]
+        perdidas = []
+
+        for _ in range(epocas):
+            orden = rng.permutation(len(X))
+            total = 0.0
+            for i in range(0, len(X), lote):
+                idx = orden[i:i + lote]
+                xb, yb = X[idx], y[idx]
+
+                oculta = np.maximum(xb @ self.W1 + self.b1, 0)
+                logits = oculta @ self.W2 + self.b2
+                logits -= logits.max(axis=1, keepdims=True)
+                p = np.exp(logits)
+                p /= p.sum(axis=1, keepdims=True)
+                total += -np.log(p[np.arange(len(yb)), yb] + 1e-9).sum()
+
+                # Retropropagación
+                d_logits = p
+                d_logits[np.arange(len(yb)), yb] -= 1
+                d_logits /= len(yb)
+                gW2 = oculta.T @ d_logits + l2 * self.W2
+                gb2 = d_logits.sum(axis=0)
+                d_oculta = (d_logits @ self.W2.T) * (oculta > 0)
+                gW1 = xb.T @ d_oculta + l2 * self.W1
+                gb1 = d_oculta.sum(axis=0)
+
+                for param, grad, vel in zip((self.W1, self.b1, self.W2, self.b2), (gW1, gb1, gW2, gb2), velocidades):
+                    vel *= 0.9
+                    vel -= lr * grad
+                    param += vel
+
+            perdidas.append(total / len(X))
+        return perdidas
+
+    def guardar(self, ruta: str):
+        np.savez_compressed(ruta, W1=self.W1, b1=self.b1, W2=self.W2, b2=self.b2)
+
+    @classmethod
+    def cargar(cls, ruta: str) -> "ClasificadorDigitos":
+        datos = np.load(ruta)
+        modelo = cls.__new__(cls)
+        modelo.W1, modelo.b1, modelo.W2, modelo.b2 = (datos[k].astype(np.float32) for k in ("W1", "b1", "W2", "b2"))
+        return modelo
+
+
+class MotorDigitosMLP(MotorReconocimiento):
+    """Motor de reconocimiento para columnas numéricas basado en ClasificadorDigitos"""
+
+    nombre = MOTOR_MLP_DIGITOS
+    costo = 1
+    solo_digitos = True
+
+    def __init__(self, modelo: ClasificadorDigitos, umbral: float = 0.8, max_digitos: int = 4):
+        self.modelo = modelo
+        self.umbral = umbral
+        self.max_digitos = max_digitos
+
+    def reconocer(self, imagen, allowlist=None):
+        glifos = segmentar_digitos(imagen, self.max_digitos)
+        if not glifos:
+            return ""
+        digitos, confianza = self.modelo.predecir(glifos)
+        if confianza < self.umbral:
+            raise ReconocimientoIncierto(f"confianza {confianza:.2f}")
+        return digitos
+
+
+def dataset_desde_celdas(celdas: List[Tuple[np.ndarray, str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convierte celdas etiquetadas en glifos de entrenamiento.
+
+    Solo se usan las celdas cuya segmentación produce tantos glifos como
+    dígitos tiene la etiqueta validada.
+    """
+    X, y = [], []
+    for imagen, etiqueta in celdas:
+        digitos = "".join(c for c in str(etiqueta) if c.isdigit())
+        if not 1 <= len(digitos) <= 4:
+            continue
+        glifos = segmentar_digitos(imagen)
+        if len(glifos) != len(digitos):
+            continue
+        for glifo, d in zip(glifos, digitos):
+            X.append(normalizar_glifo(glifo).ravel())
+            y.append(int(d))
+    if not X:
+        return np.zeros((0, LADO * LADO), np.float32), np.zeros(0, np.int64)
+    return np.stack(X), np.array(y, dtype=np.int64)
+
+
+def generar_celdas_sinteticas(n: int, semilla: int = 0, alto: int = 60) -> List[Tuple[np.ndarray, str]]:
+    """
+    Celdas de fecha sintéticas (1 a 4 dígitos con fuentes Hershey, inclinación y
+    grosor aleatorios) ya binarizadas como las produce CellPreprocessor.preprocess_cell.
+    Sirven para arrancar el modelo y para los tests.
+    """
+    rng = np.random.default_rng(semilla)
+    celdas = []
+    for _ in range(n):
+        texto = "".join(str(d) for d in rng.integers(0, 10, size=rng.integers(1, 5)))
+        fuente = FUENTES_SINTETICAS[rng.integers(len(FUENTES_SINTETICAS))]
+        escala = rng.uniform(1.3, 1.9)
+        grosor = int(rng.integers(2, 5))
+
+        (tw, th), base = cv2.getTextSize(texto, fuente, escala, grosor)
+        lienzo = np.full((max(alto, th + base + 20), tw + 40 + 12 * len(texto)), 255, np.uint8)
+        x = 20
+        for c in texto:
+            (cw, _), _ = cv2.getTextSize(c, fuente, escala, grosor)
+            cv2.putText(lienzo, c, (x, lienzo.shape[0] // 2 + th // 2), fuente, escala, 0, grosor, cv2.LINE_AA)
+            x += cw + int(rng.integers(-3, 12))
+
+        inclinacion = rng.uniform(-0.25, 0.25)
+        m = np.float32([[1, inclinacion, -inclinacion * lienzo.shape[0] / 2], [0, 1, 0]])
+        lienzo = cv2.warpAffine(lienzo, m, (lienzo.shape[1], lienzo.shape[0]), borderValue=255)
+        _, binaria = cv2.threshold(lienzo, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        celdas.append((binaria, texto))
+    return celdas
+
+
+def cargar_motor(ruta: Optional[str], umbral: float = 0.8) -> Optional[MotorDigitosMLP]:
+    """Carga el motor si existe el modelo entrenado; None en otro caso"""
+    if not ruta or not os.path.exists(ruta):
+        return None
+    try:
+        motor = MotorDigitosMLP(ClasificadorDigitos.cargar(ruta), umbral=umbral)
+        logger.info(f"✅ Clasificador de dígitos cargado: {ruta}")
+        return motor
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo cargar el clasificador de dígitos ({ruta}): {e}")
+        return None
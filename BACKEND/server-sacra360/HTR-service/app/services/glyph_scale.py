@@ -0,0 +1,58 @@
+"""
+Escala adaptativa de celdas según la altura de los glifos
+
+El reconocedor de EasyOCR lleva cada recorte de texto a 64 px de alto. Escalar
+todas las celdas por un factor fijo (3x en OCR, 2.5x en HTR) deja las celdas
+grandes con 9 veces más píxeles, que el reconocedor vuelve a reducir. Aquí se
+mide la altura típica de los glifos de la celda (o de la fila) y se elige la
+escala que la lleva a una altura objetivo: las celdas grandes se reducen y las
+chicas se agrandan.
+"""
+
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+def altura_glifo(gray: np.ndarray, min_componentes: int = 2) -> Optional[float]:
+    """
+    Altura mediana (px) de los componentes de tinta de la celda, sin restos de
+    la grilla ni ruido. None si no hay texto suficiente para medirla.
+    """
+    h, w = gray.shape[:2]
+    if h < 8 or w < 8:
+        return None
+    _, tinta = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(tinta, connectivity=8)
+    stats = stats[1:]
+    alturas = stats[:, cv2.CC_STAT_HEIGHT]
+    # Fuera: ruido (muy chico) y líneas de la grilla (casi todo el alto o el ancho)
+    validos = (
+        (stats[:, cv2.CC_STAT_AREA] >= 6) & (alturas >= 3)
+        & (alturas < 0.9 * h) & (stats[:, cv2.CC_STAT_WIDTH] < 0.9 * w)
+    )
+    if int(validos.sum()) < min_componentes:
+        return None
+    return float(np.median(alturas[validos]))
+
+
+def escala_adaptativa(gray: np.ndarray, altura_objetivo: Optional[float], defecto: float,
+                      minima: float = 0.5, maxima: float = 4.0) -> float:
+    """
+    Factor de escala que lleva los glifos de `gray` a `altura_objetivo` px.
+
+    Con altura_objetivo None (escala fija) o si no se puede medir la altura,
+    devuelve `defecto`. El resultado se limita a [minima, maxima].
+    """
+    if not altura_objetivo:
+        return defecto
+    altura = altura_glifo(gray)
+    if altura is None:
+        return defecto
+    return float(min(maxima, max(minima, altura_objetivo / altura)))
+
+
+def interpolacion(escala: float) -> int:
+    """INTER_AREA para reducir (sin aliasing), INTER_CUBIC para ampliar"""
+    return cv2.INTER_AREA if escala < 1 else cv2.INTER_CUBIC
@@ -0,0 +1,161 @@
+"""
+Caché de plantillas de grilla por libro (libros_id)
+
+Todas las páginas de un libro comparten el mismo formato impreso de 10
+columnas, pero la detección de tabla repite en cada página los pases de
+morfología sobre la imagen completa. Tras la primera detección confiable de
+un libro se guarda su geometría normalizada (coordenadas 0..1) junto con los
+perfiles de proyección horizontal y vertical de la página.
+
+En las páginas siguientes solo se calculan los perfiles (una pasada sobre la
+página en grises, sin morfología) y se correlacionan con los de la plantilla
+para estimar el desplazamiento (dx, dy). Si la correlación en ambos ejes supera el mínimo se
+reutiliza la geometría desplazada; si no, el llamador hace la detección
+completa y la plantilla se reemplaza.
+
+El formato de la geometría lo define el llamador (listas de líneas en HTR,
+cajas de celdas en OCR); el caché solo la guarda y devuelve el desplazamiento.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class PlantillaGrilla:
+    """Geometría normalizada de un libro y los perfiles de la página de referencia"""
+
+    def __init__(self, geometria: Dict[str, Any], perfil_x: np.ndarray, perfil_y: np.ndarray):
+        self.geometria = geometria
+        self.perfil_x = perfil_x
+        self.perfil_y = perfil_y
+        self.usos = 0
+
+
+class GridTemplateCache:
+    """LRU de plantillas por libro con verificación de alineación por proyecciones"""
+
+    def __init__(self, capacidad: int = 64, correlacion_minima: float = 0.8,
+                 max_desplazamiento: float = 0.03, muestras: int = 1024, reduccion: int = 4):
+        """
+        Args:
+            capacidad: Número máximo de libros en memoria
+            correlacion_minima: Correlación de Pearson exigida en cada eje
+            max_desplazamiento: Desplazamiento máximo buscado (fracción de la página)
+            muestras: Longitud a la que se remuestrean los perfiles
+            reduccion: Píxeles promediados por muestra del perfil antes de remuestrear
+        """
+        self.capacidad = capacidad
+        self.correlacion_minima = correlacion_minima
+        self.max_desplazamiento = max_desplazamiento
+        self.muestras = muestras
+        self.reduccion = reduccion
+        self._plantillas: "OrderedDict[Any, PlantillaGrilla]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"aciertos": 0, "rechazos": 0, "sin_plantilla": 0, "guardadas": 0}
+
+    # --- Perfiles ---
+
+    def perfiles(self, gray: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Perfiles de tinta por columna y por fila, reducidos, sin tendencia y normalizados"""
+        # cv2.reduce recorre la página una vez (mucho más barato que reducir la imagen)
+        columnas = 255.0 - cv2.reduce(gray, 0, cv2.REDUCE_AVG, dtype=cv2.CV_32F).ravel()
+        filas = 255.0 - cv2.reduce(gray, 1, cv2.REDUCE_AVG, dtype=cv2.CV_32F).ravel()
+        return self._normalizar(columnas), self._normalizar(filas)
+
+    def _normalizar(self, perfil: np.ndarray) -> np.ndarray:
+        # Promedio por bloques de `reduccion` píxeles y suavizado de ~1 bloque: una
+        # línea fina desplazada medio bloque no debe cambiar la forma del pico
+        n = max(1, len(perfil) // self.reduccion)
+        perfil = perfil[:n * self.reduccion].reshape(n, -1).mean(axis=1) if len(perfil) >= self.reduccion else perfil
+        perfil = cv2.GaussianBlur(perfil.reshape(1, -1).astype(np.float32), (0, 0), 1.0).ravel()
+        perfil = np.interp(
+            np.linspace(0, len(perfil) - 1, self.muestras), np.arange(len(perfil)), perfil
+        )
+        # Quitar la tendencia (iluminación, bordes oscuros) para que dominen las líneas
+        ventana = max(3, self.muestras // 32)
+        perfil = perfil - np.convolve(perfil, np.ones(ventana) / ventana, mode="same")
+        desviacion = perfil.std()
+        return (perfil - perfil.mean()) / desviacion if desviacion > 0 else perfil * 0.0
+
+    def _desplazamiento(self, plantilla: np.ndarray, pagina: np.ndarray) -> Tuple[float, float]:
+        """
+        Desplazamiento s (fracción de la página) que maximiza la correlación
+        pagina[i + s] ~ plantilla[i], y su correlación
+        """
+        n = len(plantilla)
+        maximo = max(1, int(self.max_desplazamiento * n))
+        correlaciones = np.full(2 * maximo + 1, -1.0)
+        for k, s in enumerate(range(-maximo, maximo + 1)):
+            a = plantilla[max(0, -s):n - max(0, s)]
+            b = pagina[max(0, s):n - max(0, -s)]
+            if a.std() > 0 and b.std() > 0:
+                correlaciones[k] = float(np.mean((a - a.mean()) * (b - b.mean())) / (a.std() * b.std()))
+
+        k = int(np.argmax(correlaciones))
+        # Refinamiento sub-muestra con una parábola sobre el pico
+        ajuste = 0.0
+        if 0 < k < len(correlaciones) - 1:
+            izq, centro, der = correlaciones[k - 1:k + 2]
+            curvatura = izq - 2 * centro + der
+            if curvatura < 0:
+                ajuste = 0.5 * (izq - der) / curvatura
+        return (k - maximo + ajuste) / n, float(correlaciones[k])
+
+    # --- API ---
+
+    def alinear(self, libro_id, gray: np.ndarray) -> Optional[Tuple[Dict[str, Any], float, float]]:
+        """
+        Geometría del libro alineada a esta página.
+
+        Returns:
+            (geometria, dx, dy) con el desplazamiento normalizado a aplicar sobre
+            la geometría, o None si no hay plantilla o la página no coincide
+        """
+        with self._lock:
+            plantilla = self._plantillas.get(libro_id)
+            if plantilla is None:
+                self._stats["sin_plantilla"] += 1
+                return None
+            self._plantillas.move_to_end(libro_id)
+
+        perfil_x, perfil_y = self.perfiles(gray)
+        dx, corr_x = self._desplazamiento(plantilla.perfil_x, perfil_x)
+        dy, corr_y = self._desplazamiento(plantilla.perfil_y, perfil_y)
+
+        with self._lock:
+            if min(corr_x, corr_y) < self.correlacion_minima:
+                self._stats["rechazos"] += 1
+                logger.info(f"   📐 Plantilla del libro {libro_id} descartada "
+                            f"(correlación x={corr_x:.2f}, y={corr_y:.2f})")
+                return None
+            self._stats["aciertos"] += 1
+            plantilla.usos += 1
+
+        logger.info(f"   ♻️ Plantilla del libro {libro_id} reutilizada "
+                    f"(dx={dx:+.4f}, dy={dy:+.4f}, correlación {min(corr_x, corr_y):.2f})")
+        return plantilla.geometria, dx, dy
+
+    def guardar(self, libro_id, gray: np.ndarray, geometria: Dict[str, Any]):
+        """Guarda (o reemplaza) la plantilla del libro a partir de una detección confiable"""
+        perfil_x, perfil_y = self.perfiles(gray)
+        with self._lock:
+            self._plantillas[libro_id] = PlantillaGrilla(geometria, perfil_x, perfil_y)
+            self._plantillas.move_to_end(libro_id)
+            while len(self._plantillas) > self.capacidad:
+                self._plantillas.popitem(last=False)
+            self._stats["guardadas"] += 1
+
+    def invalidar(self, libro_id):
+        with self._lock:
+            self._plantillas.pop(libro_id, None)
+
+    def resumen(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"libros": len(self._plantillas), "capacidad": self.capacidad, **self._stats}
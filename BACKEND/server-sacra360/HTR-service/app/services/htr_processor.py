@@ -25,6 +25,19 @@ from pdf2image import convert_from_bytes
 from typing import Dict, Any, List, Optional, Callable
 import logging
 
+try:
+    from ..utils.config import settings
+except ImportError:
+    from utils.config import settings
+from .onnx_recognizer import crear_reader, BACKEND_ONNX_INT8
+from .recognition_engines import crear_registro, MOTOR_EASYOCR
+from .digit_classifier import cargar_motor as cargar_motor_digitos
+from .cell_preprocessor import CellPreprocessor
+from .grid_template_cache import GridTemplateCache
+from .quality_gate import EvaluadorCalidad, dpi_origen
+from .deskew import enderezar
+from .cell_regions import bbox_tupla, columnas_a_reconocer, describir_pagina, preparar_pagina, recortar
+
 logger = logging.getLogger(__name__)
 
 
@@ -112,17 +125,33 @@ class BolivianContext:
 class GridDetector:
     """Detecta estructura de tabla con 10 columnas fijas - VERSIÓN DEL NOTEBOOK"""
     
-    def __init__(self):
+    def __init__(self, plantillas: Optional[GridTemplateCache] = None):
         self.debug_mode = False
         self.TARGET_COLS = 10
+        # Caché de grillas por libro (None = detección completa en cada página)
+        self.plantillas = plantillas
 
-    def get_structure(self, img):
+    def get_structure(self, img, debug=None, libro_id=None):
         logger.info("   📐 Detectando estructura (10 Columnas Fijas)...")
 
         H, W = img.shape[:2]
         logger.info(f"   📏 Dimensiones: {W}x{H}")
         
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+        # Páginas siguientes del mismo libro: grilla de la plantilla alineada a esta página
+        usar_plantilla = self.plantillas is not None and libro_id is not None
+        if usar_plantilla:
+            alineada = self.plantillas.alinear(libro_id, gray)
+            if alineada is not None:
+                geometria, dx, dy = alineada
+                xs = [int(round(min(max(x + dx, 0.0), 1.0) * W)) for x in geometria['xs']]
+                ys = [int(round(min(max(y + dy, 0.0), 1.0) * H)) for y in geometria['ys']]
+                logger.info(f"   📍 Grilla de plantilla: {len(xs)-1} columnas, {len(ys)-1} filas")
+                if debug is not None:
+                    debug.grid(img, xs, ys)
+                return ys, xs
+
         thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
                                       cv2.THRESH_BINARY_INV, 11, 2)
 
@@ -170,8 +199,16 @@ class GridDetector:
         logger.info(f"   📍 Columnas detectadas: {len(xs)-1} (objetivo: 10)")
         logger.info(f"   📍 Filas detectadas: {len(ys)-1}")
 
-        # Guardar imagen de debug
-        self._save_debug_image(img, xs, ys)
+        # Solo una detección con las 10 columnas y varias filas sirve de plantilla
+        if usar_plantilla and len(xs) - 1 == self.TARGET_COLS and len(ys) - 1 >= 3:
+            self.plantillas.guardar(libro_id, gray, {
+                'xs': [x / W for x in xs],
+                'ys': [y / H for y in ys],
+            })
+
+        # Overlay de debug (solo si el documento tiene sesión de debug; se escribe en segundo plano)
+        if debug is not None:
+            debug.grid(img, xs, ys)
 
         return ys, xs
 
@@ -187,31 +224,6 @@ class GridDetector:
                 merged.append(x)
         return merged
 
-    def _save_debug_image(self, img, xs, ys):
-        """Guarda imagen con grid dibujado para debugging"""
-        try:
-            import tempfile
-            import os
-            
-            debug_img = img.copy()
-            
-            # Dibujar líneas horizontales (filas) en verde
-            for y in ys:
-                cv2.line(debug_img, (0, y), (img.shape[1], y), (0, 255, 0), 2)
-            
-            # Dibujar líneas verticales (columnas) en rojo
-            for x in xs:
-                cv2.line(debug_img, (x, 0), (x, img.shape[0]), (0, 0, 255), 2)
-            
-            # Guardar en /tmp del contenedor
-            debug_path = "/tmp/htr_grid_debug.jpg"
-            cv2.imwrite(debug_path, debug_img)
-            logger.info(f"   🖼️ Grid debug guardado en: {debug_path}")
-            logger.info(f"   💡 Copia con: docker cp sacra360_htr_service:/tmp/htr_grid_debug.jpg .")
-            
-        except Exception as e:
-            logger.warning(f"   ⚠️ No se pudo guardar imagen de debug: {e}")
-
 
 class ManuscriptOCR:
     """Motor OCR optimizado para texto manuscrito"""
@@ -225,35 +237,53 @@ class ManuscriptOCR:
         except Exception:
             gpu_available = False
 
-        self.reader = easyocr.Reader(['es'], gpu=gpu_available)
+        if settings.htr_recognizer_backend == BACKEND_ONNX_INT8:
+            # Nodos sin GPU: reconocedor exportado a ONNX Runtime INT8
+            self.reader = crear_reader(
+                ['es'],
+                backend=BACKEND_ONNX_INT8,
+                directorio_onnx=settings.recognizer_onnx_dir,
+                hilos_onnx=settings.recognizer_onnx_threads
+            )
+        else:
+            self.reader = easyocr.Reader(['es'], gpu=gpu_available)
+        self.motores = crear_registro(
+            lambda: self.reader,
+            tipos_numericos={'date'},
+            ruta_tabla=settings.recognition_accuracy_table,
+            precision_minima=settings.recognition_min_accuracy,
+            forzados=settings.recognition_engines,
+            tesseract_path=settings.tesseract_path
+        )
+        # Clasificador de dígitos para columnas de fecha (si hay modelo entrenado)
+        motor_digitos = cargar_motor_digitos(settings.htr_digit_model_path, settings.htr_digit_min_confidence)
+        if motor_digitos is not None:
+            self.motores.registrar(motor_digitos)
         self.corrector = BolivianContext()
         self.scale_factor = 2.5 
+        self.preprocessor = CellPreprocessor(
+            scale_factor=self.scale_factor,
+            altura_objetivo=settings.cell_glyph_target_height or None
+        )
 
     def preprocess_cell(self, cell_img):
-        if cell_img.shape[0] < 8 or cell_img.shape[1] < 8: return None
-        gray = cv2.cvtColor(cell_img, cv2.COLOR_BGR2GRAY)
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-        gray = clahe.apply(gray)
-        gray = cv2.resize(gray, None, fx=self.scale_factor, fy=self.scale_factor, interpolation=cv2.INTER_CUBIC)
-        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
-        binary = cv2.dilate(binary, kernel, iterations=1)
-        binary = cv2.copyMakeBorder(binary, 5, 5, 5, 5, cv2.BORDER_CONSTANT, value=255)
-        return binary
-
-    def read_cell(self, cell_img, col_type="text"):
-        processed = self.preprocess_cell(cell_img)
+        return self.preprocessor.preprocess_cell(cell_img)
+
+    def preprocess_row(self, row_img, x_bounds):
+        return self.preprocessor.preprocess_row(row_img, x_bounds)
+
+    def read_cell(self, cell_img, col_type="text", processed=None, motor=None):
+        if processed is None:
+            processed = self.preprocess_cell(cell_img)
         if processed is None: return ""
 
         allowlist = '0123456789/' if col_type == "date" else None
 
         try:
-            results = self.reader.readtext(processed, detail=0, paragraph=False, allowlist=allowlist)
-            raw_text = " ".join(results).strip()
+            raw_text = self.motores.reconocer(processed, col_type, allowlist=allowlist, motor=motor)
 
             if not raw_text:
-                results = self.reader.readtext(cell_img, detail=0, paragraph=False)
-                raw_text = " ".join(results).strip()
+                raw_text = self.motores.reconocer(cell_img, col_type, motor=MOTOR_EASYOCR)
 
             if col_type == "date":
                 return self._format_date(raw_text)
@@ -272,20 +302,52 @@ class ManuscriptOCR:
         return nums if nums else text
 
 
+# Plantillas de grilla por libro, compartidas por todo el proceso
+plantillas_grilla = GridTemplateCache(
+    capacidad=settings.grid_template_cache_size,
+    correlacion_minima=settings.grid_template_min_correlation
+) if settings.grid_template_cache else None
+
+# Control de calidad de la página antes del HTR (QUALITY_GATE_MODE=off|flag|reject)
+evaluador_calidad = EvaluadorCalidad(
+    min_nitidez=settings.quality_min_sharpness,
+    min_contraste=settings.quality_min_contrast,
+    max_inclinacion=settings.quality_max_skew,
+    min_dpi=settings.quality_min_dpi
+)
+
+
 class HybridHTRProcessor:
     """Procesador híbrido - Código EXACTO del notebook"""
     
     def __init__(self):
-        self.grid_detector = GridDetector()
+        self.grid_detector = GridDetector(plantillas_grilla)
         self.ocr_engine = ManuscriptOCR()
         self.min_chars_per_row = 3
         self.FIXED_PATTERN = ['text', 'date', 'date', 'date', 'text', 'date', 'date', 'date', 'text', 'text']
-
-    def process_pdf(self, pdf_bytes: bytes, progress_callback: Optional[Callable[[int, int], None]] = None) -> List[Dict[str, Any]]:
-        """Procesa un archivo PDF"""
+        # col_4 (parroquia) no se guarda: no se valida en frontend
+        self.COLUMNAS_OMITIDAS = {4}
+        # Resolución a la que se rasteriza el PDF (antes de forzar dimensiones)
+        self.DPI_PDF = 200
+
+    def process_pdf(self, pdf_bytes: bytes, progress_callback: Optional[Callable[[int, int], None]] = None,
+                    cell_callback: Optional[Callable[[int, int, np.ndarray], None]] = None,
+                    debug=None, libro_id=None, reanudar: Optional[Dict[str, Any]] = None,
+                    row_callback: Optional[Callable[[Optional[Dict[str, Any]], Dict[str, Any]], None]] = None,
+                    calidad_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+                    ) -> List[Dict[str, Any]]:
+        """
+        Procesa un archivo PDF
+
+        Antes del HTR la página pasa por el control de calidad (salvo al reanudar,
+        ya evaluada): calidad_callback recibe el reporte y, con QUALITY_GATE_MODE=reject,
+        una página que no pasa lanza CalidadInsuficiente sin reconocer ninguna celda.
+        """
         try:
             logger.info("📄 Convirtiendo PDF a imagen...")
-            images = convert_from_bytes(pdf_bytes, dpi=200)
+            # Rasterizar directamente en gris: todo el pipeline (grilla, celdas,
+            # preprocesamiento) trabaja sobre un único buffer uint8 de un canal
+            images = convert_from_bytes(pdf_bytes, dpi=self.DPI_PDF, grayscale=True)
             
             if not images:
                 raise ValueError("No se pudieron extraer imágenes del PDF")
@@ -293,8 +355,18 @@ class HybridHTRProcessor:
             pil_image = images[0]
             img = np.array(pil_image)
             
-            if len(img.shape) == 3:
-                img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+            if img.ndim == 3:
+                img = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+
+            # Control de calidad sobre la página tal como llegó (antes de forzar dimensiones)
+            if not reanudar:
+                evaluador_calidad.controlar(img, dpi=dpi_origen(pdf_bytes, es_pdf=True),
+                                            modo=settings.quality_gate_mode, callback=calidad_callback)
+
+            # Enderezar antes de detectar la grilla (determinista: también al reanudar)
+            angulo = 0.0
+            if settings.deskew_enabled:
+                img, angulo = enderezar(img, min_angulo=settings.deskew_min_angle)
             
             # FORZAR DIMENSIONES EXACTAS DEL NOTEBOOK: (alto=3965, ancho=8038)
             # Esto garantiza procesamiento idéntico entre Docker y notebook local
@@ -307,20 +379,51 @@ class HybridHTRProcessor:
             else:
                 logger.info(f"✅ Dimensiones correctas: {current_w}x{current_h}")
 
-            return self.process_image(img, progress_callback)
+            return self.process_image(img, progress_callback, cell_callback, debug, libro_id,
+                                      reanudar=reanudar, row_callback=row_callback,
+                                      pagina=describir_pagina(img, self.DPI_PDF, angulo))
             
         except Exception as e:
             logger.error(f"Error procesando PDF: {str(e)}")
             raise
 
-    def process_image(self, img: np.ndarray, progress_callback: Optional[Callable[[int, int], None]] = None) -> List[Dict[str, Any]]:
+    def process_image(self, img: np.ndarray, progress_callback: Optional[Callable[[int, int], None]] = None,
+                      cell_callback: Optional[Callable[[int, int, np.ndarray], None]] = None,
+                      debug=None, libro_id=None, reanudar: Optional[Dict[str, Any]] = None,
+                      row_callback: Optional[Callable[[Optional[Dict[str, Any]], Dict[str, Any]], None]] = None,
+                      pagina: Optional[Dict[str, Any]] = None
+                      ) -> List[Dict[str, Any]]:
+        """
+        Procesa una página ya rasterizada.
+
+        cell_callback(tupla_numero, columna, celda) se invoca para cada celda de las
+        filas aceptadas (lo usa el entrenamiento del clasificador de dígitos).
+        debug es una DebugSession opcional (services/debug_artifacts.py) que recibe
+        la grilla, las celdas preprocesadas y la decisión tomada en cada fila.
+        libro_id activa la reutilización de la grilla del libro (GridTemplateCache).
+
+        Checkpoints: row_callback(tupla, estado) se invoca después de cada fila leída
+        con OCR (tupla es None si la fila resultó vacía). `estado` es serializable a
+        JSON y, pasado como `reanudar`, continúa el procesamiento desde la fila
+        siguiente con la misma grilla; solo se devuelven las tuplas nuevas.
+
+        Cada tupla lleva `bbox_celdas` (cell_regions.py) con la caja de cada celda;
+        `pagina` describe la rasterización (DPI, enderezado) para ubicarlas después.
+        """
         logger.info("\n" + "="*70)
         logger.info("   🚀 PROCESAMIENTO HTR - VERSIÓN NOTEBOOK")
         logger.info("="*70)
 
-        # Detección de Estructura
+        # Detección de Estructura (al reanudar se usa la grilla del checkpoint)
         logger.info("\n[PASO 1] Detección de estructura")
-        ys, xs = self.grid_detector.get_structure(img)
+        if reanudar:
+            ys, xs = reanudar['ys'], reanudar['xs']
+            logger.info(f"   ⏯️ Reanudando desde la fila {reanudar['fila'] + 1} (tupla {reanudar['tupla']})")
+        else:
+            ys, xs = self.grid_detector.get_structure(img, debug=debug, libro_id=libro_id)
+
+        if pagina is None:
+            pagina = describir_pagina(img, None, 0.0)
 
         logger.info("\n[PASO 2] Lectura OCR y Filtrado")
         data = []
@@ -335,18 +438,39 @@ class HybridHTRProcessor:
         prev_row_height = 0
         total_rows = len(ys) - 1 - start_idx
 
-        for i in range(start_idx, len(ys) - 1):
+        primera_fila = start_idx
+        if reanudar:
+            primera_fila = reanudar['fila']
+            real_row_idx = reanudar['tupla']
+            expect_noise_next = reanudar['expect_noise_next']
+            prev_row_height = reanudar['prev_row_height']
+
+        def estado_checkpoint(siguiente_fila):
+            return {
+                'ys': [int(y) for y in ys],
+                'xs': [int(x) for x in xs],
+                'fila': siguiente_fila,
+                'tupla': real_row_idx,
+                'expect_noise_next': expect_noise_next,
+                'prev_row_height': int(prev_row_height),
+            }
+
+        for i in range(primera_fila, len(ys) - 1):
             y1, y2 = ys[i], ys[i + 1]
             row_height = y2 - y1
 
             # Filtro básico
             if row_height < 20:
+                if debug is not None:
+                    debug.fila(fila=i + 1, y1=y1, y2=y2, altura=row_height, decision="muy_baja")
                 continue
 
             # Lógica de alternancia
             if expect_noise_next:
                 if prev_row_height > 0 and row_height < (prev_row_height * 0.75):
                     logger.info(f"   ⏭️ Fila {i+1} SALTADA (Ruido/Separación detectada: {row_height}px)")
+                    if debug is not None:
+                        debug.fila(fila=i + 1, y1=y1, y2=y2, altura=row_height, decision="ruido")
                     expect_noise_next = False
                     continue
                 else:
@@ -359,12 +483,21 @@ class HybridHTRProcessor:
 
             max_cols = min(len(xs) - 1, len(self.FIXED_PATTERN))
 
+            # Preprocesar la franja de la fila una sola vez y recortar las celdas
+            row_x0 = xs[0] + 2
+            row_strip = img[y1+2:y2-2, row_x0:xs[max_cols]-2]
+            x_bounds = [(xs[j] + 2 - row_x0, xs[j + 1] - 2 - row_x0) for j in range(max_cols)]
+            processed_cells = self.ocr_engine.preprocess_row(row_strip, x_bounds)
+            if debug is not None:
+                for j, processed in enumerate(processed_cells):
+                    debug.celda(i + 1, j, processed)
+
             for j in range(max_cols):
                 x1, x2 = xs[j], xs[j + 1]
                 cell = img[y1+2:y2-2, x1+2:x2-2]
                 
                 c_type = self.FIXED_PATTERN[j]
-                text = self.ocr_engine.read_cell(cell, col_type=c_type)
+                text = self.ocr_engine.read_cell(cell, col_type=c_type, processed=processed_cells[j])
                 
                 if c_type == "text":
                     row_text_content += text
@@ -372,7 +505,8 @@ class HybridHTRProcessor:
                 temp_row.append({
                     "col": j + 1,
                     "tipo": "L" if c_type == "text" else "N",
-                    "valor": text
+                    "valor": text,
+                    "celda": cell
                 })
                 
                 if progress_callback:
@@ -385,37 +519,96 @@ class HybridHTRProcessor:
             clean_content = re.sub(r'[\d\s]', '', row_text_content)
             if len(row_text_content.strip()) < 3 and len(clean_content) < 2:
                 logger.info("❌ VACÍA (ignorada)")
+                if debug is not None:
+                    debug.fila(fila=i + 1, y1=y1, y2=y2, altura=row_height, decision="vacia",
+                               valores=[item['valor'] for item in temp_row])
                 expect_noise_next = False
+                if row_callback:
+                    row_callback(None, estado_checkpoint(i + 1))
                 continue
 
             logger.info("✅ VÁLIDA")
+            if debug is not None:
+                debug.fila(fila=i + 1, y1=y1, y2=y2, altura=row_height, decision="valida",
+                           tupla_numero=real_row_idx, valores=[item['valor'] for item in temp_row])
             
             datos_json = {}
             for item in temp_row:
                 col_num = item['col'] - 1  # Convertir a 0-indexed
                 
                 # OMITIR col_4 (parroquia) - no se valida en frontend
-                if col_num == 4:
+                if col_num in self.COLUMNAS_OMITIDAS:
                     continue
                     
                 # Usar col_0, col_1, col_2... igual que OCR-service
                 col_key = f"col_{col_num}"
                 datos_json[col_key] = item['valor']
 
-            data.append({
+            tupla = {
                 "tupla_numero": real_row_idx,
-                "datos_ocr": datos_json
-            })
+                "datos_ocr": datos_json,
+                "bbox_celdas": bbox_tupla(pagina, [
+                    (xs[j] + 2, y1 + 2, xs[j + 1] - xs[j] - 4, row_height - 4) for j in range(max_cols)
+                ])
+            }
+            data.append(tupla)
+            
+            if cell_callback:
+                for item in temp_row:
+                    cell_callback(real_row_idx, item['col'] - 1, item['celda'])
             
             real_row_idx += 1
             expect_noise_next = True
             prev_row_height = row_height
 
+            if row_callback:
+                row_callback(tupla, estado_checkpoint(i + 1))
+
         logger.info(f"\n{'='*70}")
         logger.info(f"   ✅ COMPLETADO: {len(data)} filas válidas extraídas")
         
         return data
 
+    def reconocer_region(self, pdf_bytes: bytes, bbox: Dict[str, Any], columna: Optional[int] = None,
+                         dpi: Optional[int] = None, motor: Optional[str] = None) -> Dict[int, str]:
+        """
+        Vuelve a leer las celdas de una tupla (o una sola) desde sus cajas guardadas,
+        sin detectar la grilla ni recorrer el resto de la página.
+
+        Args:
+            pdf_bytes: PDF original
+            bbox: Valor de ocr_resultado.bbox_celdas de la tupla
+            columna: Índice de la única columna a leer (None = todas las guardadas)
+            dpi: Rasterizar a este DPI (más que el original para celdas difíciles)
+            motor: Motor de reconocimiento en lugar del seleccionado por tipo de columna
+
+        Returns:
+            {columna: texto}
+        """
+        motores = self.ocr_engine.motores.motores()
+        if motor and motor not in motores:
+            raise ValueError(f"Motor desconocido: {motor}. Disponibles: {', '.join(motores)}")
+        if dpi is not None and not 72 <= dpi <= 600:
+            raise ValueError("dpi debe estar entre 72 y 600")
+        if columna in self.COLUMNAS_OMITIDAS:
+            raise ValueError(f"La columna {columna} no se guarda en HTR")
+        pagina = bbox['pagina']
+        columnas = [j for j in columnas_a_reconocer(bbox, columna) if j not in self.COLUMNAS_OMITIDAS]
+
+        images = convert_from_bytes(pdf_bytes, dpi=dpi or pagina.get('dpi') or self.DPI_PDF,
+                                    grayscale=True, first_page=1, last_page=1)
+        img = np.array(images[0])
+        if img.ndim == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+        img = preparar_pagina(img, pagina)
+
+        textos = {}
+        for j in columnas:
+            celda = recortar(img, pagina, bbox['celdas'][j])
+            textos[j] = self.ocr_engine.read_cell(celda, col_type=self.FIXED_PATTERN[j], motor=motor)
+        logger.info(f"🔁 Región re-reconocida: {len(textos)} celdas")
+        return textos
+
 
 # Alias para compatibilidad con código existente
 HTRProcessor = HybridHTRProcessor
\ No newline at end of file
@@ -6,14 +6,23 @@ Usa bucket separado 'sacra360-htr' para archivos procesados con HTR
 from minio import Minio
 from minio.error import S3Error
 import os
+import shutil
 import uuid
 import logging
 from io import BytesIO
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, BinaryIO
+
+from .object_cache import CacheObjetos, es_inmutable
 
 logger = logging.getLogger(__name__)
 
+# Caché local de archivos descargados (MINIO_CACHE_MAX_MB=0 la deshabilita)
+cache_objetos = CacheObjetos(
+    directorio=os.getenv('MINIO_CACHE_DIR', '/tmp/sacra360-htr-cache'),
+    max_bytes=int(os.getenv('MINIO_CACHE_MAX_MB', '2048')) * 1024 * 1024
+)
+
 
 class MinIOService:
     """
@@ -214,14 +223,27 @@ class MinIOService:
         """
         Descarga un archivo desde MinIO
         
+        Con la caché local habilitada el archivo se lee del disco si ya se descargó
+        (misma versión según el ETag) y se devuelve mapeado en memoria (mmap).
+        
         Args:
             object_path: Ruta del objeto en MinIO (ej: "documents/file.pdf")
             
         Returns:
-            Bytes del archivo
+            Contenido del archivo (bytes o mmap)
         """
         self._ensure_connection()
         try:
+            if cache_objetos.habilitada:
+                try:
+                    etag = None if es_inmutable(object_path) else self.client.stat_object(self.bucket_name, object_path).etag
+                    return cache_objetos.leer(
+                        f"{self.bucket_name}/{object_path}", etag,
+                        lambda destino: self._descargar_en(object_path, destino)
+                    )
+                except OSError as e:
+                    logger.warning(f"⚠️ Caché local no disponible para {object_path} ({e}); descargando sin caché")
+            
             logger.info(f"Descargando objeto: {object_path}")
             response = self.client.get_object(self.bucket_name, object_path)
             data = response.read()
@@ -232,3 +254,14 @@ class MinIOService:
         except S3Error as e:
             logger.error(f"Error descargando archivo: {e}")
             raise
+    
+    def _descargar_en(self, object_path: str, destino: BinaryIO):
+        """Escribe el objeto en `destino` por partes, sin cargarlo entero en memoria"""
+        logger.info(f"Descargando objeto: {object_path}")
+        response = self.client.get_object(self.bucket_name, object_path)
+        try:
+            shutil.copyfileobj(response, destino, 1024 * 1024)
+        finally:
+            response.close()
+            response.release_conn()
+        logger.info(f"Archivo descargado exitosamente: {object_path}")
@@ -0,0 +1,201 @@
+"""
+Caché local en disco de los objetos descargados de MinIO
+
+Reprocesar un documento, cambiarlo de OCR a HTR o volver a leer una tupla
+descargaba el archivo completo de MinIO cada vez. Con la caché la primera
+descarga se escribe (por partes, sin pasar entera por memoria) en un archivo del
+directorio de caché y las siguientes se leen de ahí con `mmap`: el decodificador
+recibe el archivo mapeado en memoria, sin copiarlo ni tocar la red.
+
+- Clave: bucket/objeto + ETag, así un objeto reemplazado en MinIO no se sirve
+  viejo. Los objetos guardados por contenido (`documents/sha256/{ab}/{sha256}.ext`,
+  ver Documents-service) no cambian nunca: se identifican solo por el nombre, sin
+  consultar el ETag a MinIO.
+- Tamaño acotado a `max_bytes`: al pasarse se borran los menos usados (LRU). La
+  fecha de modificación de cada archivo marca su último uso, así el orden se
+  recupera al reiniciar el proceso.
+- Estadísticas de aciertos, fallos y bytes que no se descargaron (ver /status).
+
+Varios procesos pueden compartir el directorio (un archivo descargado por uno le
+sirve a los demás), pero cada uno lleva su propio índice: el límite de tamaño es
+aproximado. Borrar un archivo que otro proceso tiene
+mapeado es seguro (el mapeo sigue válido hasta que se libera).
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, BinaryIO, Callable, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Objetos guardados bajo su SHA-256 (inmutables)
+_PATRON_INMUTABLE = re.compile(r'(^|/)sha256/[0-9a-f]{2}/[0-9a-f]{64}(\.[A-Za-z0-9]+)?$')
+
+
+def es_inmutable(objeto: str) -> bool:
+    """True si el nombre del objeto es su hash de contenido (no puede cambiar)"""
+    return bool(_PATRON_INMUTABLE.search(objeto))
+
+
+def mapear(ruta: str) -> Union[mmap.mmap, bytes]:
+    """Archivo mapeado en memoria de solo lectura (b"" si está vacío)"""
+    with open(ruta, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        # El mapeo conserva su propio descriptor: el archivo se puede cerrar o borrar
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class CacheObjetos:
+    """Caché LRU en disco de objetos de MinIO, acotada por tamaño"""
+
+    def __init__(self, directorio: str, max_bytes: int):
+        """
+        Args:
+            directorio: Directorio de la caché (se crea si no existe)
+            max_bytes: Tamaño máximo en disco (0 = caché deshabilitada)
+        """
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.aciertos = 0
+        self.fallos = 0
+        self.bytes_ahorrados = 0
+        self.bytes_descargados = 0
+        # archivo -> tamaño, del menos al más recientemente usado
+        self._indice: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        if self.max_bytes > 0:
+            try:
+                os.makedirs(self.directorio, exist_ok=True)
+                self._cargar_indice()
+            except OSError as e:
+                logger.warning(f"⚠️ Caché de MinIO deshabilitada ({self.directorio}): {e}")
+                self.max_bytes = 0
+
+    @property
+    def habilitada(self) -> bool:
+        return self.max_bytes > 0
+
+    def _cargar_indice(self):
+        """Reconstruye el índice con los archivos que ya están en el directorio"""
+        entradas = []
+        for entrada in os.scandir(self.directorio):
+            if entrada.is_file() and not entrada.name.startswith('.'):
+                info = entrada.stat()
+                entradas.append((info.st_mtime, entrada.name, info.st_size))
+        for _, nombre, tamano in sorted(entradas):
+            self._indice[nombre] = tamano
+            self._bytes += tamano
+        if entradas:
+            logger.info(f"🗄️ Caché de MinIO: {len(entradas)} objetos ({self._bytes / 1024 / 1024:.0f} MB) en {self.directorio}")
+        self._desalojar()
+
+    @staticmethod
+    def clave(objeto: str, etag: Optional[str]) -> str:
+        """Nombre del archivo en caché para el objeto (y su ETag, si se conoce)"""
+        return hashlib.sha256(f"{objeto}\0{etag or ''}".encode()).hexdigest()
+
+    def _desalojar(self, conservar: Optional[str] = None):
+        """Borra los archivos menos usados hasta quedar dentro de `max_bytes` (con el lock tomado)"""
+        for nombre in list(self._indice):
+            if self._bytes <= self.max_bytes:
+                break
+            if nombre == conservar:
+                continue
+            self._bytes -= self._indice.pop(nombre)
+            try:
+                os.remove(os.path.join(self.directorio, nombre))
+            except FileNotFoundError:
+                pass
+
+    def leer(self, objeto: str, etag: Optional[str],
+             descargar: Callable[[BinaryIO], None]) -> Union[mmap.mmap, bytes]:
+        """
+        Contenido del objeto mapeado en memoria, de la caché o descargándolo.
+
+        Args:
+            objeto: Identificador del objeto (bucket/nombre)
+            etag: ETag actual del objeto en MinIO (None si es inmutable)
+            descargar: Escribe el objeto completo en el archivo recibido (solo si no está en caché)
+        """
+        nombre = self.clave(objeto, etag)
+        ruta = os.path.join(self.directorio, nombre)
+
+        # El archivo en el directorio es la caché (puede haberlo descargado otro proceso)
+        try:
+            datos = mapear(ruta)
+            os.utime(ruta)
+        except FileNotFoundError:
+            with self._lock:
+                anterior = self._indice.pop(nombre, None)
+                if anterior is not None:
+                    self._bytes -= anterior
+        else:
+            tamano = len(datos)
+            with self._lock:
+                if nombre in self._indice:
+                    self._indice.move_to_end(nombre)
+                else:
+                    self._indice[nombre] = tamano
+                    self._bytes += tamano
+                    self._desalojar(conservar=nombre)
+                self.aciertos += 1
+                self.bytes_ahorrados += tamano
+            logger.info(f"🗄️ {objeto} leído de la caché local ({tamano} bytes)")
+            return datos
+
+        # No está: se descarga a un temporal del mismo directorio y se renombra al terminar,
+        # así nunca se lee un archivo a medio escribir
+        fd, temporal = tempfile.mkstemp(dir=self.directorio, prefix='.descarga-')
+        try:
+            with os.fdopen(fd, 'wb') as destino:
+                descargar(destino)
+            os.replace(temporal, ruta)
+        except BaseException:
+            try:
+                os.remove(temporal)
+            except FileNotFoundError:
+                pass
+            raise
+        datos = mapear(ruta)
+        tamano = len(datos)
+
+        with self._lock:
+            self.fallos += 1
+            self.bytes_descargados += tamano
+            anterior = self._indice.pop(nombre, None)
+            if anterior is not None:
+                self._bytes -= anterior
+            if tamano <= self.max_bytes:
+                self._indice[nombre] = tamano
+                self._bytes += tamano
+                self._desalojar(conservar=nombre)
+            else:
+                # Más grande que toda la caché: no se conserva (el mapeo sigue siendo válido)
+                os.remove(ruta)
+        return datos
+
+    def estado(self) -> Dict[str, Any]:
+        """Uso y efectividad de la caché (para /status)"""
+        with self._lock:
+            lecturas = self.aciertos + self.fallos
+            return {
+                "habilitada": self.habilitada,
+                "directorio": self.directorio,
+                "objetos": len(self._indice),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / lecturas, 3) if lecturas else None,
+                "bytes_ahorrados": self.bytes_ahorrados,
+                "bytes_descargados": self.bytes_descargados,
+            }
@@ -0,0 +1,196 @@
+"""
+Almacén compartido del progreso de procesamiento por documento
+
+Reemplaza los diccionarios de progreso en memoria de cada proceso: el progreso vive
+en un hash de Redis por documento (`sacra360:progreso:estado:{documento_id}`)
+con TTL, así lo ven todos los workers y réplicas de OCR, HTR y Documents-service
+y una lectura es un solo HGETALL, sin consultar Postgres.
+
+- Cada `guardar` actualiza solo los campos recibidos (HSET) y renueva el TTL en
+  una transacción: dos escritores no se pisan campos que no tocan.
+- Los documentos en curso (estado no final) se indexan en un sorted set por
+  hora de actualización, para listar todo lo que está procesándose de una vez.
+- Sin Redis (tests, desarrollo, caída) se usa un diccionario en memoria con el
+  mismo TTL; tras un fallo de conexión se reintenta Redis pasado un rato.
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CLAVE_PROGRESO = "sacra360:progreso:estado:{documento_id}"
+CLAVE_EN_CURSO = "sacra360:progreso:en_curso"
+
+# Estados con los que termina el procesamiento de un documento
+ESTADOS_FINALES = {'completado', 'error'}
+
+
+def clave_progreso(documento_id: int) -> str:
+    return CLAVE_PROGRESO.format(documento_id=documento_id)
+
+
+class AlmacenProgreso:
+    """Progreso por documento con expiración, en Redis o en memoria"""
+
+    def __init__(self, redis_url: Optional[str], ttl: float = 3600.0, reintento_s: float = 30.0):
+        """
+        Args:
+            redis_url: URL de Redis (None o vacío = solo memoria del proceso)
+            ttl: Segundos que dura el progreso de un documento desde su última actualización
+            reintento_s: Tras un fallo de Redis, segundos usando memoria antes de reintentar
+        """
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self.reintento_s = reintento_s
+        self._cliente = None
+        self._pausado_hasta = 0.0
+        # documento_id -> (vence, campos)
+        self._memoria: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+        self._proxima_purga = 0.0
+
+    # --- Redis ---
+
+    def _redis(self):
+        """Cliente Redis, o None si no está configurado o falló hace poco"""
+        if not self.redis_url or time.monotonic() < self._pausado_hasta:
+            return None
+        if self._cliente is None:
+            try:
+                import redis
+                self._cliente = redis.Redis.from_url(
+                    self.redis_url, socket_timeout=0.5, socket_connect_timeout=0.5, decode_responses=True
+                )
+            except Exception as e:
+                self._fallo(e)
+                return None
+        return self._cliente
+
+    def _fallo(self, error: Exception):
+        self._pausado_hasta = time.monotonic() + self.reintento_s
+        logger.warning(f"⚠️ Almacén de progreso sin Redis ({error}); usando memoria por {self.reintento_s:.0f}s")
+
+    # --- Memoria ---
+
+    def _purgar(self, ahora: float):
+        """Descarta las entradas vencidas (a lo sumo una vez por segundo o por TTL)"""
+        if ahora < self._proxima_purga:
+            return
+        self._proxima_purga = ahora + min(1.0, self.ttl)
+        for documento_id in [d for d, (vence, _) in self._memoria.items() if vence <= ahora]:
+            del self._memoria[documento_id]
+
+    def _leer_memoria(self, documento_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entrada = self._memoria.get(documento_id)
+            if entrada is None:
+                return None
+            if entrada[0] <= time.monotonic():
+                del self._memoria[documento_id]
+                return None
+            return dict(entrada[1])
+
+    # --- API ---
+
+    def guardar(self, documento_id: int, campos: Dict[str, Any]):
+        """Actualiza los campos de progreso del documento y renueva su TTL"""
+        ahora_ts = time.time()
+        campos = dict(campos, actualizado=ahora_ts)
+        cliente = self._redis()
+        if cliente is not None:
+            try:
+                clave = clave_progreso(documento_id)
+                with cliente.pipeline(transaction=True) as pipe:
+                    pipe.hset(clave, mapping={k: json.dumps(v, default=str) for k, v in campos.items()})
+                    pipe.pexpire(clave, int(self.ttl * 1000))
+                    if 'estado' in campos:
+                        if campos['estado'] in ESTADOS_FINALES:
+                            pipe.zrem(CLAVE_EN_CURSO, documento_id)
+                        else:
+                            pipe.zadd(CLAVE_EN_CURSO, {documento_id: ahora_ts})
+                    pipe.execute()
+                return
+            except Exception as e:
+                self._fallo(e)
+
+        with self._lock:
+            ahora = time.monotonic()
+            self._purgar(ahora)
+            entrada = self._memoria.get(documento_id)
+            actual = dict(entrada[1]) if entrada and entrada[0] > ahora else {}
+            actual.update(campos)
+            self._memoria[documento_id] = (ahora + self.ttl, actual)
+
+    def obtener(self, documento_id: int) -> Optional[Dict[str, Any]]:
+        """Progreso del documento, o None si no hay (nunca se guardó o venció)"""
+        cliente = self._redis()
+        if cliente is not None:
+            try:
+                campos = cliente.hgetall(clave_progreso(documento_id))
+                return {k: json.loads(v) for k, v in campos.items()} if campos else None
+            except Exception as e:
+                self._fallo(e)
+        return self._leer_memoria(documento_id)
+
+    def obtener_varios(self, documentos_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Progreso de varios documentos en una sola ida y vuelta (omite los que no tienen)"""
+        documentos_ids = list(dict.fromkeys(documentos_ids))
+        cliente = self._redis()
+        if cliente is not None:
+            try:
+                with cliente.pipeline(transaction=False) as pipe:
+                    for documento_id in documentos_ids:
+                        pipe.hgetall(clave_progreso(documento_id))
+                    resultados = pipe.execute()
+                return {
+                    documento_id: {k: json.loads(v) for k, v in campos.items()}
+                    for documento_id, campos in zip(documentos_ids, resultados) if campos
+                }
+            except Exception as e:
+                self._fallo(e)
+        progresos = {}
+        for documento_id in documentos_ids:
+            progreso = self._leer_memoria(documento_id)
+            if progreso is not None:
+                progresos[documento_id] = progreso
+        return progresos
+
+    def en_curso(self) -> List[int]:
+        """Documentos con progreso vigente que todavía no terminaron"""
+        cliente = self._redis()
+        if cliente is not None:
+            try:
+                # Los que no se actualizan hace más de un TTL se dan por abandonados
+                with cliente.pipeline(transaction=True) as pipe:
+                    pipe.zremrangebyscore(CLAVE_EN_CURSO, '-inf', time.time() - self.ttl)
+                    pipe.zrange(CLAVE_EN_CURSO, 0, -1)
+                    _, ids = pipe.execute()
+                return [int(documento_id) for documento_id in ids]
+            except Exception as e:
+                self._fallo(e)
+        with self._lock:
+            ahora = time.monotonic()
+            vigentes = [
+                (campos.get('actualizado', 0), documento_id)
+                for documento_id, (vence, campos) in self._memoria.items()
+                if vence > ahora and 'estado' in campos and campos['estado'] not in ESTADOS_FINALES
+            ]
+        return [documento_id for _, documento_id in sorted(vigentes)]
+
+    def eliminar(self, documento_id: int):
+        """Olvida el progreso del documento (p.ej. al reprocesarlo desde cero)"""
+        cliente = self._redis()
+        if cliente is not None:
+            try:
+                with cliente.pipeline(transaction=True) as pipe:
+                    pipe.delete(clave_progreso(documento_id))
+                    pipe.zrem(CLAVE_EN_CURSO, documento_id)
+                    pipe.execute()
+            except Exception as e:
+                self._fallo(e)
+        with self._lock:
+            self._memoria.pop(documento_id, None)
@@ -0,0 +1,64 @@
+"""
+Utilidades para el modo pre-fork del servicio HTR
+
+El proceso master carga los modelos EasyOCR y los índices de corrección una
+sola vez y luego gunicorn hace fork de los workers. Las páginas de memoria de
+los pesos se comparten en modo copy-on-write mientras nadie las escriba.
+"""
+
+import gc
+import logging
+import os
+from typing import Dict
+
+try:
+    from .config import settings
+except ImportError:
+    from utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def congelar_heap():
+    """
+    Prepara el heap del master antes del fork.
+
+    gc.freeze() mueve todos los objetos vivos a una generación permanente que el
+    recolector no recorre; así los workers no tocan sus cabeceras (refcounts de GC)
+    y las páginas heredadas no se copian.
+    """
+    gc.collect()
+    gc.freeze()
+    logger.info(f"🧊 Heap congelado antes del fork ({gc.get_freeze_count()} objetos)")
+
+
+def configurar_worker():
+    """Ajustes por worker justo después del fork"""
+    if settings.htr_torch_threads > 0:
+        try:
+            import torch
+            torch.set_num_threads(settings.htr_torch_threads)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo fijar hilos de torch: {e}")
+    logger.info(f"👷 Worker HTR iniciado (pid={os.getpid()})")
+
+
+def uso_memoria() -> Dict[str, float]:
+    """
+    Memoria del proceso actual en MB leída de /proc (solo Linux).
+
+    `rss` cuenta las páginas compartidas en cada worker; `pss` reparte las
+    compartidas entre los procesos que las usan y refleja el costo real.
+    """
+    campos = {'Rss': 'rss_mb', 'Pss': 'pss_mb', 'Shared_Clean': 'compartida_mb', 'Private_Dirty': 'privada_mb'}
+    memoria = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for linea in f:
+                partes = linea.split()
+                clave = partes[0].rstrip(':')
+                if clave in campos:
+                    memoria[campos[clave]] = round(int(partes[1]) / 1024, 1)
+    except OSError:
+        pass
+    return memoria
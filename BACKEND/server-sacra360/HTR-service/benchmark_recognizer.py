@@ -0,0 +1,170 @@
+"""
+Benchmark del reconocedor HTR: PyTorch vs ONNX Runtime INT8
+
+Recorre las páginas de prueba (BACKEND/Images por defecto), detecta la grilla,
+preprocesa cada celda igual que ManuscriptOCR (CellPreprocessor) y la lee con ambos backends.
+Reporta tiempo por celda, speedup y coincidencia del texto (CER) del backend
+INT8 contra el de PyTorch. Si se pasa --verdad se mide también contra el texto
+validado.
+
+Uso:
+    python benchmark_recognizer.py [imagenes...] [--max-celdas 300] [--salida reporte.md]
+    python benchmark_recognizer.py --verdad verdad.json
+
+Formato de verdad.json: {"Prueba1.png": [["JUAN PEREZ", "12", "05", ...], ...]}
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+# Agregar el directorio app al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+import cv2
+
+from services.htr_processor import GridDetector
+from services.cell_preprocessor import CellPreprocessor
+from services.onnx_recognizer import crear_reader, backend_activo, BACKEND_TORCH, BACKEND_ONNX_INT8
+
+IMAGENES_DEFAULT = os.path.join(os.path.dirname(__file__), '..', '..', 'Images')
+# Mismo patrón que HybridHTRProcessor.FIXED_PATTERN
+PATRON_COLUMNAS = ['text', 'date', 'date', 'date', 'text', 'date', 'date', 'date', 'text', 'text']
+
+
+def distancia_edicion(a: str, b: str) -> int:
+    """Distancia de Levenshtein entre dos cadenas"""
+    previa = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(previa[j] + 1, actual[j - 1] + 1, previa[j - 1] + (ca != cb)))
+        previa = actual
+    return previa[-1]
+
+
+def cer(predicho: str, referencia: str) -> float:
+    if not referencia:
+        return 0.0 if not predicho else 1.0
+    return distancia_edicion(predicho, referencia) / len(referencia)
+
+
+def extraer_celdas(ruta_imagen: str, max_celdas: int):
+    """Detecta la grilla y devuelve (fila, columna, tipo, celda_preprocesada)"""
+    img = cv2.imread(ruta_imagen)
+    ys, xs = GridDetector().get_structure(img)
+    patron = PATRON_COLUMNAS
+    preprocesador = CellPreprocessor()
+
+    celdas = []
+    for i in range(len(ys) - 1):
+        for j in range(min(len(xs) - 1, len(patron))):
+            celda = img[ys[i] + 2:ys[i + 1] - 2, xs[j] + 2:xs[j + 1] - 2]
+            procesada = preprocesador.preprocess_cell(celda)
+            if procesada is not None:
+                celdas.append((i, j, patron[j], procesada))
+            if len(celdas) >= max_celdas:
+                return celdas
+    return celdas
+
+
+def leer(reader, celdas):
+    """Lee todas las celdas y devuelve (textos, segundos)"""
+    textos = []
+    inicio = time.perf_counter()
+    for _, _, tipo, procesada in celdas:
+        allowlist = '0123456789/' if tipo == 'date' else None
+        resultado = reader.readtext(procesada, detail=0, paragraph=False, allowlist=allowlist)
+        textos.append(" ".join(resultado).strip())
+    return textos, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PyTorch vs ONNX Runtime INT8 (HTR)")
+    parser.add_argument('imagenes', nargs='*')
+    parser.add_argument('--max-celdas', type=int, default=300)
+    parser.add_argument('--verdad', help="JSON con el texto validado por imagen")
+    parser.add_argument('--salida', help="Guardar reporte markdown en este archivo")
+    args = parser.parse_args()
+
+    imagenes = args.imagenes or sorted(
+        glob.glob(os.path.join(IMAGENES_DEFAULT, '*.png')) + glob.glob(os.path.join(IMAGENES_DEFAULT, '*.jp*g'))
+    )
+    verdad = json.load(open(args.verdad, encoding='utf-8')) if args.verdad else {}
+
+    print("🔧 Cargando readers (torch y onnx_int8)...")
+    readers = {
+        BACKEND_TORCH: crear_reader(['es'], backend=BACKEND_TORCH, gpu=False),
+        BACKEND_ONNX_INT8: crear_reader(['es'], backend=BACKEND_ONNX_INT8),
+    }
+    # Si la exportación falló el reader "onnx_int8" corre en PyTorch: no comparar nada
+    if backend_activo() != BACKEND_ONNX_INT8:
+        sys.exit(f"❌ El backend ONNX Runtime INT8 no quedó activo ({backend_activo()}); ver el log de la exportación")
+
+    filas = []
+    for ruta in imagenes:
+        nombre = os.path.basename(ruta)
+        celdas = extraer_celdas(ruta, args.max_celdas)
+        if not celdas:
+            print(f"⚠️  {nombre}: sin celdas")
+            continue
+
+        # Calentamiento para no medir la primera inferencia
+        for reader in readers.values():
+            leer(reader, celdas[:3])
+
+        salidas = {backend: leer(reader, celdas) for backend, reader in readers.items()}
+        textos_torch, t_torch = salidas[BACKEND_TORCH]
+        textos_int8, t_int8 = salidas[BACKEND_ONNX_INT8]
+
+        cer_vs_torch = sum(cer(a, b) for a, b in zip(textos_int8, textos_torch)) / len(celdas)
+        exactas = sum(a == b for a, b in zip(textos_int8, textos_torch)) / len(celdas)
+
+        fila = {
+            'imagen': nombre,
+            'celdas': len(celdas),
+            'ms_torch': 1000 * t_torch / len(celdas),
+            'ms_int8': 1000 * t_int8 / len(celdas),
+            'speedup': t_torch / t_int8 if t_int8 else 0.0,
+            'cer_int8_vs_torch': cer_vs_torch,
+            'exactas': exactas,
+        }
+
+        if nombre in verdad:
+            referencia = [v for fila_v in verdad[nombre] for v in fila_v]
+            pares = list(zip(celdas, referencia))
+            for backend, (textos, _) in salidas.items():
+                fila[f'cer_{backend}'] = sum(cer(textos[k], ref) for k, (_, ref) in enumerate(pares)) / max(len(pares), 1)
+
+        filas.append(fila)
+        print(f"✅ {nombre}: {fila['ms_torch']:.1f} ms → {fila['ms_int8']:.1f} ms por celda "
+              f"(x{fila['speedup']:.2f}), CER vs torch {cer_vs_torch:.3f}")
+
+    reporte = [
+        "| Imagen | Celdas | ms/celda torch | ms/celda INT8 | Speedup | CER INT8 vs torch | Idénticas |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for f in filas:
+        reporte.append(f"| {f['imagen']} | {f['celdas']} | {f['ms_torch']:.1f} | {f['ms_int8']:.1f} | "
+                       f"x{f['speedup']:.2f} | {f['cer_int8_vs_torch']:.3f} | {100 * f['exactas']:.1f}% |")
+    if any('cer_torch' in f for f in filas):
+        reporte.append("")
+        reporte.append("| Imagen | CER torch vs verdad | CER INT8 vs verdad |")
+        reporte.append("|---|---|---|")
+        for f in filas:
+            if 'cer_torch' in f:
+                reporte.append(f"| {f['imagen']} | {f['cer_torch']:.3f} | {f['cer_onnx_int8']:.3f} |")
+
+    texto = "\n".join(reporte)
+    print("\n" + texto)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + "\n")
+        print(f"\n💾 Reporte guardado en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+Tests del control de admisión del worker
+"""
+
+from app.services import admission
+from app.services.admission import ControlAdmision
+
+
+def test_rechaza_con_el_worker_lleno():
+    control = ControlAdmision(max_trabajos=2)
+    assert control.motivo_rechazo(1) is None
+    assert "2/2" in control.motivo_rechazo(2)
+    assert ControlAdmision(max_trabajos=0).motivo_rechazo(50) is None
+
+
+def test_rechaza_con_la_memoria_sobre_el_limite(monkeypatch):
+    control = ControlAdmision(max_trabajos=0, max_rss_mb=1000)
+    monkeypatch.setattr(admission, "rss_mb", lambda: 1200.0)
+    assert "RSS" in control.motivo_rechazo(0)
+    assert not control.estado(0)["acepta"]
+
+    # Si no se puede leer la memoria no se bloquea el trabajo
+    monkeypatch.setattr(admission, "rss_mb", lambda: None)
+    assert control.motivo_rechazo(0) is None
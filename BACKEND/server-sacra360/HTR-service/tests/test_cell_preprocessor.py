@@ -0,0 +1,74 @@
+"""
+Tests del preprocesamiento de celdas por fila
+"""
+
+import cv2
+import numpy as np
+
+from app.services.cell_preprocessor import CellPreprocessor
+
+
+def crear_fila(anchos, alto=150, semilla=0):
+    """Fila sintética con líneas de grilla y texto en cada celda"""
+    rng = np.random.default_rng(semilla)
+    xs = [50]
+    for w in anchos:
+        xs.append(xs[-1] + w)
+    img = rng.integers(200, 250, (alto + 20, xs[-1] + 50, 3)).astype(np.uint8)
+    for x in xs:
+        cv2.line(img, (x, 0), (x, alto + 20), (40, 40, 40), 3)
+    for j in range(len(anchos)):
+        texto = "12" if anchos[j] < 400 else "Perez"
+        cv2.putText(img, texto, (xs[j] + 20, 100), cv2.FONT_HERSHEY_SCRIPT_SIMPLEX, 2.0, (30, 30, 60), 3)
+    return img, xs
+
+
+def test_fila_coincide_con_celdas_dentro_de_tolerancia():
+    anchos = [700, 260, 260, 300, 600, 260, 260, 300, 700, 700]
+    img, xs = crear_fila(anchos)
+    p = CellPreprocessor()
+    y1, y2 = 5, 165
+    x0 = xs[0] + 2
+
+    strip = img[y1 + 2:y2 - 2, x0:xs[-1] - 2]
+    bounds = [(xs[j] + 2 - x0, xs[j + 1] - 2 - x0) for j in range(len(anchos))]
+    por_fila = p.preprocess_row(strip, bounds)
+
+    for j, procesada in enumerate(por_fila):
+        esperada = p.preprocess_cell(img[y1 + 2:y2 - 2, xs[j] + 2:xs[j + 1] - 2])
+        assert procesada.shape == esperada.shape
+        assert (procesada != esperada).mean() < 0.01
+
+
+def test_celdas_chicas_devuelven_none():
+    p = CellPreprocessor()
+    strip = np.full((40, 100, 3), 255, np.uint8)
+    assert p.preprocess_row(strip, [(0, 5), (5, 100)])[0] is None
+    assert p.preprocess_row(strip[:5], [(0, 50)]) == [None]
+
+
+def test_clahe_se_reutiliza():
+    p = CellPreprocessor()
+    celda = np.full((60, 120, 3), 200, np.uint8)
+    p.preprocess_cell(celda)
+    p.preprocess_cell(celda)
+    assert len(p._clahe) == 1
+
+
+def test_escala_adaptativa_lleva_glifos_a_la_altura_objetivo():
+    p = CellPreprocessor(altura_objetivo=40)
+    for escala_texto in (0.8, 3.0):
+        celda = np.full((300, 900), 235, np.uint8)
+        cv2.putText(celda, "Perez 12", (20, 200), cv2.FONT_HERSHEY_SIMPLEX, escala_texto, 30, 2)
+        factor = p.escala(celda)
+        alto = p.altura_objetivo / factor
+        # Texto chico se agranda, texto grande se reduce
+        assert (factor > 1) == (escala_texto < 1.5)
+        assert p.escala_minima <= factor <= p.escala_maxima
+        assert 15 * escala_texto <= alto <= 30 * escala_texto
+
+
+def test_escala_fija_sin_altura_objetivo_o_celda_vacia():
+    assert CellPreprocessor().escala(np.full((60, 120), 200, np.uint8)) == 2.5
+    vacia = np.full((60, 120), 200, np.uint8)
+    assert CellPreprocessor(altura_objetivo=40).escala(vacia) == 2.5
@@ -0,0 +1,51 @@
+"""
+Tests de las regiones de celdas guardadas para re-reconocer una tupla
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.cell_regions import (
+    bbox_tupla, columnas_a_reconocer, describir_pagina, preparar_pagina, recortar,
+)
+from app.services.deskew import enderezar
+
+
+def pagina(escala=1):
+    """Página gris con grilla, texto y una celda marcada en negro"""
+    img = np.full((1000 * escala, 2000 * escala), 228, np.uint8)
+    for y in range(50 * escala, 951 * escala, 100 * escala):
+        cv2.line(img, (40 * escala, y), (1960 * escala, y), 40, 2 * escala)
+        for x in range(60 * escala, 1800 * escala, 300 * escala):
+            cv2.putText(img, "Jose 7", (x, y + 70 * escala), cv2.FONT_HERSHEY_SIMPLEX, escala, 20, 2 * escala)
+    cv2.rectangle(img, (900 * escala, 455 * escala), (1000 * escala, 495 * escala), 0, -1)
+    return img
+
+
+def girar(img, grados):
+    h, w = img.shape
+    matriz = cv2.getRotationMatrix2D((w / 2, h / 2), grados, 1)
+    return cv2.warpAffine(img, matriz, (w, h), borderValue=228)
+
+
+def test_recorta_la_celda_en_otra_resolucion():
+    procesada, angulo = enderezar(girar(pagina(), -2))
+    bbox = bbox_tupla(describir_pagina(procesada, 150, angulo), [[900, 455, 100, 40], None])
+    assert bbox["celdas"] == [[900, 455, 100, 40], None]
+
+    # Misma página rasterizada al doble: se repite la rotación y se escalan las cajas
+    preparada = preparar_pagina(girar(pagina(escala=2), -2), bbox["pagina"])
+    celda = recortar(preparada, bbox["pagina"], bbox["celdas"][0])
+    assert celda.shape == (80, 200)
+    assert celda.mean() < 60
+
+
+def test_columnas_a_reconocer():
+    bbox = {"pagina": {"ancho": 10, "alto": 10, "dpi": None, "angulo": 0}, "celdas": [[0, 0, 5, 5], None, [5, 5, 5, 5]]}
+    assert columnas_a_reconocer(bbox, None) == [0, 2]
+    assert columnas_a_reconocer(bbox, 2) == [2]
+    with pytest.raises(ValueError):
+        columnas_a_reconocer(bbox, 1)
+    with pytest.raises(ValueError):
+        columnas_a_reconocer(bbox, 7)
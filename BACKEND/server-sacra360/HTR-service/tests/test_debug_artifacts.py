@@ -0,0 +1,46 @@
+"""
+Tests del almacén de artefactos de debug
+"""
+
+import json
+import os
+
+import numpy as np
+
+from app.services.debug_artifacts import DebugArtifactStore
+
+
+def test_sin_debug_no_hay_sesion(tmp_path):
+    store = DebugArtifactStore(str(tmp_path), max_bytes=10**7, sample_rate=0.0)
+    assert store.sesion(1) is None
+    assert store.sesion(1, forzar=True) is not None
+
+
+def test_escribe_artefactos_reducidos_por_documento(tmp_path):
+    store = DebugArtifactStore(str(tmp_path), max_bytes=10**7, escala=0.25)
+    pagina = np.full((800, 1600, 3), 255, np.uint8)
+
+    sesion = store.sesion(42, forzar=True)
+    sesion.grid(pagina, [0, 800, 1600], [0, 400, 800])
+    sesion.celda(1, 0, np.zeros((100, 200), np.uint8))
+    sesion.fila(fila=1, decision="valida", tupla_numero=1)
+    sesion.cerrar()
+    store.esperar()
+
+    assert store.listar(42) == ["celdas/f001_c0.png", "filas.json", "grid.jpg"]
+    import cv2
+    assert cv2.imread(os.path.join(store.carpeta(42), "grid.jpg")).shape[:2] == (200, 400)
+    with open(os.path.join(store.carpeta(42), "filas.json"), encoding="utf-8") as f:
+        assert json.load(f)[0]["decision"] == "valida"
+    # La página original no se modifica
+    assert pagina.min() == 255
+
+
+def test_limite_de_tamano_borra_los_mas_antiguos(tmp_path):
+    store = DebugArtifactStore(str(tmp_path), max_bytes=1, escala=1.0)
+    for documento_id in (1, 2):
+        sesion = store.sesion(documento_id, forzar=True)
+        sesion.celda(1, 0, np.random.default_rng(0).integers(0, 255, (50, 50), dtype=np.uint8))
+        sesion.cerrar()
+        store.esperar()
+    assert store.listar(1) == []
@@ -0,0 +1,48 @@
+"""
+Tests del enderezado de página previo a la detección de grilla
+"""
+
+import cv2
+import numpy as np
+
+from app.services.deskew import enderezar
+from app.services.quality_gate import EvaluadorCalidad
+
+
+def pagina():
+    """Página sintética en color con grilla y texto"""
+    img = np.full((1200, 2600, 3), 228, np.uint8)
+    for x in range(40, 2561, 280):
+        cv2.line(img, (x, 60), (x, 1140), (40, 40, 40), 3)
+    for y in range(60, 1141, 90):
+        cv2.line(img, (40, y), (2560, y), (40, 40, 40), 3)
+        for x in range(60, 2400, 280):
+            cv2.putText(img, "Maria 3", (x, y + 60), cv2.FONT_HERSHEY_SIMPLEX, 1.1, (20, 20, 20), 2)
+    return img
+
+
+def girar(img, grados):
+    h, w = img.shape[:2]
+    matriz = cv2.getRotationMatrix2D((w / 2, h / 2), grados, 1)
+    return cv2.warpAffine(img, matriz, (w, h), borderValue=(228, 228, 228))
+
+
+def test_endereza_pagina_inclinada():
+    inclinada = girar(pagina(), -2)
+    enderezada, angulo = enderezar(inclinada)
+
+    assert abs(angulo - 2) <= 0.15
+    assert enderezada.shape == inclinada.shape
+    gris = cv2.cvtColor(enderezada, cv2.COLOR_BGR2GRAY)
+    assert abs(EvaluadorCalidad.inclinacion(gris)) <= 0.15
+    # Las esquinas se rellenan con el color del papel, no con negro
+    assert enderezada[0, 0].min() > 200
+
+
+def test_pagina_recta_no_se_toca_y_es_determinista():
+    recta = pagina()
+    resultado, angulo = enderezar(recta)
+    assert angulo == 0.0 and resultado is recta
+
+    inclinada = girar(recta, 1.5)
+    assert np.array_equal(enderezar(inclinada)[0], enderezar(inclinada)[0])
@@ -0,0 +1,54 @@
+"""
+Tests del clasificador de dígitos para columnas de fecha
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from app.services.digit_classifier import (
+    ClasificadorDigitos, MotorDigitosMLP, dataset_desde_celdas,
+    generar_celdas_sinteticas, segmentar_digitos
+)
+from app.services.recognition_engines import ReconocimientoIncierto
+
+
+@pytest.fixture(scope="module")
+def modelo_entrenado():
+    X, y = dataset_desde_celdas(generar_celdas_sinteticas(800, semilla=1))
+    modelo = ClasificadorDigitos()
+    modelo.entrenar(X, y, epocas=10)
+    return modelo
+
+
+def test_segmenta_entre_uno_y_cuatro_digitos():
+    celdas = generar_celdas_sinteticas(200, semilla=2)
+    correctas = sum(len(segmentar_digitos(img)) == len(texto) for img, texto in celdas)
+    assert correctas / len(celdas) >= 0.95
+
+
+def test_celda_vacia_no_tiene_glifos():
+    assert segmentar_digitos(np.full((60, 120), 255, np.uint8)) == []
+
+
+def test_clasifica_celdas_sinteticas(modelo_entrenado):
+    celdas = generar_celdas_sinteticas(200, semilla=3)
+    aciertos = sum(modelo_entrenado.predecir(segmentar_digitos(img))[0] == texto for img, texto in celdas)
+    assert aciertos / len(celdas) >= 0.9
+
+
+def test_guardar_y_cargar(modelo_entrenado, tmp_path):
+    ruta = os.path.join(tmp_path, "digitos.npz")
+    modelo_entrenado.guardar(ruta)
+    cargado = ClasificadorDigitos.cargar(ruta)
+    img, _ = generar_celdas_sinteticas(1, semilla=4)[0]
+    glifos = segmentar_digitos(img)
+    assert cargado.predecir(glifos) == modelo_entrenado.predecir(glifos)
+
+
+def test_motor_incierto_con_umbral_alto(modelo_entrenado):
+    img, _ = generar_celdas_sinteticas(1, semilla=5)[0]
+    motor = MotorDigitosMLP(modelo_entrenado, umbral=1.01)
+    with pytest.raises(ReconocimientoIncierto):
+        motor.reconocer(img)
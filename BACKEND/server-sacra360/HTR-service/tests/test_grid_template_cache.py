@@ -0,0 +1,72 @@
+"""
+Tests del caché de plantillas de grilla por libro
+"""
+
+import cv2
+import numpy as np
+
+from app.services.grid_template_cache import GridTemplateCache
+
+XS = [60, 700, 820, 940, 1080, 1700, 1820, 1940, 2080, 2700, 3300]
+YS = [40, 150, 260, 370, 480, 590, 700, 810, 920, 1030, 1140]
+
+
+def pagina(xs, ys, dx=0, dy=0, semilla=0):
+    """Página sintética con la grilla impresa desplazada y 'manuscrito' aleatorio"""
+    rng = np.random.default_rng(semilla)
+    img = np.full((1200, 3400), 235, np.uint8)
+    for x in xs:
+        cv2.line(img, (x + dx, 0), (x + dx, 1199), 40, 4)
+    for y in ys:
+        cv2.line(img, (0, y + dy), (3399, y + dy), 40, 4)
+    for _ in range(120):
+        x, y = int(rng.integers(100, 3200)), int(rng.integers(80, 1100))
+        cv2.putText(img, "ABC 12", (x, y), cv2.FONT_HERSHEY_SIMPLEX, 1.2, 70, 2)
+    return img
+
+
+def geometria(xs, ys, w=3400, h=1200):
+    return {"xs": [x / w for x in xs], "ys": [y / h for y in ys]}
+
+
+def test_sin_plantilla_devuelve_none():
+    cache = GridTemplateCache()
+    assert cache.alinear(1, pagina(XS, YS)) is None
+    assert cache.resumen()["sin_plantilla"] == 1
+
+
+def test_reutiliza_plantilla_con_desplazamiento():
+    cache = GridTemplateCache()
+    cache.guardar(7, pagina(XS, YS), geometria(XS, YS))
+
+    alineada = cache.alinear(7, pagina(XS, YS, dx=25, dy=-12, semilla=3))
+    assert alineada is not None
+    geo, dx, dy = alineada
+    xs = [(x + dx) * 3400 for x in geo["xs"]]
+    ys = [(y + dy) * 1200 for y in geo["ys"]]
+    assert max(abs(a - (b + 25)) for a, b in zip(xs, XS)) <= 6
+    assert max(abs(a - (b - 12)) for a, b in zip(ys, YS)) <= 6
+    assert cache.resumen()["aciertos"] == 1
+
+
+def test_rechaza_pagina_con_otro_formato():
+    cache = GridTemplateCache()
+    cache.guardar(7, pagina(XS, YS), geometria(XS, YS))
+
+    otras_xs = [60, 400, 900, 1150, 1500, 2000, 2300, 2500, 2900, 3100, 3300]
+    otras_ys = [40, 300, 560, 820, 1080]
+    assert cache.alinear(7, pagina(otras_xs, otras_ys, semilla=5)) is None
+    assert cache.resumen()["rechazos"] == 1
+
+
+def test_lru_descarta_el_libro_menos_usado():
+    cache = GridTemplateCache(capacidad=2)
+    img = pagina(XS, YS)
+    for libro in (1, 2):
+        cache.guardar(libro, img, geometria(XS, YS))
+    assert cache.alinear(1, img) is not None
+    cache.guardar(3, img, geometria(XS, YS))
+
+    assert cache.alinear(2, img) is None
+    assert cache.alinear(1, img) is not None
+    assert cache.resumen()["libros"] == 2
@@ -0,0 +1,59 @@
+"""
+Tests de la caché local de objetos de MinIO
+"""
+
+import mmap
+
+from app.services.object_cache import CacheObjetos, es_inmutable
+
+
+def _descarga(contenido: bytes, llamadas: list):
+    def descargar(destino):
+        llamadas.append(contenido)
+        destino.write(contenido)
+    return descargar
+
+
+def test_segunda_lectura_sale_de_la_cache_mapeada(tmp_path):
+    cache = CacheObjetos(str(tmp_path), max_bytes=1024)
+    llamadas = []
+
+    primera = cache.leer("bucket/doc.pdf", "etag-1", _descarga(b"%PDF-1", llamadas))
+    segunda = cache.leer("bucket/doc.pdf", "etag-1", _descarga(b"%PDF-1", llamadas))
+    assert isinstance(segunda, mmap.mmap) and segunda[:] == primera[:] == b"%PDF-1"
+    assert len(llamadas) == 1
+
+    # Otro ETag es otra versión del objeto: se vuelve a descargar
+    cache.leer("bucket/doc.pdf", "etag-2", _descarga(b"%PDF-2", llamadas))
+    assert len(llamadas) == 2
+
+    estado = cache.estado()
+    assert (estado["aciertos"], estado["fallos"], estado["bytes_ahorrados"]) == (1, 2, 6)
+    assert estado["tasa_aciertos"] == 0.333
+
+
+def test_desaloja_los_menos_usados_al_pasar_el_limite(tmp_path):
+    cache = CacheObjetos(str(tmp_path), max_bytes=10)
+    llamadas = []
+    cache.leer("b/a", None, _descarga(b"a" * 4, llamadas))
+    cache.leer("b/b", None, _descarga(b"b" * 4, llamadas))
+    cache.leer("b/a", None, _descarga(b"a" * 4, llamadas))  # "a" pasa a ser el más reciente
+    cache.leer("b/c", None, _descarga(b"c" * 4, llamadas))  # no entra: se va "b"
+    assert llamadas == [b"a" * 4, b"b" * 4, b"c" * 4]
+    assert cache.estado()["bytes"] == 8
+
+    cache.leer("b/a", None, _descarga(b"a" * 4, llamadas))
+    cache.leer("b/b", None, _descarga(b"b" * 4, llamadas))
+    assert llamadas[-1] == b"b" * 4 and len(llamadas) == 4
+
+    # Un objeto más grande que la caché se devuelve pero no se conserva
+    assert cache.leer("b/grande", None, _descarga(b"g" * 20, llamadas))[:] == b"g" * 20
+    assert cache.estado()["bytes"] <= 10
+
+    # El índice se reconstruye desde el directorio al reiniciar
+    assert CacheObjetos(str(tmp_path), max_bytes=10).estado()["objetos"] == cache.estado()["objetos"]
+
+
+def test_objetos_por_contenido_son_inmutables():
+    assert es_inmutable("documents/sha256/ab/" + "ab" + "0" * 62 + ".pdf")
+    assert not es_inmutable("documents/20251019_120000_abcd1234.pdf")
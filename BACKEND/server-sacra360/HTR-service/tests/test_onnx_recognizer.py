@@ -0,0 +1,52 @@
+"""
+Tests de la exportación del reconocedor de EasyOCR a ONNX Runtime INT8
+"""
+
+import types
+
+import torch
+from easyocr.model import vgg_model
+
+from app.services import onnx_recognizer
+from app.services.onnx_recognizer import (
+    activar_backend_onnx, backend_activo, BACKEND_ONNX_INT8, BACKEND_TORCH_INT8
+)
+
+
+def _reader():
+    """Reader con la red de EasyOCR generation2 (chica y con pesos al azar)"""
+    torch.manual_seed(0)
+    red = vgg_model.Model(input_channel=1, output_channel=32, hidden_size=32, num_class=12).eval()
+    return types.SimpleNamespace(recognizer=red, model_lang='prueba', character='0123456789/', imgH=64)
+
+
+def test_exporta_con_lote_y_ancho_dinamicos(tmp_path):
+    reader = _reader()
+    original = reader.recognizer
+
+    assert activar_backend_onnx(reader, str(tmp_path)) is True
+    assert backend_activo() == BACKEND_ONNX_INT8
+
+    # Celdas de distinto ancho y lotes de varias imágenes, no solo la forma del ejemplo
+    for lote, ancho in ((1, 64), (3, 180), (2, 400)):
+        entrada = torch.rand(lote, 1, 64, ancho) * 2 - 1
+        with torch.no_grad():
+            esperado = original(entrada, None)
+        obtenido = reader.recognizer(entrada)
+        assert obtenido.shape == esperado.shape
+        assert (obtenido.argmax(-1) == esperado.argmax(-1)).float().mean() > 0.9
+
+    # La red del reader no se modifica para exportarla
+    assert isinstance(original.AdaptiveAvgPool, torch.nn.AdaptiveAvgPool2d)
+    assert not any(m.training for m in original.modules())
+
+
+def test_si_la_exportacion_falla_queda_torch_int8(tmp_path, monkeypatch):
+    def falla(reader, directorio):
+        raise RuntimeError("exportación rota")
+
+    monkeypatch.setattr(onnx_recognizer, 'exportar_modelo_int8', falla)
+    reader = _reader()
+
+    assert activar_backend_onnx(reader, str(tmp_path)) is False
+    assert backend_activo() == BACKEND_TORCH_INT8
@@ -0,0 +1,77 @@
+"""
+Tests del outbox de eventos y su relay
+"""
+
+import json
+from datetime import datetime
+
+from app.services.outbox import EVENTO_DOCUMENTO_PROCESADO, RelayOutbox, registrar_evento
+
+
+class ResultadoFalso:
+    def __init__(self, filas):
+        self.filas = filas
+
+    def fetchall(self):
+        return self.filas
+
+
+class SesionFalsa:
+    """Registra las sentencias; el SELECT del relay devuelve `pendientes`"""
+
+    def __init__(self, pendientes=()):
+        self.pendientes = list(pendientes)
+        self.sentencias = []
+        self.commits = 0
+
+    def execute(self, sentencia, params=None):
+        sql = " ".join(str(sentencia).split())
+        self.sentencias.append((sql, params or {}))
+        return ResultadoFalso(self.pendientes if sql.startswith("SELECT") else [])
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    def updates(self):
+        return [(sql, params) for sql, params in self.sentencias if sql.startswith("UPDATE")]
+
+
+def fila(id_evento, intentos=0):
+    return (id_evento, EVENTO_DOCUMENTO_PROCESADO, 7, "htr", {"modelo": "htr"}, datetime(2026, 10, 19), intentos)
+
+
+def test_registrar_evento_no_hace_commit():
+    db = SesionFalsa()
+    id_evento = registrar_evento(db, EVENTO_DOCUMENTO_PROCESADO, 7, {"total_tuplas": 10}, origen="htr")
+
+    sql, params = db.sentencias[0]
+    assert sql.startswith("INSERT INTO outbox_evento")
+    assert params["id_evento"] == id_evento and json.loads(params["payload"]) == {"total_tuplas": 10}
+    assert db.commits == 0
+
+
+def test_relay_marca_entregados_y_reprograma_fallidos():
+    db = SesionFalsa([fila("a"), fila("b", intentos=2)])
+    entregados = []
+
+    def entregar(evento):
+        if evento["id_evento"] == "b":
+            raise ConnectionError("documents-service caído")
+        entregados.append(evento)
+
+    relay = RelayOutbox(lambda: db, entregar, espera_base=5)
+    assert relay.procesar_pendientes() == 1
+
+    assert entregados[0]["documento_id"] == 7 and entregados[0]["payload"] == {"modelo": "htr"}
+    (ok_sql, ok_params), (fallo_sql, fallo_params) = db.updates()
+    assert "enviado_en = NOW()" in ok_sql and ok_params["id_evento"] == "a"
+    assert "proximo_intento" in fallo_sql and fallo_params["id_evento"] == "b"
+    # Espera exponencial: 5 * 2^2
+    assert fallo_params["espera"] == 20 and "caído" in fallo_params["error"]
+    assert db.commits == 1
@@ -0,0 +1,39 @@
+"""
+Tests de la publicación de eventos de progreso
+"""
+
+import json
+
+from app.services.progress_events import PublicadorProgreso, canal_progreso
+
+
+class RedisFalso:
+    def __init__(self, falla=False):
+        self.falla = falla
+        self.publicados = []
+
+    def publish(self, canal, mensaje):
+        if self.falla:
+            raise ConnectionError("redis caído")
+        self.publicados.append((canal, json.loads(mensaje)))
+
+
+def test_publica_evento_en_el_canal_del_documento():
+    publicador = PublicadorProgreso("redis://redis:6379", servicio="htr")
+    publicador._cliente = RedisFalso()
+
+    assert publicador.publicar(7, {"estado": "procesando_htr", "progreso": 40})
+    canal, evento = publicador._cliente.publicados[0]
+    assert canal == canal_progreso(7) == "sacra360:progreso:7"
+    assert evento["progreso"] == 40 and evento["documento_id"] == 7 and evento["servicio"] == "htr"
+
+
+def test_sin_redis_no_interrumpe_y_espera_para_reintentar():
+    assert not PublicadorProgreso("", servicio="htr").publicar(1, {"estado": "iniciando"})
+
+    publicador = PublicadorProgreso("redis://redis:6379", servicio="htr", reintento_s=60)
+    publicador._cliente = RedisFalso(falla=True)
+    assert not publicador.publicar(1, {"estado": "iniciando"})
+    publicador._cliente = RedisFalso()
+    assert not publicador.publicar(1, {"estado": "iniciando"})
+    assert publicador._cliente.publicados == []
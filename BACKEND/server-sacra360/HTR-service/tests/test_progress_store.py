@@ -0,0 +1,61 @@
+"""
+Tests del almacén de progreso compartido (modo en memoria, sin Redis)
+"""
+
+import time
+
+from app.services.progress_store import AlmacenProgreso
+
+
+def test_guardar_actualiza_solo_los_campos_recibidos():
+    almacen = AlmacenProgreso(None)
+    assert almacen.obtener(1) is None
+
+    almacen.guardar(1, {"estado": "en_cola", "progreso": 0, "modelo": "htr"})
+    almacen.guardar(1, {"estado": "procesando_htr", "progreso": 40})
+    progreso = almacen.obtener(1)
+    assert progreso["estado"] == "procesando_htr" and progreso["progreso"] == 40
+    assert progreso["modelo"] == "htr" and "actualizado" in progreso
+
+    # Lo devuelto es una copia: modificarlo no altera el almacén
+    progreso["progreso"] = 99
+    assert almacen.obtener(1)["progreso"] == 40
+
+    almacen.eliminar(1)
+    assert almacen.obtener(1) is None
+
+
+def test_las_entradas_vencen_y_se_purgan():
+    almacen = AlmacenProgreso(None, ttl=0.05)
+    almacen.guardar(1, {"estado": "completado"})
+    almacen.guardar(2, {"estado": "procesando_htr"})
+    time.sleep(0.06)
+    almacen.guardar(2, {"progreso": 50})  # renueva el TTL de 2 y purga 1
+
+    assert 1 not in almacen._memoria
+    assert almacen.obtener(1) is None
+    # 2 también había vencido: solo queda lo escrito después
+    assert almacen.obtener(2)["progreso"] == 50 and "estado" not in almacen.obtener(2)
+
+
+def test_sin_cliente_redis_usa_memoria():
+    # Redis configurado pero inaccesible (o sin la librería): no falla, usa memoria
+    almacen = AlmacenProgreso("redis://127.0.0.1:1/0", reintento_s=60)
+    almacen.guardar(3, {"estado": "iniciando"})
+    assert almacen.obtener(3)["estado"] == "iniciando"
+
+
+def test_obtener_varios_y_en_curso():
+    almacen = AlmacenProgreso(None)
+    almacen.guardar(1, {"estado": "en_cola", "progreso": 0})
+    almacen.guardar(2, {"estado": "procesando_htr", "progreso": 30})
+    almacen.guardar(3, {"estado": "completado", "progreso": 100})
+    almacen.guardar(1, {"progreso": 5})  # sin estado: no cambia su condición de en curso
+
+    varios = almacen.obtener_varios([3, 1, 99, 1])
+    assert sorted(varios) == [1, 3] and varios[3]["estado"] == "completado"
+    assert sorted(almacen.en_curso()) == [1, 2]
+
+    almacen.guardar(1, {"estado": "error"})
+    almacen.eliminar(2)
+    assert almacen.en_curso() == []
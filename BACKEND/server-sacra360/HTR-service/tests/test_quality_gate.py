@@ -0,0 +1,83 @@
+"""
+Tests del control de calidad de imagen previo al HTR
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.quality_gate import CalidadInsuficiente, EvaluadorCalidad, dpi_origen
+
+
+def pagina(semilla=0):
+    """Página sintética con grilla impresa y texto, con algo de ruido de escaneo"""
+    rng = np.random.default_rng(semilla)
+    img = (np.full((1400, 3000), 230.0) + rng.normal(0, 6, (1400, 3000))).clip(0, 255).astype(np.uint8)
+    for x in np.linspace(40, 2960, 11).astype(int):
+        cv2.line(img, (x, 60), (x, 1340), 50, 3)
+    for y in range(60, 1341, 80):
+        cv2.line(img, (40, y), (2960, y), 50, 3)
+        for x in np.linspace(50, 2700, 10).astype(int):
+            cv2.putText(img, "Juan 12", (x, y + 55), cv2.FONT_HERSHEY_SIMPLEX, 1.2, 30, 2)
+    return img
+
+
+def girar(img, grados):
+    h, w = img.shape
+    matriz = cv2.getRotationMatrix2D((w / 2, h / 2), grados, 1)
+    return cv2.warpAffine(img, matriz, (w, h), borderValue=230)
+
+
+def test_pagina_nitida_aprobada():
+    reporte = EvaluadorCalidad().evaluar(pagina())
+    assert reporte["aprobada"], reporte["motivos"]
+    assert abs(reporte["metricas"]["inclinacion"]) <= 0.1
+
+
+def test_rechaza_pagina_borrosa():
+    reporte = EvaluadorCalidad().evaluar(cv2.GaussianBlur(pagina(), (0, 0), 5))
+    assert not reporte["aprobada"]
+    assert any(m.startswith("borrosa") for m in reporte["motivos"])
+
+
+def test_rechaza_pagina_lavada():
+    lavada = (pagina().astype(np.float32) * 0.2 + 195).astype(np.uint8)
+    reporte = EvaluadorCalidad().evaluar(lavada)
+    assert any(m.startswith("bajo contraste") for m in reporte["motivos"])
+
+
+def test_mide_inclinacion_y_la_endereza():
+    evaluador = EvaluadorCalidad()
+    inclinada = girar(pagina(), 7)
+    reporte = evaluador.evaluar(inclinada)
+    assert any(m.startswith("inclinada") for m in reporte["motivos"])
+    assert abs(abs(reporte["metricas"]["inclinacion"]) - 7) <= 0.2
+
+    enderezada = girar(inclinada, reporte["metricas"]["inclinacion"])
+    assert abs(evaluador.inclinacion(enderezada)) <= 0.2
+
+
+def test_dpi_bajo_y_desconocido():
+    reporte = EvaluadorCalidad(min_dpi=200).evaluar(pagina(), dpi=96)
+    assert any(m.startswith("resolución baja") for m in reporte["motivos"])
+    assert dpi_origen(b"no es una imagen", es_pdf=False) is None
+
+
+def test_excepcion_lleva_el_reporte():
+    reporte = EvaluadorCalidad().evaluar(cv2.GaussianBlur(pagina(), (0, 0), 5))
+    with pytest.raises(CalidadInsuficiente) as error:
+        raise CalidadInsuficiente(reporte)
+    assert error.value.reporte is reporte
+    assert "borrosa" in str(error.value)
+
+
+def test_controlar_segun_modo():
+    evaluador = EvaluadorCalidad()
+    borrosa = cv2.GaussianBlur(pagina(), (0, 0), 5)
+    recibidos = []
+
+    assert evaluador.controlar(borrosa, modo="off", callback=recibidos.append) is None
+    assert evaluador.controlar(borrosa, modo="flag", callback=recibidos.append)["modo"] == "flag"
+    with pytest.raises(CalidadInsuficiente):
+        evaluador.controlar(borrosa, modo="reject", callback=recibidos.append)
+    assert [r["modo"] for r in recibidos] == ["flag", "reject"]
@@ -0,0 +1,64 @@
+"""
+Tests del registro de motores de reconocimiento
+"""
+
+import numpy as np
+
+from app.services.recognition_engines import (
+    MotorReconocimiento, RegistroMotores, estadisticas_motores, parsear_forzados
+)
+
+
+class MotorFalso(MotorReconocimiento):
+    def __init__(self, nombre, costo, solo_digitos=False, texto="", falla=False):
+        self.nombre = nombre
+        self.costo = costo
+        self.solo_digitos = solo_digitos
+        self.texto = texto
+        self.falla = falla
+
+    def reconocer(self, imagen, allowlist=None):
+        if self.falla:
+            raise RuntimeError("motor roto")
+        return self.texto
+
+
+def crear_registro(tabla, forzados=None):
+    registro = RegistroMotores({'date'}, tabla_precision=tabla, precision_minima=0.9, forzados=forzados)
+    registro.registrar(MotorFalso("easyocr", 30, texto="easy"))
+    registro.registrar(MotorFalso("digitos", 5, solo_digitos=True, texto="12"))
+    registro.registrar(MotorFalso("tesseract", 10, texto="tess"))
+    return registro
+
+
+def test_sin_tabla_usa_motor_default():
+    registro = crear_registro({})
+    assert registro.seleccionar('date').nombre == "easyocr"
+    assert registro.seleccionar('text').nombre == "easyocr"
+
+
+def test_elige_el_mas_barato_que_cumple_precision():
+    tabla = {
+        'date': {'easyocr': 0.95, 'digitos': 0.93, 'tesseract': 0.97},
+        'text': {'easyocr': 0.92, 'digitos': 0.99, 'tesseract': 0.80},
+    }
+    registro = crear_registro(tabla)
+    assert registro.seleccionar('date').nombre == "digitos"
+    # Un motor solo de dígitos nunca se usa en columnas de texto
+    assert registro.seleccionar('text').nombre == "easyocr"
+
+
+def test_motor_forzado_por_tipo():
+    registro = crear_registro({}, forzados=parsear_forzados("date=tesseract"))
+    assert registro.seleccionar('date').nombre == "tesseract"
+
+
+def test_fallo_vuelve_al_default_y_registra_tiempos():
+    registro = RegistroMotores({'date'}, forzados={'date': 'roto'})
+    registro.registrar(MotorFalso("easyocr", 30, texto="easy"))
+    registro.registrar(MotorFalso("roto", 1, solo_digitos=True, falla=True))
+
+    assert registro.reconocer(np.zeros((10, 10), np.uint8), 'date') == "easy"
+    resumen = estadisticas_motores.resumen()
+    assert resumen["roto"]["errores"] >= 1
+    assert resumen["easyocr"]["por_tipo"]["date"] >= 1
@@ -0,0 +1,205 @@
+"""
+Entrenamiento y benchmark del clasificador de dígitos (columnas de fecha HTR)
+
+Fuentes de datos:
+  --desde-bd     Tuplas validadas (ocr_resultado.validado = true) de documentos HTR.
+                 Se vuelve a procesar cada página para recuperar las celdas de
+                 fecha de cada tupla y se usa el valor validado como etiqueta.
+  --sintetico N  N celdas sintéticas (fuentes Hershey) para arrancar sin datos.
+
+Uso:
+    python train_digit_classifier.py --desde-bd --sintetico 3000
+    python train_digit_classifier.py --desde-bd --benchmark --actualizar-tabla
+
+El modelo se guarda en HTR_DIGIT_MODEL_PATH (default ./models/digitos_mlp.npz).
+Con --benchmark se compara precisión y ms por celda contra los motores EasyOCR
+sobre las celdas reales de validación; --actualizar-tabla escribe los
+resultados en RECOGNITION_ACCURACY_TABLE para la selección de motores.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+# Agregar el directorio app al path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'app'))
+
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from utils.config import settings
+from services.digit_classifier import (
+    ClasificadorDigitos, MotorDigitosMLP, MOTOR_MLP_DIGITOS,
+    dataset_desde_celdas, generar_celdas_sinteticas, segmentar_digitos
+)
+from services.recognition_engines import MOTOR_EASYOCR, MOTOR_EASYOCR_DIGITOS, DIGITOS, ReconocimientoIncierto
+
+# Columnas 'date' de HybridHTRProcessor.FIXED_PATTERN
+COLUMNAS_FECHA = [1, 2, 3, 5, 6, 7]
+
+
+def ruta_en_bucket(imagen_url: str) -> str:
+    """Path del objeto dentro del bucket (misma lógica que HTRController)"""
+    for bucket in ('/sacra360-documents/', '/sacra360-htr/'):
+        if bucket in imagen_url:
+            return imagen_url.split(bucket)[-1]
+    partes = imagen_url.split('/')
+    return '/'.join(partes[4:]) if len(partes) > 4 else partes[-1]
+
+
+def celdas_desde_bd(processor, max_documentos: int):
+    """Celdas de fecha preprocesadas con su valor validado"""
+    from sqlalchemy import create_engine, text
+    from services.minio_service import MinIOService
+
+    engine = create_engine(settings.database_url)
+    with engine.connect() as conn:
+        filas = conn.execute(text("""
+            SELECT o.documento_id, o.tupla_numero, o.datos_ocr, d.imagen_url, d.nombre_archivo
+            FROM ocr_resultado o
+            JOIN documento_digitalizado d ON d.id_documento = o.documento_id
+            WHERE o.validado = true AND o.fuente_modelo = 'HTR_Sacra360'
+            ORDER BY o.documento_id, o.tupla_numero
+        """)).fetchall()
+
+    documentos = defaultdict(dict)
+    archivos = {}
+    for doc_id, tupla, datos, imagen_url, nombre in filas:
+        documentos[doc_id][tupla] = datos if isinstance(datos, dict) else json.loads(datos)
+        archivos[doc_id] = (imagen_url, nombre)
+
+    minio_service = MinIOService()
+    celdas = []
+    for doc_id in list(documentos)[:max_documentos]:
+        imagen_url, nombre = archivos[doc_id]
+        print(f"📄 Documento {doc_id}: {nombre} ({len(documentos[doc_id])} tuplas validadas)")
+        contenido = minio_service.download_file(ruta_en_bucket(imagen_url))
+        validadas = documentos[doc_id]
+
+        def guardar_celda(tupla, columna, celda):
+            if tupla in validadas and columna in COLUMNAS_FECHA:
+                valor = validadas[tupla].get(f"col_{columna}")
+                procesada = processor.ocr_engine.preprocess_cell(celda)
+                if valor and procesada is not None:
+                    celdas.append((procesada, str(valor)))
+
+        if nombre.lower().endswith('.pdf'):
+            processor.process_pdf(contenido, cell_callback=guardar_celda)
+        else:
+            img = cv2.imdecode(np.frombuffer(contenido, np.uint8), cv2.IMREAD_COLOR)
+            processor.process_image(img, cell_callback=guardar_celda)
+
+    return celdas
+
+
+def evaluar(nombre, reconocer, celdas):
+    """Precisión por celda (secuencia completa) y ms por celda"""
+    aciertos, inciertos = 0, 0
+    inicio = time.perf_counter()
+    for imagen, etiqueta in celdas:
+        esperado = "".join(c for c in etiqueta if c.isdigit())
+        try:
+            leido = "".join(c for c in reconocer(imagen) if c.isdigit())
+        except ReconocimientoIncierto:
+            inciertos += 1
+            continue
+        aciertos += int(leido == esperado)
+    segundos = time.perf_counter() - inicio
+    return {
+        'motor': nombre,
+        'precision': aciertos / len(celdas) if celdas else 0.0,
+        'inciertos': inciertos,
+        'ms_por_celda': 1000 * segundos / len(celdas) if celdas else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entrena el clasificador de dígitos HTR")
+    parser.add_argument('--desde-bd', action='store_true')
+    parser.add_argument('--max-documentos', type=int, default=50)
+    parser.add_argument('--sintetico', type=int, default=0)
+    parser.add_argument('--epocas', type=int, default=20)
+    parser.add_argument('--validacion', type=float, default=0.2)
+    parser.add_argument('--salida', default=settings.htr_digit_model_path)
+    parser.add_argument('--benchmark', action='store_true', help="Comparar contra EasyOCR")
+    parser.add_argument('--actualizar-tabla', action='store_true')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    reales, processor = [], None
+    if args.desde_bd or args.benchmark:
+        from services.htr_processor import HybridHTRProcessor
+        processor = HybridHTRProcessor()
+    if args.desde_bd:
+        reales = celdas_desde_bd(processor, args.max_documentos)
+        print(f"✅ {len(reales)} celdas de fecha validadas")
+
+    # Validación solo con celdas reales (si hay); las sintéticas van todas a entrenamiento
+    orden = rng.permutation(len(reales))
+    corte = int(len(reales) * args.validacion)
+    validacion = [reales[i] for i in orden[:corte]]
+    entrenamiento = [reales[i] for i in orden[corte:]] + generar_celdas_sinteticas(args.sintetico)
+    if not validacion:
+        validacion = generar_celdas_sinteticas(max(200, args.sintetico // 5), semilla=1)
+
+    X, y = dataset_desde_celdas(entrenamiento)
+    if len(X) == 0:
+        print("❌ Sin datos de entrenamiento (usar --desde-bd y/o --sintetico N)")
+        sys.exit(1)
+    print(f"🧠 Entrenando con {len(X)} glifos de {len(entrenamiento)} celdas...")
+
+    modelo = ClasificadorDigitos()
+    inicio = time.perf_counter()
+    perdidas = modelo.entrenar(X, y, epocas=args.epocas)
+    print(f"   pérdida final {perdidas[-1]:.4f} ({time.perf_counter() - inicio:.1f}s)")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+    modelo.guardar(args.salida)
+    print(f"💾 Modelo guardado en {args.salida}")
+
+    segmentadas = sum(
+        len(segmentar_digitos(img)) == len([c for c in etq if c.isdigit()]) for img, etq in validacion
+    )
+    print(f"✂️  Segmentación correcta: {segmentadas}/{len(validacion)} celdas")
+
+    motor = MotorDigitosMLP(modelo, umbral=settings.htr_digit_min_confidence)
+    resultados = [
+        evaluar(f"{MOTOR_MLP_DIGITOS} (sin umbral)", lambda img: modelo.predecir(segmentar_digitos(img))[0], validacion),
+        evaluar(MOTOR_MLP_DIGITOS, motor.reconocer, validacion),
+    ]
+
+    if args.benchmark and processor is not None:
+        registro = processor.ocr_engine.motores
+        for nombre in (MOTOR_EASYOCR_DIGITOS, MOTOR_EASYOCR):
+            m = registro._motores[nombre]
+            resultados.append(evaluar(nombre, lambda img, m=m: m.reconocer(img, DIGITOS), validacion))
+
+    print("\n| Motor | Precisión por celda | Inciertos | ms/celda |")
+    print("|---|---|---|---|")
+    for r in resultados:
+        print(f"| {r['motor']} | {100 * r['precision']:.1f}% | {r['inciertos']} | {r['ms_por_celda']:.2f} |")
+
+    if args.actualizar_tabla:
+        if not reales:
+            print("⚠️  La tabla de precisión solo se actualiza con celdas reales (--desde-bd)")
+            return
+        ruta = settings.recognition_accuracy_table
+        tabla = json.load(open(ruta, encoding='utf-8')) if os.path.exists(ruta) else {}
+        fecha = tabla.setdefault('date', {})
+        for r in resultados:
+            if r['motor'] in (MOTOR_MLP_DIGITOS, MOTOR_EASYOCR_DIGITOS, MOTOR_EASYOCR):
+                fecha[r['motor']] = round(r['precision'], 4)
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(tabla, f, indent=2)
+        print(f"💾 Tabla de precisión actualizada: {ruta}")
+
+
+if __name__ == "__main__":
+    main()
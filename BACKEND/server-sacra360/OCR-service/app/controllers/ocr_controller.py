@@ -4,19 +4,50 @@ OCR Controller - Lógica de negocio para procesamiento OCR
 
 from fastapi import UploadFile, HTTPException
 from typing import Dict, Any, Optional
+import json
 import logging
+import time
+import uuid
 from datetime import datetime
 import io
 import requests
+from sqlalchemy import text
 
 from ..services.ocr_v2_processor import OcrV2Processor
+from ..services.quality_gate import CalidadInsuficiente
 from ..services.database_service import DatabaseService
 from ..services.minio_service import MinioService
+from ..services.progress_events import PublicadorProgreso
+from ..services.progress_store import AlmacenProgreso
+from ..services.outbox import EVENTO_DOCUMENTO_PROCESADO, registrar_evento
+from ..services.admission import ControlAdmision
+from ..utils.config import settings
 
 logger = logging.getLogger(__name__)
 
-# Diccionario global para tracking de progreso
-progress_tracker = {}
+# Progreso por documento, compartido entre workers y servicios (Redis con TTL)
+almacen_progreso = AlmacenProgreso(settings.redis_url, ttl=settings.progress_ttl_seconds)
+
+# Eventos de progreso para Documents-service (SSE), vía Redis pub/sub
+publicador_progreso = PublicadorProgreso(settings.redis_url, servicio='ocr')
+
+
+def reportar_progreso(documento_id: int, estado: Dict[str, Any]):
+    """Guarda el progreso en el almacén compartido y lo publica para los clientes suscritos"""
+    almacen_progreso.guardar(documento_id, dict(estado, modelo='ocr'))
+    publicador_progreso.publicar(documento_id, estado)
+
+
+# Documentos (o subidas directas) procesándose en este proceso e identificador del proceso (para checkpoints)
+trabajos_activos = set()
+INSTANCIA = uuid.uuid4().hex
+
+# Rechaza trabajos nuevos con el proceso lleno o sin memoria (503 + Retry-After)
+control_admision = ControlAdmision(
+    max_trabajos=settings.max_trabajos_simultaneos,
+    max_rss_mb=settings.max_rss_mb,
+    retry_after=settings.admision_retry_after
+)
 
 
 class OcrController:
@@ -44,6 +75,14 @@ class OcrController:
         Returns:
             Dict con resultado del procesamiento
         """
+        motivo = control_admision.motivo_rechazo(len(trabajos_activos))
+        if motivo:
+            logger.warning(f"🚦 Archivo {file.filename} rechazado: {motivo}")
+            raise HTTPException(status_code=503, detail=motivo,
+                                headers={"Retry-After": str(control_admision.retry_after)})
+        # Las subidas directas no tienen documento_id todavía: cuentan con un identificador propio
+        trabajo = f"subida:{uuid.uuid4().hex}"
+        trabajos_activos.add(trabajo)
         try:
             logger.info("=" * 70)
             logger.info(f"📄 Procesando documento: {file.filename}")
@@ -113,6 +152,12 @@ class OcrController:
         
         except HTTPException:
             raise
+        except CalidadInsuficiente as e:
+            logger.warning(f"📷 Documento rechazado por calidad: {', '.join(e.reporte['motivos'])}")
+            raise HTTPException(
+                status_code=422,
+                detail={'mensaje': 'Calidad de imagen insuficiente', 'calidad': e.reporte}
+            )
         except Exception as e:
             logger.error(f"❌ Error en procesamiento: {e}")
             import traceback
@@ -121,6 +166,8 @@ class OcrController:
                 status_code=500,
                 detail=f"Error al procesar documento: {str(e)}"
             )
+        finally:
+            trabajos_activos.discard(trabajo)
     
     async def obtener_resultados(self, documento_id: int) -> Optional[Dict[str, Any]]:
         """
@@ -161,23 +208,30 @@ class OcrController:
         Returns:
             Dict con resultado del procesamiento
         """
+        if documento_id in trabajos_activos:
+            raise HTTPException(status_code=409, detail=f"El documento {documento_id} ya se está procesando")
+        motivo = control_admision.motivo_rechazo(len(trabajos_activos))
+        if motivo:
+            logger.warning(f"🚦 Documento {documento_id} rechazado: {motivo}")
+            raise HTTPException(status_code=503, detail=motivo,
+                                headers={"Retry-After": str(control_admision.retry_after)})
+        trabajos_activos.add(documento_id)
         try:
             logger.info("=" * 70)
             logger.info(f"📄 Procesando documento desde BD: ID={documento_id}")
             logger.info("=" * 70)
             
             # Actualizar progreso: iniciando
-            progress_tracker[documento_id] = {
+            reportar_progreso(documento_id, {
                 'estado': 'iniciando',
                 'progreso': 5,
                 'mensaje': 'Iniciando procesamiento...',
                 'etapa': 'init'
-            }
+            })
             
             # 1. Obtener documento de BD
-            from sqlalchemy import text
             query = text("""
-                SELECT id_documento, nombre_archivo, imagen_url, tipo_sacramento
+                SELECT id_documento, nombre_archivo, imagen_url, tipo_sacramento, libros_id
                 FROM documento_digitalizado
                 WHERE id_documento = :doc_id
             """)
@@ -186,16 +240,21 @@ class OcrController:
             if not result:
                 raise HTTPException(status_code=404, detail=f"Documento {documento_id} no encontrado en BD")
             
-            doc_id, nombre_archivo, archivo_url, tipo_sacramento = result
+            doc_id, nombre_archivo, archivo_url, tipo_sacramento, libro_id = result
             logger.info(f"📄 Documento encontrado: {nombre_archivo}")
             
+            # Reanudar desde el último checkpoint (reinicio del contenedor o reintento por timeout)
+            checkpoint = self._cargar_checkpoint(documento_id, archivo_url)
+            if not checkpoint:
+                self._descartar_tuplas_no_listas(documento_id)
+            
             # Actualizar progreso: descargando
-            progress_tracker[documento_id] = {
+            reportar_progreso(documento_id, {
                 'estado': 'descargando',
                 'progreso': 15,
                 'mensaje': 'Descargando archivo desde MinIO...',
                 'etapa': 'download'
-            }
+            })
             
             # 2. Descargar archivo de MinIO
             logger.info(f"☁️  Descargando desde: {archivo_url}")
@@ -203,12 +262,12 @@ class OcrController:
             logger.info(f"✅ Archivo descargado: {len(contenido)} bytes")
             
             # Actualizar progreso: procesando OCR
-            progress_tracker[documento_id] = {
+            reportar_progreso(documento_id, {
                 'estado': 'procesando_ocr',
                 'progreso': 25,
                 'mensaje': 'Extrayendo texto con OCR V2... (esto puede tardar varios minutos)',
                 'etapa': 'ocr'
-            }
+            })
             
             # 3. Determinar tipo de archivo
             es_pdf = nombre_archivo.lower().endswith('.pdf')
@@ -222,13 +281,13 @@ class OcrController:
                 progreso_ocr = 25 + int((celda_actual / total_celdas) * 55)
                 mensaje = f'Procesadas {celda_actual}/{total_celdas} celdas'
                 
-                # Actualizar en memoria
-                progress_tracker[documento_id] = {
+                # Actualizar en el almacén compartido y publicar
+                reportar_progreso(documento_id, {
                     'estado': 'procesando_ocr',
                     'progreso': progreso_ocr,
                     'mensaje': mensaje,
                     'etapa': 'ocr'
-                }
+                })
                 
                 # Actualizar en BD para persistencia
                 try:
@@ -248,83 +307,87 @@ class OcrController:
                 except Exception as e:
                     logger.warning(f"⚠️ No se pudo guardar progreso en BD: {e}")
             
+            def guardar_tupla(tupla_numero, tupla, bbox_celdas=None):
+                """Publica la tupla apenas el validador de patrón la confirma"""
+                try:
+                    self._insertar_tupla(documento_id, tupla_numero, tupla,
+                                         listo=settings.stream_partial_results, bbox_celdas=bbox_celdas)
+                    self.db.commit()
+                except Exception:
+                    self.db.rollback()
+                    raise
+            
             resultado_ocr = self.ocr_processor.procesar_documento_completo(
                 archivo_bytes=contenido,
                 es_pdf=es_pdf,
-                progress_callback=actualizar_progreso_ocr
+                progress_callback=actualizar_progreso_ocr,
+                libro_id=libro_id,
+                reanudar=checkpoint['estado'] if checkpoint else None,
+                checkpoint_callback=lambda estado: self._guardar_checkpoint(documento_id, archivo_url, estado),
+                tupla_callback=guardar_tupla,
+                calidad_callback=lambda reporte: self._guardar_calidad(documento_id, reporte)
             )
             
             if resultado_ocr['estado'] != 'success':
-                progress_tracker[documento_id] = {
+                # El procesador devuelve el error (sin tabla, falla al guardar una tupla...):
+                # misma falla definitiva que el except genérico, sin checkpoint y con 500
+                mensaje = f"Error en OCR: {resultado_ocr.get('mensaje', 'Error desconocido')}"
+                logger.error(f"❌ {mensaje}")
+                self._marcar_error(documento_id, mensaje)
+                reportar_progreso(documento_id, {
                     'estado': 'error',
                     'progreso': 100,
-                    'mensaje': f"Error en OCR: {resultado_ocr.get('mensaje', 'Error desconocido')}",
+                    'mensaje': mensaje,
                     'etapa': 'error'
-                }
-                logger.error(f"❌ Error en OCR: {resultado_ocr.get('mensaje')}")
-                return {
-                    'estado': 'error',
-                    'mensaje': resultado_ocr.get('mensaje', 'Error en procesamiento OCR'),
-                    'total_tuplas': 0
-                }
+                })
+                raise HTTPException(status_code=500, detail=mensaje)
             
             logger.info(f"✅ OCR completado: {resultado_ocr['total_tuplas']} tuplas extraídas")
             
             # Actualizar progreso: guardando
-            progress_tracker[documento_id] = {
+            reportar_progreso(documento_id, {
                 'estado': 'guardando',
                 'progreso': 85,
                 'mensaje': f'Guardando {resultado_ocr["total_tuplas"]} tuplas en base de datos...',
                 'etapa': 'save'
-            }
-            
-            # 5. Actualizar BD con resultados OCR
-            logger.info("💾 Guardando resultados en PostgreSQL...")
+            })
             
-            # Guardar tuplas en ocr_resultado
-            import json
-            for idx, tupla in enumerate(resultado_ocr['tuplas'], start=1):
-                # tupla es una lista simple: ['val1', 'val2', 'val3', ...]
-                # Convertir a formato JSONB con nombres de columnas
-                datos_ocr = {
-                    f"col_{i}": valor 
-                    for i, valor in enumerate(tupla)
-                }
-                
-                insert_query = text("""
-                    INSERT INTO ocr_resultado 
-                    (documento_id, tupla_numero, datos_ocr, confianza, fuente_modelo, validado, estado_validacion)
-                    VALUES 
-                    (:doc_id, :tupla_num, CAST(:datos AS jsonb), :confianza, :modelo, false, 'pendiente')
-                """)
-                
-                self.db.execute(insert_query, {
-                    "doc_id": documento_id,
-                    "tupla_num": idx,
-                    "datos": json.dumps(datos_ocr),
-                    "confianza": 0.85,  # Confianza promedio de EasyOCR
-                    "modelo": 'OCR_V2_EasyOCR'
-                })
+            # 5. Las tuplas ya se guardaron a medida que se confirmaban: marcarlas como listas
+            self.db.execute(text("""
+                UPDATE ocr_resultado
+                SET listo = true
+                WHERE documento_id = :doc_id AND listo = false
+            """), {"doc_id": documento_id})
             
-            # Actualizar estado del documento
+            # Actualizar estado del documento y descartar el checkpoint
             update_query = text("""
                 UPDATE documento_digitalizado
                 SET estado_procesamiento = 'ocr_completado',
-                    fecha_procesamiento = NOW()
+                    fecha_procesamiento = NOW(),
+                    checkpoint_procesamiento = NULL
                 WHERE id_documento = :doc_id
             """)
             self.db.execute(update_query, {"doc_id": documento_id})
             
+            # Evento para Documents-service en la misma transacción (outbox)
+            registrar_evento(self.db, EVENTO_DOCUMENTO_PROCESADO, documento_id, {
+                'modelo': 'ocr',
+                'estado_procesamiento': 'ocr_completado',
+                'total_tuplas': resultado_ocr['total_tuplas'],
+                'libro_id': libro_id,
+                'tipo_sacramento': tipo_sacramento
+            }, origen='ocr')
+            
             self.db.commit()
             logger.info(f"✅ Resultados guardados en BD")
             
             # Actualizar progreso: completado
-            progress_tracker[documento_id] = {
+            reportar_progreso(documento_id, {
                 'estado': 'completado',
                 'progreso': 100,
                 'mensaje': f'Procesamiento completado: {resultado_ocr["total_tuplas"]} tuplas extraídas',
                 'etapa': 'completed'
-            }
+            })
             
             logger.info("=" * 70)
             logger.info("✅ PROCESAMIENTO COMPLETADO EXITOSAMENTE")
@@ -340,28 +403,228 @@ class OcrController:
         
         except HTTPException:
             raise
+        except CalidadInsuficiente as e:
+            # Página rechazada antes del OCR: no se reintenta, hay que reescanear
+            logger.warning(f"📷 Documento {documento_id} rechazado por calidad: {', '.join(e.reporte['motivos'])}")
+            mensaje = f"Reescanear: {', '.join(e.reporte['motivos'])}"
+            self.db.execute(text("""
+                UPDATE documento_digitalizado
+                SET estado_procesamiento = 'rechazado_calidad',
+                    mensaje_progreso = :mensaje,
+                    checkpoint_procesamiento = NULL
+                WHERE id_documento = :doc_id
+            """), {"doc_id": documento_id, "mensaje": mensaje})
+            self.db.commit()
+            
+            reportar_progreso(documento_id, {
+                'estado': 'error',
+                'progreso': 100,
+                'mensaje': mensaje,
+                'etapa': 'error'
+            })
+            
+            raise HTTPException(
+                status_code=422,
+                detail={'mensaje': 'Calidad de imagen insuficiente', 'calidad': e.reporte}
+            )
         except Exception as e:
             logger.error(f"❌ Error en procesamiento desde BD: {e}")
             import traceback
             traceback.print_exc()
             
+            # Documents-service no reenvía un 500: la falla es definitiva y el documento
+            # no debe seguir figurando en curso (checkpoint) para poder validarse
+            self._marcar_error(documento_id, f'Error: {str(e)}')
+            
             # Actualizar progreso: error
-            progress_tracker[documento_id] = {
+            reportar_progreso(documento_id, {
                 'estado': 'error',
                 'progreso': 100,
                 'mensaje': f'Error: {str(e)}',
                 'etapa': 'error'
-            }
+            })
             
             raise HTTPException(
                 status_code=500,
                 detail=f"Error al procesar documento: {str(e)}"
             )
+        
+        finally:
+            trabajos_activos.discard(documento_id)
+    
+    def _cargar_checkpoint(self, documento_id: int, archivo_url: str) -> Optional[Dict[str, Any]]:
+        """
+        Checkpoint OCR del documento, si corresponde al mismo archivo.
+
+        Si el checkpoint pertenece a otro proceso y se actualizó hace poco, ese
+        trabajo probablemente sigue vivo (otro worker) y se rechaza con 409.
+        """
+        fila = self.db.execute(text("""
+            SELECT checkpoint_procesamiento FROM documento_digitalizado WHERE id_documento = :doc_id
+        """), {"doc_id": documento_id}).fetchone()
+        checkpoint = fila[0] if fila else None
+        if isinstance(checkpoint, str):
+            checkpoint = json.loads(checkpoint)
+        if not checkpoint or checkpoint.get('modelo') != 'ocr' or checkpoint.get('archivo') != archivo_url:
+            return None
+
+        antiguedad = time.time() - checkpoint.get('actualizado', 0)
+        if checkpoint.get('instancia') != INSTANCIA and antiguedad < settings.checkpoint_heartbeat_timeout:
+            raise HTTPException(
+                status_code=409,
+                detail=f"El documento {documento_id} se está procesando en otro worker (checkpoint hace {antiguedad:.0f}s)"
+            )
+        logger.info(f"⏯️ Checkpoint encontrado: {len(checkpoint['estado']['textos'])} celdas ya reconocidas")
+        return checkpoint
+
+    def _marcar_error(self, documento_id: int, mensaje: str):
+        """Falla sin reanudación: estado 'error' y sin checkpoint"""
+        try:
+            self.db.rollback()
+            self.db.execute(text("""
+                UPDATE documento_digitalizado
+                SET estado_procesamiento = 'error',
+                    mensaje_progreso = :mensaje,
+                    checkpoint_procesamiento = NULL
+                WHERE id_documento = :doc_id
+            """), {"doc_id": documento_id, "mensaje": mensaje[:500]})
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.warning(f"⚠️ No se pudo marcar el documento {documento_id} con error: {e}")
+
+    def _guardar_checkpoint(self, documento_id: int, archivo_url: str, estado: Dict[str, Any]):
+        """Persiste las celdas reconocidas hasta ahora (se llama al completar cada fila)"""
+        checkpoint = {
+            'modelo': 'ocr',
+            'archivo': archivo_url,
+            'instancia': INSTANCIA,
+            'actualizado': time.time(),
+            'estado': estado,
+        }
+        try:
+            self.db.execute(text("""
+                UPDATE documento_digitalizado
+                SET checkpoint_procesamiento = CAST(:checkpoint AS jsonb)
+                WHERE id_documento = :doc_id
+            """), {"doc_id": documento_id, "checkpoint": json.dumps(checkpoint)})
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.warning(f"⚠️ No se pudo guardar checkpoint: {e}")
+    
+    def _guardar_calidad(self, documento_id: int, reporte: Dict[str, Any]):
+        """Guarda las métricas del control de calidad de la página junto al documento"""
+        try:
+            self.db.execute(text("""
+                UPDATE documento_digitalizado
+                SET calidad_imagen = CAST(:calidad AS jsonb)
+                WHERE id_documento = :doc_id
+            """), {"doc_id": documento_id, "calidad": json.dumps(reporte)})
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.warning(f"⚠️ No se pudo guardar la calidad de imagen: {e}")
+    
+    def _descartar_tuplas_no_listas(self, documento_id: int):
+        """Borra tuplas no publicadas de un trabajo interrumpido sin checkpoint utilizable"""
+        self.db.execute(text("""
+            DELETE FROM ocr_resultado
+            WHERE documento_id = :doc_id AND listo = false
+        """), {"doc_id": documento_id})
+        self.db.commit()
+
+    def _insertar_tupla(self, documento_id: int, tupla_numero: int, tupla, listo: bool,
+                        bbox_celdas: Optional[Dict[str, Any]] = None):
+        """
+        Inserta una tupla ['val1', 'val2', ...] como JSONB con nombres de columnas.
+
+        Al reanudar, el validador vuelve a confirmar las tuplas anteriores a la
+        interrupción; las que ya están guardadas (quizás ya validadas) no se tocan.
+        bbox_celdas guarda la caja de cada celda para re-reconocerla (reconocer_tupla).
+        """
+        datos_ocr = {
+            f"col_{i}": valor
+            for i, valor in enumerate(tupla)
+        }
+        self.db.execute(text("""
+            INSERT INTO ocr_resultado
+            (documento_id, tupla_numero, datos_ocr, confianza, fuente_modelo, validado, estado_validacion, listo,
+             bbox_celdas)
+            SELECT :doc_id, :tupla_num, CAST(:datos AS jsonb), :confianza, :modelo, false, 'pendiente', :listo,
+                   CAST(:bbox AS jsonb)
+            WHERE NOT EXISTS (
+                SELECT 1 FROM ocr_resultado WHERE documento_id = :doc_id AND tupla_numero = :tupla_num
+            )
+        """), {
+            "doc_id": documento_id,
+            "tupla_num": tupla_numero,
+            "datos": json.dumps(datos_ocr),
+            "confianza": 0.85,  # Confianza promedio de EasyOCR
+            "modelo": 'OCR_V2_EasyOCR',
+            "listo": listo,
+            "bbox": json.dumps(bbox_celdas) if bbox_celdas else None
+        })
+    
+    def reconocer_tupla(self, documento_id: int, tupla_numero: int, columna: Optional[int] = None,
+                        dpi: Optional[int] = None, motor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Vuelve a reconocer una tupla (o una de sus celdas) con las cajas guardadas en
+        bbox_celdas y actualiza solo esa fila de ocr_resultado. Tarda lo que tarda
+        rasterizar la página y leer unas pocas celdas, no el documento completo.
+        """
+        fila = self.db.execute(text("""
+            SELECT r.id_ocr, r.datos_ocr, r.bbox_celdas, r.validado, d.nombre_archivo, d.imagen_url
+            FROM ocr_resultado r
+            JOIN documento_digitalizado d ON d.id_documento = r.documento_id
+            WHERE r.documento_id = :doc_id AND r.tupla_numero = :tupla_num
+        """), {"doc_id": documento_id, "tupla_num": tupla_numero}).fetchone()
+        if not fila:
+            raise HTTPException(status_code=404, detail=f"Tupla {tupla_numero} del documento {documento_id} no encontrada")
+        id_ocr, datos_ocr, bbox, validado, nombre_archivo, archivo_url = fila
+        if validado:
+            raise HTTPException(status_code=409, detail=f"La tupla {tupla_numero} ya fue validada")
+        if not bbox:
+            raise HTTPException(
+                status_code=422,
+                detail="La tupla no tiene regiones guardadas (procesada antes de bbox_celdas); reprocese el documento"
+            )
+        datos_ocr = json.loads(datos_ocr) if isinstance(datos_ocr, str) else dict(datos_ocr)
+        bbox = json.loads(bbox) if isinstance(bbox, str) else bbox
+
+        inicio = time.time()
+        contenido = self.minio_service.download_file_by_url(archivo_url)
+        try:
+            textos = self.ocr_processor.reconocer_region(
+                contenido, nombre_archivo.lower().endswith('.pdf'), bbox,
+                columna=columna, dpi=dpi, motor=motor
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        anteriores = {f"col_{j}": datos_ocr.get(f"col_{j}") for j in textos}
+        datos_ocr.update({f"col_{j}": texto for j, texto in textos.items()})
+        self.db.execute(text("""
+            UPDATE ocr_resultado SET datos_ocr = CAST(:datos AS jsonb) WHERE id_ocr = :id_ocr
+        """), {"id_ocr": id_ocr, "datos": json.dumps(datos_ocr)})
+        self.db.commit()
+
+        segundos = round(time.time() - inicio, 2)
+        logger.info(f"🔁 Tupla {tupla_numero} del documento {documento_id} re-reconocida en {segundos}s")
+        return {
+            'documento_id': documento_id,
+            'tupla_numero': tupla_numero,
+            'datos_ocr': datos_ocr,
+            'anteriores': anteriores,
+            'motor': motor,
+            'dpi': dpi,
+            'tiempo_s': segundos
+        }
     
     def obtener_progreso(self, documento_id: int) -> Dict[str, Any]:
         """
         Obtiene el progreso actual del procesamiento de un documento.
-        Primero intenta leer de BD (más confiable), luego de memoria.
+        Lee el almacén de progreso compartido; solo si no hay progreso reciente consulta la BD.
         
         Args:
             documento_id: ID del documento
@@ -369,7 +632,12 @@ class OcrController:
         Returns:
             Dict con información de progreso
         """
-        # Primero verificar en BD (fuente de verdad)
+        # Almacén compartido: una lectura, sin consultar la BD
+        progreso = almacen_progreso.obtener(documento_id)
+        if progreso is not None:
+            return progreso
+        
+        # Sin progreso reciente (venció el TTL o se procesó en otra época): estado en BD
         from sqlalchemy import text
         query = text("""
             SELECT estado_procesamiento, progreso_ocr, mensaje_progreso
@@ -390,22 +658,6 @@ class OcrController:
         
         logger.info(f"📊 Consultando progreso doc {documento_id}: estado_bd={estado_bd}, progreso={progreso_bd}, mensaje='{mensaje_bd}'")
         
-        # Si está en procesamiento y tiene progreso, devolverlo
-        if estado_bd == 'procesando' and progreso_bd > 0:
-            respuesta = {
-                'estado': 'procesando_ocr',
-                'progreso': progreso_bd,
-                'mensaje': mensaje_bd or f'Procesando OCR: {progreso_bd}%',
-                'etapa': 'ocr'
-            }
-            logger.info(f"✅ Devolviendo progreso desde BD: {respuesta}")
-            return respuesta
-        
-        # Si hay info en memoria, usarla
-        if documento_id in progress_tracker:
-            logger.info(f"✅ Devolviendo progreso desde memoria")
-            return progress_tracker[documento_id]
-        
         # Mapear estado de BD a respuesta
         if estado_bd == 'ocr_completado':
             return {
@@ -13,6 +13,11 @@ from datetime import datetime
 # Importar configuración y routers
 from .utils.config import settings
 from .routers.ocr_router import api_router
+from .services.recognition_engines import estadisticas_motores
+from .services.ocr_v2_processor import plantillas_grilla
+from .controllers.ocr_controller import control_admision, trabajos_activos
+from .services.minio_service import cache_objetos
+from .services.onnx_recognizer import backend_activo, BACKEND_ONNX_INT8
 
 # Configuración de logging
 logging.basicConfig(
@@ -54,6 +59,36 @@ app.add_middleware(
 # Incluir routers
 app.include_router(api_router)
 
+# Relay del outbox de eventos (uno por worker: las filas se reparten con SKIP LOCKED)
+relay_outbox = None
+
+@app.on_event("startup")
+async def iniciar_relay_outbox():
+    """Entrega en segundo plano los eventos documento.procesado pendientes"""
+    global relay_outbox
+    if not settings.outbox_relay_enabled:
+        return
+    from .services.database_service import SessionLocal
+    from .services.outbox import RelayOutbox, entregar_http, entregar_redis
+    if settings.outbox_destino_url:
+        entregar = entregar_http(settings.outbox_destino_url)
+    elif settings.redis_url:
+        entregar = entregar_redis(settings.redis_url)
+    else:
+        logger.warning("⚠️ Outbox sin destino (OUTBOX_DESTINO_URL y REDIS_URL vacíos): relay desactivado")
+        return
+    relay_outbox = RelayOutbox(
+        SessionLocal, entregar,
+        intervalo=settings.outbox_relay_interval,
+        max_intentos=settings.outbox_max_intentos
+    )
+    relay_outbox.iniciar()
+
+@app.on_event("shutdown")
+async def detener_relay_outbox():
+    if relay_outbox is not None:
+        relay_outbox.detener()
+
 @app.get("/")
 async def root():
     """Endpoint raíz del servicio"""
@@ -93,8 +128,19 @@ async def service_status():
             "config": {
                 "ocr_language": settings.ocr_language,
                 "max_file_size_mb": settings.max_file_size // (1024 * 1024),
-                "supported_file_types": settings.allowed_file_types
+                "supported_file_types": settings.allowed_file_types,
+                "recognizer_backend": settings.ocr_recognizer_backend,
+                # Con onnx_int8 puede quedar torch_int8 si la exportación falló (None = reader sin cargar)
+                "recognizer_backend_activo": (
+                    backend_activo() if settings.ocr_recognizer_backend == BACKEND_ONNX_INT8
+                    else settings.ocr_recognizer_backend
+                ),
+                "recognition_engines": settings.recognition_engines or "auto"
             },
+            "motores": estadisticas_motores.resumen(),
+            "admision": control_admision.estado(len(trabajos_activos)),
+            "cache_minio": cache_objetos.estado(),
+            "plantillas_grilla": plantillas_grilla.resumen() if plantillas_grilla is not None else None,
             "capabilities": [
                 "OCR de registros de confirmación",
                 "Extracción de tuplas estructuradas", 
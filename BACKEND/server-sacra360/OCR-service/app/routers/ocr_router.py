@@ -43,6 +43,8 @@ async def procesar_documento(
         resultado = await controller.procesar_documento(file)
         return resultado
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Error en endpoint /procesar: {e}")
         raise HTTPException(
@@ -165,3 +167,39 @@ async def obtener_progreso(
             detail=f"Error al obtener progreso: {str(e)}"
         )
 
+
+
+@api_router.post("/reconocer-tupla/{documento_id}/{tupla_numero}", summary="Re-reconocer una tupla o una celda")
+async def reconocer_tupla(
+    documento_id: int,
+    tupla_numero: int,
+    columna: Optional[int] = None,
+    dpi: Optional[int] = None,
+    motor: Optional[str] = None,
+    db = Depends(get_database)
+):
+    """
+    Vuelve a reconocer solo una tupla (o una celda) usando las cajas guardadas en
+    `ocr_resultado.bbox_celdas`, sin reprocesar el documento.
+    
+    **Parámetros**:
+    - `columna`: Índice de columna (0-9) a reconocer; sin él, toda la tupla
+    - `dpi`: Rasterizar el PDF a más resolución que la original (ej. 300)
+    - `motor`: Motor de reconocimiento (easyocr, easyocr_digitos, tesseract)
+    
+    **Respuesta**:
+    - `datos_ocr`: Tupla actualizada
+    - `anteriores`: Valores reemplazados
+    """
+    try:
+        controller = OcrController(db)
+        return controller.reconocer_tupla(documento_id, tupla_numero, columna=columna, dpi=dpi, motor=motor)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Error en endpoint /reconocer-tupla: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al re-reconocer tupla: {str(e)}"
+        )
@@ -3,16 +3,25 @@ Servicio de gestión de archivos con MinIO
 Maneja subida, descarga y gestión de URLs para documentos
 """
 import os
+import shutil
 import uuid
 from datetime import datetime, timedelta
 from minio import Minio
 from minio.error import S3Error
 from io import BytesIO
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, BinaryIO
 import logging
 
+from .object_cache import CacheObjetos, es_inmutable
+
 logger = logging.getLogger(__name__)
 
+# Caché local de archivos descargados (MINIO_CACHE_MAX_MB=0 la deshabilita)
+cache_objetos = CacheObjetos(
+    directorio=os.getenv('MINIO_CACHE_DIR', '/tmp/sacra360-ocr-cache'),
+    max_bytes=int(os.getenv('MINIO_CACHE_MAX_MB', '2048')) * 1024 * 1024
+)
+
 class MinioService:
     """Servicio para gestionar archivos en MinIO Object Storage"""
     
@@ -118,14 +127,27 @@ class MinioService:
         """
         Descargar archivo desde MinIO
         
+        Con la caché local habilitada el archivo se lee del disco si ya se descargó
+        (misma versión según el ETag) y se devuelve mapeado en memoria (mmap).
+        
         Args:
             object_name: Nombre del objeto en MinIO
             
         Returns:
-            Contenido del archivo en bytes o None si hay error
+            Contenido del archivo (bytes o mmap) o None si hay error
         """
         self._ensure_connection()
         try:
+            if cache_objetos.habilitada:
+                try:
+                    etag = None if es_inmutable(object_name) else self.client.stat_object(self.bucket_name, object_name).etag
+                    return cache_objetos.leer(
+                        f"{self.bucket_name}/{object_name}", etag,
+                        lambda destino: self._descargar_en(object_name, destino)
+                    )
+                except OSError as e:
+                    logger.warning(f"⚠️ Caché local no disponible para {object_name} ({e}); descargando sin caché")
+            
             response = self.client.get_object(self.bucket_name, object_name)
             data = response.read()
             response.close()
@@ -138,6 +160,16 @@ class MinioService:
             logger.error(f"Error descargando archivo {object_name}: {e}")
             return None
     
+    def _descargar_en(self, object_name: str, destino: BinaryIO):
+        """Escribe el objeto en `destino` por partes, sin cargarlo entero en memoria"""
+        response = self.client.get_object(self.bucket_name, object_name)
+        try:
+            shutil.copyfileobj(response, destino, 1024 * 1024)
+        finally:
+            response.close()
+            response.release_conn()
+        logger.info(f"Archivo descargado exitosamente: {object_name}")
+    
     def download_file_by_url(self, file_url: str) -> bytes:
         """
         Descargar archivo desde MinIO usando URL completa
@@ -146,7 +178,7 @@ class MinioService:
             file_url: URL completa del archivo (ej: http://minio:9000/bucket/path/file.pdf)
             
         Returns:
-            Contenido del archivo en bytes
+            Contenido del archivo (bytes o mmap, ver download_file)
         """
         # Extraer object_name de la URL
         # Formato esperado: http://minio:9000/sacra360-documents/path/to/file.pdf
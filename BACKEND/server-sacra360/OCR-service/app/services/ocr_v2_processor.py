@@ -14,26 +14,139 @@ Este procesador implementa el flujo completo:
 import cv2
 import numpy as np
 import pandas as pd
-import os
-import shutil
 import logging
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional
 import easyocr
-from pathlib import Path
+
+from ..utils.config import settings
+from .onnx_recognizer import crear_reader, BACKEND_ONNX_INT8
+from .recognition_engines import crear_registro
+from .grid_template_cache import GridTemplateCache
+from .quality_gate import CalidadInsuficiente, EvaluadorCalidad, dpi_origen
+from .deskew import enderezar
+from .glyph_scale import escala_adaptativa, interpolacion
+from .cell_regions import bbox_tupla, columnas_a_reconocer, describir_pagina, preparar_pagina, recortar
 
 logger = logging.getLogger(__name__)
 
+# Plantillas de celdas por libro, compartidas entre requests (el procesador se crea por request)
+plantillas_grilla = GridTemplateCache(
+    capacidad=settings.grid_template_cache_size,
+    correlacion_minima=settings.grid_template_min_correlation
+) if settings.grid_template_cache else None
+
+# Control de calidad de la página antes del OCR (QUALITY_GATE_MODE=off|flag|reject)
+evaluador_calidad = EvaluadorCalidad(
+    min_nitidez=settings.quality_min_sharpness,
+    min_contraste=settings.quality_min_contrast,
+    max_inclinacion=settings.quality_max_skew,
+    min_dpi=settings.quality_min_dpi
+)
+
+
+class ValidadorPatronIncremental:
+    """
+    Validación de patrón (notebook: célula 8) aplicada celda por celda.
+
+    La decisión sobre un bloque solo depende de sus primeras num_cols celdas,
+    así que cada tupla se confirma apenas llegan las celdas que la cubren, sin
+    esperar al resto de la página. Produce exactamente las mismas tuplas que
+    validar_y_corregir_patron sobre el DataFrame completo.
+
+    `origenes[k]` indica de qué celda (índice en orden de lectura) salió cada
+    valor de la tupla k+1; None para los 'nD'/'nan' que agrega el validador.
+    """
+
+    def __init__(self, num_cols: int, pattern: List[str]):
+        self.num_cols = num_cols
+        self.pattern = pattern
+        self.pendientes: List[str] = []
+        self.origenes_pendientes: List[Optional[int]] = []
+        self.origenes: List[List[Optional[int]]] = []
+        self.celdas = 0
+        self.tuplas = 0
+
+    def _patron_bloque(self, block: List[str]) -> List[str]:
+        block_pattern = []
+        for v in block:
+            if v == 'nD':
+                block_pattern.append('E')
+            else:
+                first_char = v[0] if v else ''
+                if first_char.isalpha():
+                    block_pattern.append('L')
+                elif first_char.isdigit():
+                    block_pattern.append('N')
+                else:
+                    block_pattern.append('E')
+        return block_pattern
+
+    def agregar(self, valor, origen: Optional[int] = None) -> List[List[str]]:
+        """Agrega una celda reconocida y devuelve las tuplas que quedan confirmadas"""
+        self.pendientes.append(str(valor).strip())
+        self.origenes_pendientes.append(origen)
+        self.celdas += 1
+        nuevas = []
+
+        while len(self.pendientes) >= self.num_cols:
+            block = self.pendientes[:self.num_cols]
+            match = all(bp == p or bp == 'E' for bp, p in zip(self._patron_bloque(block), self.pattern))
+
+            if match:
+                nuevas.append(block)
+                self.origenes.append(self.origenes_pendientes[:self.num_cols])
+                self.pendientes = self.pendientes[self.num_cols:]
+                self.origenes_pendientes = self.origenes_pendientes[self.num_cols:]
+            else:
+                # Insertar 'nD' para intentar realinear
+                self.pendientes.insert(0, 'nD')
+                self.origenes_pendientes.insert(0, None)
+
+        self.tuplas += len(nuevas)
+        return nuevas
+
+    def finalizar(self) -> List[List[str]]:
+        """
+        Completa la última fila física como lo hace el DataFrame del OCR (celdas
+        faltantes -> 'nan') y devuelve las tuplas que eso confirme. Con una
+        sola fila incompleta el DataFrame no rellena nada
+        """
+        nuevas = []
+        while self.celdas > self.num_cols and self.celdas % self.num_cols:
+            nuevas.extend(self.agregar('nan'))
+        return nuevas
+
 
 class OcrV2Processor:
     """Procesador OCRv2 para extracción de tablas de documentos sacramentales"""
     
     def __init__(self):
         """Inicializa el procesador OCRv2"""
-        self.temp_dir = "temp"
-        self.temp_preprocessed_dir = "temp_preprocessed"
         self.num_cols = 10  # Número de columnas esperadas en la tabla
+        self.dpi_pdf = 150  # Resolución a la que se rasterizan los PDF
         self.pattern = ['L','N','N','N','L','N','N','N','L','L']  # Patrón esperado
         self._reader = None
+        # Celdas de la página en memoria (vistas en gris de la imagen, en orden de lectura)
+        # y su tipo de columna ('L'/'N'), solo si su fila está completa
+        self.celdas: List[np.ndarray] = []
+        self.celdas_preprocesadas: List[Optional[np.ndarray]] = []
+        self.tipos_celda: List[Optional[str]] = []
+        # Caja (x, y, w, h) de cada celda en la página procesada y datos de esa página
+        # (se guardan por tupla en ocr_resultado.bbox_celdas, ver cell_regions.py)
+        self.cajas_celdas: List[Tuple[int, int, int, int]] = []
+        self.pagina: Optional[Dict[str, Any]] = None
+        self._kernel_dilatacion = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
+        # IMPORTANTE: workers=0 en readtext para evitar BlockingIOError en señales UNIX/Docker
+        self.motores = crear_registro(
+            lambda: self.reader,
+            tipos_numericos={'N'},
+            ruta_tabla=settings.recognition_accuracy_table,
+            precision_minima=settings.recognition_min_accuracy,
+            forzados=settings.recognition_engines,
+            tesseract_path=settings.tesseract_path,
+            idioma_tesseract=settings.ocr_language,
+            workers=0
+        )
         
         logger.info("✅ OCRv2Processor inicializado")
     
@@ -44,8 +157,19 @@ class OcrV2Processor:
             logger.info("🔧 Inicializando EasyOCR...")
             import platform
             
+            # Nodos sin GPU: reconocedor exportado a ONNX Runtime INT8
+            if settings.ocr_recognizer_backend == BACKEND_ONNX_INT8:
+                logger.info("💻 Backend de reconocimiento ONNX Runtime INT8 (CPU)")
+                self._reader = crear_reader(
+                    ['en'],
+                    backend=BACKEND_ONNX_INT8,
+                    directorio_onnx=settings.recognizer_onnx_dir,
+                    hilos_onnx=settings.recognizer_onnx_threads,
+                    verbose=False,
+                    download_enabled=True
+                )
             # En Windows solo funciona con CPU
-            if platform.system() == 'Windows':
+            elif platform.system() == 'Windows':
                 logger.info("💻 Windows detectado - usando CPU")
                 self._reader = easyocr.Reader(
                     ['en'], 
@@ -76,43 +200,34 @@ class OcrV2Processor:
         
         return self._reader
     
-    def crear_carpetas_temporales(self):
-        """Crea las carpetas temporales necesarias"""
-        os.makedirs(self.temp_dir, exist_ok=True)
-        os.makedirs(self.temp_preprocessed_dir, exist_ok=True)
-    
-    def limpiar_carpetas_temporales(self):
-        """Elimina las carpetas temporales"""
-        if os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
-        if os.path.exists(self.temp_preprocessed_dir):
-            shutil.rmtree(self.temp_preprocessed_dir)
+    def liberar_celdas(self):
+        """Suelta las celdas en memoria de la página procesada"""
+        self.celdas = []
+        self.celdas_preprocesadas = []
+        self.tipos_celda = []
+        self.cajas_celdas = []
     
     def convertir_pdf_a_imagen(self, pdf_bytes: bytes, dpi: int = 150) -> np.ndarray:
         """
-        Convierte PDF a imagen (primera página)
-        Usa PyMuPDF (fitz) que no requiere poppler
+        Convierte PDF a imagen en escala de grises (primera página)
+        Usa PyMuPDF (fitz) que no requiere poppler; el pixmap se rasteriza
+        directamente en gris, sin pasar por RGB/BGR
         """
         logger.info(f"📄 Convirtiendo PDF a imagen (DPI={dpi})...")
         
         try:
             import fitz  # PyMuPDF
-            pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+            # PyMuPDF solo acepta bytes (los archivos de la caché llegan como mmap)
+            pdf_document = fitz.open(stream=bytes(pdf_bytes), filetype="pdf")
             page = pdf_document[0]  # Primera página
             
             # Calcular zoom para DPI deseado
             zoom = dpi / 72  # 72 DPI es el default de PDF
             mat = fitz.Matrix(zoom, zoom)
-            pix = page.get_pixmap(matrix=mat)
-            
-            # Convertir a numpy array
-            img_rgb = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+            pix = page.get_pixmap(matrix=mat, colorspace=fitz.csGRAY, alpha=False)
             
-            # Convertir RGB a BGR para OpenCV
-            if pix.n == 4:  # RGBA
-                img = cv2.cvtColor(img_rgb, cv2.COLOR_RGBA2BGR)
-            else:  # RGB
-                img = cv2.cvtColor(img_rgb, cv2.COLOR_RGB2BGR)
+            # Un canal uint8 (stride puede tener relleno al final de cada fila)
+            img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
             
             pdf_document.close()
             logger.info(f"✅ PDF convertido. Dimensiones: {img.shape}")
@@ -122,15 +237,32 @@ class OcrV2Processor:
             logger.error(f"❌ Error al convertir PDF: {e}")
             raise
     
-    def detectar_y_extraer_tabla(self, img: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    def detectar_y_extraer_tabla(self, img: np.ndarray, libro_id: Optional[int] = None) -> List[Tuple[int, int, int, int]]:
         """
         Detecta la tabla y extrae las celdas
         Implementación del notebook: células 4 y 5
+
+        Con libro_id se intenta reutilizar las celdas de una página anterior del
+        mismo libro (GridTemplateCache) antes de la detección completa.
         """
         logger.info("🔍 Detectando tabla...")
         
-        # Convertir a escala de grises y aplicar threshold
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        # La página ya llega en gris (convertir solo si viene en color)
+        gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        H, W = gray.shape[:2]
+
+        usar_plantilla = plantillas_grilla is not None and libro_id is not None
+        if usar_plantilla:
+            alineada = plantillas_grilla.alinear(libro_id, gray)
+            if alineada is not None:
+                geometria, dx, dy = alineada
+                cells = [
+                    (int(round((x + dx) * W)), int(round((y + dy) * H)), int(round(w * W)), int(round(h * H)))
+                    for x, y, w, h in geometria['celdas']
+                ]
+                logger.info(f"✅ {len(cells)} celdas desde la plantilla del libro {libro_id}")
+                return cells, img
+
         thresh = cv2.threshold(gray, 180, 255, cv2.THRESH_BINARY_INV)[1]
         
         # Detectar líneas horizontales y verticales
@@ -151,7 +283,7 @@ class OcrV2Processor:
         ys, xs = np.where(table_mask > 0)
         if len(xs) == 0 or len(ys) == 0:
             logger.error("❌ No se detectó ninguna tabla")
-            return []
+            return [], img
         
         x_min, x_max = xs.min(), xs.max()
         y_min, y_max = ys.min(), ys.max()
@@ -196,21 +328,31 @@ class OcrV2Processor:
         
         # Ordenar por fila (y) y luego por columna (x)
         merged_cells = sorted(merged_cells, key=lambda c: c[1])
+
+        # Solo una tabla con varias filas completas sirve de plantilla para el libro
+        if usar_plantilla and len(merged_cells) >= self.num_cols * 3:
+            plantillas_grilla.guardar(libro_id, gray, {
+                'celdas': [(x / W, y / H, w / W, h / H) for x, y, w, h in merged_cells]
+            })
         
         return merged_cells, img
     
     def extraer_y_guardar_celdas(self, img: np.ndarray, cells: List[Tuple[int, int, int, int]]):
         """
-        Extrae las celdas de la imagen y las guarda
+        Extrae las celdas de la imagen en orden de lectura
         Implementación del notebook: célula 5
+
+        Las celdas quedan en self.celdas como vistas de la página en gris (sin copiar
+        ni escribir PNG temporales), así que también es seguro con requests concurrentes.
         """
         logger.info(f"✂️  Extrayendo {len(cells)} celdas...")
         
-        self.crear_carpetas_temporales()
-        
+        gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
         padding = 5
-        idx = 1
         cells_copy = cells.copy()
+        self.celdas = []
+        self.tipos_celda = []
+        self.cajas_celdas = []
         
         while cells_copy:
             bx, by, bw, bh = cells_copy[0]
@@ -233,70 +375,65 @@ class OcrV2Processor:
             # Ordenar fila por x
             current_row = sorted(current_row, key=lambda c: c[0])
             
+            # El tipo de columna solo es confiable si la fila tiene todas sus celdas
+            fila_completa = len(current_row) == self.num_cols
+            
             # Guardar celdas de la fila
-            for x, y, w, h in current_row:
+            for j, (x, y, w, h) in enumerate(current_row):
                 x1p = max(x - padding, 0)
                 y1p = max(y - padding, 0)
-                x2p = min(x + w + padding, img.shape[1])
-                y2p = min(y + h + padding, img.shape[0])
-                roi = img[y1p:y2p, x1p:x2p]
-                filename = os.path.join(self.temp_dir, f"cell_{idx:03d}.png")
-                cv2.imwrite(filename, roi)
-                idx += 1
+                x2p = min(x + w + padding, gray.shape[1])
+                y2p = min(y + h + padding, gray.shape[0])
+                self.celdas.append(gray[y1p:y2p, x1p:x2p])
+                self.cajas_celdas.append((x1p, y1p, x2p - x1p, y2p - y1p))
+                self.tipos_celda.append(self.pattern[j] if fila_completa else None)
             
             cells_copy = remaining
         
-        logger.info(f"✅ {idx-1} celdas guardadas en {self.temp_dir}")
+        logger.info(f"✅ {len(self.celdas)} celdas extraídas")
     
-    def preprocesar_imagenes(self):
+    def preprocesar_imagenes(self, omitir: int = 0):
         """
         Preprocesa las imágenes de las celdas
         Implementación del notebook: célula 6
+
+        Args:
+            omitir: Celdas iniciales ya reconocidas (checkpoint); se descartan sin procesar
         """
         logger.info("🔄 Preprocesando imágenes...")
         
+        self.celdas_preprocesadas = [
+            None if idx <= omitir else self.preprocesar_celda(gray)
+            for idx, gray in enumerate(self.celdas, 1)
+        ]
+        
+        # Las celdas originales (vistas de la página) ya no se necesitan
+        self.celdas = []
+        logger.info(f"✅ {len(self.celdas_preprocesadas) - omitir} imágenes preprocesadas")
+    
+    def preprocesar_celda(self, gray: np.ndarray) -> np.ndarray:
+        """Escalado, borde blanco, Otsu y dilatación de una celda en gris (célula 6)"""
         scale_factor = 3
         padding = 5
         
-        image_files = sorted([f for f in os.listdir(self.temp_dir) if f.endswith(".png")])
+        # Escalar: factor fijo del notebook o el que lleva los glifos a la altura objetivo
+        escala = escala_adaptativa(gray, settings.cell_glyph_target_height or None, scale_factor)
+        gray = cv2.resize(gray, None, fx=escala, fy=escala, interpolation=interpolacion(escala))
         
-        for idx, filename in enumerate(image_files, 1):
-            filepath = os.path.join(self.temp_dir, filename)
-            img = cv2.imread(filepath)
-            
-            # Convertir a escala de grises
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            
-            # Escalar
-            gray = cv2.resize(
-                gray, 
-                (gray.shape[1]*scale_factor, gray.shape[0]*scale_factor), 
-                interpolation=cv2.INTER_CUBIC
-            )
-            
-            # Agregar padding
-            gray = cv2.copyMakeBorder(
-                gray, padding, padding, padding, padding, 
-                cv2.BORDER_CONSTANT, value=255
-            )
-            
-            # Threshold binario
-            _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            
-            # Dilatar
-            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2,2))
-            thresh = cv2.dilate(thresh, kernel, iterations=1)
-            
-            # Guardar imagen preprocesada
-            save_path = os.path.join(self.temp_preprocessed_dir, filename)
-            cv2.imwrite(save_path, thresh)
-            
-            # Eliminar original
-            os.remove(filepath)
+        # Agregar padding
+        gray = cv2.copyMakeBorder(
+            gray, padding, padding, padding, padding, 
+            cv2.BORDER_CONSTANT, value=255
+        )
+        
+        # Threshold binario
+        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
         
-        logger.info(f"✅ {len(image_files)} imágenes preprocesadas")
+        # Dilatar
+        return cv2.dilate(thresh, self._kernel_dilatacion, iterations=1)
     
-    def aplicar_ocr_easyocr(self, progress_callback=None, total_celdas=0) -> pd.DataFrame:
+    def aplicar_ocr_easyocr(self, progress_callback=None, total_celdas=0, textos_previos=None,
+                            checkpoint_callback=None, tupla_callback=None) -> pd.DataFrame:
         """
         Aplica EasyOCR a las imágenes preprocesadas
         Implementación del notebook: célula 7
@@ -304,50 +441,76 @@ class OcrV2Processor:
         Args:
             progress_callback: Función opcional para reportar progreso (celda_actual, total)
             total_celdas: Total de celdas para calcular progreso
+            textos_previos: Textos de las primeras celdas, ya reconocidos (checkpoint)
+            checkpoint_callback: Función opcional que recibe los textos reconocidos hasta
+                el momento cada vez que se completa una fila
+            tupla_callback: Función opcional (tupla_numero, tupla, bbox_celdas) llamada
+                apenas el validador de patrón confirma cada tupla. Al reanudar se vuelve
+                a llamar con las tuplas ya confirmadas antes de la interrupción.
+                bbox_celdas ubica cada valor en la página (None si no hay página)
         """
         logger.info("📝 Aplicando EasyOCR...")
         
-        image_files = sorted([f for f in os.listdir(self.temp_preprocessed_dir) if f.endswith(".png")])
+        textos = list(textos_previos or [])
+        pendientes = range(len(textos), len(self.celdas_preprocesadas))
+        validador = ValidadorPatronIncremental(self.num_cols, self.pattern) if tupla_callback else None
+
+        def publicar(tuplas):
+            for numero, tupla in enumerate(tuplas, validador.tuplas - len(tuplas) + 1):
+                bbox = None
+                if self.pagina is not None:
+                    bbox = bbox_tupla(self.pagina, [
+                        self.cajas_celdas[origen] if origen is not None and origen < len(self.cajas_celdas) else None
+                        for origen in validador.origenes[numero - 1]
+                    ])
+                tupla_callback(numero, tupla, bbox)
         
         rows = []
         current_row = []
         
-        # IMPORTANTE: Forzar workers=0 para evitar BlockingIOError en señales UNIX/Docker
-        num_workers = 0
+        # Las celdas ya reconocidas no tienen imagen preprocesada (ver preprocesar_imagenes)
+        for posicion, text in enumerate(textos):
+            current_row.append(text)
+            if len(current_row) == self.num_cols:
+                rows.append(current_row)
+                current_row = []
+            if validador:
+                publicar(validador.agregar(text, posicion))
         
-        for idx, filename in enumerate(image_files, 1):
-            filepath = os.path.join(self.temp_preprocessed_dir, filename)
-            img = cv2.imread(filepath)
+        for idx, posicion in enumerate(pendientes, len(textos) + 1):
+            img = self.celdas_preprocesadas[posicion]
             
-            # Aplicar OCR
-            result = self.reader.readtext(
-                img, 
-                detail=0, 
-                paragraph=False,
-                workers=num_workers
-            )
-            text = " ".join(result).strip() if result else ""
+            # Aplicar OCR con el motor asignado al tipo de columna
+            text = self.motores.reconocer(img, self.tipos_celda[posicion])
             
             current_row.append(text)
+            textos.append(text)
+            if validador:
+                publicar(validador.agregar(text, posicion))
             
-            # Eliminar archivo procesado
-            os.remove(filepath)
+            # Liberar la celda ya reconocida
+            self.celdas_preprocesadas[posicion] = None
             
             # Completar fila
             if len(current_row) == self.num_cols:
                 rows.append(current_row)
                 current_row = []
+                if checkpoint_callback:
+                    checkpoint_callback(list(textos))
             
             # Reportar progreso cada 10 celdas para dar feedback visual
+            total = len(self.celdas_preprocesadas)
             if progress_callback and (idx + 1) % 10 == 0:
-                progress_callback(idx + 1, len(image_files))
-                logger.info(f"📊 Procesadas {idx + 1}/{len(image_files)} celdas")
+                progress_callback(idx + 1, total)
+                logger.info(f"📊 Procesadas {idx + 1}/{total} celdas")
             elif idx % 10 == 0:
-                logger.info(f"   Procesadas {idx}/{len(image_files)} celdas")
+                logger.info(f"   Procesadas {idx}/{total} celdas")
         
         # Agregar última fila si existe
         if current_row:
             rows.append(current_row)
+        if validador:
+            publicar(validador.finalizar())
         
         df = pd.DataFrame(rows)
         logger.info(f"✅ OCR completado: {len(df)} filas extraídas")
@@ -360,46 +523,64 @@ class OcrV2Processor:
         Implementación del notebook: célula 8
         """
         logger.info("✓  Validando patrón...")
-        
-        # Aplanar DataFrame
-        arr_flat = df.to_numpy().flatten()
-        arr_flat = [str(v).strip() for v in arr_flat]
-        
+
+        # Aplanar DataFrame y pasar las celdas por el mismo validador que usa el streaming
+        validador = ValidadorPatronIncremental(self.num_cols, self.pattern)
         new_rows = []
-        
-        while len(arr_flat) >= self.num_cols:
-            block = arr_flat[:self.num_cols]
-            block_pattern = []
-            
-            # Determinar patrón del bloque
-            for v in block:
-                if v == 'nD':
-                    block_pattern.append('E')
-                else:
-                    first_char = v[0] if v else ''
-                    if first_char.isalpha():
-                        block_pattern.append('L')
-                    elif first_char.isdigit():
-                        block_pattern.append('N')
-                    else:
-                        block_pattern.append('E')
-            
-            # Verificar si coincide con el patrón esperado
-            match = all(bp == p or bp == 'E' for bp, p in zip(block_pattern, self.pattern))
-            
-            if match:
-                new_rows.append(block)
-                arr_flat = arr_flat[self.num_cols:]
-            else:
-                # Insertar 'nD' para intentar realinear
-                arr_flat.insert(0, 'nD')
-        
+        for v in df.to_numpy().flatten():
+            new_rows.extend(validador.agregar(v))
+
         df_fixed = pd.DataFrame(new_rows, columns=[f"Col{i+1}" for i in range(self.num_cols)])
         logger.info(f"✅ Patrón validado: {len(df_fixed)} tuplas válidas")
         
         return df_fixed
     
-    def procesar_documento_completo(self, archivo_bytes: bytes, es_pdf: bool = True, progress_callback=None) -> Dict[str, Any]:
+    def reconocer_region(self, archivo_bytes: bytes, es_pdf: bool, bbox: Dict[str, Any],
+                         columna: Optional[int] = None, dpi: Optional[int] = None,
+                         motor: Optional[str] = None) -> Dict[int, str]:
+        """
+        Vuelve a reconocer las celdas de una tupla (o una sola) a partir de sus
+        cajas guardadas, sin detectar la tabla ni procesar el resto de la página.
+
+        Args:
+            archivo_bytes: Bytes del archivo original (PDF o imagen)
+            es_pdf: Si el archivo es PDF
+            bbox: Valor de ocr_resultado.bbox_celdas de la tupla
+            columna: Índice de la única columna a reconocer (None = todas)
+            dpi: Rasterizar el PDF a este DPI (más que el original para celdas difíciles)
+            motor: Motor de reconocimiento a usar en lugar del seleccionado por columna
+
+        Returns:
+            {columna: texto}
+        """
+        if motor and motor not in self.motores.motores():
+            raise ValueError(f"Motor desconocido: {motor}. Disponibles: {', '.join(self.motores.motores())}")
+        if dpi is not None and not 72 <= dpi <= 600:
+            raise ValueError("dpi debe estar entre 72 y 600")
+        pagina = bbox['pagina']
+        columnas = columnas_a_reconocer(bbox, columna)
+
+        if es_pdf:
+            img = self.convertir_pdf_a_imagen(archivo_bytes, dpi=dpi or pagina.get('dpi') or self.dpi_pdf)
+        else:
+            # Una imagen ya tiene su resolución: el dpi pedido no aplica
+            img = cv2.imdecode(np.frombuffer(archivo_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+        img = preparar_pagina(img, pagina)
+
+        textos = {}
+        for j in columnas:
+            celda = recortar(img, pagina, bbox['celdas'][j])
+            if celda.shape[0] < 2 or celda.shape[1] < 2:
+                textos[j] = ''
+                continue
+            textos[j] = self.motores.reconocer(self.preprocesar_celda(celda), self.pattern[j], motor=motor)
+        logger.info(f"🔁 Región re-reconocida: {len(textos)} celdas")
+        return textos
+    
+    def procesar_documento_completo(self, archivo_bytes: bytes, es_pdf: bool = True, progress_callback=None,
+                                    libro_id: Optional[int] = None, reanudar: Optional[Dict[str, Any]] = None,
+                                    checkpoint_callback=None, tupla_callback=None,
+                                    calidad_callback=None) -> Dict[str, Any]:
         """
         Procesa un documento completo con OCRv2
         
@@ -407,25 +588,53 @@ class OcrV2Processor:
             archivo_bytes: Bytes del archivo (PDF o imagen)
             es_pdf: Si el archivo es PDF
             progress_callback: Función opcional para reportar progreso (celda_actual, total)
+            libro_id: Libro del documento; permite reutilizar la grilla de páginas anteriores
+            reanudar: Checkpoint {'celdas', 'textos'} de un procesamiento interrumpido
+            checkpoint_callback: Recibe el checkpoint {'celdas', 'textos'} tras cada fila
+            tupla_callback: Recibe (tupla_numero, tupla) apenas se confirma cada tupla,
+                antes de que termine la página (validación en paralelo al OCR)
+            calidad_callback: Recibe el reporte del control de calidad de la página
             
         Returns:
             Dict con tuplas extraídas y metadatos
+
+        Raises:
+            CalidadInsuficiente: Con QUALITY_GATE_MODE=reject, si la página no pasa
+                el control de calidad (antes de detectar la tabla)
         """
         try:
             logger.info("=" * 70)
             logger.info("🚀 Iniciando procesamiento OCRv2")
             logger.info("=" * 70)
             
-            # 1. Convertir PDF a imagen
+            # 1. Convertir PDF a imagen (todo el pipeline trabaja en gris, un canal)
             if es_pdf:
-                img = self.convertir_pdf_a_imagen(archivo_bytes)
+                img = self.convertir_pdf_a_imagen(archivo_bytes, dpi=self.dpi_pdf)
             else:
-                # Decodificar imagen directamente
+                # Decodificar imagen directamente en gris
                 nparr = np.frombuffer(archivo_bytes, np.uint8)
-                img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            # 2. Detectar tabla y extraer celdas
-            cells, img = self.detectar_y_extraer_tabla(img)
+                img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
+            
+            # Control de calidad (al reanudar la página ya se evaluó)
+            if not reanudar:
+                evaluador_calidad.controlar(img, dpi=dpi_origen(archivo_bytes, es_pdf),
+                                            modo=settings.quality_gate_mode, callback=calidad_callback)
+            
+            # Enderezar la página: los kernels de líneas de 100 px suponen tabla recta.
+            # Es determinista, así que las celdas de un checkpoint siguen valiendo
+            angulo = 0.0
+            if settings.deskew_enabled:
+                img, angulo = enderezar(img, min_angulo=settings.deskew_min_angle)
+            self.pagina = describir_pagina(img, self.dpi_pdf if es_pdf else None, angulo)
+            
+            # 2. Detectar tabla y extraer celdas (al reanudar, las mismas celdas del checkpoint)
+            if reanudar:
+                cells = [tuple(c) for c in reanudar['celdas']]
+                textos_previos = reanudar['textos']
+                logger.info(f"⏯️ Reanudando: {len(textos_previos)}/{len(cells)} celdas ya reconocidas")
+            else:
+                cells, img = self.detectar_y_extraer_tabla(img, libro_id=libro_id)
+                textos_previos = []
             
             if not cells:
                 return {
@@ -439,10 +648,20 @@ class OcrV2Processor:
             self.extraer_y_guardar_celdas(img, cells)
             
             # 4. Preprocesar imágenes
-            self.preprocesar_imagenes()
+            self.preprocesar_imagenes(omitir=len(textos_previos))
             
             # 5. Aplicar OCR
-            df_raw = self.aplicar_ocr_easyocr(progress_callback=progress_callback, total_celdas=len(cells))
+            celdas_checkpoint = [[int(v) for v in c] for c in cells]
+            df_raw = self.aplicar_ocr_easyocr(
+                progress_callback=progress_callback,
+                total_celdas=len(cells),
+                textos_previos=textos_previos,
+                checkpoint_callback=(
+                    (lambda textos: checkpoint_callback({'celdas': celdas_checkpoint, 'textos': textos}))
+                    if checkpoint_callback else None
+                ),
+                tupla_callback=tupla_callback
+            )
             
             # 6. Validar y corregir patrón
             df_final = self.validar_y_corregir_patron(df_raw)
@@ -465,6 +684,8 @@ class OcrV2Processor:
                 'patron': self.pattern
             }
             
+        except CalidadInsuficiente:
+            raise
         except Exception as e:
             logger.error(f"❌ Error en pipeline OCR V2: {e}")
             import traceback
@@ -477,5 +698,5 @@ class OcrV2Processor:
             }
         
         finally:
-            # Limpiar carpetas temporales
-            self.limpiar_carpetas_temporales()
+            # Soltar las celdas en memoria
+            self.liberar_celdas()
@@ -0,0 +1,239 @@
+"""
+Backend ONNX Runtime INT8 para el reconocedor de EasyOCR
+
+Exporta la red de reconocimiento (CRNN: VGG + BiLSTM + CTC) del Reader a ONNX,
+le aplica cuantización dinámica INT8 a la parte secuencial (BiLSTM y capas
+lineales) y la ejecuta con ONNX Runtime en CPU. Las convoluciones quedan en FP32:
+ConvInteger en ONNX Runtime resultó unas 5 veces más lento que la convolución FP32.
+El detector CRAFT sigue corriendo en PyTorch; solo se reemplaza
+`reader.recognizer`, que es la parte que se invoca una vez por celda.
+
+Los modelos exportados se guardan en disco y se reutilizan entre arranques.
+Si la exportación falla se sigue con la cuantización dinámica de PyTorch; el
+backend que quedó activo se registra (`backend_activo`, ver /status).
+"""
+
+import os
+import inspect
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+BACKEND_TORCH = "torch"
+BACKEND_ONNX_INT8 = "onnx_int8"
+BACKENDS_VALIDOS = (BACKEND_TORCH, BACKEND_ONNX_INT8)
+# Respaldo cuando no se pudo activar ONNX Runtime
+BACKEND_TORCH_INT8 = "torch_int8"
+
+# Backend con el que quedó el último reader creado (None = todavía no se creó)
+_backend_activo: Optional[str] = None
+
+
+def backend_activo() -> Optional[str]:
+    """Backend de reconocimiento efectivamente en uso en este proceso"""
+    return _backend_activo
+
+
+class OnnxRecognizer:
+    """
+    Reemplazo de `reader.recognizer` respaldado por una sesión de ONNX Runtime.
+
+    EasyOCR llama `model.eval()` y luego `model(image, text_for_pred)` dentro de
+    `recognizer_predict`, y espera un tensor de torch [batch, secuencia, clases].
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+
+    def eval(self):
+        return self
+
+    def __call__(self, image, text=None):
+        import torch
+        logits = self.session.run(None, {self.input_name: image.detach().cpu().numpy()})[0]
+        return torch.from_numpy(logits)
+
+
+def _nombre_modelo(reader) -> str:
+    """Nombre estable del modelo de reconocimiento para el caché en disco"""
+    red = getattr(reader, "model_lang", None) or "standard"
+    clases = len(getattr(reader, "character", "") or "")
+    return f"easyocr_{red}_{clases}c"
+
+
+def _modelo_exportable(modelo):
+    """
+    Copia del CRNN que se puede exportar con ancho dinámico.
+
+    `AdaptiveAvgPool2d((None, 1))` (promedio sobre la altura del mapa de
+    características) no se exporta con el ancho variable: se reemplaza por el
+    promedio equivalente sobre esa dimensión.
+    """
+    import copy
+    import torch
+
+    class _PromedioAltura(torch.nn.Module):
+        def forward(self, x):
+            return x.mean(dim=3, keepdim=True)
+
+    modelo = copy.deepcopy(modelo)
+    pool = getattr(modelo, "AdaptiveAvgPool", None)
+    if isinstance(pool, torch.nn.AdaptiveAvgPool2d) and tuple(pool.output_size) == (None, 1):
+        modelo.AdaptiveAvgPool = _PromedioAltura()
+    return modelo
+
+
+def _verificar_exportacion(modelo, ruta_fp32: str, alto: int):
+    """
+    Compara el ONNX FP32 con PyTorch en un lote y un ancho distintos a los del
+    ejemplo de exportación: un eje que quedó fijo o una operación mal traducida
+    falla acá y no con los documentos.
+    """
+    import numpy as np
+    import onnxruntime as ort
+    import torch
+
+    entrada = torch.rand(2, 1, alto, 180) * 2 - 1
+    with torch.no_grad():
+        esperado = modelo(entrada, None).numpy()
+    session = ort.InferenceSession(ruta_fp32, providers=["CPUExecutionProvider"])
+    obtenido = session.run(None, {"imagen": entrada.numpy()})[0]
+    if obtenido.shape != esperado.shape or not np.allclose(obtenido, esperado, atol=1e-3):
+        raise RuntimeError(f"el modelo ONNX no reproduce a PyTorch (salida {obtenido.shape}, esperada {esperado.shape})")
+
+
+def exportar_modelo_int8(reader, directorio: str) -> str:
+    """
+    Exporta el reconocedor del reader a ONNX y lo cuantiza a INT8.
+
+    El reader debe haberse creado con `quantize=False`: la cuantización
+    dinámica de PyTorch no se puede exportar a ONNX.
+
+    Returns:
+        Ruta del modelo INT8 (.onnx)
+    """
+    import torch
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    os.makedirs(directorio, exist_ok=True)
+    nombre = _nombre_modelo(reader)
+    ruta_fp32 = os.path.join(directorio, f"{nombre}_fp32.onnx")
+    ruta_int8 = os.path.join(directorio, f"{nombre}_int8.onnx")
+
+    if os.path.exists(ruta_int8):
+        return ruta_int8
+
+    modelo = reader.recognizer
+    if isinstance(modelo, torch.nn.DataParallel):
+        modelo = modelo.module
+    modelo = _modelo_exportable(modelo).float().cpu().eval()
+
+    class _SoloImagen(torch.nn.Module):
+        """El CRNN ignora el argumento `text`; ONNX necesita una sola entrada"""
+
+        def __init__(self, red):
+            super().__init__()
+            self.red = red
+
+        def forward(self, imagen):
+            return self.red(imagen, None)
+
+    alto = getattr(reader, "imgH", 64)
+    ejemplo = torch.randn(1, 1, alto, 256)
+
+    # El exportador basado en dynamo (default desde torch 2.9) deja fijos el lote y
+    # la secuencia de la salida: se usa el de TorchScript, que respeta dynamic_axes
+    opciones = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+
+    logger.info(f"📦 Exportando reconocedor a ONNX: {ruta_fp32}")
+    with torch.no_grad():
+        # El exportador deja los módulos en el modo del envoltorio: eval, o las
+        # BatchNorm quedan usando las estadísticas del lote
+        torch.onnx.export(
+            _SoloImagen(modelo).eval(),
+            ejemplo,
+            ruta_fp32,
+            input_names=["imagen"],
+            output_names=["logits"],
+            dynamic_axes={"imagen": {0: "batch", 3: "ancho"}, "logits": {0: "batch", 1: "secuencia"}},
+            opset_version=13,
+            **opciones
+        )
+    try:
+        _verificar_exportacion(modelo, ruta_fp32, alto)
+
+        logger.info(f"🗜️  Cuantizando a INT8: {ruta_int8}")
+        quantize_dynamic(ruta_fp32, ruta_int8, weight_type=QuantType.QInt8,
+                         op_types_to_quantize=["MatMul", "LSTM"])
+    finally:
+        os.remove(ruta_fp32)
+    return ruta_int8
+
+
+def activar_backend_onnx(reader, directorio: str, hilos: int = 0) -> bool:
+    """
+    Reemplaza `reader.recognizer` por la versión ONNX Runtime INT8.
+
+    Si onnxruntime no está instalado o la exportación falla, aplica la
+    cuantización dinámica de PyTorch (lo que EasyOCR haría con quantize=True)
+    para no quedar corriendo el modelo en FP32.
+
+    Returns:
+        True si el backend ONNX quedó activo
+    """
+    global _backend_activo
+    try:
+        import onnxruntime as ort
+
+        ruta = exportar_modelo_int8(reader, directorio)
+
+        opciones = ort.SessionOptions()
+        opciones.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if hilos > 0:
+            opciones.intra_op_num_threads = hilos
+        session = ort.InferenceSession(ruta, sess_options=opciones, providers=["CPUExecutionProvider"])
+
+        reader.recognizer = OnnxRecognizer(session)
+        _backend_activo = BACKEND_ONNX_INT8
+        logger.info(f"✅ Reconocedor ONNX Runtime INT8 activo ({os.path.basename(ruta)})")
+        return True
+
+    except Exception:
+        logger.exception("❌ No se pudo activar el backend ONNX Runtime INT8; se usa PyTorch cuantizado (torch_int8)")
+        import torch
+        torch.quantization.quantize_dynamic(reader.recognizer, dtype=torch.qint8, inplace=True)
+        _backend_activo = BACKEND_TORCH_INT8
+        return False
+
+
+def crear_reader(idiomas, backend: str = BACKEND_TORCH, gpu: bool = False,
+                 directorio_onnx: Optional[str] = None, hilos_onnx: int = 0, **kwargs):
+    """
+    Crea un easyocr.Reader con el backend de reconocimiento indicado.
+
+    Args:
+        idiomas: Lista de idiomas de EasyOCR
+        backend: 'torch' (default) u 'onnx_int8' (solo CPU)
+        gpu: Usar GPU con el backend torch
+        directorio_onnx: Carpeta donde guardar/reutilizar los modelos exportados
+        hilos_onnx: Hilos intra-op de ONNX Runtime (0 = automático)
+    """
+    global _backend_activo
+    import easyocr
+
+    if backend not in BACKENDS_VALIDOS:
+        raise ValueError(f"Backend de reconocimiento inválido: {backend}. Use {BACKENDS_VALIDOS}")
+
+    if backend == BACKEND_TORCH:
+        reader = easyocr.Reader(idiomas, gpu=gpu, **kwargs)
+        _backend_activo = BACKEND_TORCH
+        return reader
+
+    # El backend ONNX es para nodos sin GPU: el reader se crea en CPU y sin
+    # cuantizar para poder exportar la red en FP32
+    reader = easyocr.Reader(idiomas, gpu=False, quantize=False, **kwargs)
+    directorio = directorio_onnx or os.path.join(os.path.expanduser("~"), ".EasyOCR", "onnx")
+    activar_backend_onnx(reader, directorio, hilos_onnx)
+    return reader
@@ -0,0 +1,171 @@
+"""
+Outbox transaccional de eventos hacia Documents-service
+
+Cuando un documento termina de procesarse, el evento `documento.procesado` se
+inserta en `outbox_evento` dentro de la MISMA transacción que marca las tuplas
+como listas y actualiza documento_digitalizado: o se confirma todo o nada, y un
+reinicio entre el commit y el aviso no pierde el evento.
+
+Un relay en segundo plano lee los eventos pendientes y los entrega (HTTP a
+Documents-service o, sin destino configurado, al bus local en Redis). Si la
+entrega falla se reintenta con espera exponencial. Con varios workers cada fila
+se toma con FOR UPDATE SKIP LOCKED, así un evento no se entrega dos veces a la
+vez; el receptor igual deduplica por id_evento (entrega al menos una vez).
+"""
+
+import json
+import logging
+import threading
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+EVENTO_DOCUMENTO_PROCESADO = "documento.procesado"
+CANAL_EVENTOS = "sacra360:eventos"
+
+
+def registrar_evento(db, tipo: str, documento_id: int, payload: Dict[str, Any], origen: str) -> str:
+    """
+    Agrega un evento al outbox en la transacción en curso de `db` (no hace commit).
+
+    Returns:
+        id_evento (uuid)
+    """
+    id_evento = str(uuid.uuid4())
+    db.execute(text("""
+        INSERT INTO outbox_evento (id_evento, tipo, documento_id, origen, payload)
+        VALUES (CAST(:id_evento AS uuid), :tipo, :documento_id, :origen, CAST(:payload AS jsonb))
+    """), {
+        "id_evento": id_evento,
+        "tipo": tipo,
+        "documento_id": documento_id,
+        "origen": origen,
+        "payload": json.dumps(payload, default=str),
+    })
+    return id_evento
+
+
+def entregar_http(url: str, timeout: float = 5.0) -> Callable[[Dict[str, Any]], None]:
+    """Entrega por POST JSON a `url`; cualquier respuesta no 2xx cuenta como fallo"""
+    import requests
+
+    def entregar(evento: Dict[str, Any]):
+        respuesta = requests.post(url, json=evento, timeout=timeout)
+        if not 200 <= respuesta.status_code < 300:
+            raise RuntimeError(f"HTTP {respuesta.status_code}: {respuesta.text[:200]}")
+
+    return entregar
+
+
+def entregar_redis(redis_url: str, canal: str = CANAL_EVENTOS) -> Callable[[Dict[str, Any]], None]:
+    """Bus local: publica el evento en un canal de Redis"""
+    import redis
+    cliente = redis.Redis.from_url(redis_url, socket_timeout=2, socket_connect_timeout=2)
+
+    def entregar(evento: Dict[str, Any]):
+        cliente.publish(canal, json.dumps(evento, default=str))
+
+    return entregar
+
+
+class RelayOutbox:
+    """Entrega en segundo plano los eventos pendientes del outbox"""
+
+    def __init__(self, session_factory: Callable, entregar: Callable[[Dict[str, Any]], None],
+                 intervalo: float = 2.0, lote: int = 20, max_intentos: int = 10, espera_base: float = 5.0):
+        """
+        Args:
+            session_factory: Crea una sesión de BD (SessionLocal)
+            entregar: Función que entrega un evento; lanza excepción si falla
+            intervalo: Segundos entre pasadas cuando no hay eventos pendientes
+            lote: Eventos por pasada
+            max_intentos: Tras esta cantidad de fallos el evento queda sin entregar (ultimo_error)
+            espera_base: Espera del primer reintento; se duplica en cada fallo (máx. 1 hora)
+        """
+        self.session_factory = session_factory
+        self.entregar = entregar
+        self.intervalo = intervalo
+        self.lote = lote
+        self.max_intentos = max_intentos
+        self.espera_base = espera_base
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def procesar_pendientes(self) -> int:
+        """Una pasada del relay. Returns: eventos entregados"""
+        db = self.session_factory()
+        entregados = 0
+        try:
+            filas = db.execute(text("""
+                SELECT id_evento, tipo, documento_id, origen, payload, creado_en, intentos
+                FROM outbox_evento
+                WHERE enviado_en IS NULL AND intentos < :max_intentos AND proximo_intento <= NOW()
+                ORDER BY creado_en
+                LIMIT :lote
+                FOR UPDATE SKIP LOCKED
+            """), {"max_intentos": self.max_intentos, "lote": self.lote}).fetchall()
+
+            for id_evento, tipo, documento_id, origen, payload, creado_en, intentos in filas:
+                evento = {
+                    "id_evento": str(id_evento),
+                    "tipo": tipo,
+                    "documento_id": documento_id,
+                    "origen": origen,
+                    "payload": json.loads(payload) if isinstance(payload, str) else payload,
+                    "creado_en": creado_en.isoformat() if creado_en else None,
+                }
+                try:
+                    self.entregar(evento)
+                    db.execute(text("""
+                        UPDATE outbox_evento
+                        SET enviado_en = NOW(), intentos = intentos + 1, ultimo_error = NULL
+                        WHERE id_evento = :id_evento
+                    """), {"id_evento": id_evento})
+                    entregados += 1
+                except Exception as e:
+                    espera = min(self.espera_base * (2 ** intentos), 3600)
+                    db.execute(text("""
+                        UPDATE outbox_evento
+                        SET intentos = intentos + 1,
+                            proximo_intento = NOW() + make_interval(secs => :espera),
+                            ultimo_error = :error
+                        WHERE id_evento = :id_evento
+                    """), {"id_evento": id_evento, "espera": espera, "error": str(e)[:500]})
+                    logger.warning(f"⚠️ Evento {tipo} del documento {documento_id} no entregado "
+                                   f"(intento {intentos + 1}): {e}; reintento en {espera:.0f}s")
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        if entregados:
+            logger.info(f"📨 Outbox: {entregados} evento(s) entregados")
+        return entregados
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            try:
+                entregados = self.procesar_pendientes()
+            except Exception as e:
+                logger.error(f"❌ Relay de outbox: {e}")
+                entregados = 0
+            # Si la pasada llenó el lote puede haber más: seguir sin esperar
+            if entregados < self.lote:
+                self._detener.wait(self.intervalo)
+
+    def iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="relay-outbox", daemon=True)
+            self._hilo.start()
+            logger.info("📨 Relay de outbox iniciado")
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
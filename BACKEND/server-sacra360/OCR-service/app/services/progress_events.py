@@ -0,0 +1,66 @@
+"""
+Eventos de progreso publicados en Redis (pub/sub)
+
+Cada cambio de progreso de un documento se publica como JSON en el canal
+`sacra360:progreso:{documento_id}`; Documents-service lo reenvía a los
+clientes por Server-Sent Events. Publicar es "fire and forget": si Redis no
+está disponible el procesamiento sigue igual y solo se pierde el push (el
+snapshot de progreso en BD sigue funcionando).
+"""
+
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CANAL_PROGRESO = "sacra360:progreso:{documento_id}"
+
+
+def canal_progreso(documento_id: int) -> str:
+    return CANAL_PROGRESO.format(documento_id=documento_id)
+
+
+class PublicadorProgreso:
+    """Publica eventos de progreso de documentos en Redis pub/sub"""
+
+    def __init__(self, redis_url: Optional[str], servicio: str, reintento_s: float = 30.0):
+        """
+        Args:
+            redis_url: URL de Redis (None o vacío desactiva la publicación)
+            servicio: Nombre del servicio que publica ('ocr' o 'htr')
+            reintento_s: Tras un fallo de conexión, segundos sin intentar publicar
+        """
+        self.redis_url = redis_url
+        self.servicio = servicio
+        self.reintento_s = reintento_s
+        self._cliente = None
+        self._pausado_hasta = 0.0
+
+    def _conectar(self):
+        if self._cliente is None:
+            import redis
+            self._cliente = redis.Redis.from_url(
+                self.redis_url, socket_timeout=0.5, socket_connect_timeout=0.5
+            )
+        return self._cliente
+
+    def publicar(self, documento_id: int, evento: Dict[str, Any]) -> bool:
+        """
+        Publica el evento (estado, progreso, mensaje, etapa) del documento.
+
+        Returns:
+            True si se publicó, False si Redis no está configurado o no responde
+        """
+        if not self.redis_url or time.monotonic() < self._pausado_hasta:
+            return False
+        mensaje = dict(evento, documento_id=documento_id, servicio=self.servicio, ts=time.time())
+        try:
+            self._conectar().publish(canal_progreso(documento_id), json.dumps(mensaje, default=str))
+            return True
+        except Exception as e:
+            # Sin Redis no se frena el procesamiento: se reintenta pasado un rato
+            self._pausado_hasta = time.monotonic() + self.reintento_s
+            logger.warning(f"⚠️ No se pudo publicar progreso en Redis ({e}); reintento en {self.reintento_s:.0f}s")
+            return False
@@ -0,0 +1,287 @@
+"""
+Registro de motores de reconocimiento con selección por tipo de columna
+
+Cada columna del patrón de la tabla (nombres vs. fechas/números) puede leerse
+con un motor distinto. Para cada tipo se elige el motor disponible más barato
+cuya precisión medida supera el mínimo configurado; si no hay medición para
+ningún motor se usa EasyOCR completo, que es el comportamiento original.
+
+Motores incluidos (de menor a mayor costo):
+- tesseract:        Tesseract vía pytesseract (opcional, requiere el binario)
+- easyocr_digitos:  solo el reconocedor de EasyOCR sobre la celda entera, sin
+                    el detector CRAFT, con allowlist de dígitos
+- easyocr:          EasyOCR completo (detector + reconocedor)
+
+La tabla de precisión es un JSON {tipo_columna: {motor: precision}} con la
+precisión medida sobre celdas validadas (ver README).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MOTOR_EASYOCR = "easyocr"
+MOTOR_EASYOCR_DIGITOS = "easyocr_digitos"
+MOTOR_TESSERACT = "tesseract"
+
+DIGITOS = "0123456789/"
+
+
+class ReconocimientoIncierto(Exception):
+    """El motor no está seguro del resultado; la celda se lee con el motor default"""
+
+
+class MotorReconocimiento:
+    """Interfaz de un motor de reconocimiento de celdas"""
+
+    nombre = "base"
+    costo = 100          # Rango relativo: menor = más barato por celda
+    solo_digitos = False  # Solo apto para columnas numéricas
+
+    def disponible(self) -> bool:
+        return True
+
+    def reconocer(self, imagen: np.ndarray, allowlist: Optional[str] = None) -> str:
+        raise NotImplementedError
+
+
+class MotorEasyOCR(MotorReconocimiento):
+    """EasyOCR completo: detección de líneas con CRAFT y reconocimiento"""
+
+    nombre = MOTOR_EASYOCR
+    costo = 30
+
+    def __init__(self, obtener_reader: Callable, **opciones_readtext):
+        self.obtener_reader = obtener_reader
+        self.opciones = opciones_readtext
+
+    def reconocer(self, imagen, allowlist=None):
+        resultado = self.obtener_reader().readtext(
+            imagen, detail=0, paragraph=False, allowlist=allowlist, **self.opciones
+        )
+        return " ".join(resultado).strip() if resultado else ""
+
+
+class MotorEasyOCRDigitos(MotorReconocimiento):
+    """
+    Solo el reconocedor de EasyOCR sobre la celda completa.
+
+    Una celda de fecha contiene un único número, así que se omite el detector
+    CRAFT (la parte más costosa de readtext) y se reconoce la celda como una
+    sola línea.
+    """
+
+    nombre = MOTOR_EASYOCR_DIGITOS
+    costo = 20
+    solo_digitos = True
+
+    def __init__(self, obtener_reader: Callable):
+        self.obtener_reader = obtener_reader
+
+    def reconocer(self, imagen, allowlist=None):
+        resultado = self.obtener_reader().recognize(imagen, detail=0, allowlist=allowlist or DIGITOS)
+        return " ".join(resultado).strip() if resultado else ""
+
+
+class MotorTesseract(MotorReconocimiento):
+    """Tesseract en modo línea única (psm 7). Requiere pytesseract y el binario"""
+
+    nombre = MOTOR_TESSERACT
+    costo = 10
+
+    def __init__(self, ruta_binario: Optional[str] = None, idioma: str = "spa"):
+        self.idioma = idioma
+        self._disponible = None
+        try:
+            import pytesseract
+            if ruta_binario:
+                pytesseract.pytesseract.tesseract_cmd = ruta_binario
+            self._pytesseract = pytesseract
+        except ImportError:
+            self._pytesseract = None
+
+    def disponible(self):
+        if self._disponible is None:
+            try:
+                self._pytesseract.get_tesseract_version()
+                self._disponible = True
+            except Exception:
+                self._disponible = False
+        return self._disponible
+
+    def reconocer(self, imagen, allowlist=None):
+        config = "--psm 7"
+        if allowlist:
+            config += f" -c tessedit_char_whitelist={allowlist}"
+        texto = self._pytesseract.image_to_string(imagen, lang=self.idioma, config=config)
+        return " ".join(texto.split())
+
+
+class EstadisticasMotores:
+    """Tiempos acumulados por motor, compartidos por todos los registros del proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._datos: Dict[str, Dict] = {}
+
+    def registrar(self, motor: str, tipo_columna: Optional[str], segundos: float,
+                  error: bool = False, incierto: bool = False):
+        with self._lock:
+            d = self._datos.setdefault(
+                motor, {"llamadas": 0, "errores": 0, "inciertos": 0, "segundos": 0.0, "por_tipo": {}}
+            )
+            d["llamadas"] += 1
+            d["segundos"] += segundos
+            if error:
+                d["errores"] += 1
+            if incierto:
+                d["inciertos"] += 1
+            clave = tipo_columna or "sin_tipo"
+            d["por_tipo"][clave] = d["por_tipo"].get(clave, 0) + 1
+
+    def resumen(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                motor: {
+                    "llamadas": d["llamadas"],
+                    "errores": d["errores"],
+                    "inciertos": d["inciertos"],
+                    "tiempo_total_s": round(d["segundos"], 3),
+                    "ms_por_celda": round(1000 * d["segundos"] / d["llamadas"], 2) if d["llamadas"] else 0.0,
+                    "por_tipo": dict(d["por_tipo"]),
+                }
+                for motor, d in self._datos.items()
+            }
+
+
+# Instancia global del proceso (se expone en /status)
+estadisticas_motores = EstadisticasMotores()
+
+
+class RegistroMotores:
+    """Motores registrados y selección del más barato que cumple la precisión mínima"""
+
+    def __init__(self, tipos_numericos: Iterable[str], tabla_precision: Optional[Dict[str, Dict[str, float]]] = None,
+                 precision_minima: float = 0.9, forzados: Optional[Dict[str, str]] = None,
+                 motor_default: str = MOTOR_EASYOCR):
+        self.tipos_numericos = set(tipos_numericos)
+        self.tabla_precision = tabla_precision or {}
+        self.precision_minima = precision_minima
+        self.forzados = forzados or {}
+        self.motor_default = motor_default
+        self._motores: Dict[str, MotorReconocimiento] = {}
+        self._seleccion: Dict[Optional[str], str] = {}
+
+    def registrar(self, motor: MotorReconocimiento):
+        self._motores[motor.nombre] = motor
+        self._seleccion.clear()
+
+    def motores(self) -> List[str]:
+        return list(self._motores)
+
+    def _apto(self, motor: MotorReconocimiento, tipo_columna: Optional[str]) -> bool:
+        if motor.solo_digitos and tipo_columna not in self.tipos_numericos:
+            return False
+        return motor.disponible()
+
+    def seleccionar(self, tipo_columna: Optional[str]) -> MotorReconocimiento:
+        """Motor para un tipo de columna (la decisión se cachea)"""
+        if tipo_columna not in self._seleccion:
+            nombre = self.motor_default
+            forzado = self.forzados.get(tipo_columna)
+
+            if forzado in self._motores and self._apto(self._motores[forzado], tipo_columna):
+                nombre = forzado
+            else:
+                precisiones = self.tabla_precision.get(tipo_columna, {})
+                candidatos = [
+                    m for n, m in self._motores.items()
+                    if precisiones.get(n, 0.0) >= self.precision_minima and self._apto(m, tipo_columna)
+                ]
+                if candidatos:
+                    nombre = min(candidatos, key=lambda m: m.costo).nombre
+
+            self._seleccion[tipo_columna] = nombre
+            logger.info(f"🔀 Columnas '{tipo_columna}' → motor {nombre}")
+
+        return self._motores[self._seleccion[tipo_columna]]
+
+    def reconocer(self, imagen: np.ndarray, tipo_columna: Optional[str] = None,
+                  allowlist: Optional[str] = None, motor: Optional[str] = None) -> str:
+        """
+        Reconoce una celda con el motor seleccionado para su tipo de columna.
+
+        Si un motor alternativo falla o no está seguro se reintenta con el motor default.
+        """
+        elegido = self._motores[motor] if motor else self.seleccionar(tipo_columna)
+        inicio = time.perf_counter()
+        try:
+            texto = elegido.reconocer(imagen, allowlist)
+            estadisticas_motores.registrar(elegido.nombre, tipo_columna, time.perf_counter() - inicio)
+            return texto
+        except ReconocimientoIncierto:
+            estadisticas_motores.registrar(elegido.nombre, tipo_columna, time.perf_counter() - inicio, incierto=True)
+            if elegido.nombre == self.motor_default:
+                return ""
+            return self.reconocer(imagen, tipo_columna, allowlist, motor=self.motor_default)
+        except Exception as e:
+            estadisticas_motores.registrar(elegido.nombre, tipo_columna, time.perf_counter() - inicio, error=True)
+            if elegido.nombre == self.motor_default:
+                raise
+            logger.warning(f"⚠️ Motor {elegido.nombre} falló ({e}); usando {self.motor_default}")
+            return self.reconocer(imagen, tipo_columna, allowlist, motor=self.motor_default)
+
+
+def cargar_tabla_precision(ruta: Optional[str]) -> Dict[str, Dict[str, float]]:
+    """Lee la tabla de precisión por tipo de columna y motor (vacía si no existe)"""
+    if not ruta or not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.warning(f"⚠️ Tabla de precisión inválida ({ruta}): {e}")
+        return {}
+
+
+def parsear_forzados(valor: Optional[str]) -> Dict[str, str]:
+    """'date=tesseract,text=easyocr' → {'date': 'tesseract', 'text': 'easyocr'}"""
+    forzados = {}
+    for par in (valor or "").split(","):
+        if "=" in par:
+            tipo, motor = par.split("=", 1)
+            forzados[tipo.strip()] = motor.strip()
+    return forzados
+
+
+def crear_registro(obtener_reader: Callable, tipos_numericos: Iterable[str], ruta_tabla: Optional[str] = None,
+                   precision_minima: float = 0.9, forzados: Optional[str] = None,
+                   tesseract_path: Optional[str] = None, idioma_tesseract: str = "spa",
+                   **opciones_readtext) -> RegistroMotores:
+    """
+    Crea el registro con los motores incluidos.
+
+    Args:
+        obtener_reader: Función que devuelve el easyocr.Reader (permite carga perezosa)
+        tipos_numericos: Tipos de columna que solo contienen dígitos y '/'
+        ruta_tabla: JSON con la precisión medida por tipo de columna y motor
+        precision_minima: Precisión requerida para usar un motor más barato
+        forzados: Motor fijo por tipo de columna ('date=tesseract,...')
+    """
+    registro = RegistroMotores(
+        tipos_numericos,
+        tabla_precision=cargar_tabla_precision(ruta_tabla),
+        precision_minima=precision_minima,
+        forzados=parsear_forzados(forzados),
+    )
+    registro.registrar(MotorEasyOCR(obtener_reader, **opciones_readtext))
+    registro.registrar(MotorEasyOCRDigitos(obtener_reader))
+    registro.registrar(MotorTesseract(tesseract_path, idioma_tesseract))
+    return registro
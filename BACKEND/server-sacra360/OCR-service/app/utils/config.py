@@ -17,6 +17,60 @@ class Settings:
         self.tesseract_path = os.getenv("TESSERACT_PATH")
         self.ocr_language = "spa"  # Español
         
+        # Backend del reconocedor EasyOCR: 'torch' (default) u 'onnx_int8' (nodos CPU)
+        self.ocr_recognizer_backend = os.getenv("OCR_RECOGNIZER_BACKEND", "torch")
+        self.recognizer_onnx_dir = os.getenv("RECOGNIZER_ONNX_DIR", "./models/onnx")
+        self.recognizer_onnx_threads = int(os.getenv("RECOGNIZER_ONNX_THREADS", "0"))
+
+        # Motores de reconocimiento por tipo de columna (ver services/recognition_engines.py)
+        self.recognition_accuracy_table = os.getenv("RECOGNITION_ACCURACY_TABLE", "./models/precision_motores.json")
+        self.recognition_min_accuracy = float(os.getenv("RECOGNITION_MIN_ACCURACY", "0.9"))
+        # Motor fijo por tipo de columna, ej. "N=easyocr_digitos"
+        self.recognition_engines = os.getenv("RECOGNITION_ENGINES", "")
+
+        # Plantillas de grilla por libro: las páginas siguientes reutilizan las celdas alineadas
+        self.grid_template_cache = os.getenv("GRID_TEMPLATE_CACHE", "true").lower() == "true"
+        self.grid_template_cache_size = int(os.getenv("GRID_TEMPLATE_CACHE_SIZE", "64"))
+        self.grid_template_min_correlation = float(os.getenv("GRID_TEMPLATE_MIN_CORRELATION", "0.8"))
+
+        # Checkpoints por fila: un checkpoint de otro proceso más reciente que esto se considera vivo
+        self.checkpoint_heartbeat_timeout = int(os.getenv("CHECKPOINT_HEARTBEAT_TIMEOUT", "120"))
+        # Publicar cada tupla para validación apenas se reconoce (false: al terminar la página)
+        self.stream_partial_results = os.getenv("STREAM_PARTIAL_RESULTS", "true").lower() == "true"
+        
+        # Control de calidad de imagen previo al procesamiento: off | flag (marcar para
+        # reescanear y seguir) | reject (no procesar la página)
+        self.quality_gate_mode = os.getenv("QUALITY_GATE_MODE", "flag").lower()
+        self.quality_min_sharpness = float(os.getenv("QUALITY_MIN_SHARPNESS", "50"))
+        self.quality_min_contrast = float(os.getenv("QUALITY_MIN_CONTRAST", "70"))
+        self.quality_max_skew = float(os.getenv("QUALITY_MAX_SKEW", "5"))
+        self.quality_min_dpi = float(os.getenv("QUALITY_MIN_DPI", "150"))
+
+        # Enderezado de la página antes de detectar la grilla
+        self.deskew_enabled = os.getenv("DESKEW_ENABLED", "true").lower() == "true"
+        self.deskew_min_angle = float(os.getenv("DESKEW_MIN_ANGLE", "0.1"))
+
+        # Escala de celdas según la altura medida de los glifos (px); 0 = factor fijo del notebook
+        self.cell_glyph_target_height = float(os.getenv("CELL_GLYPH_TARGET_HEIGHT", "40"))
+        
+        # Redis: progreso compartido y eventos para Documents-service (vacío = solo memoria)
+        self.redis_url = os.getenv("REDIS_URL", "")
+        # Segundos que se conserva el progreso de un documento desde su última actualización
+        self.progress_ttl_seconds = float(os.getenv("PROGRESS_TTL_SECONDS", "3600"))
+
+        # Outbox de eventos hacia Documents-service (ver services/outbox.py)
+        self.outbox_relay_enabled = os.getenv("OUTBOX_RELAY_ENABLED", "true").lower() == "true"
+        # URL que recibe los eventos; vacío = bus local en Redis (canal sacra360:eventos)
+        self.outbox_destino_url = os.getenv("OUTBOX_DESTINO_URL", "http://documents-service:8002/api/v1/eventos")
+        self.outbox_relay_interval = float(os.getenv("OUTBOX_RELAY_INTERVAL", "2"))
+        self.outbox_max_intentos = int(os.getenv("OUTBOX_MAX_INTENTOS", "10"))
+        
+        # Control de admisión por proceso (ver services/admission.py): con el worker lleno
+        # o con la memoria residente sobre el límite se responde 503 + Retry-After
+        self.max_trabajos_simultaneos = int(os.getenv("MAX_TRABAJOS_SIMULTANEOS", "2"))
+        self.max_rss_mb = float(os.getenv("MAX_RSS_MB", "0"))  # 0 = sin límite
+        self.admision_retry_after = int(os.getenv("ADMISION_RETRY_AFTER", "30"))
+        
         # Configuración de archivos
         self.max_file_size = 50 * 1024 * 1024  # 50MB
         self.allowed_file_types = ["image/jpeg", "image/png", "image/jpg", "application/pdf"]
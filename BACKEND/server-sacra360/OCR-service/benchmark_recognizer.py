@@ -0,0 +1,137 @@
+"""
+Benchmark del reconocedor OCR V2: PyTorch vs ONNX Runtime INT8
+
+Usa el mismo flujo de OcrV2Processor (detección de tabla, extracción y
+preprocesamiento de celdas) sobre las páginas de prueba (BACKEND/Images por
+defecto) y lee las celdas con ambos backends. Reporta tiempo por celda,
+speedup y coincidencia del texto (CER) del backend INT8 contra PyTorch.
+
+Uso:
+    python benchmark_recognizer.py [imagenes...] [--max-celdas 300] [--salida reporte.md]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+# Agregar el directorio raíz al path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import cv2
+
+from app.services.ocr_v2_processor import OcrV2Processor
+from app.services.onnx_recognizer import crear_reader, backend_activo, BACKEND_TORCH, BACKEND_ONNX_INT8
+
+IMAGENES_DEFAULT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Images')
+
+
+def distancia_edicion(a: str, b: str) -> int:
+    """Distancia de Levenshtein entre dos cadenas"""
+    previa = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(previa[j] + 1, actual[j - 1] + 1, previa[j - 1] + (ca != cb)))
+        previa = actual
+    return previa[-1]
+
+
+def cer(predicho: str, referencia: str) -> float:
+    if not referencia:
+        return 0.0 if not predicho else 1.0
+    return distancia_edicion(predicho, referencia) / len(referencia)
+
+
+def extraer_celdas(processor: OcrV2Processor, ruta_imagen: str, max_celdas: int):
+    """Corre el flujo de OcrV2Processor hasta el preprocesamiento y devuelve las celdas (en memoria)"""
+    img = cv2.imread(ruta_imagen, cv2.IMREAD_GRAYSCALE)
+    try:
+        cells, img_procesada = processor.detectar_y_extraer_tabla(img)
+        if not cells:
+            return []
+        processor.extraer_y_guardar_celdas(img_procesada, cells)
+        processor.preprocesar_imagenes()
+        return [celda for celda in processor.celdas_preprocesadas[:max_celdas] if celda is not None]
+    finally:
+        processor.liberar_celdas()
+
+
+def leer(reader, celdas):
+    """Lee todas las celdas y devuelve (textos, segundos)"""
+    textos = []
+    inicio = time.perf_counter()
+    for celda in celdas:
+        resultado = reader.readtext(celda, detail=0, paragraph=False, workers=0)
+        textos.append(" ".join(resultado).strip())
+    return textos, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PyTorch vs ONNX Runtime INT8 (OCR V2)")
+    parser.add_argument('imagenes', nargs='*')
+    parser.add_argument('--max-celdas', type=int, default=300)
+    parser.add_argument('--salida', help="Guardar reporte markdown en este archivo")
+    args = parser.parse_args()
+
+    imagenes = args.imagenes or sorted(
+        glob.glob(os.path.join(IMAGENES_DEFAULT, '*.png')) + glob.glob(os.path.join(IMAGENES_DEFAULT, '*.jp*g'))
+    )
+
+    print("🔧 Cargando readers (torch y onnx_int8)...")
+    readers = {
+        BACKEND_TORCH: crear_reader(['en'], backend=BACKEND_TORCH, gpu=False, verbose=False),
+        BACKEND_ONNX_INT8: crear_reader(['en'], backend=BACKEND_ONNX_INT8, verbose=False),
+    }
+    # Si la exportación falló el reader "onnx_int8" corre en PyTorch: no comparar nada
+    if backend_activo() != BACKEND_ONNX_INT8:
+        sys.exit(f"❌ El backend ONNX Runtime INT8 no quedó activo ({backend_activo()}); ver el log de la exportación")
+    processor = OcrV2Processor()
+
+    filas = []
+    for ruta in imagenes:
+        nombre = os.path.basename(ruta)
+        celdas = extraer_celdas(processor, ruta, args.max_celdas)
+        if not celdas:
+            print(f"⚠️  {nombre}: sin celdas")
+            continue
+
+        # Calentamiento para no medir la primera inferencia
+        for reader in readers.values():
+            leer(reader, celdas[:3])
+
+        textos_torch, t_torch = leer(readers[BACKEND_TORCH], celdas)
+        textos_int8, t_int8 = leer(readers[BACKEND_ONNX_INT8], celdas)
+
+        fila = {
+            'imagen': nombre,
+            'celdas': len(celdas),
+            'ms_torch': 1000 * t_torch / len(celdas),
+            'ms_int8': 1000 * t_int8 / len(celdas),
+            'speedup': t_torch / t_int8 if t_int8 else 0.0,
+            'cer': sum(cer(a, b) for a, b in zip(textos_int8, textos_torch)) / len(celdas),
+            'exactas': sum(a == b for a, b in zip(textos_int8, textos_torch)) / len(celdas),
+        }
+        filas.append(fila)
+        print(f"✅ {nombre}: {fila['ms_torch']:.1f} ms → {fila['ms_int8']:.1f} ms por celda "
+              f"(x{fila['speedup']:.2f}), CER vs torch {fila['cer']:.3f}")
+
+    reporte = [
+        "| Imagen | Celdas | ms/celda torch | ms/celda INT8 | Speedup | CER INT8 vs torch | Idénticas |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for f in filas:
+        reporte.append(f"| {f['imagen']} | {f['celdas']} | {f['ms_torch']:.1f} | {f['ms_int8']:.1f} | "
+                       f"x{f['speedup']:.2f} | {f['cer']:.3f} | {100 * f['exactas']:.1f}% |")
+
+    texto = "\n".join(reporte)
+    print("\n" + texto)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + "\n")
+        print(f"\n💾 Reporte guardado en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -110,6 +110,11 @@ CREATE TABLE documento_digitalizado (
     progreso_ocr int DEFAULT 0,
     mensaje_progreso text DEFAULT '',
     fecha_validacion timestamp  NULL,
+    checkpoint_procesamiento jsonb  NULL,
+    clasificacion_pagina jsonb  NULL,
+    calidad_imagen jsonb  NULL,
+    sha256 char(64)  NULL,
+    lote_id varchar(32)  NULL,
     CONSTRAINT documento_digitalizado_pk PRIMARY KEY (id_documento)
 );
 
@@ -117,6 +122,11 @@ CREATE TABLE documento_digitalizado (
 COMMENT ON COLUMN documento_digitalizado.modelo_procesamiento IS 'Indica qué modelo se usó para procesar el documento: ocr (EasyOCR) o htr (HTR_Sacra360)';
 COMMENT ON COLUMN documento_digitalizado.progreso_ocr IS 'Progreso del procesamiento (0-100%). Aplica tanto para OCR como HTR';
 COMMENT ON COLUMN documento_digitalizado.mensaje_progreso IS 'Mensaje descriptivo del progreso actual. Ejemplo: "Procesadas 20/139 celdas"';
+COMMENT ON COLUMN documento_digitalizado.checkpoint_procesamiento IS 'Checkpoint del procesamiento OCR/HTR en curso (NULL si no hay trabajo pendiente). Se borra al completar';
+COMMENT ON COLUMN documento_digitalizado.clasificacion_pagina IS 'Decisión del clasificador impreso/manuscrito: modelo, confianza, características y corregido_a si el operador cambió el modelo. NULL si el modelo se eligió manualmente';
+COMMENT ON COLUMN documento_digitalizado.calidad_imagen IS 'Control de calidad de la página: aprobada, motivos (borrosa, bajo contraste, inclinada, resolución baja...), métricas y modo (flag/reject). NULL si no se evaluó';
+COMMENT ON COLUMN documento_digitalizado.sha256 IS 'SHA-256 (hex) del archivo subido; clave del objeto en MinIO y de la deduplicación de uploads';
+COMMENT ON COLUMN documento_digitalizado.lote_id IS 'Lote de carga (POST /lote) que creó el documento. NULL en documentos subidos de a uno';
 
 -- Table: libros
 CREATE TABLE libros (
@@ -140,9 +150,13 @@ CREATE TABLE ocr_resultado (
     estado_validacion varchar(20)  NOT NULL DEFAULT 'pendiente',
     sacramento_id int  NULL,
     fecha_validacion timestamp  NULL,
+    listo boolean  NOT NULL DEFAULT true,
+    bbox_celdas jsonb  NULL,
     CONSTRAINT ocr_resultado_pk PRIMARY KEY (id_ocr)
 );
 
+COMMENT ON COLUMN ocr_resultado.bbox_celdas IS 'Caja [x, y, w, h] de cada celda de la tupla en la página procesada y datos de la página (ancho, alto, dpi, angulo de enderezado). NULL en tuplas procesadas antes de Migration_Bbox_Celdas.sql';
+
 -- Table: personas
 CREATE TABLE personas (
     id_persona serial  NOT NULL,
@@ -234,6 +248,31 @@ CREATE TABLE validacion_tuplas (
     CONSTRAINT validacion_tuplas_pk PRIMARY KEY (id_validacion)
 );
 
+-- Table: outbox_evento
+CREATE TABLE outbox_evento (
+    id_evento uuid  NOT NULL,
+    tipo varchar(100)  NOT NULL,
+    documento_id int  NULL,
+    origen varchar(20)  NOT NULL,
+    payload jsonb  NOT NULL DEFAULT '{}'::jsonb,
+    creado_en timestamp  NOT NULL DEFAULT NOW(),
+    enviado_en timestamp  NULL,
+    intentos int  NOT NULL DEFAULT 0,
+    proximo_intento timestamp  NOT NULL DEFAULT NOW(),
+    ultimo_error text  NULL,
+    CONSTRAINT outbox_evento_pk PRIMARY KEY (id_evento)
+);
+
+-- Table: evento_recibido
+CREATE TABLE evento_recibido (
+    id_evento uuid  NOT NULL,
+    tipo varchar(100)  NOT NULL,
+    documento_id int  NULL,
+    origen varchar(20)  NULL,
+    recibido_en timestamp  NOT NULL DEFAULT NOW(),
+    CONSTRAINT evento_recibido_pk PRIMARY KEY (id_evento)
+);
+
 -- Índices y mejoras añadidas por migraciones
 CREATE INDEX idx_documento_modelo_procesamiento 
 ON documento_digitalizado(modelo_procesamiento);
@@ -244,14 +283,23 @@ ON ocr_resultado(fuente_modelo);
 CREATE INDEX idx_documento_estado_procesamiento 
 ON documento_digitalizado (estado_procesamiento);
 
+CREATE INDEX idx_documento_sha256 ON documento_digitalizado (sha256);
+
+CREATE INDEX idx_documento_lote ON documento_digitalizado (lote_id);
+
 CREATE INDEX idx_ocr_resultado_tupla ON ocr_resultado(documento_id, tupla_numero);
 CREATE INDEX idx_ocr_resultado_estado ON ocr_resultado(estado_validacion);
+CREATE INDEX idx_ocr_resultado_documento_listo ON ocr_resultado(documento_id, listo);
 CREATE INDEX idx_validacion_tuplas_documento ON validacion_tuplas(documento_id);
 CREATE INDEX idx_validacion_tuplas_estado ON validacion_tuplas(estado);
+CREATE INDEX idx_outbox_evento_pendiente ON outbox_evento(proximo_intento) WHERE enviado_en IS NULL;
 
 -- Comentarios adicionales
 COMMENT ON TABLE ocr_resultado IS 'Almacena resultados de procesamiento de documentos (OCR o HTR). El campo fuente_modelo distingue qué motor generó los datos.';
 COMMENT ON COLUMN ocr_resultado.fuente_modelo IS 'Identificador del modelo que generó los datos: "OCRv2_EasyOCR" o "HTR_Sacra360"';
+COMMENT ON COLUMN ocr_resultado.listo IS 'false mientras el trabajo que insertó la tupla sigue en curso; la validación solo muestra tuplas listas';
+COMMENT ON TABLE outbox_evento IS 'Eventos pendientes de entrega a otros servicios; se insertan en la misma transacción que el cambio que los origina';
+COMMENT ON TABLE evento_recibido IS 'Eventos ya aplicados por Documents-service; un id_evento repetido se ignora';
 
 COMMENT ON CONSTRAINT personas_datos_basicos_unique ON personas IS 'Evita registrar la misma persona con los mismos datos básicos (nombres, apellidos, fecha nacimiento y fecha bautismo)';
 COMMENT ON CONSTRAINT sacramentos_unico_por_registro ON sacramentos IS 'Evita registrar el mismo sacramento dos veces para la misma persona';
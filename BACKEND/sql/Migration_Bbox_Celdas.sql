@@ -0,0 +1,22 @@
+-- ==================================================================================
+-- MIGRATION: Regiones de celdas por tupla
+-- Fecha: 2026-10-19
+-- Descripción: OCR-service y HTR-service guardan la caja de cada celda de la tupla
+-- para que el validador pueda volver a reconocer una tupla o una celda
+-- (POST /reconocer-tupla/{documento_id}/{tupla_numero}) sin reprocesar el documento.
+-- ==================================================================================
+
+-- 1. Cajas de las celdas
+ALTER TABLE ocr_resultado
+ADD COLUMN IF NOT EXISTS bbox_celdas JSONB NULL;
+
+COMMENT ON COLUMN ocr_resultado.bbox_celdas IS
+'Caja [x, y, w, h] de cada celda de la tupla en la página procesada y datos de la página (ancho, alto, dpi, angulo de enderezado). NULL en tuplas procesadas antes de esta migración';
+
+-- 2. Verificar la migración
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Migración completada exitosamente';
+    RAISE NOTICE 'Columnas agregadas:';
+    RAISE NOTICE '  - ocr_resultado.bbox_celdas';
+END $$;
@@ -0,0 +1,22 @@
+-- ==================================================================================
+-- MIGRATION: Control de calidad de imagen antes del OCR/HTR
+-- Fecha: 2026-10-19
+-- Descripción: OCR-service y HTR-service evalúan nitidez, contraste, inclinación y
+-- DPI de la página antes de reconocerla. Las métricas se guardan en el documento;
+-- con QUALITY_GATE_MODE=reject la página queda en estado 'rechazado_calidad'.
+-- ==================================================================================
+
+-- 1. Métricas del control de calidad
+ALTER TABLE documento_digitalizado
+ADD COLUMN IF NOT EXISTS calidad_imagen JSONB NULL;
+
+COMMENT ON COLUMN documento_digitalizado.calidad_imagen IS
+'Control de calidad de la página: aprobada, motivos (borrosa, bajo contraste, inclinada, resolución baja...), métricas y modo (flag/reject). NULL si no se evaluó';
+
+-- 2. Verificar la migración
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Migración completada exitosamente';
+    RAISE NOTICE 'Columnas agregadas:';
+    RAISE NOTICE '  - documento_digitalizado.calidad_imagen';
+END $$;
@@ -0,0 +1,36 @@
+-- ==================================================================================
+-- MIGRATION: Checkpoints por fila para reanudar procesamientos OCR/HTR
+-- Fecha: 2026-10-19
+-- Descripción: Un procesamiento HTR de página completa tarda minutos. Si el
+-- contenedor se reinicia o vence el timeout de DigitalizacionService, el trabajo
+-- se reanuda desde el último checkpoint en lugar de empezar de cero.
+-- ==================================================================================
+
+-- 1. Estado del procesamiento en curso (grilla, última fila completada, etc.)
+ALTER TABLE documento_digitalizado
+ADD COLUMN IF NOT EXISTS checkpoint_procesamiento JSONB NULL;
+
+COMMENT ON COLUMN documento_digitalizado.checkpoint_procesamiento IS
+'Checkpoint del procesamiento OCR/HTR en curso (NULL si no hay trabajo pendiente). Se borra al completar';
+
+-- 2. Tuplas guardadas por un trabajo que aún no termina
+ALTER TABLE ocr_resultado
+ADD COLUMN IF NOT EXISTS listo BOOLEAN NOT NULL DEFAULT true;
+
+COMMENT ON COLUMN ocr_resultado.listo IS
+'false mientras el trabajo que insertó la tupla sigue en curso; la validación solo muestra tuplas listas';
+
+-- 3. Índice para las consultas de validación (solo tuplas listas)
+CREATE INDEX IF NOT EXISTS idx_ocr_resultado_documento_listo
+ON ocr_resultado(documento_id, listo);
+
+-- 4. Verificar la migración
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Migración completada exitosamente';
+    RAISE NOTICE 'Columnas agregadas:';
+    RAISE NOTICE '  - documento_digitalizado.checkpoint_procesamiento';
+    RAISE NOTICE '  - ocr_resultado.listo';
+    RAISE NOTICE 'Índices creados:';
+    RAISE NOTICE '  - idx_ocr_resultado_documento_listo';
+END $$;
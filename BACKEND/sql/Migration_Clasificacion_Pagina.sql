@@ -0,0 +1,22 @@
+-- ==================================================================================
+-- MIGRATION: Clasificación automática OCR/HTR de páginas
+-- Fecha: 2026-10-19
+-- Descripción: Con modelo_procesamiento=auto, Documents-service clasifica la página
+-- (impresa o manuscrita) antes de enviarla a OCR o HTR. La decisión y su confianza
+-- se guardan para auditar el enrutamiento y medir las correcciones manuales.
+-- ==================================================================================
+
+-- 1. Decisión del clasificador
+ALTER TABLE documento_digitalizado
+ADD COLUMN IF NOT EXISTS clasificacion_pagina JSONB NULL;
+
+COMMENT ON COLUMN documento_digitalizado.clasificacion_pagina IS
+'Decisión del clasificador impreso/manuscrito: modelo, confianza, características y corregido_a si el operador cambió el modelo. NULL si el modelo se eligió manualmente';
+
+-- 2. Verificar la migración
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Migración completada exitosamente';
+    RAISE NOTICE 'Columnas agregadas:';
+    RAISE NOTICE '  - documento_digitalizado.clasificacion_pagina';
+END $$;
@@ -0,0 +1,27 @@
+-- ==================================================================================
+-- MIGRATION: Carga de libros por lote
+-- Fecha: 2026-10-19
+-- Descripción: Documents-service acepta un libro completo en un pedido
+-- (POST /api/v1/digitalizacion/lote, varias páginas o un ZIP). Los documentos
+-- creados por el lote comparten un lote_id, con el que se consulta el progreso
+-- agregado (GET /api/v1/digitalizacion/lote/{lote_id}).
+-- ==================================================================================
+
+-- 1. Lote de carga del documento
+ALTER TABLE documento_digitalizado
+ADD COLUMN IF NOT EXISTS lote_id VARCHAR(32) NULL;
+
+COMMENT ON COLUMN documento_digitalizado.lote_id IS
+'Lote de carga (POST /lote) que creó el documento. NULL en documentos subidos de a uno';
+
+-- 2. Índice para el progreso por lote
+CREATE INDEX IF NOT EXISTS idx_documento_lote
+ON documento_digitalizado (lote_id);
+
+-- 3. Verificar la migración
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Migración completada exitosamente';
+    RAISE NOTICE 'Columnas agregadas:';
+    RAISE NOTICE '  - documento_digitalizado.lote_id (índice idx_documento_lote)';
+END $$;
@@ -0,0 +1,55 @@
+-- ==================================================================================
+-- MIGRATION: Outbox de eventos entre servicios
+-- Fecha: 2026-10-19
+-- Descripción: OCR-service y HTR-service registran el evento documento.procesado
+-- en outbox_evento dentro de la misma transacción que guarda los resultados; un
+-- relay lo entrega a Documents-service con reintentos. Documents-service anota
+-- en evento_recibido los eventos ya aplicados para ignorar las entregas repetidas.
+-- ==================================================================================
+
+-- 1. Outbox (lado emisor)
+CREATE TABLE IF NOT EXISTS outbox_evento (
+    id_evento uuid  NOT NULL,
+    tipo varchar(100)  NOT NULL,
+    documento_id int  NULL,
+    origen varchar(20)  NOT NULL,
+    payload jsonb  NOT NULL DEFAULT '{}'::jsonb,
+    creado_en timestamp  NOT NULL DEFAULT NOW(),
+    enviado_en timestamp  NULL,
+    intentos int  NOT NULL DEFAULT 0,
+    proximo_intento timestamp  NOT NULL DEFAULT NOW(),
+    ultimo_error text  NULL,
+    CONSTRAINT outbox_evento_pk PRIMARY KEY (id_evento)
+);
+
+-- 2. Índice parcial de eventos pendientes (lo que recorre el relay)
+CREATE INDEX IF NOT EXISTS idx_outbox_evento_pendiente
+ON outbox_evento (proximo_intento)
+WHERE enviado_en IS NULL;
+
+COMMENT ON TABLE outbox_evento IS
+'Eventos pendientes de entrega a otros servicios; se insertan en la misma transacción que el cambio que los origina';
+COMMENT ON COLUMN outbox_evento.enviado_en IS
+'NULL mientras el evento no se entregó; el relay reintenta con espera exponencial (proximo_intento)';
+
+-- 3. Eventos recibidos (lado receptor, deduplicación)
+CREATE TABLE IF NOT EXISTS evento_recibido (
+    id_evento uuid  NOT NULL,
+    tipo varchar(100)  NOT NULL,
+    documento_id int  NULL,
+    origen varchar(20)  NULL,
+    recibido_en timestamp  NOT NULL DEFAULT NOW(),
+    CONSTRAINT evento_recibido_pk PRIMARY KEY (id_evento)
+);
+
+COMMENT ON TABLE evento_recibido IS
+'Eventos ya aplicados por Documents-service; la entrega es al menos una vez y un id_evento repetido se ignora';
+
+-- 4. Verificar la migración
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Migración completada exitosamente';
+    RAISE NOTICE 'Tablas creadas:';
+    RAISE NOTICE '  - outbox_evento';
+    RAISE NOTICE '  - evento_recibido';
+END $$;
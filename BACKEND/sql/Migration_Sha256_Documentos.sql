@@ -0,0 +1,27 @@
+-- ==================================================================================
+-- MIGRATION: Almacenamiento por contenido y deduplicación de uploads
+-- Fecha: 2026-10-19
+-- Descripción: Documents-service guarda cada archivo en MinIO bajo su SHA-256
+-- (documents/sha256/{ab}/{sha256}.ext) y anota el hash en documento_digitalizado.
+-- Un upload repetido del mismo libro y sacramento devuelve el documento existente;
+-- en otro libro reutiliza el objeto ya guardado sin volver a subirlo.
+-- ==================================================================================
+
+-- 1. Hash del contenido
+ALTER TABLE documento_digitalizado
+ADD COLUMN IF NOT EXISTS sha256 CHAR(64) NULL;
+
+COMMENT ON COLUMN documento_digitalizado.sha256 IS
+'SHA-256 (hex) del archivo subido; clave del objeto en MinIO. NULL en documentos subidos antes de esta migración';
+
+-- 2. Índice para la búsqueda de duplicados al subir
+CREATE INDEX IF NOT EXISTS idx_documento_sha256
+ON documento_digitalizado (sha256);
+
+-- 3. Verificar la migración
+DO $$
+BEGIN
+    RAISE NOTICE '✅ Migración completada exitosamente';
+    RAISE NOTICE 'Columnas agregadas:';
+    RAISE NOTICE '  - documento_digitalizado.sha256 (índice idx_documento_sha256)';
+END $$;
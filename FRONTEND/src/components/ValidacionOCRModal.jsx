@@ -342,7 +342,17 @@ const ValidacionOCRModal = ({
           setObservaciones('');
           setModoEdicion(false);
           console.log(`➡️ Avanzando a tupla ${resultado.siguiente_tupla}`);
+        } else {
+          // Tupla publicada por el OCR/HTR después de abrir el modal
+          await cargarTuplasPendientes();
         }
+      } else if (resultado.procesamiento_en_curso) {
+        // Se validó todo lo publicado pero la página sigue procesándose
+        setNotificacion({
+          tipo: 'info',
+          mensaje: '⏳ Esperando más tuplas del procesamiento en curso...'
+        });
+        setTimeout(cargarTuplasPendientes, 5000);
       } else if (resultado.completado) {
         // Validación completada - todas las tuplas procesadas
         console.log('🎉 Documento completamente validado');
@@ -578,7 +588,9 @@ const ValidacionOCRModal = ({
         {/* Notificación de éxito */}
         {notificacion && (
           <div className={`absolute top-4 right-4 z-10 px-4 py-3 rounded-lg shadow-lg ${
-            notificacion.tipo === 'success' ? 'bg-green-500 text-white' : 'bg-red-500 text-white'
+            notificacion.tipo === 'success' ? 'bg-green-500 text-white'
+              : notificacion.tipo === 'info' ? 'bg-blue-500 text-white'
+              : 'bg-red-500 text-white'
           } animate-fade-in-down`}>
             {notificacion.mensaje}
           </div>
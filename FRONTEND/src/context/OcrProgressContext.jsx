@@ -2,14 +2,43 @@ import { createContext, useContext, useState, useEffect, useRef, useCallback } f
 
 /**
  * Context para manejar el progreso de OCR de forma centralizada
- * Evita el problema de polling infinito al mantener un único intervalo global
+ * Todos los documentos en seguimiento reciben su progreso en vivo por un único
+ * stream Server-Sent Events (/progreso/stream?ids=...): una conexión por
+ * documento agotaría las ~6 conexiones por origen del navegador y bloquearía el
+ * resto de las llamadas a la API. Un único intervalo global de polling queda de respaldo
  */
+const API_PROGRESO = 'http://localhost:8002/api/v1/digitalizacion/progreso'
+const ESTADOS_FINALES = ['completado', 'error']
+// Máximo de documentos por stream (MAX_PROGRESO_LOTE en Documents-service)
+const MAX_DOCUMENTOS_STREAM = 200
+
 const OcrProgressContext = createContext()
 
 export function OcrProgressProvider({ children }) {
   const [documentosEnProceso, setDocumentosEnProceso] = useState({})
   const intervalRef = useRef(null)
   const isPollingRef = useRef(false)
+  // Stream compartido: { source: EventSource, ids: Set de documentos que sigue }
+  const streamRef = useRef(null)
+  const etagRef = useRef(null)
+  const consultarRef = useRef(null)
+
+  /**
+   * Aplica un progreso recibido (stream o polling) si el documento sigue en seguimiento
+   */
+  const aplicarProgreso = useCallback((docId, data) => {
+    setDocumentosEnProceso(prev => {
+      if (!prev[docId]) return prev
+      return { ...prev, [docId]: { ...data, timestamp: Date.now() } }
+    })
+  }, [])
+
+  const cerrarStream = useCallback(() => {
+    if (streamRef.current) {
+      streamRef.current.source.close()
+      streamRef.current = null
+    }
+  }, [])
 
   /**
    * Inicia el seguimiento de un documento
@@ -33,6 +62,7 @@ export function OcrProgressProvider({ children }) {
    */
   const detenerSeguimiento = useCallback((documentoId) => {
     console.log('🛑 Deteniendo seguimiento OCR para documento:', documentoId)
+    // El stream compartido deja de reportarlo al llegar a un estado final
     
     setDocumentosEnProceso(prev => {
       const nuevo = { ...prev }
@@ -51,50 +81,73 @@ export function OcrProgressProvider({ children }) {
       return
     }
 
-    // Consultar cada documento (en paralelo para eficiencia)
-    // Ahora consulta Documents-service que redirige a OCR o HTR según el modelo
-    const promesas = documentosIds.map(async (docId) => {
-      try {
-        const response = await fetch(`http://localhost:8002/api/v1/digitalizacion/progreso/${docId}`)
-        
-        if (!response.ok) {
-          throw new Error(`HTTP ${response.status}`)
-        }
+    // Una sola consulta en lote para todos los documentos; con ETag, si nada
+    // cambió desde la última respuesta el servidor contesta 304 sin cuerpo
+    let data
+    try {
+      const headers = etagRef.current ? { 'If-None-Match': etagRef.current } : {}
+      const response = await fetch(`${API_PROGRESO}?ids=${documentosIds.join(',')}`, { headers, cache: 'no-store' })
 
-        const data = await response.json()
-        return { docId, data }
-      } catch (error) {
-        console.error(`⚠️ Error consultando progreso de documento ${docId}:`, error)
-        return { docId, data: null }
+      if (response.status === 304) {
+        return
+      }
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`)
       }
-    })
 
-    const resultados = await Promise.all(promesas)
+      etagRef.current = response.headers.get('ETag')
+      data = await response.json()
+    } catch (error) {
+      console.error('⚠️ Error consultando progreso de documentos:', documentosIds, error)
+      return
+    }
 
     // Actualizar estados y MANTENER documentos completados para permitir redirección
-    setDocumentosEnProceso(prev => {
-      const nuevo = { ...prev }
-      
-      resultados.forEach(({ docId, data }) => {
-        if (data && nuevo[docId]) {
-          console.log(`📊 Progreso documento ${docId}:`, {
-            estado: data.estado,
-            progreso: data.progreso,
-            mensaje: data.mensaje
-          })
-          
-          // Actualizar estado siempre (incluso si está completado/error)
-          // El modal se encarga de redirigir y luego detener el seguimiento
-          nuevo[docId] = {
-            ...data,
-            timestamp: Date.now()
-          }
-        }
-      })
+    // (el modal se encarga de redirigir y luego detener el seguimiento)
+    Object.entries(data.documentos || {}).forEach(([docId, progreso]) => {
+      aplicarProgreso(docId, progreso)
+    })
+  }, [documentosEnProceso, aplicarProgreso])
+  consultarRef.current = consultarProgresos
 
-      return nuevo
+  /**
+   * Mantiene un único stream SSE para los documentos en seguimiento que no
+   * terminaron; se reabre solo cuando aparece un documento que el stream no sigue
+   */
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') return
+
+    const activos = Object.keys(documentosEnProceso)
+      .filter(docId => !ESTADOS_FINALES.includes(documentosEnProceso[docId]?.estado))
+      .slice(0, MAX_DOCUMENTOS_STREAM)
+
+    if (activos.length === 0) {
+      cerrarStream()
+      return
+    }
+    if (streamRef.current && activos.every(docId => streamRef.current.ids.has(docId))) return
+
+    cerrarStream()
+    const ids = new Set(activos)
+    const source = new EventSource(`${API_PROGRESO}/stream?ids=${activos.join(',')}`)
+    source.addEventListener('progreso', (evento) => {
+      const data = JSON.parse(evento.data)
+      const docId = String(data.documento_id)
+      aplicarProgreso(docId, data)
+      if (ESTADOS_FINALES.includes(data.estado)) {
+        ids.delete(docId)
+        // Todos terminaron: cerrar antes de que EventSource reconecte solo
+        if (ids.size === 0 && streamRef.current?.source === source) {
+          cerrarStream()
+        }
+      }
     })
-  }, [documentosEnProceso])
+    // Ante un error EventSource reconecta solo; el polling cubre mientras tanto
+    streamRef.current = { source, ids }
+  }, [documentosEnProceso, aplicarProgreso, cerrarStream])
+
+  // Cerrar el stream al desmontar
+  useEffect(() => cerrarStream, [cerrarStream])
 
   /**
    * Efecto para manejar el polling global
@@ -116,14 +169,15 @@ export function OcrProgressProvider({ children }) {
 
     // Si hay documentos y NO hay polling activo, iniciarlo
     if (!isPollingRef.current) {
-      console.log('🔄 Iniciando polling global cada 15 segundos')
+      console.log('🔄 Iniciando polling global de respaldo cada 15 segundos')
       isPollingRef.current = true
       
       // Primera consulta inmediata
       consultarProgresos()
       
       // Luego cada 15 segundos para capturar cambios
-      intervalRef.current = setInterval(consultarProgresos, 15000)
+      // (vía ref: el intervalo consulta siempre la lista de documentos actual)
+      intervalRef.current = setInterval(() => consultarRef.current(), 15000)
     }
     // NO hacer cleanup aquí - solo detener cuando documentosIds.length === 0
   }, [documentosEnProceso, consultarProgresos])
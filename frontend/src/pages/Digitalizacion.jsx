@@ -4,6 +4,9 @@ import Layout from '../components/Layout'
 import OcrProgressModal from '../components/OcrProgressModal'
 import { useOcrProgress } from '../context/OcrProgressContext'
 
+// Reintentos de un upload rechazado con 429 (OCR/HTR saturados) antes de darlo por fallido
+const MAX_REINTENTOS_SATURADO = 5
+
 export default function Digitalizacion() {
   const navigate = useNavigate()
   const { iniciarSeguimiento } = useOcrProgress()
@@ -151,14 +154,27 @@ export default function Digitalizacion() {
         try {
           console.log('📤 Subiendo archivo:', file.name)
           
-          const response = await fetch('http://localhost:8002/api/v1/digitalizacion/upload', {
-            method: 'POST',
-            body: uploadData
-          })
+          // 429 = OCR/HTR y su cola llenos: esperar lo que indica Retry-After y reintentar
+          let response
+          for (let intento = 0; ; intento++) {
+            response = await fetch('http://localhost:8002/api/v1/digitalizacion/upload', {
+              method: 'POST',
+              body: uploadData
+            })
+            if (response.status !== 429 || intento >= MAX_REINTENTOS_SATURADO) break
+            const espera = parseInt(response.headers.get('Retry-After'), 10) || 30
+            console.warn(`🚦 Servicio saturado, reintentando ${file.name} en ${espera}s`)
+            await new Promise(resolve => setTimeout(resolve, espera * 1000))
+          }
 
           if (response.ok) {
             const result = await response.json()
             console.log('✅ Archivo subido:', result)
+            if (result.duplicado) {
+              console.log(`♻️ ${file.name} ya estaba subido como documento ${result.documento_id}`)
+            } else if (result.admision === 'en_cola') {
+              console.log(`⏳ En cola (posición ${result.posicion_cola}, ~${Math.ceil(result.eta_segundos / 60)} min)`)
+            }
             
             newUploadedFiles.push({
               ...result,